@@ -1,6 +1,6 @@
 import time
 import json
-from typing import List
+from typing import List, Optional
 
 from loguru import logger
 from pydantic import Field
@@ -9,6 +9,11 @@ from agentevolver.schema.trajectory import Trajectory, Reward
 from agentevolver.utils.http_client import HttpClient
 
 
+def to_summary_payload(trajectory: Trajectory) -> dict:
+    """The part of a trajectory the summarizer needs: its messages and outcome score."""
+    return {"messages": trajectory.steps, "score": trajectory.reward.outcome}
+
+
 class EMClient(HttpClient):
     base_url: str = Field(default="http://localhost:8001")
     timeout: int = Field(default=1200, description="request timeout, second")
@@ -28,21 +33,38 @@ class EMClient(HttpClient):
             str: The merged experience string from the server's response.
         """
         start_time = time.time()
+        # "query": trajectory.query,
+        answer = self.retrieve_task_memory(json.dumps(trajectory.steps, ensure_ascii=False), retrieve_top_k, workspace_id)
+        if answer is None:
+            logger.warning("error call_context_generator")
+            return ""
+
+        # TODO return raw experience instead of context @jinli
+        trajectory.metadata["context_time_cost"] = time.time() - start_time  # ⭐ Log the time taken for the operation
+        return answer
+
+    def retrieve_task_memory(self, query: str, retrieve_top_k: int = 1, workspace_id: str = "default") -> Optional[str]:
+        """
+        Retrieves the merged experience for a query string from the retrieve_task_memory endpoint.
+
+        Args:
+            query (str): The retrieval query.
+            retrieve_top_k (int, optional): The number of top results to retrieve. Defaults to 1.
+            workspace_id (str, optional): The ID of the workspace. Defaults to "default".
+
+        Returns:
+            Optional[str]: The merged experience, or None if the request failed.
+        """
         self.url = self.base_url + "/retrieve_task_memory"  # ⭐ Set the URL for the request
         json_data = {
-            # "query": trajectory.query,
-            "query": json.dumps(trajectory.steps, ensure_ascii=False),
+            "query": query,
             "top_k": retrieve_top_k,
             "workspace_id": workspace_id,
             # "metadata": kwargs
         }
         response = self.request(json_data=json_data, headers={"Content-Type": "application/json"})  # ⭐ Send the request to the server
         if response is None:
-            logger.warning("error call_context_generator")
-            return ""
-
-        # TODO return raw experience instead of context @jinli
-        trajectory.metadata["context_time_cost"] = time.time() - start_time  # ⭐ Log the time taken for the operation
+            return None
         return response["answer"]  # ⭐ Return the merged experience from the response
 
     def call_summarizer(self, trajectories: List[Trajectory], workspace_id: str = "default", **kwargs):
@@ -54,6 +76,19 @@ class EMClient(HttpClient):
             workspace_id (str, optional): The ID of the workspace. Defaults to "default".
             **kwargs: Additional metadata to be included in the request.
 
+        Returns:
+            Tuple[List[Dict], float]: A tuple containing the list of summarized experiences and the time taken for the operation.
+        """
+        return self.call_summarizer_payloads([to_summary_payload(x) for x in trajectories], workspace_id=workspace_id)
+
+    def call_summarizer_payloads(self, payloads: List[dict], workspace_id: str = "default"):
+        """
+        Sends already compacted trajectories (see `to_summary_payload`) to the summary_task_memory endpoint.
+
+        Args:
+            payloads (List[dict]): `{"messages": ..., "score": ...}` dicts.
+            workspace_id (str, optional): The ID of the workspace. Defaults to "default".
+
         Returns:
             Tuple[List[Dict], float]: A tuple containing the list of summarized experiences and the time taken for the operation.
         """
@@ -61,7 +96,7 @@ class EMClient(HttpClient):
 
         self.url = self.base_url + "/summary_task_memory"  # ⭐ Set the URL for the summarizer endpoint
         json_data = {
-            "trajectories": [{"messages": x.steps, "score": x.reward.outcome} for x in trajectories],
+            "trajectories": payloads,
             "workspace_id": workspace_id,
             # "metadata": kwargs
         }
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed embedding cache: an in-memory LRU, optionally backed by a sqlite file that persists across runs.
+    """
+
+    def __init__(self, model: str, max_size: int = 10000, cache_path: Optional[str] = None):
+        """
+        Args:
+            model (str): embedding model name, part of the key so different models never share vectors
+            max_size (int): maximum number of embeddings kept in memory
+            cache_path (Optional[str]): sqlite file for the persistent store, None to keep the cache in memory only
+        """
+        self._model = model
+        self._max_size = max_size
+        self._lru: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if cache_path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._db.commit()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self._model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[list[float]]:
+        """
+        Get the cached embedding of text, None if it has never been embedded
+        """
+        key = self.key(text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is None and self._db is not None:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = array("f", row[0]).tolist()
+                    self._put_lru(key, vector)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector: list[float]):
+        key = self.key(text)
+        with self._lock:
+            self._put_lru(key, vector)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                                 (key, array("f", vector).tobytes()))
+                self._db.commit()
+
+    def _put_lru(self, key: str, vector: list[float]):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._max_size:
+            self._lru.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def get_metrics(self) -> dict[str, float]:
+        return {
+            "embedding_cache/hit_rate": self.hit_rate,
+            "embedding_cache/hits": float(self.hits),
+            "embedding_cache/misses": float(self.misses),
+            "embedding_cache/size": float(len(self._lru)),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1,14 +1,48 @@
 # env_client.py
-from typing import Dict, List, Any
+import asyncio
+import threading
+from typing import Dict, List, Any, Tuple
 
+import aiohttp
 import requests
 from loguru import logger
+from requests.adapters import HTTPAdapter
+
+
+_session_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+
+
+def get_pooled_session(base_url: str, pool_maxsize: int = 256) -> requests.Session:
+    """
+    Returns a keep-alive `requests.Session` shared by every EnvClient pointing at the same env service.
+
+    Rollout threads create one EnvClient per trajectory, so pooling at module level is what lets
+    consecutive create/step/evaluate/release calls reuse TCP connections instead of re-handshaking.
+
+    Args:
+        base_url (str): The base URL of the env service.
+        pool_maxsize (int, optional): Maximum number of kept-alive connections. Defaults to 256.
+
+    Returns:
+        requests.Session: The shared session for `base_url`.
+    """
+    with _session_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[base_url] = session
+        return session
 
 
 class EnvClient:
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url.rstrip("/")
         self.timeout = 300.0
+        self.session = get_pooled_session(self.base_url)
 
     def _make_request(
         self,
@@ -44,7 +78,7 @@ class EnvClient:
             **kwargs,
         }
         try:
-            response = requests.post(url, json=data, timeout=self.timeout)  # ⭐ Sends the POST request
+            response = self.session.post(url, json=data, timeout=self.timeout)  # ⭐ Sends the POST request over a pooled connection
             response.raise_for_status()
             return response.json()  # ⭐ Parses and returns the JSON response
         except requests.exceptions.RequestException as e:
@@ -138,6 +172,24 @@ class EnvClient:
         )  # ⭐ Sends the request to the environment API
         return response["data"]
 
+    def batch_step(self, steps: List[Tuple[str, Dict]], params: Dict = {}) -> List[dict]:
+        """
+        Executes one step in each of several environment instances with a single round trip.
+
+        Args:
+            steps (List[Tuple[str, Dict]]): `(instance_id, action)` pairs.
+            params (Dict, optional): Additional parameters applied to every step. Defaults to {}.
+
+        Returns:
+            List[dict]: One `{"success", "data", "error"}` entry per pair, in request order.
+        """
+        response = self._make_request(
+            endpoint="batch_step",
+            params=params,
+            steps=[{"instance_id": instance_id, "action": action} for instance_id, action in steps],
+        )  # ⭐ Sends all actions in one request
+        return response["data"]
+
     def evaluate(
         self, instance_id: str, messages: Dict = {}, params: Dict = {}
     ) -> float:
@@ -174,6 +226,107 @@ class EnvClient:
         return response["success"]
 
 
+class AsyncEnvClient:
+    """
+    asyncio-native counterpart of `EnvClient`.
+
+    All requests share one `aiohttp.ClientSession` whose connector keeps up to `max_connections`
+    connections alive, so thousands of concurrent trajectories can be driven from a single event loop
+    without one OS thread (and one TCP handshake) per env step.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", max_connections: int = 256,
+                 timeout: float = 300.0):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _make_request(
+        self,
+        endpoint: str,
+        env_type: str = "default",
+        task_id: str = None,
+        instance_id: str = None,
+        messages: Dict[str, Any] = None,
+        params: Dict[str, Any] = None,
+        **kwargs,
+    ) -> Dict:
+        """
+        Sends a POST request to the env service over the pooled session, see `EnvClient._make_request`.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        data = {
+            "env_type": env_type,
+            "task_id": task_id,
+            "instance_id": instance_id,
+            "messages": messages or {},
+            "params": params or {},
+            **kwargs,
+        }
+        try:
+            async with self._get_session().post(url, json=data) as response:
+                response.raise_for_status()
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Request failed: {str(e)}, data: {data}")
+            raise
+
+    async def get_env_profile(self, env_type: str, split: str = "train") -> List[str]:
+        response = await self._make_request(endpoint="get_env_profile", env_type=env_type, params={"split": split})
+        return response["data"]
+
+    async def get_tools_info(self, instance_id: str, messages: Dict = {}, params: Dict = {}) -> float:
+        response = await self._make_request(endpoint="get_info", instance_id=instance_id, messages=messages,
+                                            params=params)
+        return response["data"]
+
+    async def create_instance(self, env_type: str, task_id: str, instance_id: str = None,
+                              params: Dict = None) -> dict:
+        response = await self._make_request(endpoint="create", env_type=env_type, task_id=task_id,
+                                            instance_id=instance_id, params=params)
+        return response["data"]
+
+    async def step(self, instance_id: str, action: Dict = {}, params: Dict = {}) -> dict:
+        response = await self._make_request(endpoint="step", instance_id=instance_id, messages=action,
+                                            params=params)
+        return response["data"]
+
+    async def batch_step(self, steps: List[Tuple[str, Dict]], params: Dict = {}) -> List[dict]:
+        response = await self._make_request(
+            endpoint="batch_step",
+            params=params,
+            steps=[{"instance_id": instance_id, "action": action} for instance_id, action in steps],
+        )
+        return response["data"]
+
+    async def evaluate(self, instance_id: str, messages: Dict = {}, params: Dict = {}) -> float:
+        response = await self._make_request(endpoint="evaluate", instance_id=instance_id, messages=messages,
+                                            params=params)
+        return response["data"]
+
+    async def release_instance(self, instance_id: str) -> bool:
+        response = await self._make_request(endpoint="release", instance_id=instance_id)
+        return response["success"]
+
+
 def main():
     """
     Demonstrates the use of EnvClient by performing a sequence of operations:
@@ -333,7 +333,10 @@ class TaskRunner:
             device_name=config.trainer.device,
         )  # ⭐ Initialize the PPO trainer with the given parameters
         trainer.init_workers()  # ⭐ Initialize the workers for the trainer
-        trainer.fit()  # ⭐ Start the training process
+        try:
+            trainer.fit()  # ⭐ Start the training process
+        finally:
+            trainer.close()  # ⭐ Send the queued experience summaries and stop the background threads
 
 def create_rl_dataset(data_paths, data_config, tokenizer, processor):
     """
@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 # PRM step → (optional) group-level standardization on steps → per-trajectory projection (optional) → suffix-sum on steps → broadcast to tokens
 from __future__ import annotations
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
-import torch
 import math
+import numpy as np
+import torch
+from agentevolver.module.adv_processor.group_stats import group_mean_std, index_to_group_ids
 from agentevolver.module.adv_processor.prompt import get_positive_mask, rescale_score
 
 # =========================
@@ -59,128 +61,149 @@ def _ensure_tensor(x, device, dtype=None):
         return t
     return torch.as_tensor(x, device=device, dtype=dtype)
 
-def _num_steps_from_step_ids(step_ids_row: torch.Tensor) -> int:
-    if step_ids_row.numel() == 0:
-        return 0
-    valid = step_ids_row >= 0
-    if not torch.any(valid):
-        return 0
-    return int(step_ids_row[valid].max().item()) + 1
+def _p95(vals: List[float]) -> float:
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    k = int(round(0.95 * (len(s) - 1)))
+    return float(s[k])
 
-def _align_flags(flags: List[bool], K: int, is_success: bool) -> List[bool]:
+def _mean(t: torch.Tensor) -> float:
+    return float(t.mean().item()) if t.numel() > 0 else 0.0
+
+def _num_steps(step_ids: torch.Tensor) -> torch.Tensor:
+    """
+    Number of steps of each trajectory (max step id + 1, or 0 without response tokens), shape (B,).
+    """
+    if step_ids.size(1) == 0:
+        return torch.zeros(step_ids.size(0), dtype=torch.long, device=step_ids.device)
+    return (step_ids.max(dim=1).values + 1).clamp(min=0)
+
+def _pack_step_flags(
+    step_flags: List[List[bool]],
+    num_steps: torch.Tensor,
+    default: torch.Tensor,
+) -> Tuple[torch.Tensor, torch.Tensor]:
     """
-    Aligns the length of the flags list to match the specified number of steps K.
-    If the flags list is shorter than K, it pads the list with a default value.
-    If the flags list is longer than K, it truncates the list to K elements.
+    Packs the ragged GOOD/BAD flags into a padded (B, K_max) tensor aligned to each trajectory's number of steps.
+    Missing flags take the row's `default`, surplus flags are dropped.
 
     Args:
-        flags (List[bool]): The list of boolean flags.
-        K (int): The target length to align the flags list to.
-        is_success (bool): Determines the default value for padding. True if is_success, False otherwise.
+        step_flags (List[List[bool]]): GOOD/BAD flags for each trajectory (may be shorter than B).
+        num_steps (torch.Tensor): Number of steps of each trajectory, shape (B,).
+        default (torch.Tensor): Padding flag of each trajectory, shape (B,).
 
     Returns:
-        List[bool]: The aligned list of boolean flags.
+        Tuple[torch.Tensor, torch.Tensor]: Flags and step mask, both bool of shape (B, K_max).
     """
-    if len(flags) == K:
-        return list(flags)
-    default_flag = True if is_success else False
-    if len(flags) < K:
-        return list(flags) + [default_flag] * (K - len(flags))
-    else:
-        return list(flags[:K])
+    B = num_steps.size(0)
+    device = num_steps.device
+    K_max = int(num_steps.max().item()) if B > 0 else 0
+    given = np.zeros((B, K_max), dtype=bool)
+    given_len = np.zeros(B, dtype=np.int64)
+    for i in range(min(B, len(step_flags))):
+        row = list(step_flags[i][:K_max])
+        given[i, :len(row)] = row
+        given_len[i] = len(row)
+
+    steps = torch.arange(K_max, device=device)
+    mask = steps < num_steps.unsqueeze(1)
+    provided = steps < torch.as_tensor(given_len, device=device).unsqueeze(1)
+    flags = torch.where(provided, torch.as_tensor(given, device=device), default.view(-1, 1).to(torch.bool))
+    return flags & mask, mask
+
+def _segment_sum(values: torch.Tensor, group_ids: torch.Tensor, num_groups: int) -> torch.Tensor:
+    """Sums `values` (B,) into `num_groups` buckets given by `group_ids` (B,)."""
+    return torch.zeros(num_groups, dtype=values.dtype, device=values.device).index_add_(0, group_ids, values)
+
+def _row_fsum(values: torch.Tensor) -> torch.Tensor:
+    """Correctly rounded (`math.fsum`) sum of each row of `values` (B, K); zero padding does not change it."""
+    sums = [math.fsum(row) for row in values.tolist()]
+    return torch.tensor(sums, dtype=values.dtype, device=values.device)
+
+def _sqrt(values: torch.Tensor) -> torch.Tensor:
+    """Elementwise `math.sqrt`; float64 `torch.sqrt` is not correctly rounded on every CPU build."""
+    return torch.tensor([math.sqrt(v) for v in values.tolist()], dtype=values.dtype, device=values.device)
 
 def _group_zscore_on_steps(
-    step_rewards_raw: List[List[float]],
+    step_rewards: torch.Tensor,
+    step_mask: torch.Tensor,
     group_ids: torch.Tensor,
     hyper: PRMHyper,
-) -> List[List[float]]:
+) -> torch.Tensor:
     """
     Standardizes the step rewards within each group by subtracting the mean and dividing by the standard deviation.
 
     Args:
-        step_rewards_raw (List[List[float]]): A list of lists containing the raw step rewards for each trajectory.
-        group_ids (torch.Tensor): A tensor indicating the group ID for each trajectory.
+        step_rewards (torch.Tensor): Raw step rewards, zero-padded, shape (B, K_max).
+        step_mask (torch.Tensor): Valid steps, shape (B, K_max).
+        group_ids (torch.Tensor): A tensor indicating the group ID for each trajectory, shape (B,).
         hyper (PRMHyper): An object containing hyperparameters, including whether to perform batch normalization and
                           whether to use equal trajectory weighting.
 
     Returns:
-        List[List[float]]: A list of lists containing the standardized step rewards for each trajectory.
+        torch.Tensor: The standardized step rewards, zero-padded, shape (B, K_max).
+
+    Note:
+        Results are bit-identical to the per-trajectory loop this replaced: each trajectory's steps are summed
+        with `math.fsum` as before, the group accumulation (`index_add_`) adds the trajectories in batch
+        order on CPU, which is the order the loop used, and the group std uses `math.sqrt`.
     """
     if not hyper.do_batch_norm:
-        return [list(r) for r in step_rewards_raw]
+        return step_rewards.clone()
 
-    B = len(step_rewards_raw)
-    gids = group_ids.view(-1).tolist()
-    g2idx: Dict[int, List[int]] = {}
-    for i, g in enumerate(gids):
-        g2idx.setdefault(int(g), []).append(i)
-
-    step_rewards_std: List[List[float]] = [[] for _ in range(B)]
+    gid = index_to_group_ids(group_ids, device=step_rewards.device)
+    G = int(gid.max().item()) + 1 if gid.numel() > 0 else 0
     eps = float(hyper.eps)
+    m = step_mask.to(step_rewards.dtype)
+    lengths = m.sum(dim=1)
+    safe_lengths = lengths.clamp(min=1)
+    masked = step_rewards * m
+
+    if hyper.equal_trajectory_weight:
+        # === Equal trajectory weight: mean of means first, then mean of variances ===
+        n_traj = _segment_sum((lengths > 0).to(step_rewards.dtype), gid, G)
+        mu_g = _segment_sum(_row_fsum(masked) / safe_lengths, gid, G) / n_traj.clamp(min=1)
+        dev = step_rewards - mu_g[gid].unsqueeze(1)
+        var_g = _segment_sum(_row_fsum(dev * dev * m) / safe_lengths, gid, G) / n_traj.clamp(min=1)
+        sd_g = _sqrt(var_g + eps)
+        empty = n_traj == 0
+    else:
+        # === Flatten: all steps of the group form one sample, population variance (unbiased=False) ===
+        total_cnt = _segment_sum(lengths, gid, G)
+        mu_g = _segment_sum(_row_fsum(masked), gid, G) / total_cnt.clamp(min=1)
+        dev = step_rewards - mu_g[gid].unsqueeze(1)
+        sd_g = _sqrt(_segment_sum(_row_fsum(dev * dev * m), gid, G) / total_cnt.clamp(min=1))
+        sd_g = torch.clamp(sd_g, min=eps)
+        empty = total_cnt == 0
+
+    mu_g = torch.where(empty, torch.zeros_like(mu_g), mu_g)
+    sd_g = torch.where(empty, torch.ones_like(sd_g), sd_g)
+    inv = 1.0 / (sd_g + 1e-12)
+    out = (step_rewards - mu_g[gid].unsqueeze(1)) * inv[gid].unsqueeze(1)
+    return torch.where(step_mask, out, torch.zeros_like(out))
+
+def _group_normalize_orm(orm_scores: torch.Tensor, group_ids: torch.Tensor, hyper: PRMHyper) -> torch.Tensor:
+    """
+    Group-wise z-score of the ORM scores (population std; centering only for constant groups).
 
-    for _, idxs in g2idx.items():
-        if hyper.equal_trajectory_weight:
-            # === Equal trajectory weight: mean of means first, then mean of variances ===
-            n_traj = 0
-            mu_acc = 0.0
-            for i in idxs:
-                ri = step_rewards_raw[i]
-                if not ri:
-                    continue
-                n_traj += 1
-                # Accumulate trajectory means (equal weight)
-                mu_acc += (math.fsum(ri) / len(ri))
-            if n_traj == 0:
-                mu_g, sd_g = 0.0, 1.0
-            else:
-                mu_g = mu_acc / n_traj
-                # Group variance = mean squared deviation around mu_g within trajectories, then equal-weighted average across trajectories
-                second_moments_sum = 0.0
-                for i in idxs:
-                    ri = step_rewards_raw[i]
-                    if not ri:
-                        continue
-                    second_moments_sum += (math.fsum((x - mu_g) * (x - mu_g) for x in ri) / len(ri))
-                var_g = (second_moments_sum / n_traj) if n_traj > 0 else 0.0
-                sd_g = math.sqrt(var_g + eps)
-        else:
-            # === Flatten: two-pass streaming statistics (to avoid huge overhead of converting flat lists and tensors) ===
-            total_cnt = 0
-            total_sum = 0.0
-            # pass1: count total steps and sum across the group → mean
-            for i in idxs:
-                ri = step_rewards_raw[i]
-                if not ri:
-                    continue
-                total_cnt += len(ri)
-                total_sum += math.fsum(ri)
-
-            if total_cnt == 0:
-                mu_g, sd_g = 0.0, 1.0
-            else:
-                mu_g = total_sum / total_cnt
-                # pass2: accumulate second-order deviations → population variance (aligned with unbiased=False)
-                M2 = 0.0
-                for i in idxs:
-                    ri = step_rewards_raw[i]
-                    if not ri:
-                        continue
-                    M2 += math.fsum((x - mu_g) * (x - mu_g) for x in ri)
-                var = M2 / total_cnt
-                sd = math.sqrt(var)
-                sd_g = sd if sd >= eps else eps
-
-        inv = 1.0 / (sd_g + 1e-12)
-        for i in idxs:
-            ri = step_rewards_raw[i]
-            if not ri:
-                step_rewards_std[i] = []
-            else:
-                step_rewards_std[i] = [float((x - mu_g) * inv) for x in ri]
-
-    return step_rewards_std
+    Args:
+        orm_scores (torch.Tensor): ORM score of each trajectory, shape (B,).
+        group_ids (torch.Tensor): Group ID of each trajectory, shape (B,).
+        hyper (PRMHyper): Provides `eps`.
 
+    Returns:
+        torch.Tensor: Normalized ORM scores in float64, shape (B,).
 
+    Note:
+        Like the per-group loop this replaced, the statistics are float32 `mean()`/`std(unbiased=False)` of each
+        group (see `group_mean_std`) and the normalization runs in float64, so the scores are bit-identical.
+    """
+    gid = index_to_group_ids(group_ids, device=orm_scores.device)
+    x = orm_scores.to(torch.float32)
+    mean, std, _ = group_mean_std(x, gid, unbiased=False)
+    centered = x.double() - mean.double()[gid]
+    return torch.where(std[gid] <= hyper.eps, centered, centered / (std.double()[gid] + 1e-12))
 
 def _build_allocation(
     orm_scores: torch.Tensor,
@@ -188,7 +211,7 @@ def _build_allocation(
     step_ids: torch.Tensor,
     group_ids: torch.Tensor,
     hyper: PRMHyper,
-) -> List[List[float]]:
+) -> Tuple[torch.Tensor, Dict[str, float]]:
     """
     Builds a step-level allocation of rewards for each trajectory based on ORM scores, step flags, and other parameters.
     Ensures that the total reward for each trajectory aligns with the ORM score's sign and applies group normalization to the rewards.
@@ -201,265 +224,121 @@ def _build_allocation(
         hyper (PRMHyper): PRM hyperparameter configuration.
 
     Returns:
-        List[List[float]]: Step-level advantage rewards for each trajectory, after group mean subtraction.
+        Tuple[torch.Tensor, Dict[str, float]]: Step-level rewards after group normalization and ORM overlay,
+        zero-padded to shape (B, K_max), and the allocation metrics.
     """
-    B = step_ids.size(0)
-
-    # ---------- Utility functions ----------
-    def _p95(vals):
-        if not vals:
-            return 0.0
-        s = sorted(vals)
-        k = int(round(0.95 * (len(s) - 1)))
-        return float(s[k])
-
     mean_eps = getattr(hyper, "zscore_mean_tol", 0.05)  # Tolerance for group-wise mean
     std_tol  = getattr(hyper, "zscore_std_tol", 0.2)    # Allowed deviation of std from 1 => interval [1-std_tol, 1+std_tol]
     small_mag_threshold = getattr(hyper, "small_mag_threshold", 0.05)
+    dtype = torch.float64
 
     # ---- Stage 1: Generate raw PRM rewards (consistent weight allocation, per-trajectory reward sum = ORM sign) ----
-    step_rewards_raw: List[List[float]] = []
-
-    # Monitoring: weight ratios / degenerate count / pre-normalization consistency invariants
-    unit_weights: List[float] = []
-    pos_consistent_shares: List[float] = []
-    neg_consistent_shares: List[float] = []
-    degenerate_total_w_count = 0
-    pre_norm_sign_agree_flags: List[float] = []
-
-    # Majority consistency (based on PRM annotations)
-    pos_major_good = pos_cnt = 0
-    neg_major_bad  = neg_cnt = 0
-
-    # Cache flags for subsequent r_norm GAP calculation
-    flags_cache: List[List[bool]] = []
-
-    for i in range(B):
-        # Get the number of steps in the current trajectory
-        K = _num_steps_from_step_ids(step_ids[i])
-        if K == 0:
-            step_rewards_raw.append([]); flags_cache.append([]); continue
-
-        # Determine trajectory type and weight allocation strategy based on ORM score sign
-        raw_orm = float(orm_scores[i].item())
-        is_success = bool(get_positive_mask(raw_orm, threshold=0.5))
-
-        # Align flags
-        flags_i = _align_flags(step_flags[i] if i < len(step_flags) else [], K, is_success)
-        flags_cache.append(flags_i)
-
-        # Count GOOD/BAD steps
-        n_g = sum(1 for f in flags_i if f)
-        n_b = K - n_g
-
-        # Consistent/inconsistent weights
-        if is_success:
-            # Successful trajectory: consistent steps (GOOD) have higher weight, inconsistent steps (BAD) have lower weight
-            w_g, w_b = hyper.consistent_scale, hyper.pos_unconsistent_scale
-            sgn = +1.0
-        else:
-            # Failed trajectory: consistent steps (BAD) have lower weight, inconsistent steps (GOOD) have higher weight
-            w_g, w_b = hyper.neg_unconsistent_scale, hyper.consistent_scale
-            sgn = -1.0
-
-        # Weight normalization: ensure trajectory total reward equals ORM sign
-        total_w = n_g * w_g + n_b * w_b
-        if total_w <= hyper.eps:
-            unit = 0.0
-            degenerate_total_w_count += 1
-        else:
-            unit = 1.0 / total_w
-        unit_weights.append(unit)
-
-        # Trajectory raw rewards (sum == sgn or degenerate to 0)
-        r_raw = [sgn * (w_g * unit) if f else sgn * (w_b * unit) for f in flags_i]
-        step_rewards_raw.append([float(x) for x in r_raw])
-
-        # Monitoring: consistent weight ratio (pos: GOOD consistent; neg: BAD consistent)
-        if total_w > hyper.eps:
-            if is_success:
-                pos_consistent_shares.append((n_g * w_g) / total_w)
-            else:
-                neg_consistent_shares.append((n_b * w_b) / total_w)
-
-        # Monitoring: pre-norm invariant (sum(r_raw) should be consistent with ORM sign)
-        raw_sum = sum(r_raw)
-        # is_raw_sum_positive = get_positive_mask(raw_sum, threshold=0.0)
-        raw_orm_sign = 1.0 if is_success else -1.0
-        pre_norm_sign_agree_flags.append(1.0 if (raw_sum * raw_orm_sign) > 0 else 0.0)
-
-        # Majority consistency (PRM annotation vs ORM direction)
-        is_good_majority = (n_g > n_b) # Add a readable boolean variable
-        if is_success:
-            pos_cnt += 1
-            if is_good_majority:
-                pos_major_good += 1
-        else: # not is_success
-            neg_cnt += 1
-            if not is_good_majority: # not (n_g > n_b) is equivalent to n_b >= n_g
-                neg_major_bad += 1
-
+    num_steps = _num_steps(step_ids)
+    valid = num_steps > 0
+    orm = orm_scores.to(dtype)
+    is_success = get_positive_mask(orm, threshold=0.5)
+    flags, mask = _pack_step_flags(step_flags, num_steps, default=is_success)
+    m = mask.to(dtype)
+
+    # Count GOOD/BAD steps
+    n_g = flags.sum(dim=1).to(dtype)
+    n_b = num_steps.to(dtype) - n_g
+
+    # Consistent/inconsistent weights: successful → GOOD consistent; failed → BAD consistent
+    w_g = torch.where(is_success, torch.full_like(orm, hyper.consistent_scale), torch.full_like(orm, hyper.neg_unconsistent_scale))
+    w_b = torch.where(is_success, torch.full_like(orm, hyper.pos_unconsistent_scale), torch.full_like(orm, hyper.consistent_scale))
+    sgn = torch.where(is_success, torch.ones_like(orm), -torch.ones_like(orm))
+
+    # Weight normalization: ensure trajectory total reward equals ORM sign
+    total_w = n_g * w_g + n_b * w_b
+    degenerate = total_w <= hyper.eps
+    unit = torch.where(degenerate, torch.zeros_like(total_w), 1.0 / total_w)
+
+    # Trajectory raw rewards (sum == sgn or degenerate to 0)
+    step_rewards_raw = torch.where(flags, (sgn * (w_g * unit)).unsqueeze(1), (sgn * (w_b * unit)).unsqueeze(1)) * m
+
+    # Monitoring: consistent weight ratio (pos: GOOD consistent; neg: BAD consistent)
+    weighted = valid & ~degenerate
+    pos_consistent_shares = ((n_g * w_g) / total_w)[weighted & is_success]
+    neg_consistent_shares = ((n_b * w_b) / total_w)[weighted & ~is_success]
+
+    # Monitoring: pre-norm invariant (sum(r_raw) should be consistent with ORM sign)
+    pre_norm_sign_agree = ((step_rewards_raw.sum(dim=1) * sgn) > 0)[valid]
+
+    # Majority consistency (PRM annotation vs ORM direction)
+    is_good_majority = n_g > n_b
+    pos_cnt = int((valid & is_success).sum().item())
+    neg_cnt = int((valid & ~is_success).sum().item())
+    pos_major_good = int((valid & is_success & is_good_majority).sum().item())
+    neg_major_bad = int((valid & ~is_success & ~is_good_majority).sum().item())
 
     # ---- Stage 2: Group-wise z-score normalization (to obtain the true advantage function) ----
-    r_norm = _group_zscore_on_steps(step_rewards_raw, group_ids, hyper)
+    r_norm = _group_zscore_on_steps(step_rewards_raw, mask, group_ids, hyper)
 
     # Monitoring: group-wise mean/variance (aggregate all steps by group)
-    gid_list = group_ids.view(-1).tolist()
-    group_vals: Dict[int, List[float]] = {}
-    all_abs_rnorm: List[float] = []
-    for i in range(B):
-        g = int(gid_list[i])
-        vals = r_norm[i]
-        if not vals:
-            continue
-        group_vals.setdefault(g, []).extend(vals)
-        all_abs_rnorm.extend(abs(x) for x in vals)
-
-    group_mean_abs = []
-    group_std = []
-    zscore_bad_group_cnt = 0
-    for g, vals in group_vals.items():
-        t = torch.tensor(vals, dtype=torch.float32)
-        m = float(t.mean().item())
-        s = float(t.std(unbiased=False).item())
-        group_mean_abs.append(abs(m))
-        group_std.append(s)
-        if (abs(m) > mean_eps) or (s < (1 - std_tol)) or (s > (1 + std_tol)):
-            zscore_bad_group_cnt += 1
-
-    r_norm_group_mean_abs_p95 = _p95(group_mean_abs) if group_mean_abs else 0.0
-    r_norm_group_std_p95 = _p95(group_std) if group_std else 0.0
+    gid = index_to_group_ids(group_ids, device=r_norm.device)
+    G = int(gid.max().item()) + 1 if gid.numel() > 0 else 0
+    group_cnt = _segment_sum(m.sum(dim=1), gid, G)
+    has_steps = group_cnt > 0
+    group_mean = _segment_sum(r_norm.sum(dim=1), gid, G) / group_cnt.clamp(min=1)
+    group_var = _segment_sum(((r_norm - group_mean[gid].unsqueeze(1)) ** 2 * m).sum(dim=1), gid, G) / group_cnt.clamp(min=1)
+    group_mean, group_std = group_mean[has_steps], torch.sqrt(group_var[has_steps])
+    zscore_bad_group_cnt = int(((group_mean.abs() > mean_eps) | (group_std < (1 - std_tol)) | (group_std > (1 + std_tol))).sum().item())
+    r_norm_group_mean_abs_p95 = _p95(group_mean.abs().tolist())
+    r_norm_group_std_p95 = _p95(group_std.tolist())
 
     # Monitoring: r_norm separability of GOOD/BAD (measured separately by ORM positive/negative)
-    gap_pos_list = []
-    gap_neg_list = []
-    for i in range(B):
-        vals = r_norm[i]
-        if not vals:
-            continue
-        flags_i = flags_cache[i]
-        raw_orm = float(orm_scores[i].item())
-        good_vals = [v for v, f in zip(vals, flags_i) if f]
-        bad_vals  = [v for v, f in zip(vals, flags_i) if not f]
-        is_orm_positive_current = get_positive_mask(float(orm_scores[i].item()))
-
-        if is_orm_positive_current:
-            if good_vals and bad_vals:
-                gap_pos_list.append(float(torch.tensor(good_vals).mean() - torch.tensor(bad_vals).mean()))
-        else:
-            if good_vals and bad_vals:
-                gap_neg_list.append(float(torch.tensor(bad_vals).mean() - torch.tensor(good_vals).mean()))
-    good_bad_rnorm_gap_pos = float(torch.tensor(gap_pos_list).mean().item()) if gap_pos_list else 0.0
-    good_bad_rnorm_gap_neg = float(torch.tensor(gap_neg_list).mean().item()) if gap_neg_list else 0.0
+    good = flags.to(dtype)
+    bad = (mask & ~flags).to(dtype)
+    n_good_steps, n_bad_steps = good.sum(dim=1), bad.sum(dim=1)
+    good_mean = (r_norm * good).sum(dim=1) / n_good_steps.clamp(min=1)
+    bad_mean = (r_norm * bad).sum(dim=1) / n_bad_steps.clamp(min=1)
+    has_both = valid & (n_good_steps > 0) & (n_bad_steps > 0)
+    is_orm_positive_current = get_positive_mask(orm)
+    good_bad_rnorm_gap_pos = _mean((good_mean - bad_mean)[has_both & is_orm_positive_current])
+    good_bad_rnorm_gap_neg = _mean((bad_mean - good_mean)[has_both & ~is_orm_positive_current])
 
     # Monitoring: small magnitude ratio (whether diluted)
-    if all_abs_rnorm:
-        rnorm_small_mag_ratio = float(sum(1 for x in all_abs_rnorm if x < small_mag_threshold) / len(all_abs_rnorm))
-    else:
-        rnorm_small_mag_ratio = 0.0
+    rnorm_small_mag_ratio = _mean((r_norm.abs() < small_mag_threshold)[mask].to(dtype))
 
     # ---------- Stage 3: Group-wise normalize ORM and overlay on r_norm (allocation strategy consistent with decouple) ----------
     alpha = getattr(hyper, "alpha", 1.0)
     orm_distribution = getattr(hyper, "orm_distribution", "last_step")
+    orm_scores_std = _group_normalize_orm(orm_scores, group_ids, hyper)
+
+    is_last = torch.arange(r_norm.size(1), device=r_norm.device) == (num_steps - 1).unsqueeze(1)
+    if orm_distribution == "last_step":
+        combined = alpha * r_norm + orm_scores_std.unsqueeze(1) * is_last.to(dtype)
+        out_abs = orm_scores_std.abs()
+    elif orm_distribution == "all_steps":
+        combined = (alpha * r_norm + orm_scores_std.unsqueeze(1)) * m
+        out_abs = num_steps.to(dtype) * orm_scores_std.abs()
+    else:
+        raise ValueError(f"Unknown orm_distribution: {orm_distribution}")
 
-    orm_list = orm_scores.detach().cpu().tolist()
-    g2idx: Dict[int, List[int]] = {}
-    for i, g in enumerate(gid_list):
-        g2idx.setdefault(int(g), []).append(i)
-
-    orm_scores_std = [0.0] * B
-    for _, idxs in g2idx.items():
-        group_vals_orm = [orm_list[i] for i in idxs]
-        t = torch.tensor(group_vals_orm, dtype=torch.float32)
-        m = t.mean()
-        s = t.std(unbiased=False)
-        if s <= hyper.eps:
-            for i in idxs:
-                orm_scores_std[i] = float(orm_list[i] - m.item())
-        else:
-            denom = s.item() + 1e-12
-            for i in idxs:
-                orm_scores_std[i] = float((orm_list[i] - m.item()) / denom)
-
-    combined_rewards: List[List[float]] = []
-    # Monitoring: ORM/PRM dominance & post-normalization consistency
-    per_traj_attr_abs_sum = []
-    per_traj_out_abs_sum  = []
-    per_traj_out_last_abs = []
-    sum_step_reward_sign_agree_flags: List[float] = []
-
-    for i in range(B):
-        steps_i = r_norm[i]
-        if not steps_i:
-            combined_rewards.append([]); continue
-        K = len(steps_i)
-        ostd = orm_scores_std[i]
-
-        # Combination
-        if orm_distribution == "last_step":
-            arr = [alpha * x for x in steps_i]
-            arr[-1] = arr[-1] + ostd
-        elif orm_distribution == "all_steps":
-            arr = [alpha * x + ostd for x in steps_i]
-        else:
-            raise ValueError(f"Unknown orm_distribution: {orm_distribution}")
-
-        combined_rewards.append([float(v) for v in arr])
-
-        # Monitoring: dominance (aligned with decouple)
-        a_abs = sum(abs(alpha * x) for x in steps_i)          # α * Σ|r_norm|
-        if orm_distribution == "last_step":
-            o_abs = abs(ostd)                                 # Σ|ORM| (last_step mode)
-            o_last = abs(ostd)
-        else:
-            o_abs = K * abs(ostd)                             # all_steps: each step has the same orm_std
-            o_last = abs(ostd)
-
-        per_traj_attr_abs_sum.append(float(a_abs))
-        per_traj_out_abs_sum.append(float(o_abs))
-        per_traj_out_last_abs.append(float(o_last))
-
-        # Post-normalization consistency: ∑(combined_step_reward) vs original ORM sign
-        is_orm_positive = get_positive_mask(float(orm_scores[i].item()), threshold=0.5)
-        is_sum_positive = get_positive_mask(sum(arr), threshold=0.0)
-        signs_agree = (is_sum_positive == is_orm_positive)
-        sum_step_reward_sign_agree_flags.append(float(signs_agree))
-
-
-    # outcome_share_last_mean & alpha_effective
-    shares = []
-    for a_abs, o_last in zip(per_traj_attr_abs_sum, per_traj_out_last_abs):
-        denom = o_last + a_abs + 1e-12
-        shares.append(float(o_last / denom))
-    outcome_share_last_mean = float(sum(shares) / max(1, len(shares)))
-
-    alpha_ratios = []
-    for a_abs, o_abs in zip(per_traj_attr_abs_sum, per_traj_out_abs_sum):
-        denom = o_abs + 1e-12
-        alpha_ratios.append(float(a_abs / denom))
-    alpha_effective = float(sum(alpha_ratios) / max(1, len(alpha_ratios)))
+    # Monitoring: dominance (aligned with decouple)
+    attr_abs = (alpha * r_norm).abs().sum(dim=1)[valid]   # α * Σ|r_norm|
+    out_last_abs = orm_scores_std.abs()[valid]
+    out_abs = out_abs[valid]
+    outcome_share_last_mean = _mean(out_last_abs / (out_last_abs + attr_abs + 1e-12))
+    alpha_effective = _mean(attr_abs / (out_abs + 1e-12))
 
-    sum_step_reward_sign_agree = float(sum(sum_step_reward_sign_agree_flags) / max(1, len(sum_step_reward_sign_agree_flags)))
+    # Post-normalization consistency: ∑(combined_step_reward) vs original ORM sign
+    is_orm_positive = get_positive_mask(orm, threshold=0.5)
+    is_sum_positive = get_positive_mask(combined.sum(dim=1), threshold=0.0)
+    sum_step_reward_sign_agree = _mean((is_sum_positive == is_orm_positive)[valid].to(dtype))
 
     # post-norm invariant (after z-score, sum should be approximately 0)
-    post_norm_sum_vals = []
-    for vals in r_norm:
-        if vals:
-            post_norm_sum_vals.append(sum(vals))
-    post_norm_sum_mean = float(torch.tensor(post_norm_sum_vals, dtype=torch.float32).mean().item()) if post_norm_sum_vals else 0.0
-
-    # Majority consistency (aligned with decouple metrics for horizontal comparison)
-    pos_rate = float(pos_major_good / max(1, pos_cnt))
-    neg_rate = float(neg_major_bad  / max(1, neg_cnt))
+    post_norm_sum_mean = _mean(r_norm.sum(dim=1)[valid])
 
     # ---------- Summary metrics ----------
     alloc_stats = {
         # §1 Whether weight allocation works as designed
-        "prm_allocation/consistent_weight_share_pos": float(torch.tensor(pos_consistent_shares).mean().item()) if pos_consistent_shares else 0.0,
-        "prm_allocation/consistent_weight_share_neg": float(torch.tensor(neg_consistent_shares).mean().item()) if neg_consistent_shares else 0.0,
-        "prm_allocation/unit_weight_mean": float(torch.tensor(unit_weights).mean().item()) if unit_weights else 0.0,
-        "prm_allocation/unit_weight_p95": _p95(unit_weights),
-        "prm_allocation/degenerate_total_w_count": float(degenerate_total_w_count),
+        "prm_allocation/consistent_weight_share_pos": _mean(pos_consistent_shares),
+        "prm_allocation/consistent_weight_share_neg": _mean(neg_consistent_shares),
+        "prm_allocation/unit_weight_mean": _mean(unit[valid]),
+        "prm_allocation/unit_weight_p95": _p95(unit[valid].tolist()),
+        "prm_allocation/degenerate_total_w_count": float((valid & degenerate).sum().item()),
 
         # §2 z-score effectiveness
         "prm_allocation/r_norm_group_mean_abs_p95": r_norm_group_mean_abs_p95,
@@ -472,7 +351,7 @@ def _build_allocation(
         "prm_allocation/rnorm_small_mag_ratio": rnorm_small_mag_ratio,
 
         # §4 Invariant checks
-        "prm_allocation/pre_norm_sum_sign_agree": float(sum(pre_norm_sign_agree_flags) / max(1, len(pre_norm_sign_agree_flags))),
+        "prm_allocation/pre_norm_sum_sign_agree": _mean(pre_norm_sign_agree.to(dtype)),
         "prm_allocation/post_norm_sum_mean": post_norm_sum_mean,
 
         # §6 Dominance and consistency (after overlaying ORM)
@@ -481,16 +360,12 @@ def _build_allocation(
         "prm_allocation/sum_step_reward_sign_agree": sum_step_reward_sign_agree,
 
         # Majority consistency (aligned with decouple for horizontal comparison)
-        "prm_allocation/pos_traj_prm_good_majority_rate": pos_rate,
-        "prm_allocation/neg_traj_prm_bad_majority_rate": neg_rate,
+        "prm_allocation/pos_traj_prm_good_majority_rate": float(pos_major_good / max(1, pos_cnt)),
+        "prm_allocation/neg_traj_prm_bad_majority_rate": float(neg_major_bad / max(1, neg_cnt)),
     }
 
-    return combined_rewards, alloc_stats
-
+    return combined * m, alloc_stats
 
-import math
-from typing import List, Dict
-import torch
 
 def _build_decouple(
     orm_full_scores: torch.Tensor,
@@ -498,7 +373,7 @@ def _build_decouple(
     step_ids: torch.Tensor,
     group_ids: torch.Tensor,
     hyper: "PRMHyper"
-) -> List[List[float]]:
+) -> Tuple[torch.Tensor, Dict[str, float]]:
     """
     Decouples and standardizes PRM and ORM rewards separately before combining them.
 
@@ -510,246 +385,132 @@ def _build_decouple(
         hyper (PRMHyper): Hyperparameters for the decoupling process.
 
     Returns:
-        List[List[float]]: Combined and standardized PRM and ORM rewards for each trajectory.
+        Tuple[torch.Tensor, Dict[str, float]]: Combined and standardized PRM and ORM rewards, zero-padded to
+        shape (B, K_max), and the decouple metrics.
     """
-
-    B = step_ids.size(0)
     alpha = hyper.alpha
     orm_distribution = hyper.orm_distribution
     enable_length_normalization = hyper.enable_length_normalization  # New parameter to control whether to apply sqrt length normalization
+    if orm_distribution not in ("last_step", "all_steps", "only_prm"):
+        raise ValueError(f"Unknown orm_distribution: {orm_distribution}")
+    dtype = torch.float64
 
     # ---- 1. Construct base PRM rewards ----
-    prm_rewards_raw: List[List[float]] = []
-    for i in range(B):
-        K = _num_steps_from_step_ids(step_ids[i])
-        if K == 0:
-            prm_rewards_raw.append([])
-            continue
-        flags = _align_flags(step_flags[i] if i < len(step_flags) else [], K, is_success=True)
-        prm_rewards = [hyper.fix_base if f else -hyper.fix_base for f in flags]
-        prm_rewards_raw.append(prm_rewards)
+    num_steps = _num_steps(step_ids)
+    valid = num_steps > 0
+    orm = orm_full_scores.to(dtype)
+    flags, mask = _pack_step_flags(step_flags, num_steps, default=torch.ones_like(valid))
+    m = mask.to(dtype)
+    fix_base = torch.full(flags.shape, hyper.fix_base, dtype=dtype, device=flags.device)
+    prm_rewards_raw = torch.where(flags, fix_base, -fix_base) * m
 
     # ---- 2. Perform z-score normalization on PRM rewards within groups ----
-    prm_rewards_std = _group_zscore_on_steps(prm_rewards_raw, group_ids, hyper)
+    prm_rewards_std = _group_zscore_on_steps(prm_rewards_raw, mask, group_ids, hyper)
 
     # ---- 3. Perform group-wise normalization on ORM scores ----
-    orm_scores = orm_full_scores.cpu().tolist()
-    gids = group_ids.view(-1).tolist()
-    g2idx: Dict[int, List[int]] = {}
-    for i, g in enumerate(gids):
-        g2idx.setdefault(int(g), []).append(i)
-
-    orm_scores_std = [0.0] * B
-    for _, idxs in g2idx.items():
-        group_orms = [orm_scores[i] for i in idxs]
-        if len(group_orms) == 0:
-            continue
-        orm_tensor = torch.tensor(group_orms, dtype=torch.float32)
-        orm_mean = orm_tensor.mean()
-        orm_std = orm_tensor.std(unbiased=False)
-        if orm_std <= hyper.eps:
-            for i in idxs:
-                orm_scores_std[i] = float(orm_scores[i] - orm_mean.item())
-        else:
-            for i in idxs:
-                orm_scores_std[i] = float((orm_scores[i] - orm_mean.item()) / (orm_std.item() + 1e-12))
+    orm_scores_std = _group_normalize_orm(orm_full_scores, group_ids, hyper)
 
     # ---- 4. Combine standardized PRM and ORM rewards ----
-    combined_rewards: List[List[float]] = []
-
-    # Prepare containers for statistics
-    per_traj_attr_abs_sum = []   # Sum of α * |PRM_std| for each trajectory (excluding ORM)
-    per_traj_out_abs_sum  = []   # Sum of ORM_std for each trajectory (all steps: K * |orm_std|; last step: |orm_std|)
-    per_traj_out_last_abs = []   # Absolute value of ORM at the last step (for outcome_share_last_mean)
-    sum_sign_agree_flags  = []   # Whether the sum of combined_step_reward agrees with the original ORM sign
-    pos_major_good, pos_cnt = 0, 0
-    neg_major_bad , neg_cnt = 0, 0
-
-    # Prepare containers for PRM/ORM distribution statistics
-    flat_attr_vals = []          # All step PRM standardized values (not multiplied by α)
-    out_vals       = []          # One ORM standardized value per trajectory
-
-    for i in range(B):
-        if not prm_rewards_std[i]:
-            combined_rewards.append([])
-            continue
-
-        prm_std = prm_rewards_std[i]
-        orm_std = orm_scores_std[i]
-        K = len(prm_std)
-        # --- PRM/ORM distribution statistics sampling ---
-        flat_attr_vals.extend(prm_std)
-        out_vals.append(float(orm_std))
-
-        # 🔥 Key difference: whether to calculate length normalization factor
-        if enable_length_normalization:
-            length_scale = 1.0 / math.sqrt(max(K, 1))
-            print(f"Trajectory {i}: length={K}, length scale factor=1/sqrt({K})={length_scale:.4f}")
-        else:
-            length_scale = 1.0
-            print(f"Trajectory {i}: length={K}, no length normalization (scale factor=1.0)")
-
-        combined = []
-        # Construct combined_step_reward step by step, and calculate various sums for per-traj
-        attr_abs_sum = 0.0  # α * Σ_j |prm_std[j]|
-        for j, prm_reward in enumerate(prm_std):
-            if orm_distribution == "last_step":
-                if j == K - 1:
-                    combined_reward = alpha * prm_reward + orm_std
-                else:
-                    combined_reward = alpha * prm_reward
-            elif orm_distribution == "all_steps":
-                combined_reward = alpha * prm_reward + orm_std
-            elif orm_distribution == "only_prm":
-                combined_reward = prm_reward
-            else:
-                raise ValueError(f"Unknown orm_distribution: {orm_distribution}")
-
-            final_reward = combined_reward * length_scale
-            combined.append(float(final_reward))
-            attr_abs_sum += abs(alpha * prm_reward)
-
-        # Absolute contribution of ORM (per trajectory)
-        if orm_distribution == "last_step":
-            out_abs_sum = abs(orm_std)               # Only added at the last step
-            out_last_abs = abs(orm_std)
-        else:  # "all_steps"
-            out_abs_sum = K * abs(orm_std)           # all_steps: each step has the same orm_std
-            out_last_abs = abs(orm_std)
-
-        per_traj_attr_abs_sum.append(float(attr_abs_sum))
-        per_traj_out_abs_sum.append(float(out_abs_sum))
-        per_traj_out_last_abs.append(float(out_last_abs))
-
-        # ∑(combined_step_reward) consistency with the "original" ORM sign (not using z-score sign)
-        is_orm_positive = get_positive_mask(float(orm_full_scores[i].item()), threshold=0.5)
-        combined_sum = sum(combined)
-        is_sum_positive = get_positive_mask(combined_sum, threshold=0.0)
-        signs_agree = (is_sum_positive == is_orm_positive)
-        sum_sign_agree_flags.append(float(signs_agree))
-
-        # "Majority" consistency of PRM annotations in positive/negative trajectories
-        flags_i = _align_flags(step_flags[i] if i < len(step_flags) else [], K, is_success=is_orm_positive)
-        n_g = sum(1 for f in flags_i if f)
-        n_b = K - n_g
-        is_good_majority = (n_g > n_b) # Add a readable variable
-        if is_orm_positive:
-            pos_cnt += 1
-            if is_good_majority:
-                pos_major_good += 1
-        else:
-            neg_cnt += 1
-            if not is_good_majority:
-                neg_major_bad += 1
-
-        combined_rewards.append(combined)
+    # 🔥 Key difference: whether to calculate length normalization factor
+    if enable_length_normalization:
+        length_scale = 1.0 / _sqrt(num_steps.clamp(min=1).to(dtype))
+    else:
+        length_scale = torch.ones_like(orm)
+    print(f"[decouple] {int(valid.sum().item())} trajectories, length normalization: {enable_length_normalization}")
+
+    is_last = torch.arange(prm_rewards_std.size(1), device=prm_rewards_std.device) == (num_steps - 1).unsqueeze(1)
+    if orm_distribution == "last_step":
+        combined = alpha * prm_rewards_std + orm_scores_std.unsqueeze(1) * is_last.to(dtype)
+        out_abs = orm_scores_std.abs()                              # Only added at the last step
+    elif orm_distribution == "all_steps":
+        combined = alpha * prm_rewards_std + orm_scores_std.unsqueeze(1)
+        out_abs = num_steps.to(dtype) * orm_scores_std.abs()        # each step has the same orm_std
+    else:  # "only_prm"
+        combined = prm_rewards_std
+        out_abs = num_steps.to(dtype) * orm_scores_std.abs()
+    combined = combined * length_scale.unsqueeze(1) * m
+
+    # Per-trajectory sums: α * Σ_j |prm_std[j]|, Σ|ORM|, |ORM(last step)|
+    attr_abs = (alpha * prm_rewards_std).abs().sum(dim=1)[valid]
+    out_abs = out_abs[valid]
+    out_last_abs = orm_scores_std.abs()[valid]
+
+    # ∑(combined_step_reward) consistency with the "original" ORM sign (not using z-score sign)
+    is_orm_positive = get_positive_mask(orm, threshold=0.5)
+    is_sum_positive = get_positive_mask(combined.sum(dim=1), threshold=0.0)
+
+    # "Majority" consistency of PRM annotations in positive/negative trajectories (padding follows the ORM sign)
+    majority_flags, _ = _pack_step_flags(step_flags, num_steps, default=is_orm_positive)
+    n_g = majority_flags.sum(dim=1)
+    is_good_majority = n_g > (num_steps - n_g)
+    pos_cnt = int((valid & is_orm_positive).sum().item())
+    neg_cnt = int((valid & ~is_orm_positive).sum().item())
+    pos_major_good = int((valid & is_orm_positive & is_good_majority).sum().item())
+    neg_major_bad = int((valid & ~is_orm_positive & ~is_good_majority).sum().item())
 
     # === Decouple statistics ===
     # 1) mean/std of PRM/ORM normalized distribution
-    if len(flat_attr_vals) == 0:
-        attr_mean, attr_std = 0.0, 0.0
-    else:
-        t_attr = torch.tensor(flat_attr_vals, dtype=torch.float32)
-        attr_mean = float(t_attr.mean().item())
-        attr_std  = float(t_attr.std(unbiased=False).item())
-
-    if len(out_vals) == 0:
-        out_mean, out_std = 0.0, 0.0
-    else:
-        t_out = torch.tensor(out_vals, dtype=torch.float32)
-        out_mean = float(t_out.mean().item())
-        out_std  = float(t_out.std(unbiased=False).item())
-
-    # 2) outcome_share_last_mean: |ORM(last step)| / (|ORM(last step)| + α * Σ|PRM_std|)
-    shares = []
-    for a_abs, o_last in zip(per_traj_attr_abs_sum, per_traj_out_last_abs):
-        denom = o_last + a_abs + 1e-12
-        shares.append(float(o_last / denom))
-    outcome_share_last_mean = float(sum(shares) / max(1, len(shares)))
-
-    # 3) alpha_effective: α * Σ|PRM_std| / (Σ|ORM|), calculate ratio per trajectory then average
-    alpha_ratios = []
-    for a_abs, o_abs, i in zip(per_traj_attr_abs_sum, per_traj_out_abs_sum, range(len(per_traj_out_abs_sum))):
-        denom = o_abs + 1e-12
-        alpha_ratios.append(float(a_abs / denom))
-    alpha_effective = float(sum(alpha_ratios) / max(1, len(alpha_ratios)))
-
-    # 4) Proportion of ∑(combined_step_reward) consistent with the original ORM sign
-    sum_step_reward_sign_agree = float(sum(sum_sign_agree_flags) / max(1, len(sum_sign_agree_flags)))
-
-    # 5) "Global consistency" of PRM annotations with ORM (majority)
-    pos_rate = float(pos_major_good / max(1, pos_cnt))
-    neg_rate = float(neg_major_bad  / max(1, neg_cnt))
+    flat_attr_vals = prm_rewards_std[mask]
+    out_vals = orm_scores_std[valid]
 
     decouple_stats = {
-        "prm/decouple/attr_mean": attr_mean,
-        "prm/decouple/attr_std": attr_std,
-        "prm/decouple/out_mean": out_mean,
-        "prm/decouple/out_std": out_std,
-        "prm/decouple/outcome_share_last_mean": outcome_share_last_mean,
-        "prm/decouple/alpha_effective": alpha_effective,
-        "prm/decouple/sum_step_reward_sign_agree": sum_step_reward_sign_agree,
-        "prm/decouple/pos_traj_prm_good_majority_rate": pos_rate,
-        "prm/decouple/neg_traj_prm_bad_majority_rate": neg_rate,
+        "prm/decouple/attr_mean": _mean(flat_attr_vals),
+        "prm/decouple/attr_std": float(flat_attr_vals.std(unbiased=False).item()) if flat_attr_vals.numel() > 0 else 0.0,
+        "prm/decouple/out_mean": _mean(out_vals),
+        "prm/decouple/out_std": float(out_vals.std(unbiased=False).item()) if out_vals.numel() > 0 else 0.0,
+        # 2) outcome_share_last_mean: |ORM(last step)| / (|ORM(last step)| + α * Σ|PRM_std|)
+        "prm/decouple/outcome_share_last_mean": _mean(out_last_abs / (out_last_abs + attr_abs + 1e-12)),
+        # 3) alpha_effective: α * Σ|PRM_std| / (Σ|ORM|), calculate ratio per trajectory then average
+        "prm/decouple/alpha_effective": _mean(attr_abs / (out_abs + 1e-12)),
+        # 4) Proportion of ∑(combined_step_reward) consistent with the original ORM sign
+        "prm/decouple/sum_step_reward_sign_agree": _mean((is_sum_positive == is_orm_positive)[valid].to(dtype)),
+        # 5) "Global consistency" of PRM annotations with ORM (majority)
+        "prm/decouple/pos_traj_prm_good_majority_rate": float(pos_major_good / max(1, pos_cnt)),
+        "prm/decouple/neg_traj_prm_bad_majority_rate": float(neg_major_bad / max(1, neg_cnt)),
     }
 
-    # Note: Return (rewards, stats) tuple (only decouple does this), other schemes still return rewards only
-    return combined_rewards, decouple_stats
+    # Note: Return (rewards, stats) tuple
+    return combined, decouple_stats
 # =========================
 # Step → Token broadcast + suffix-sum
 # =========================
 
-def suffix_sum_on_steps(step_rewards: List[List[float]]) -> List[List[float]]:
+def suffix_sum_on_steps(step_rewards: torch.Tensor) -> torch.Tensor:
     """
-    Computes the suffix sum (cumulative sum from the end to the beginning) for each trajectory's step rewards.
+    Computes the suffix sum (cumulative sum from the end to the beginning) of each trajectory's step rewards.
 
     Args:
-        step_rewards (List[List[float]]): A list of lists, where each inner list contains the step rewards for a single trajectory.
+        step_rewards (torch.Tensor): Step rewards, zero-padded on the right, shape (B, K_max).
 
     Returns:
-        List[List[float]]: A list of lists, where each inner list contains the suffix sums of the step rewards for a single trajectory.
+        torch.Tensor: The suffix sums in float32, shape (B, K_max). Padded steps add zeros, so the sums of valid steps
+        are unaffected by the padding.
     """
-    adv: List[List[float]] = []
-    for r in step_rewards:
-        if not r:
-            adv.append([]); continue
-        t = torch.tensor(r, dtype=torch.float32)
-        s = torch.flip(torch.cumsum(torch.flip(t, dims=[0]), dim=0), dims=[0])
-        adv.append([float(x) for x in s])
-    return adv
+    t = step_rewards.to(torch.float32)
+    return torch.flip(torch.cumsum(torch.flip(t, dims=[1]), dim=1), dims=[1])
 
 def broadcast_step_adv_to_tokens(
-    step_adv: List[List[float]],
+    step_adv: torch.Tensor,
     step_ids: torch.Tensor,
 ) -> torch.Tensor:
     """
-    Broadcasts step-level advantage values to the token level.
-
-    This function assigns the advantage value of each step to the corresponding token positions
-    based on the provided `step_ids`. Non-response tokens (indicated by -1 in `step_ids`) are
-    kept at 0.
+    Broadcasts step-level advantage values to the token level with a single gather over `step_ids`.
+    Non-response tokens (indicated by -1 in `step_ids`) are kept at 0.
 
     Args:
-        step_adv (List[List[float]]): A list of step advantage values for each trajectory.
+        step_adv (torch.Tensor): Step advantage values, shape (B, K_max).
         step_ids (torch.Tensor): A tensor of step identifiers, shape (B, L_resp), where -1
                                  indicates non-response tokens.
 
     Returns:
         torch.Tensor: A tensor of token-level advantage values, shape (B, L_resp).
     """
-    device = step_ids.device
-    B, L = step_ids.shape
-    out = torch.zeros((B, L), device=device, dtype=torch.float32)
-    for i in range(B):
-        if not step_adv[i]:
-            continue
-        adv_i = torch.tensor(step_adv[i], device=device, dtype=torch.float32)
-        sid_row = step_ids[i]
-        valid = sid_row >= 0
-        if torch.any(valid):
-            sids = sid_row[valid]
-            out[i, valid] = adv_i[sids]
-    return out
+    valid = step_ids >= 0
+    if step_adv.size(1) == 0:
+        return torch.zeros(step_ids.shape, device=step_ids.device, dtype=torch.float32)
+    step_adv = step_adv.to(device=step_ids.device, dtype=torch.float32)
+    gathered = torch.gather(step_adv, 1, step_ids.clamp(min=0))
+    return torch.where(valid, gathered, torch.zeros_like(gathered))
 
 # =========================
 # Entry
@@ -12,7 +12,7 @@ from verl import DataProto
 
 # Note: These imports are moved from the trainer's fit loop.
 from agentevolver.utils.step_parser import verify_step_alignment, verify_step_content
-from agentevolver.module.adv_processor.semantic_attribution import evaluate_step_flags_parallel_sync
+from agentevolver.module.adv_processor.semantic_attribution import evaluate_step_flags_parallel_sync, LATENCY_BUCKETS
 from agentevolver.module.adv_processor.adca_grpo import (
     compute_prm_grpo_advantages, PRMHyper
 )
@@ -79,6 +79,7 @@ def apply_adca_grpo(
         epoch=f"train.{epoch}.{i}",
         skip_type=getattr(prm_cfg, 'skip_type', "skip_small_adv"),
         model_name=getattr(prm_cfg, 'model_name', "qwen-max"),
+        cache_dir=getattr(prm_cfg, 'judge_cache_dir', None),
     )
 
     # --- PRM evaluation result statistics ---
@@ -86,6 +87,8 @@ def apply_adca_grpo(
         for k in (
             "prm/parse_success_rate", "prm/avg_steps_per_sample",
             "prm/p95_steps_per_sample", "prm/flags_len_mismatch_rate",
+            "prm/judge_cache_hit_rate", "prm/judge_latency_p50", "prm/judge_latency_p95", "prm/judge_latency_max",
+            *(f"prm/judge_latency_le_{b}s" for b in LATENCY_BUCKETS),
         ):
             v = stats.get(k, None)
             if v is not None:
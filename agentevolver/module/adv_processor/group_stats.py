@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Vectorized per-group statistics shared by the GRPO-style advantage estimators
+from __future__ import annotations
+from typing import Tuple
+
+import numpy as np
+import torch
+
+
+def index_to_group_ids(index, device=None) -> torch.Tensor:
+    """
+    Maps arbitrary group keys (e.g. uid strings) to dense integer group ids in one pass.
+
+    Args:
+        index: Array-like of hashable group keys, shape (B,).
+        device (torch.device, optional): Device of the returned tensor.
+
+    Returns:
+        torch.Tensor: Long tensor of group ids in `[0, num_groups)`, shape (B,).
+    """
+    if torch.is_tensor(index):
+        _, inverse = torch.unique(index.view(-1), return_inverse=True)
+        return inverse.to(device=device if device is not None else index.device)
+    _, inverse = np.unique(np.asarray(index), return_inverse=True)
+    return torch.as_tensor(inverse.reshape(-1), dtype=torch.long, device=device)
+
+
+def group_mean_std(
+    values: torch.Tensor,
+    group_ids: torch.Tensor,
+    singleton_mean: float = 0.0,
+    singleton_std: float = 1.0,
+    unbiased: bool = True,
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Computes the mean and std of `values` within each group, on the tensor's device.
+
+    Group sizes come from `bincount`, members are laid out group-contiguously with a stable sort, and
+    groups of equal size are reduced together as one `(num_groups_of_that_size, size)` matrix. Each row
+    therefore goes through exactly the reduction `torch.mean`/`torch.std` would apply to that group alone,
+    which keeps results bit-identical to per-group reductions while the number of kernel launches only
+    grows with the number of distinct group sizes (one for plain GRPO).
+
+    Args:
+        values (torch.Tensor): Values to reduce, shape (B,).
+        group_ids (torch.Tensor): Dense integer group ids, shape (B,).
+        singleton_mean (float, optional): Mean reported for single-member groups. Defaults to 0.0.
+        singleton_std (float, optional): Std reported for single-member groups. Defaults to 1.0.
+        unbiased (bool, optional): Bessel-corrected std. Defaults to True. With `unbiased=False` single-member
+            groups are reduced like any other group (mean = the value, std = 0) and the singleton defaults are unused.
+
+    Returns:
+        Tuple[torch.Tensor, torch.Tensor, torch.Tensor]: Per-group mean, std and count, each shape (num_groups,).
+    """
+    group_ids = group_ids.to(device=values.device, dtype=torch.long).view(-1)
+    num_groups = int(group_ids.max().item()) + 1 if group_ids.numel() > 0 else 0
+    counts = torch.bincount(group_ids, minlength=num_groups)
+    mean = torch.full((num_groups,), singleton_mean, dtype=values.dtype, device=values.device)
+    std = torch.full((num_groups,), singleton_std, dtype=values.dtype, device=values.device)
+    if num_groups == 0:
+        return mean, std, counts
+
+    order = torch.sort(group_ids, stable=True).indices  # keep original order inside each group
+    sorted_values = values.view(-1)[order]
+    starts = torch.cumsum(counts, dim=0) - counts
+
+    for size in torch.unique(counts).tolist():
+        if size == 0 or (size == 1 and unbiased):
+            continue
+        groups = torch.nonzero(counts == size, as_tuple=False).view(-1)
+        member_idx = starts[groups].unsqueeze(-1) + torch.arange(size, device=values.device)
+        members = sorted_values[member_idx]  # (num_groups_of_this_size, size)
+        mean[groups] = members.mean(dim=-1)
+        std[groups] = members.std(dim=-1, unbiased=unbiased)
+    return mean, std, counts
@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class JudgmentCache:
+    """
+    Content-addressed cache of parsed GOOD/BAD step flags.
+
+    Entries live in memory for the lifetime of the process and, when `cache_dir` is set, on disk as
+    `<cache_dir>/<key[:2]>/<key>.json`, so they survive restarts and can be shared between runs.
+    Keys are hex digests computed by the caller from everything the judgment depends on.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_memory_entries: int = 100_000):
+        """
+        Args:
+            cache_dir (str, optional): Directory of the on-disk cache. None keeps the cache in memory only.
+            max_memory_entries (int, optional): Entries kept in memory (LRU). Defaults to 100000.
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, List[bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _remember(self, key: str, flags: List[bool]) -> None:
+        with self._lock:
+            self._memory[key] = flags
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[bool]]:
+        """Returns the cached flags of `key`, or None."""
+        with self._lock:
+            flags = self._memory.get(key)
+            if flags is not None:
+                self._memory.move_to_end(key)
+                return list(flags)
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                flags = [bool(flag) for flag in json.load(f)["flags"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        self._remember(key, flags)
+        return list(flags)
+
+    def put(self, key: str, flags: List[bool], meta: Optional[Dict] = None) -> None:
+        """
+        Stores `flags` under `key`.
+
+        Args:
+            key (str): The content hash.
+            flags (List[bool]): Parsed per-step judgments.
+            meta (Dict, optional): Extra fields written next to the flags on disk, for inspection only.
+        """
+        flags = [bool(flag) for flag in flags]
+        self._remember(key, flags)
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"flags": flags, **(meta or {})}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[judgment_cache] ❌ FAILED to write {path}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+
+_caches: Dict[Optional[str], JudgmentCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_judgment_cache(cache_dir: Optional[str] = None) -> JudgmentCache:
+    """Returns the process-wide cache of `cache_dir`, so judgments are reused across training steps."""
+    key = os.path.abspath(cache_dir) if cache_dir else None
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = JudgmentCache(key)
+        return _caches[key]
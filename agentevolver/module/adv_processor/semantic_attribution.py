@@ -3,6 +3,8 @@ import verl.utils.torch_functional as verl_F
 from openai import AsyncOpenAI, RateLimitError, APIError, BadRequestError
 import os
 import json
+import hashlib
+import functools
 from pathlib import Path
 from loguru import logger
 import time
@@ -16,6 +18,7 @@ import threading
 from dataclasses import dataclass, asdict
 import random
 from agentevolver.module.adv_processor.prompt import build_batch_adv_evaluation_prompt, build_batch_reward_evaluation_prompt, get_positive_mask, THRESHOLD, rescale_score
+from agentevolver.module.adv_processor.judgment_cache import get_judgment_cache
 
 __all__ = [
     "evaluate_step_flags_parallel",
@@ -38,6 +41,8 @@ class EvaluationResult:
     sample_idx: int
     step_results: List[bool]  # Evaluation results for all steps
     response_time: float
+    parsed: bool = False  # True only if step_results were parsed from the LLM output (not a fallback)
+    cached: bool = False
 
 @dataclass
 class EvaluationRecord:
@@ -361,10 +366,12 @@ async def _evaluate_single_sample_api(
         )
 
         # 3) Parse the results
+        parsed = False
         try:
             step_results = parse_batch_evaluation_result(
                 llm_raw_output, len(task.steps)
             )
+            parsed = True
             print(
                 f"[API] ✅ Sample {task.sample_idx}: Successfully parsed "
                 f"{len(step_results)} step results"
@@ -409,6 +416,7 @@ async def _evaluate_single_sample_api(
             sample_idx=task.sample_idx,
             step_results=step_results,
             response_time=response_time,
+            parsed=parsed,
         )
 
     except Exception as e:
@@ -444,7 +452,70 @@ async def _evaluate_single_sample_api(
             response_time=response_time,
         )
 
-async def evaluate_step_flags_parallel(tokenizer, batch, overall_score_source: str = "advantages", model_name: str = "qwen-max", evaluation_type: Literal["api"] = "api", max_concurrent: int = 20, batch_size_limit: int = 100, mask_tensor: torch.Tensor = None, api_max_retries: int = 200, save_dir: Optional[str] = None, global_step: Optional[int] = None, epoch: Optional[str] = None, skip_type: str='skip_small_adv') -> Tuple[List[List[bool]], Dict]:
+LATENCY_BUCKETS = (1, 2, 5, 10, 30, 60, 120)
+
+
+@functools.lru_cache(maxsize=None)
+def _prompt_version(overall_score_source: str) -> str:
+    """
+    Fingerprint of the evaluation prompt template, so cached judgments are invalidated when the prompt changes.
+
+    Args:
+        overall_score_source (str): Selects the prompt builder ("advantages" or "token_level_rewards").
+
+    Returns:
+        str: A short hex digest of the prompts rendered for a fixed probe input.
+    """
+    builder = build_batch_reward_evaluation_prompt if overall_score_source == "token_level_rewards" else build_batch_adv_evaluation_prompt
+    probe_steps = [{"action": "<action>", "observation": "<observation>"}]
+    rendered = [builder("<query>", probe_steps, score) for score in (1.0, -1.0)]
+    return hashlib.sha256(json.dumps(rendered, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def _judgment_key(task: EvaluationTask, model_name: str, overall_score_source: str) -> str:
+    """
+    Content hash of everything a judgment depends on: prompt version, model, query, step texts and the sign
+    of the overall score (the prompt's evaluation rules only depend on the sign).
+
+    Args:
+        task (EvaluationTask): The sample to judge.
+        model_name (str): The judge model.
+        overall_score_source (str): Selects the prompt builder.
+
+    Returns:
+        str: A sha256 hex digest.
+    """
+    content = {
+        "prompt_version": _prompt_version(overall_score_source),
+        "model": model_name,
+        "query": task.query,
+        "steps": _steps_struct_to_text_list(task.steps),
+        "positive": bool(get_positive_mask(task.overall_score)),
+    }
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _latency_metrics(latencies: List[float]) -> Dict[str, float]:
+    """
+    Summarizes judge call latencies as percentiles and a cumulative histogram.
+
+    Args:
+        latencies (List[float]): Seconds per LLM call (cache hits excluded).
+
+    Returns:
+        Dict[str, float]: "prm/judge_latency_{p50,p95,max}" and "prm/judge_latency_le_{b}s" counts.
+    """
+    metrics = {}
+    s = sorted(latencies)
+    for name, q in (("p50", 0.5), ("p95", 0.95)):
+        metrics[f"prm/judge_latency_{name}"] = float(s[int(round(q * (len(s) - 1)))]) if s else 0.0
+    metrics["prm/judge_latency_max"] = float(s[-1]) if s else 0.0
+    for bucket in LATENCY_BUCKETS:
+        metrics[f"prm/judge_latency_le_{bucket}s"] = sum(1 for v in s if v <= bucket)
+    return metrics
+
+
+async def evaluate_step_flags_parallel(tokenizer, batch, overall_score_source: str = "advantages", model_name: str = "qwen-max", evaluation_type: Literal["api"] = "api", max_concurrent: int = 20, batch_size_limit: int = 100, mask_tensor: torch.Tensor = None, api_max_retries: int = 200, save_dir: Optional[str] = None, global_step: Optional[int] = None, epoch: Optional[str] = None, skip_type: str='skip_small_adv', cache_dir: Optional[str] = None, base_url: Optional[str] = None) -> Tuple[List[List[bool]], Dict]:
     """
     Evaluates step flags in parallel for a batch of samples, with each sample being evaluated in one API call.
 
@@ -455,13 +526,15 @@ async def evaluate_step_flags_parallel(tokenizer, batch, overall_score_source: s
         model_name (str, optional): The name of the model being used. Defaults to "qwen-max".
         evaluation_type (Literal["api"], optional): The type of evaluation, currently only "api" is supported. Defaults to "api".
         max_concurrent (int, optional): The maximum number of concurrent API calls. Defaults to 20.
-        batch_size_limit (int, optional): The maximum size of the batch. Defaults to 100.
+        batch_size_limit (int, optional): Kept for compatibility; samples are no longer processed in chunks. Defaults to 100.
         mask_tensor (torch.Tensor, optional): An external mask tensor. Defaults to None.
         api_max_retries (int, optional): The maximum number of retries for API calls. Defaults to 200.
         save_dir (Optional[str], optional): The directory to save evaluation records. Defaults to None.
         global_step (Optional[int], optional): The global step in the training process. Defaults to None.
         epoch (Optional[str], optional): The current epoch. Defaults to None.
         skip_type (str, optional): The type of skipping logic to apply. Defaults to 'skip_small_adv'.
+        cache_dir (Optional[str], optional): Directory of the on-disk judgment cache; None keeps it in memory only. Defaults to None.
+        base_url (Optional[str], optional): OpenAI-compatible endpoint; defaults to $SEMANTIC_EVAL_BASE_URL or DashScope.
 
     Returns:
         Tuple[List[List[bool]], Dict]: A tuple containing the list of step flags for each sample and a dictionary with additional information.
@@ -492,8 +565,9 @@ async def evaluate_step_flags_parallel(tokenizer, batch, overall_score_source: s
 
     api_client = AsyncOpenAI(
         api_key=api_key,
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+        base_url=base_url or os.getenv("SEMANTIC_EVAL_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"),
     )
+    judgment_cache = get_judgment_cache(cache_dir)
 
     # 🚀 Key optimization: create tasks by sample, not by step
     all_tasks = []
@@ -512,9 +586,16 @@ async def evaluate_step_flags_parallel(tokenizer, batch, overall_score_source: s
         response_mask = batch.batch["loss_mask"][:, -response_length:]
         print(f"[parallel_eval] Using default loss_mask")
 
+    # GRPO siblings share their prompt: decode each distinct prompt once
+    decoded_queries = {}
     for sample_idx in range(batch_size):
-        query = tokenizer.decode(batch.batch["prompts"][sample_idx], skip_special_tokens=True)
-        rollout = tokenizer.decode(batch.batch["responses"][sample_idx], skip_special_tokens=True)
+        prompt_ids = batch.batch["prompts"][sample_idx]
+        prompt_key = prompt_ids.cpu().numpy().tobytes()
+        if prompt_key not in decoded_queries:
+            decoded_queries[prompt_key] = tokenizer.decode(prompt_ids, skip_special_tokens=True)
+        query = decoded_queries[prompt_key]
+        # the rollout text is only used in saved evaluation records
+        rollout = tokenizer.decode(batch.batch["responses"][sample_idx], skip_special_tokens=True) if save_dir else ""
         # shuchang: 0809
         # FIXME: Changed to use batch.non_tensor_batch["steps"] directly, no need for additional parsing
         # steps_struct = parse_rollout_to_steps(rollout)
@@ -630,38 +711,64 @@ async def evaluate_step_flags_parallel(tokenizer, batch, overall_score_source: s
             "efficiency_gain": 0
         }
 
+    # Cached judgments are reused; identical uncached samples are sent to the LLM once
     all_results = []
+    pending: Dict[str, List[EvaluationTask]] = {}
+    for task in all_tasks:
+        key = _judgment_key(task, model_name, overall_score_source)
+        cached_flags = judgment_cache.get(key)
+        if cached_flags is not None and len(cached_flags) == len(task.steps):
+            all_results.append(EvaluationResult(sample_idx=task.sample_idx, step_results=cached_flags,
+                                                response_time=0.0, parsed=True, cached=True))
+        else:
+            pending.setdefault(key, []).append(task)
+    cache_hits = len(all_results)
+    deduplicated = sum(len(tasks) - 1 for tasks in pending.values())
+    print(f"[parallel_eval] Judgment cache: {cache_hits} hits, {len(pending)} LLM calls, {deduplicated} duplicates")
+
+    # Continuous worker pool: a slow or retried call only occupies its own worker, never a whole chunk
     semaphore = asyncio.Semaphore(max_concurrent)
+    work_queue: asyncio.Queue = asyncio.Queue()
+    for key, tasks in pending.items():
+        work_queue.put_nowait((key, tasks))
+    api_latencies = []
 
     with tqdm(total=total_tasks, desc=f"[parallel_eval] Processing samples (API)") as pbar:
-        for i in range(0, total_tasks, batch_size_limit):
-            batch_tasks = all_tasks[i:i + batch_size_limit]
-
-            # Each task calls _evaluate_single_sample_api to evaluate all steps of the entire sample at once
-            coroutines = [
-                _evaluate_single_sample_api(api_client, model_name, task, semaphore, overall_score_source, api_max_retries, save_dir, global_step, epoch)
-                for task in batch_tasks
-            ]
-            batch_results = await asyncio.gather(*coroutines, return_exceptions=True)
-
-            for result in batch_results:
-                if isinstance(result, Exception):
-                    print(f"[parallel_eval] ❌ Task failed with exception: {result}")
+        pbar.update(cache_hits)
+
+        async def _worker():
+            while True:
+                try:
+                    key, tasks = work_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    result = await _evaluate_single_sample_api(api_client, model_name, tasks[0], semaphore, overall_score_source, api_max_retries, save_dir, global_step, epoch)
+                except Exception as e:
+                    print(f"[parallel_eval] ❌ Task failed with exception: {e}")
+                    pbar.update(len(tasks))
                     continue
+                api_latencies.append(result.response_time)
+                if result.parsed:
+                    judgment_cache.put(key, result.step_results, meta={"model": model_name, "num_steps": len(tasks[0].steps)})
                 all_results.append(result)
+                for task in tasks[1:]:
+                    all_results.append(EvaluationResult(sample_idx=task.sample_idx, step_results=list(result.step_results),
+                                                        response_time=0.0, parsed=result.parsed, cached=True))
+                pbar.update(len(tasks))
 
-            pbar.update(len(batch_tasks))
+        await asyncio.gather(*[_worker() for _ in range(min(max_concurrent, len(pending)))])
 
     # Organize results into flags_per_sample
     for result in all_results:
         flags_per_sample[result.sample_idx] = result.step_results
 
-    total_time = sum(r.response_time for r in all_results)
-    avg_time = total_time / len(all_results) if all_results else 0
+    total_time = sum(api_latencies)
+    avg_time = total_time / len(api_latencies) if api_latencies else 0
 
     stats = {
         "total_tasks": total_tasks,
-        "total_api_calls": len(all_results),
+        "total_api_calls": len(api_latencies),
         "total_steps": total_steps,
         "successful_tasks": len(all_results),
         "failed_tasks": total_tasks - len(all_results),
@@ -708,7 +815,12 @@ async def evaluate_step_flags_parallel(tokenizer, batch, overall_score_source: s
         "prm/flags_len_mismatch_rate": length_mismatch / max(1, total_tasks),
         "prm/_parse_success_count": parsed_ok,
         "prm/_flags_len_mismatch_count": length_mismatch,
+        "prm/judge_cache_hit_rate": (total_tasks - len(pending)) / max(1, total_tasks),
+        "prm/judge_cache_hits": cache_hits,
+        "prm/judge_dedup_hits": deduplicated,
+        "prm/judge_cache_size": len(judgment_cache),
     })
+    stats.update(_latency_metrics(api_latencies))
 
     print(f"[parallel_eval] ✅ Completed with {stats['efficiency_gain']:.1f}x efficiency gain!")
     print(f"[parallel_eval] Stats: {stats}")
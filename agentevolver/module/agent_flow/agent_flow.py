@@ -14,12 +14,10 @@ from agentevolver.module.context_manager.cmt_linear_think import LinearThinkCMT
 from agentevolver.module.context_manager.cmt_context_clip import SelfContextClipCMT
 from agentevolver.module.agent_flow.reward_calculator import RewardCalculator
 from typing import Any, Dict, List, Union, Optional
-import threading
 from agentevolver.module.exp_manager.exp_manager import TrajExpConfig, ExperienceWorker
+from agentevolver.module.agent_flow.rollout_log_writer import get_rollout_log_writer
 
 
-log_generate_lock = threading.Lock()
-
 class AgentFlow(BaseAgentFlow):
 
     def __init__(self, reward_calculator:Optional[RewardCalculator]=None, **kwargs):
@@ -42,6 +40,7 @@ class AgentFlow(BaseAgentFlow):
         self.cmt: Union[Linear_CMT, LinearThinkCMT] = None
         self.console_debug_mode: bool = self.config.actor_rollout_ref.rollout.debug_llm_io
         self.exp_worker = ExperienceWorker(config=self.config)
+        self.log_writer = get_rollout_log_writer(self.config, self.tokenizer)
 
 
     def execute(self, context_manager, init_messages: List[dict], env: EnvClient, instance_id: str, tmux, stop, thread_index, task_id, traj_exp_config,data_id="", rollout_id="", query="", **kwargs) -> Linear_CMT:
@@ -153,6 +152,11 @@ class AgentFlow(BaseAgentFlow):
 
         tmux['step'][thread_index] = -1
 
+        if self.cmt.discarded and self.config.actor_rollout_ref.rollout.get("straggler", {}).get("action", "discard") == "discard":
+            # stopped by the straggler policy and dropped by the env manager anyway: skip the evaluation
+            self.cmt.reward = Reward(outcome=0.0, success_rate=0.0, madness=0.0, description="Cancelled straggler.")
+            return self.cmt
+
         if self._reward_calculator is not None:
             grader_res = self._reward_calculator.calculate_reward(self.cmt, env, instance_id)  # ⭐ Calculate the reward using the reward calculator
             score = grader_res["score"] 
@@ -168,8 +172,8 @@ class AgentFlow(BaseAgentFlow):
         self.cmt.reward = self.cmt.reward_patch(self.cmt.reward)
         self.cmt.remove_last_context()
 
-        with log_generate_lock:
-            self.cmt.generate_log(task_id=task_id)  # ⭐ Generate the log for the task
+        if self.log_writer is not None and self.log_writer.should_log():
+            self.log_writer.submit(self.cmt.build_log_payload(task_id=task_id))  # ⭐ Rendered by the log worker process
 
 
         return self.cmt
@@ -0,0 +1,200 @@
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+from typing import Optional
+
+from loguru import logger
+
+
+def _log_worker(log_queue, tokenizer, config, log_path: Optional[str]):
+    """
+    Worker process: tokenizes and renders rollout log payloads until it receives the `None` sentinel.
+
+    Args:
+        log_queue: The multiprocessing queue filled by `RolloutLogWriter.submit`.
+        tokenizer: The HF tokenizer used to tokenize the steps and display tokens.
+        config (DictConfig): The training configuration, used to tokenize the steps as the trainer does.
+        log_path (str | None): Log directory of the parent process, see `env_manager.init_logger`.
+    """
+    if log_path is not None:
+        from beast_logger import register_logger
+        non_console_mods = ["conversation", "rollout", "token_clip", "bad_case", "env_clip"]
+        register_logger(mods=["evaluation", "exception"], non_console_mods=non_console_mods, auto_clean_mods=[], base_log_path=log_path, debug=False)
+    from agentevolver.module.context_manager.cmt_linear import Linear_CMT
+    from agentevolver.module.context_manager.cmt_log import render_rollout_log, tokenize_log_payload
+
+    cmt = Linear_CMT(config, tokenizer)  # ⭐ Only used for its `tokenize_steps`
+    while True:
+        payload = log_queue.get()
+        if payload is None:
+            break
+        try:
+            cmt.metadata = payload["metadata"]
+            render_rollout_log(tokenize_log_payload(payload, cmt), tokenizer)
+        except Exception as e:
+            logger.warning(f"failed to render rollout log: {e}")
+
+
+class RolloutLogWriter:
+    """
+    Renders rollout logs in a background process, off the rollout threads.
+
+    Trajectories are sampled (1 in `log_every_n`) and their log payloads (see `Linear_CMT.build_log_payload`)
+    are handed to a bounded queue. The payloads hold the raw steps: tokenization and rendering both happen
+    in the worker process. When the queue is full the payload is dropped rather than waited on, so logging
+    never stalls rollout.
+
+    Attributes:
+        submitted (int): Payloads handed to the worker.
+        dropped (int): Payloads dropped because the queue was full.
+        skipped (int): Trajectories not sampled for logging.
+    """
+
+    def __init__(self, tokenizer, config, log_every_n: int = 1, queue_size: int = 256, log_path: Optional[str] = None):
+        """
+        Starts the worker process.
+
+        Args:
+            tokenizer: The HF tokenizer used to tokenize the steps and display tokens.
+            config (DictConfig): The training configuration.
+            log_every_n (int, optional): Log one trajectory out of every `log_every_n`. Defaults to 1.
+            queue_size (int, optional): Maximum number of pending payloads. Defaults to 256.
+            log_path (str, optional): Log directory the worker registers its logger on. Defaults to None.
+        """
+        self.log_every_n = max(1, int(log_every_n))
+        ctx = mp.get_context("spawn")  # rollout threads hold locks, never fork here
+        self._queue = ctx.Queue(maxsize=queue_size)
+        self._process = ctx.Process(target=_log_worker, args=(self._queue, tokenizer, config, log_path), daemon=True)
+        self._process.start()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.submitted = 0
+        self.dropped = 0
+        self.skipped = 0
+        atexit.register(self.close)
+
+    def should_log(self) -> bool:
+        """
+        Decides whether the next trajectory is logged, before its (costly) payload is built.
+
+        Returns:
+            bool: True if the trajectory is sampled and the queue has room.
+        """
+        with self._lock:
+            if next(self._counter) % self.log_every_n != 0:
+                self.skipped += 1
+                return False
+            if self._closed or self._queue.full():
+                self.dropped += 1
+                return False
+            return True
+
+    def submit(self, payload: Optional[dict]) -> bool:
+        """
+        Hands a payload to the worker without blocking.
+
+        Args:
+            payload (dict | None): The log payload; None is ignored.
+
+        Returns:
+            bool: True if the payload was queued.
+        """
+        if payload is None or self._closed:
+            return False
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1  # ⭐ Drop on backpressure, never wait
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def stats(self) -> dict:
+        """Cumulative counters since the writer started."""
+        with self._lock:
+            return {
+                "rollout_log/submitted": self.submitted,
+                "rollout_log/dropped": self.dropped,
+                "rollout_log/skipped": self.skipped,
+            }
+
+    def get_metrics(self, since: Optional[dict] = None) -> dict:
+        """
+        Writer statistics for trainer logging.
+
+        Args:
+            since (dict, optional): A previous `stats()` snapshot; counters are reported relative to it.
+
+        Returns:
+            dict: Submitted, dropped and skipped payloads.
+        """
+        stats = self.stats()
+        if since is not None:
+            for name in stats:
+                stats[name] -= since.get(name, 0)
+        return stats
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Lets the worker drain the queue and stops it."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+            self._process.join(timeout=timeout)
+        except (queue.Full, ValueError, OSError):
+            pass
+        if self._process.is_alive():
+            self._process.terminate()
+        self._queue.cancel_join_thread()  # payloads the worker did not take must not block interpreter exit
+
+
+_writer: Optional[RolloutLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_rollout_log_writer(config, tokenizer) -> Optional[RolloutLogWriter]:
+    """
+    Returns the process-wide rollout log writer, starting it on first use.
+
+    Reads `actor_rollout_ref.rollout.log_every_n` (0 disables rollout logs) and
+    `actor_rollout_ref.rollout.log_queue_size`.
+
+    Args:
+        config (DictConfig): The training configuration.
+        tokenizer: The HF tokenizer used to tokenize the steps and display tokens.
+
+    Returns:
+        RolloutLogWriter | None: The writer, or None if rollout logging is disabled.
+    """
+    global _writer
+    log_every_n = config.actor_rollout_ref.rollout.get("log_every_n", 1)
+    if log_every_n <= 0:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = RolloutLogWriter(
+                tokenizer,
+                config,
+                log_every_n=log_every_n,
+                queue_size=config.actor_rollout_ref.rollout.get("log_queue_size", 256),
+                log_path=os.environ.get("BEST_LOGGER_PATH", None),
+            )
+        return _writer
+
+
+def current_rollout_log_writer() -> Optional[RolloutLogWriter]:
+    """
+    Returns the process-wide rollout log writer without starting it.
+
+    Returns:
+        RolloutLogWriter | None: The writer, or None if no rollout has started it yet.
+    """
+    return _writer
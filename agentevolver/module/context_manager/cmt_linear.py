@@ -1,7 +1,5 @@
 import copy
-import uuid
 import json
-import re
 import torch
 from typing import List, Union
 from agentevolver.schema.trajectory import Sample, Reward
@@ -9,7 +7,9 @@ from agentevolver.schema.trajectory import Sample, Trajectory
 from agentevolver.utils.compute_madness import repetition_penalty_reward_scalar
 from agentevolver.module.context_manager.cmt_base import ExtendedMessage, ContextManagerBase
 from agentevolver.module.context_manager.cmt_base import find_sublist_indices, replace_token_ids
-from best_logger import register_logger, print_listofdict, print_dict, print_nested, NestedJsonItem, SeqItem
+from agentevolver.module.context_manager.cmt_token_cache import IncrementalTokenizer
+from agentevolver.module.context_manager.cmt_log import render_rollout_log, token_texts, tokenize_log_payload
+from best_logger import register_logger, print_dict
 from agentevolver.module.exp_manager.exp_manager import ExperienceWorker, TrajExpConfig
 
 
@@ -41,6 +41,7 @@ class Linear_CMT(Trajectory, ContextManagerBase):
         super().__init__()
         self.config = config
         self.tokenizer = tokenizer
+        self.token_cache = IncrementalTokenizer(tokenizer)  # ⭐ Only tokenize the delta of the growing history
         self.full_context: List[ExtendedMessage] = []  # ⭐ Initialize the list to store all messages in the conversation
         self.current_context_status = ""
         max_response_length = self.config.actor_rollout_ref.rollout.response_length
@@ -116,11 +117,8 @@ class Linear_CMT(Trajectory, ContextManagerBase):
         Returns:
             bool: True if the total number of tokens is less than the maximum allowed sequence length, False otherwise.
         """
-        def get_seq_length(messages):
-            prompt_text = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-            return len(self.tokenizer(prompt_text, return_tensors="pt", padding=False)["input_ids"][0])  # ⭐ Calculate the total number of tokens in the messages
         messages = self.prepare_previous_context(mod="raw")
-        return get_seq_length(messages) < self.max_seq_length   # self.config.env_engine.max_seq_length = 20480
+        return self.token_cache.count_tokens(messages, add_generation_prompt=True) < self.max_seq_length   # self.config.env_engine.max_seq_length = 20480
 
 
     def get_inc(self, text_frag_from, text_frag_to):
@@ -134,20 +132,7 @@ class Linear_CMT(Trajectory, ContextManagerBase):
         Returns:
             Tuple[List[int], str]: A tuple containing the list of incremental token IDs and a message with token length details.
         """
-        tokenizer_output = self.tokenizer(text_frag_from, return_tensors="pt", padding=False)
-        tokenizer_input_ids = tokenizer_output["input_ids"][0].tolist()
-        token_ids_acc = tokenizer_input_ids
-
-        tokenizer_output = self.tokenizer(text_frag_to, return_tensors="pt", padding=False)
-        input_ids = tokenizer_output["input_ids"][0].tolist()
-        input_id_increment = input_ids[len(token_ids_acc):]  # ⭐ Get the new tokens added in this step
-        overlap_length = 0
-        for i in range(len(token_ids_acc)):
-            if i < len(token_ids_acc) and input_ids[i] == token_ids_acc[i]: overlap_length += 1
-            else: break
-        msg = f"previous token length: {len(token_ids_acc)}, overlap token length: {(overlap_length)}, increment token length: {len(input_id_increment)}"
-        # print(msg)
-        return input_id_increment, msg
+        return self.token_cache.get_inc(text_frag_from, text_frag_to)  # ⭐ Both fragments share the cached prefix
 
     def remove_last_context(self):
         """
@@ -241,21 +226,13 @@ class Linear_CMT(Trajectory, ContextManagerBase):
             )
             self.full_context += [ext_msg]  # ⭐ Adds the extended message to the full context
 
-        # compute token array for each message
-        token_ids_acc = []
-        for llm_msg, ext_msg, index in zip(init_input_arr, self.full_context, range(len(init_input_arr))):
-            text_with_chat_template = self.tokenizer.apply_chat_template(init_input_arr[:(index+1)], tokenize=False)
-            tokenizer_output = self.tokenizer(text_with_chat_template, return_tensors="pt", padding=False)
-            input_ids = tokenizer_output["input_ids"][0].tolist()
-            # attention_mask = outputs["attention_mask"][0].tolist()
-            input_id_increment = input_ids[len(token_ids_acc):]  # get the new tokens added in this step
-            overlap_length = 0
-            for i in range(len(token_ids_acc)):
-                if (i < len(token_ids_acc)) and (input_ids[i] == token_ids_acc[i]): overlap_length += 1
-                else: break
-            ext_msg._info = f"previous token length: {len(token_ids_acc)}, overlap token length: {(overlap_length)}, increment token length: {len(input_id_increment)}"
+        # compute token array for each message, each prefix is tokenized on top of the previous one
+        text_from = ""
+        for ext_msg, index in zip(self.full_context, range(len(init_input_arr))):
+            text_to = self.token_cache.render(init_input_arr[:(index+1)])
+            input_id_increment, ext_msg._info = self.token_cache.get_inc(text_from, text_to)
             ext_msg.token_arr = input_id_increment  # ⭐ Sets the token array for the extended message
-            token_ids_acc += input_ids
+            text_from = text_to
         return
 
     def influence_extra_reward(self, llm_output):
@@ -317,15 +294,15 @@ class Linear_CMT(Trajectory, ContextManagerBase):
         # generate token
         def get_token_inc_from_vllm_response(input_msg_ref) -> List[int]:
             generation_prompt_token, msg = self.get_inc(
-                self.tokenizer.apply_chat_template(input_msg_ref, tokenize=False, add_generation_prompt=False),
-                self.tokenizer.apply_chat_template(input_msg_ref, tokenize=False, add_generation_prompt=True),
+                self.token_cache.render(input_msg_ref, add_generation_prompt=False),
+                self.token_cache.render(input_msg_ref, add_generation_prompt=True),
             )
             # completion_token_arr will contain generation_prompt header
             completion_token_arr, msg2 = self.get_inc(
                 # ...  <|im_end|>
-                self.tokenizer.apply_chat_template(input_msg_ref, tokenize=False),
+                self.token_cache.render(input_msg_ref),
                 # ...  <|im_end|><|im_start|>...<|im_end|>
-                self.tokenizer.apply_chat_template(input_msg_ref + [ {"role": llm_output['role'],  "content": llm_output['content']} ], tokenize=False),
+                self.token_cache.render(input_msg_ref + [ {"role": llm_output['role'],  "content": llm_output['content']} ]),
             )
             vllm_output_raw_token = [t.token_id for t in llm_output['tokens']]
             self.generated_token_cnt += len(vllm_output_raw_token)  # ⭐ Increment the generated token count
@@ -478,7 +455,7 @@ class Linear_CMT(Trajectory, ContextManagerBase):
     def group_render_token_log(self):
         ext_steps=self.full_context
         cmt_tokenized = self.tokenize_steps(ext_steps=ext_steps)
-        text_arr = [self.tokenizer.decode(t) for t in cmt_tokenized["input_ids"]]
+        text_arr = token_texts(self.tokenizer, cmt_tokenized["input_ids"])
         input_id_arr = [str(t) for t in cmt_tokenized["input_ids"]]
         loss_mask_color_arr = ["#09ABCF" if mask==1 else "#D98510" for mask in cmt_tokenized["loss_mask"]]
         return {
@@ -488,6 +465,49 @@ class Linear_CMT(Trajectory, ContextManagerBase):
         }
 
 
+    def get_log_step_groups(self) -> dict:
+        """
+        Returns the groups of raw steps shown in the rollout log, keyed by their selector suffix ("" for none).
+        A linear context is a single group; context managers that split the conversation override this.
+
+        Returns:
+            dict: Selector suffix -> list of ExtendedMessage.
+        """
+        return {"": self.full_context}
+
+    def build_log_payload(self, task_id):
+        """
+        Collects everything the rollout log needs into a plain, picklable dict. The steps are kept raw, so that
+        both their tokenization and the rendering can happen off the rollout thread, see `tokenize_log_payload`
+        and `RolloutLogWriter`. Every group of `get_log_step_groups` becomes one log item.
+
+        Args:
+            task_id (str): The ID of the task for which the log is being generated.
+
+        Returns:
+            dict: The log payload.
+        """
+        task_outcome = str(self.reward.success_rate)  # ⭐ Get the task success rate as a string
+        final_reward = self.reward_patch(self.reward).outcome  # ⭐ Get the final reward after applying the reward patch
+        groups = self.get_log_step_groups()
+        items = {}
+        for suffix, ext_steps in groups.items():
+            selectors = [task_id, task_outcome] + ([suffix] if suffix else [])
+            items[".".join(selectors)] = {
+                "ext_steps": list(ext_steps),  # ⭐ Tokenized by `tokenize_log_payload`
+                "outcome": task_outcome,
+                "reward": f"{float(self.reward.outcome):.3f}",
+                "final_reward": final_reward,
+            }
+        return {
+            "header": f"Training task {task_id} (Final Reward {final_reward})",
+            "attach": "Copy Sample Message",
+            "metadata": self.metadata,
+            "items": items,
+            "conversation": self.steps if list(groups) == [""] else None,  # ⭐ Only a linear context is one conversation
+        }
+
+
     def generate_log(self, task_id):
         """
         Generates and prints a log for the specified task, including detailed information about the tokenized steps,
@@ -499,52 +519,7 @@ class Linear_CMT(Trajectory, ContextManagerBase):
         Returns:
             None
         """
-        nested_items_print_buffer = {}
-        ext_steps=self.full_context  # ⭐ Retrieve the full context for the task
-        cmt_tokenized = self.tokenize_steps(ext_steps=ext_steps)  # ⭐ Tokenize the extended steps
-        text_arr = [self.tokenizer.decode(t) for t in cmt_tokenized["input_ids"]]  # ⭐ Decode the tokenized input IDs to text
-        input_id_arr = [str(t) for t in cmt_tokenized["input_ids"]]  # ⭐ Convert input IDs to strings
-        loss_mask_color_arr = ["#09ABCF" if mask==1 else "#D98510" for mask in cmt_tokenized["loss_mask"]]  # ⭐ Generate color array based on loss mask
-        buffer = {
-            "text_arr": text_arr,
-            "input_id_arr": input_id_arr,
-            "loss_mask_color_arr": loss_mask_color_arr,
-        }
-        len_prompt_ids = len(cmt_tokenized["prompt_ids"])  # ⭐ Calculate the length of prompt IDs
-        len_response_ids = len(cmt_tokenized["response_ids"])  # ⭐ Calculate the length of response IDs
-        len_input_ids = len(cmt_tokenized["input_ids"])  # ⭐ Calculate the length of input IDs
-        reward = self.reward.outcome  # ⭐ Get the reward outcome
-        task_outcome = str(self.reward.success_rate)  # ⭐ Get the task success rate as a string
-        final_reward = self.reward_patch(self.reward).outcome  # ⭐ Get the final reward after applying the reward patch
-        selectors = [task_id, task_outcome]
-        nested_items_print_buffer[f".".join(selectors)] = NestedJsonItem(
-            item_id=f"item",
-            outcome=task_outcome,
-            len_prompt_ids=len_prompt_ids,
-            len_response_ids=len_response_ids,
-            len_input_ids=len_input_ids,
-            reward=f"{float(reward):.3f}",
-            final_reward=final_reward,
-            content=SeqItem(
-                text = buffer['text_arr'],  # text
-                title = buffer['text_arr'], # mouse hover
-                count = buffer['input_id_arr'], # highlight text
-                color = buffer['loss_mask_color_arr']   # color
-            )
-        )
-        print_nested(nested_items_print_buffer,  # ⭐ Print the nested JSON buffer
-            main_content="This is the main content of the nested JSON",
-            header=f"Training task {task_id} (Final Reward {final_reward})",
-            mod="rollout",
-            narrow=False,
-            attach="Copy Sample Message"
-        )
-        print_listofdict(  # ⭐ Print the list of dictionaries
-            self.steps,
-            header=f"Training task {task_id} (Final Reward {final_reward})",
-            mod="conversation",
-            narrow=False,
-        )
+        render_rollout_log(tokenize_log_payload(self.build_log_payload(task_id), self), self.tokenizer)
 
     def reward_patch(self, reward):
         """
@@ -5,7 +5,8 @@ from agentevolver.schema.trajectory import Sample
 from best_logger import print_dict, print_listofdict
 from agentevolver.module.context_manager.cmt_linear import ExtendedMessage, Linear_CMT
 from agentevolver.module.context_manager.cmt_linear import find_sublist_indices, replace_token_ids
-from best_logger import register_logger, print_dict, print_nested, NestedJsonItem, SeqItem
+from best_logger import register_logger, print_dict
+from agentevolver.module.context_manager.cmt_log import render_rollout_log, tokenize_log_payload
 from textwrap import dedent
 
 class LinearThinkCMT(Linear_CMT):
@@ -96,8 +97,7 @@ class LinearThinkCMT(Linear_CMT):
         Returns:
             int: The length of the tokenized sequence.
         """
-        prompt_text = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)  # ⭐ Apply the chat template to the messages
-        return len(self.tokenizer(prompt_text, return_tensors="pt", padding=False)["input_ids"][0])  # ⭐ Tokenize the prompt text and return the length of the tokenized sequence
+        return self.token_cache.count_tokens(messages, add_generation_prompt=True)  # ⭐ Only the part after the cached prefix is tokenized
 
 
     def check_context_token_num_safe(self, messages: List[dict]) -> bool:
@@ -213,6 +213,16 @@ class LinearThinkCMT(Linear_CMT):
 
 
 
+    def get_log_step_groups(self):
+        """
+        Returns every group of steps, keyed by its index, so that each one is a separate rollout log item.
+
+        Returns:
+            dict: Group index -> list of ExtendedMessage.
+        """
+        return {str(index): ext_steps for index, ext_steps in enumerate(self.grouped_steps)}
+
+
     def generate_log(self, task_id):
         """
         Generates a log for the given task ID, which includes tokenized steps, decoded text, and other relevant details.
@@ -223,45 +233,7 @@ class LinearThinkCMT(Linear_CMT):
         Returns:
             None
         """
-        nested_items_print_buffer = {}
-        for index, ext_steps in enumerate(self.grouped_steps):
-            cmt_tokenized = self.tokenize_steps(ext_steps=ext_steps, debug=True)  # ⭐ Tokenize the extended steps
-            text_arr = [self.tokenizer.decode(t) for t in cmt_tokenized["input_ids"]]
-            input_id_arr = [str(t) for t in cmt_tokenized["input_ids"]]
-            loss_mask_color_arr = ["#09ABCF" if mask==1 else "#D98510" for mask in cmt_tokenized["loss_mask"]]
-            buffer = {
-                "text_arr": text_arr,
-                "input_id_arr": input_id_arr,
-                "loss_mask_color_arr": loss_mask_color_arr,
-            }
-            reward = self.reward.outcome
-            task_outcome = str(self.reward.success_rate)
-            selectors = [task_id, task_outcome, str(index)]
-            len_prompt_ids = len(cmt_tokenized["prompt_ids"])
-            len_response_ids = len(cmt_tokenized["response_ids"])
-            len_input_ids = len(cmt_tokenized["input_ids"])
-            assert len_prompt_ids + len_response_ids == len_input_ids, "len_prompt_ids + len_response_ids should equal to len_input_ids"
-            nested_items_print_buffer[f".".join(selectors)] = NestedJsonItem(
-                item_id=f"item",
-                outcome=task_outcome,
-                len_prompt_ids=len_prompt_ids,
-                len_response_ids=len_response_ids,
-                len_input_ids=len_input_ids,
-                reward=f"{float(reward):.3f}",
-                content=SeqItem(
-                    text=buffer['text_arr'],  # Text
-                    title=buffer['text_arr'],  # Hover text
-                    count=buffer['input_id_arr'],  # Highlighted text
-                    color=buffer['loss_mask_color_arr']  # Color
-                )
-            )
-        print_nested(nested_items_print_buffer,
-            main_content="This is the main content of the nested JSON",
-            header=f"Training, task {task_id}",
-            mod="rollout",
-            narrow=False,
-            attach="copy this"
-        )
+        render_rollout_log(tokenize_log_payload(self.build_log_payload(task_id), self), self.tokenizer)
 
 
     def save_init_input(self, init_input_arr:list, add_nothink):
@@ -0,0 +1,114 @@
+from functools import lru_cache
+from typing import List, Optional
+
+from best_logger import print_listofdict, print_nested, NestedJsonItem, SeqItem
+
+
+@lru_cache(maxsize=1)
+def _byte_decoder() -> dict:
+    """Inverse of the GPT-2 byte-to-unicode table used by byte-level BPE vocabularies."""
+    bs = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) + list(range(ord("®"), ord("ÿ") + 1))
+    cs = bs[:]
+    n = 0
+    for b in range(2 ** 8):
+        if b not in bs:
+            bs.append(b)
+            cs.append(2 ** 8 + n)
+            n += 1
+    return {chr(c): b for b, c in zip(bs, cs)}
+
+
+def token_texts(tokenizer, input_ids: List[int]) -> List[str]:
+    """
+    Returns the display text of every token with a single `convert_ids_to_tokens` call,
+    instead of one `tokenizer.decode` call per token.
+
+    Args:
+        tokenizer: The HF tokenizer.
+        input_ids (List[int]): Token ids.
+
+    Returns:
+        List[str]: One text piece per token.
+    """
+    byte_decoder = _byte_decoder()
+    texts = []
+    for tok in tokenizer.convert_ids_to_tokens(list(input_ids)):
+        tok = tok or ""
+        if all(c in byte_decoder for c in tok):
+            # byte-level BPE (Qwen, Llama-3, ...): map the printable stand-ins back to bytes
+            texts.append(bytes(byte_decoder[c] for c in tok).decode("utf-8", errors="replace"))
+        else:
+            texts.append(tok.replace("▁", " "))  # sentencepiece word boundary
+    return texts
+
+
+def tokenize_log_payload(payload: Optional[dict], cmt) -> Optional[dict]:
+    """
+    Replaces the raw steps (`ext_steps`) of every item of a payload built by `Linear_CMT.build_log_payload`
+    with their token ids, loss mask and prompt/response lengths.
+
+    Args:
+        payload (dict | None): The log payload, modified in place.
+        cmt (Linear_CMT): The context manager whose `tokenize_steps` is used.
+
+    Returns:
+        dict | None: The payload, ready for `render_rollout_log`.
+    """
+    if payload is None:
+        return None
+    for selector, item in payload["items"].items():
+        cmt_tokenized = cmt.tokenize_steps(ext_steps=item.pop("ext_steps"))
+        len_prompt_ids = len(cmt_tokenized["prompt_ids"])
+        len_response_ids = len(cmt_tokenized["response_ids"])
+        len_input_ids = len(cmt_tokenized["input_ids"])
+        assert len_prompt_ids + len_response_ids == len_input_ids, "len_prompt_ids + len_response_ids should equal to len_input_ids"
+        payload["items"][selector] = {
+            "input_ids": cmt_tokenized["input_ids"],
+            "loss_mask": cmt_tokenized["loss_mask"],
+            "outcome": item.pop("outcome"),
+            "len_prompt_ids": len_prompt_ids,
+            "len_response_ids": len_response_ids,
+            "len_input_ids": len_input_ids,
+            **item,
+        }
+    return payload
+
+
+def render_rollout_log(payload: Optional[dict], tokenizer) -> None:
+    """
+    Prints a rollout log (token view and, optionally, the conversation) once `tokenize_log_payload` has run.
+
+    Args:
+        payload (dict | None): The log payload, nothing is printed if None.
+        tokenizer: The HF tokenizer used to display tokens.
+    """
+    if payload is None:
+        return
+    nested_items_print_buffer = {}
+    for selector, item in payload["items"].items():
+        text_arr = token_texts(tokenizer, item["input_ids"])
+        fields = {k: v for k, v in item.items() if k not in ("input_ids", "loss_mask")}
+        nested_items_print_buffer[selector] = NestedJsonItem(
+            item_id="item",
+            **fields,
+            content=SeqItem(
+                text=text_arr,  # text
+                title=text_arr,  # mouse hover
+                count=[str(t) for t in item["input_ids"]],  # highlight text
+                color=["#09ABCF" if mask == 1 else "#D98510" for mask in item["loss_mask"]]  # color
+            )
+        )
+    print_nested(nested_items_print_buffer,
+        main_content="This is the main content of the nested JSON",
+        header=payload["header"],
+        mod="rollout",
+        narrow=False,
+        attach=payload["attach"]
+    )
+    if payload.get("conversation") is not None:
+        print_listofdict(
+            payload["conversation"],
+            header=payload["header"],
+            mod="conversation",
+            narrow=False,
+        )
@@ -161,12 +161,12 @@ class MemoryCoreCMT(Linear_CMT):
                 List[int]: The final token array after processing.
             """
             generation_prompt_token, msg = self.get_inc(
-                self.tokenizer.apply_chat_template(input_msg_ref, tokenize=False, add_generation_prompt=False),
-                self.tokenizer.apply_chat_template(input_msg_ref, tokenize=False, add_generation_prompt=True),
+                self.token_cache.render(input_msg_ref, add_generation_prompt=False),
+                self.token_cache.render(input_msg_ref, add_generation_prompt=True),
             )  # ⭐ Calculate the token increment for the generation prompt
             completion_token_arr, msg2 = self.get_inc(
-                self.tokenizer.apply_chat_template(input_msg_ref, tokenize=False),
-                self.tokenizer.apply_chat_template(input_msg_ref + [ {"role": llm_output['role'],  "content": llm_output['content']} ], tokenize=False),
+                self.token_cache.render(input_msg_ref),
+                self.token_cache.render(input_msg_ref + [ {"role": llm_output['role'],  "content": llm_output['content']} ]),
             )  # ⭐ Calculate the token increment for the completion
             vllm_output_raw_token = [t.token_id for t in llm_output['tokens']]
             final_token_arr = replace_token_ids(place_holder=completion_token_arr, replace_with=vllm_output_raw_token, begin=generation_prompt_token, end=[self.tokenizer.eos_token_id])
@@ -267,6 +267,18 @@ class MemoryCMT(MemoryCoreCMT):
     def steps(self):
         raise NotImplementedError("MemoryCMT does not support steps.")
 
+    def build_log_payload(self, task_id):
+        """
+        Memory trajectories are not rendered into the rollout log, see `generate_log`.
+
+        Args:
+            task_id (str): The ID of the task for which the log is being generated.
+
+        Returns:
+            None
+        """
+        return None
+
     def generate_log(self, task_id):
         """
         Generates a log of grouped steps from the conversation history.
@@ -0,0 +1,196 @@
+import json
+from collections import OrderedDict
+from typing import List, Tuple
+
+
+class IncrementalTokenizer:
+    """
+    Per-trajectory incremental tokenization engine shared by the linear context managers.
+
+    Every turn of a trajectory re-renders `apply_chat_template` over a history that only grew at the end,
+    and then tokenizes the whole rendered text again. This engine keeps, for each recently rendered text,
+    the token ids of its longest prefix that ends right after a special token (e.g. `<|im_end|>`). Special
+    tokens are split off before BPE, so `tokenize(prefix + delta) == tokenize(prefix) + tokenize(delta)`
+    whenever `prefix` ends with one; only `delta` is sent to the tokenizer.
+
+    The identity is only guaranteed for byte-level BPE tokenizers (Qwen, Llama 3, GPT-2 style). SentencePiece-style
+    tokenizers (Llama 2, Mistral) mark the start of the input with '▁', so a delta tokenized on its own differs
+    from the same text in context; for those every text is tokenized whole (see `_splits_exactly`).
+
+    Attributes:
+        tokenizer_calls (int): Number of calls made to the underlying tokenizer.
+        tokenized_chars (int): Number of characters sent to the underlying tokenizer.
+        render_calls (int): Number of `apply_chat_template` renderings actually performed.
+        running_token_count (int): Token count of the last context passed to `count_tokens`.
+    """
+
+    def __init__(self, tokenizer, max_anchors: int = 8, max_renders: int = 16):
+        """
+        Initializes the engine.
+
+        Args:
+            tokenizer: The HF tokenizer used by the context manager.
+            max_anchors (int, optional): Number of tokenized prefixes kept. Defaults to 8.
+            max_renders (int, optional): Number of rendered chat templates kept. Defaults to 16.
+        """
+        self.tokenizer = tokenizer
+        self.max_anchors = max_anchors
+        self.max_renders = max_renders
+        self._anchors: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._renders: "OrderedDict[tuple, str]" = OrderedDict()
+        self._boundary_tokens = self._get_boundary_tokens(tokenizer) if self._splits_exactly(tokenizer) else []
+
+        self.tokenizer_calls = 0
+        self.tokenized_chars = 0
+        self.render_calls = 0
+        self.running_token_count = 0
+
+    @staticmethod
+    def _splits_exactly(tokenizer) -> bool:
+        """
+        Whether text can be split after a special token without changing its tokenization, i.e. whether the
+        tokenizer has a byte-level pre-tokenizer that does not add a prefix space.
+        """
+        backend = getattr(tokenizer, "backend_tokenizer", None)
+        if backend is None or backend.pre_tokenizer is None:
+            return False
+        pre_tokenizer = json.loads(backend.pre_tokenizer.__getstate__())
+        parts = pre_tokenizer.get("pretokenizers", [pre_tokenizer])
+        return any(p.get("type") == "ByteLevel" and not p.get("add_prefix_space", False) for p in parts)
+
+    @staticmethod
+    def _get_boundary_tokens(tokenizer) -> List[str]:
+        """
+        Returns the special tokens after which text can be split without changing its tokenization.
+        Added tokens that strip neighbouring whitespace are excluded, since they merge with the next segment.
+        """
+        stripping = {
+            str(tok) for tok in getattr(tokenizer, "added_tokens_decoder", {}).values()
+            if getattr(tok, "lstrip", False) or getattr(tok, "rstrip", False)
+        }
+        return [tok for tok in getattr(tokenizer, "all_special_tokens", []) if tok and tok not in stripping]
+
+    def _tokenize(self, text: str, add_special_tokens: bool = True) -> List[int]:
+        self.tokenizer_calls += 1
+        self.tokenized_chars += len(text)
+        return self.tokenizer(text, add_special_tokens=add_special_tokens, padding=False)["input_ids"]
+
+    def _boundary(self, text: str, start: int) -> int:
+        """Returns the end index of the last special token found in `text[start:]`, or -1."""
+        boundary = -1
+        for tok in self._boundary_tokens:
+            index = text.rfind(tok, start)
+            if index >= 0:
+                boundary = max(boundary, index + len(tok))
+        return boundary
+
+    def render(self, messages: List[dict], add_generation_prompt: bool = False) -> str:
+        """
+        Memoized `tokenizer.apply_chat_template(messages, tokenize=False, ...)`.
+
+        Renders are keyed on a canonical JSON serialization of the whole messages, since templates also read
+        fields other than 'role' and 'content' (tool calls, names, ...) and 'content' may be a list of parts.
+
+        Args:
+            messages (List[dict]): Messages with 'role' and 'content'.
+            add_generation_prompt (bool, optional): Whether to append the generation prompt. Defaults to False.
+
+        Returns:
+            str: The rendered chat template.
+        """
+        key = (add_generation_prompt, tuple(json.dumps(m, sort_keys=True, ensure_ascii=False, default=str) for m in messages))
+        rendered = self._renders.get(key)
+        if rendered is None:
+            self.render_calls += 1
+            rendered = self.tokenizer.apply_chat_template(messages, tokenize=False,
+                                                          add_generation_prompt=add_generation_prompt)
+            self._renders[key] = rendered
+            if len(self._renders) > self.max_renders:
+                self._renders.popitem(last=False)
+        else:
+            self._renders.move_to_end(key)
+        return rendered
+
+    def encode(self, text: str) -> List[int]:
+        """
+        Tokenizes `text`, only sending the part after the longest cached prefix to the tokenizer.
+
+        Args:
+            text (str): The text to tokenize.
+
+        Returns:
+            List[int]: Token ids, identical to `tokenizer(text)["input_ids"]`.
+        """
+        if not text:
+            return []
+        anchor, anchor_ids = "", None
+        for candidate in reversed(self._anchors):
+            if len(candidate) > len(anchor) and text.startswith(candidate):
+                anchor, anchor_ids = candidate, self._anchors[candidate]
+        if anchor_ids is not None:
+            self._anchors.move_to_end(anchor)
+
+        boundary = self._boundary(text, len(anchor))
+        if anchor_ids is None:
+            if boundary <= 0:
+                return self._tokenize(text)
+            head_ids = self._tokenize(text[:boundary])
+        elif boundary > len(anchor):
+            head_ids = anchor_ids + self._tokenize(text[len(anchor):boundary], add_special_tokens=False)
+        else:
+            head_ids, boundary = anchor_ids, len(anchor)
+
+        if boundary > len(anchor):
+            self._anchors[text[:boundary]] = head_ids
+            if len(self._anchors) > self.max_anchors:
+                self._anchors.popitem(last=False)
+        if boundary == len(text):
+            return list(head_ids)
+        return head_ids + self._tokenize(text[boundary:], add_special_tokens=False)
+
+    def encode_messages(self, messages: List[dict], add_generation_prompt: bool = False) -> List[int]:
+        """Renders and tokenizes `messages` through the caches."""
+        return self.encode(self.render(messages, add_generation_prompt=add_generation_prompt))
+
+    def count_tokens(self, messages: List[dict], add_generation_prompt: bool = True) -> int:
+        """
+        Counts the prompt tokens of `messages` and records it as the running token count.
+
+        Args:
+            messages (List[dict]): Messages with 'role' and 'content'.
+            add_generation_prompt (bool, optional): Whether to count the generation prompt. Defaults to True.
+
+        Returns:
+            int: The number of tokens.
+        """
+        self.running_token_count = len(self.encode_messages(messages, add_generation_prompt=add_generation_prompt))
+        return self.running_token_count
+
+    def get_inc(self, text_frag_from: str, text_frag_to: str) -> Tuple[List[int], str]:
+        """
+        Get the incremental token array from text_frag_from to text_frag_to.
+
+        Args:
+            text_frag_from (str): The starting text fragment.
+            text_frag_to (str): The ending text fragment.
+
+        Returns:
+            Tuple[List[int], str]: The incremental token ids and a message with token length details.
+        """
+        token_ids_acc = self.encode(text_frag_from)
+        input_ids = self.encode(text_frag_to)
+        input_id_increment = input_ids[len(token_ids_acc):]  # ⭐ Get the new tokens added in this step
+        overlap_length = 0
+        for i in range(min(len(token_ids_acc), len(input_ids))):
+            if input_ids[i] == token_ids_acc[i]: overlap_length += 1
+            else: break
+        msg = f"previous token length: {len(token_ids_acc)}, overlap token length: {(overlap_length)}, increment token length: {len(input_id_increment)}"
+        return input_id_increment, msg
+
+    def stats(self) -> dict:
+        return {
+            "tokenizer_calls": self.tokenizer_calls,
+            "tokenized_chars": self.tokenized_chars,
+            "render_calls": self.render_calls,
+            "running_token_count": self.running_token_count,
+        }
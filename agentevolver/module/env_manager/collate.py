@@ -0,0 +1,97 @@
+from array import array
+from typing import Dict, List, Sequence
+
+import numpy as np
+import torch
+
+
+def as_int32_array(seq) -> np.ndarray:
+    """
+    Views a token sequence as a 1-D int32 NumPy array, without copying when possible.
+
+    `array('i')` buffers (see `Sample.compact`) and int32 NumPy arrays are wrapped zero-copy;
+    Python lists are converted once.
+
+    Args:
+        seq: A list of ints, an `array('i')` or a NumPy array.
+
+    Returns:
+        np.ndarray: The sequence as an int32 array.
+    """
+    if isinstance(seq, array) and seq.itemsize == 4 and seq.typecode in ("i", "l"):
+        return np.frombuffer(seq, dtype=np.int32)
+    return np.asarray(seq, dtype=np.int32)
+
+
+def collate_samples(
+    samples: Sequence,
+    pad_token_id: int,
+    step_ids: List[Sequence[int]],
+    step_ids_length: int,
+) -> Dict[str, torch.Tensor]:
+    """
+    Collates tokenized samples into the padded training tensors in a single pass over preallocated buffers.
+
+    Prompts are left-padded and responses right-padded to the longest prompt/response of the batch. Each
+    field is written once into a `(B, L_prompt + L_response)` NumPy buffer that is then handed to torch with
+    `torch.from_numpy`, instead of building one tensor per sample, padding them twice and concatenating.
+    Dtypes and values match the former `pad_sequence` based collation.
+
+    Args:
+        samples (Sequence[Sample]): Samples with non-empty prompt/response fields.
+        pad_token_id (int): Padding token of the tokenizer.
+        step_ids (List[Sequence[int]]): Per-sample step ids of the response tokens (-1 outside actions).
+        step_ids_length (int): Length step ids are padded to (the configured max response length).
+
+    Returns:
+        Dict[str, torch.Tensor]: "prompts", "responses", "input_ids", "attention_mask", "position_ids",
+        "loss_mask", "exp_mask", "step_ids" and "group_ids".
+    """
+    batch_size = len(samples)
+    prompt_lens = np.fromiter((len(s.prompt_ids) for s in samples), dtype=np.int64, count=batch_size)
+    response_lens = np.fromiter((len(s.response_ids) for s in samples), dtype=np.int64, count=batch_size)
+    max_prompt_len = int(prompt_lens.max())
+    max_response_len = int(response_lens.max())
+    total_len = max_prompt_len + max_response_len
+
+    input_ids = np.full((batch_size, total_len), pad_token_id, dtype=np.int32)
+    attention_mask = np.zeros((batch_size, total_len), dtype=np.int32)
+    loss_mask = np.zeros((batch_size, total_len), dtype=np.int32)
+    exp_mask = np.zeros((batch_size, total_len), dtype=np.int32)
+    position_ids = np.zeros((batch_size, total_len), dtype=np.int64)
+    step_ids_buf = np.full((batch_size, max(step_ids_length, max_response_len)), -1, dtype=np.int64)
+
+    for i, sample in enumerate(samples):
+        p_start = max_prompt_len - int(prompt_lens[i])
+        r_end = max_prompt_len + int(response_lens[i])
+
+        input_ids[i, p_start:max_prompt_len] = as_int32_array(sample.prompt_ids)
+        attention_mask[i, p_start:max_prompt_len] = as_int32_array(sample.prompt_attention_mask)
+        loss_mask[i, p_start:max_prompt_len] = as_int32_array(sample.prompt_loss_mask)
+        position_ids[i, p_start:max_prompt_len] = as_int32_array(sample.prompt_position_ids)
+
+        input_ids[i, max_prompt_len:r_end] = as_int32_array(sample.response_ids)
+        attention_mask[i, max_prompt_len:r_end] = as_int32_array(sample.response_attention_mask)
+        loss_mask[i, max_prompt_len:r_end] = as_int32_array(sample.response_loss_mask)
+
+        # exp_mask: 1 over the real tokens if off_clip_high conditions met (add_exp=True, task_train_expmode="discard")
+        if sample.extras.get("add_exp", False) and sample.extras.get("task_train_expmode", None) == "discard":
+            exp_mask[i, p_start:r_end] = 1
+
+        step_ids_buf[i, :len(step_ids[i])] = step_ids[i]
+
+    # ⭐ Response positions continue from the last prompt position (padding included), as in the left-padded layout
+    position_ids[:, max_prompt_len:] = position_ids[:, max_prompt_len - 1:max_prompt_len] + np.arange(1, max_response_len + 1)
+
+    input_ids = torch.from_numpy(input_ids)
+    return {
+        "prompts": input_ids[:, :max_prompt_len].clone(),
+        "responses": input_ids[:, max_prompt_len:].clone(),
+        "input_ids": input_ids,
+        "attention_mask": torch.from_numpy(attention_mask),
+        "position_ids": torch.from_numpy(position_ids),
+        "loss_mask": torch.from_numpy(loss_mask),
+        "exp_mask": torch.from_numpy(exp_mask),
+        "step_ids": torch.from_numpy(step_ids_buf),
+        "group_ids": torch.tensor([int(s.data_id) for s in samples], dtype=torch.long),
+    }
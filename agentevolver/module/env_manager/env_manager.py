@@ -1,8 +1,9 @@
 import copy
 import time
 import json
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
-from typing import Dict, List, Literal, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from collections import defaultdict
+from typing import Callable, Dict, List, Literal, Optional, Tuple
 
 import numpy as np
 import torch
@@ -12,21 +13,23 @@ import os
 from loguru import logger
 from omegaconf import DictConfig
 from tensordict import TensorDict
-from torch.nn.utils.rnn import pad_sequence
 from tqdm import tqdm
 from verl import DataProto
 from verl.utils.model import compute_position_id_with_mask
-from verl.utils.torch_functional import (pad_sequence_to_length)
 
 from agentevolver.module.agent_flow.agent_flow import AgentFlow
+from agentevolver.module.agent_flow.rollout_log_writer import current_rollout_log_writer
 from agentevolver.module.agent_flow.base_agent_flow import BaseAgentFlow
+from agentevolver.module.env_manager.collate import collate_samples
 from agentevolver.module.env_manager.env_worker import EnvWorker
+from agentevolver.module.env_manager.retry_scheduler import RetryScheduler, classify_failure
+from agentevolver.module.env_manager.straggler_policy import StragglerPolicy
 from agentevolver.utils.agentscope_utils import dynamic_import
 from agentevolver.module.trainer.ae_async_llm_server_manager import BaAsyncLLMServerManager
-from agentevolver.module.task_manager.rewards import grader_manager
+from agentevolver.module.task_manager.rewards import grader_manager, configure_judge_cache, get_judge_cache
 from agentevolver.schema.task import Task
 from agentevolver.schema.trajectory import Trajectory, Sample
-from agentevolver.utils.step_parser import parse_response_ids_to_steps
+from agentevolver.utils.step_parser import parse_response_ids_to_steps, _extract_role_header_tokens
 # do not delete this line
 from agentevolver.module.task_manager.rewards import LlmAsJudgeRewardCalculator,LlmAsJudgeRewardCalculatorWithGT,LlmAsJudgeBinaryRewardCalculator,LlmAsJudgeBinaryRewardCalculatorWithGT,EnvGrader, AvgBinaryGTJudge, AvgLlmJudge
 from beast_logger import register_logger
@@ -45,6 +48,7 @@ def init_logger(experiment_name):
     os.environ['BEST_LOGGER_WEB_SERVICE_URL'] = "http://127.0.0.1:8181/"
     from datetime import datetime
     final_log_path = os.path.join( "experiments", experiment_name, "trace_rollout", datetime.now().strftime("%Y_%m_%d_%H_%M"))
+    os.environ['BEST_LOGGER_PATH'] = final_log_path  # the rollout log worker process registers on the same path
     non_console_mods = ["conversation", "rollout", "token_clip", "bad_case", "env_clip"]
     register_logger(mods=["evaluation", "exception"], non_console_mods=non_console_mods, auto_clean_mods=[], base_log_path=final_log_path, debug=False)
     print('Run `beast_logger_go` and click the url to inspect rollout logs. Continue in 5 seconds')
@@ -80,6 +84,11 @@ class ParallelEnvManager(object):
         self.tokenizer = self.async_rollout_manager.chat_scheduler.completion_callback.tokenizer
         self.pad_token_id = self.tokenizer.pad_token_id
         self.rollout_config = config.actor_rollout_ref.rollout
+        self.last_rollout_metrics: dict = {}  # straggler policy, retry, judge cache and rollout log metrics of the latest rollout
+        self.live_rollout_status: Dict[str, float] = {}  # counters of the rollout in progress, see publish_rollout_status
+        grader_config = config.get("task_manager", {}).get("grader", {})
+        configure_judge_cache(max_entries=grader_config.get("judge_cache_size", 4096),
+                              max_concurrency=grader_config.get("judge_max_concurrency", 16))
 
         # self.experience_template = config.hybrid_experience_training.experience_template
         self.llm_mode = "local" # use fsdp worker ("local") or use foreign server ("remote")
@@ -176,16 +185,17 @@ class ParallelEnvManager(object):
         else:
             return llm_chat
 
-    def step_status_printer(self, tmux):
+    def get_rollout_status(self, tmux) -> Dict[str, float]:
         """
-        Prints the current status of the steps in the parallel environment, including the number of threads in different step ranges and the token generation rate.
+        Live counters of the rollout: the number of threads per range of 5 steps, the finished threads and the token
+        generation rate since the previous call.
 
         Args:
             tmux (dict): A dictionary containing the 'step' and 'token' information for the current state of the environment.
-        """
-        # Initialize a counter to keep track of the number of threads in each step range
-        step_counter = {}
 
+        Returns:
+            Dict[str, float]: e.g. {"rollout/threads_step_0-5": 12, "rollout/threads_finished": 3, "rollout/tokens_per_sec": 850.0}
+        """
         # Calculate the total tokens and the time elapsed since the last count
         current_token = sum(tmux['token'])
         current_time = time.time()
@@ -193,39 +203,55 @@ class ParallelEnvManager(object):
         delta_time = current_time - self.current_token_count_time
         self.current_token = current_token
         self.current_token_count_time = current_time
-        token_gen_per_sec_str = f"{delta_token/delta_time:.2f} tokens/s" if delta_time > 0 else "N/A"
 
         # Categorize the steps into bins and count the number of threads in each bin
+        step_counter: Dict[int, int] = defaultdict(int)
+        finished = 0
         for step in tmux['step']:
             if step == -1:
-                step_counter[(-1, 'terminated')] = step_counter.get((-1, 'terminated'), 0) + 1
-                continue
+                finished += 1
             else:
-                start = (step // 5) * 5
-                end = start + 5
-                step_counter[(start, end)] = step_counter.get((start, end), 0) + 1
+                step_counter[(step // 5) * 5] += 1
 
-        # Sort the step counter by the start value of each bin
-        step_counter = dict(sorted(step_counter.items(), key=lambda x: x[0][0]))  # ⭐ Sort the step counter to ensure the output is in ascending order
+        status: Dict[str, float] = {f"rollout/threads_step_{start}-{start + 5}": count for start, count in sorted(step_counter.items())}
+        status["rollout/threads_finished"] = finished
+        status["rollout/tokens_per_sec"] = delta_token / delta_time if delta_time > 0 else 0.0
+        return status
 
-        # Prepare the print buffer with the formatted step ranges and thread counts
-        print_buf = []
-        for (start, end), count in step_counter.items():
-            if start != -1:
-                print_buf += [f"[{start}-{end}]:{count} threads"]
-        for (start, end), count in step_counter.items():
-            if start == -1:
-                print_buf += [f"[finished]:{count} threads"]
+    def publish_rollout_status(self, tmux, retry_scheduler: RetryScheduler, pbar: Optional[tqdm] = None) -> Dict[str, float]:
+        """
+        Publishes the live rollout counters and the retry scheduler state to `live_rollout_status`, the progress bar
+        and the log.
 
-        # Print the rollout progress with the token generation rate and the step ranges
-        print(f"Rollout progress ({token_gen_per_sec_str}): " + "  //  ".join(print_buf))
+        Args:
+            tmux (dict): The shared progress counters.
+            retry_scheduler (RetryScheduler): The scheduler of the current rollout.
+            pbar (tqdm, optional): The progress bar of the rollout.
 
+        Returns:
+            Dict[str, float]: The published counters.
+        """
+        status = self.get_rollout_status(tmux)
+        status.update(retry_scheduler.get_metrics())
+        self.live_rollout_status = status
+        if pbar is not None:
+            pbar.set_postfix({"tok/s": f"{status['rollout/tokens_per_sec']:.0f}", "retrying": status["rollout/retries_pending"],
+                              "given_up": status["rollout/retries_given_up"]}, refresh=False)
+        logger.info("Rollout status: " + "  //  ".join(f"{k.split('/', 1)[1]}: {v:.4g}" for k, v in status.items()))
+        return status
+
+    def _dependency_key(self, task: Task, failure_class: str) -> str:
+        """The dependency a failure is attributed to, i.e. the circuit breaker it counts against."""
+        if failure_class in ("llm", "quota"):
+            return f"llm:{self.model_name}"
+        return f"env:{task.env_type}"
 
 
     def rollout_env_worker(self, task: Task, traj_exp_config: TrajExpConfig, data_id: str, rollout_id: str, mode: Literal["sample", "validate"],
                            thread_index: int, tmux: dict, stop:list, **kwargs) -> Trajectory:
         """
-        Processes a single task in a thread-safe way, handling retries and exceptions.
+        Runs a single rollout attempt of a task in a thread-safe way. Failures propagate to `rollout`, whose
+        `RetryScheduler` resubmits them after a backoff instead of sleeping in this worker thread.
         
         This method supports two modes:
         1. Agentscope workflow mode: If agentscope_workflow is configured, uses agentscope workflow
@@ -245,86 +271,82 @@ class ParallelEnvManager(object):
         Returns:
             Trajectory: The trajectory generated from the task execution.
         """
-        max_retry = 4
-        for retry in range(max_retry):
-            try:
-                # Prepare sampling parameters
-                sampling_params = dict(
-                    n=1,
-                    max_completion_tokens=self.rollout_config.response_length,
-                    temperature=self.rollout_config.temperature,
-                    top_p=self.rollout_config.top_p,
-                    # chat_template_kwargs={"enable_thinking": False}
-                )
+        # Prepare sampling parameters
+        sampling_params = dict(
+            n=1,
+            max_completion_tokens=self.rollout_config.response_length,
+            temperature=self.rollout_config.temperature,
+            top_p=self.rollout_config.top_p,
+            # chat_template_kwargs={"enable_thinking": False}
+        )
 
-                if mode == "validate":
-                    sampling_params["temperature"] = self.rollout_config.val_kwargs.temperature
-                    sampling_params["top_k"] = self.rollout_config.val_kwargs.top_k
-                    sampling_params["top_p"] = self.rollout_config.val_kwargs.top_p
+        if mode == "validate":
+            sampling_params["temperature"] = self.rollout_config.val_kwargs.temperature
+            sampling_params["top_k"] = self.rollout_config.val_kwargs.top_k
+            sampling_params["top_p"] = self.rollout_config.val_kwargs.top_p
 
-                llm_chat_fn = self.get_llm_chat_fn(sampling_params)
+        llm_chat_fn = self.get_llm_chat_fn(sampling_params)
                 
-                # Check if agentscope_workflow is configured
-                workflow_import = self.config.actor_rollout_ref.rollout.get("agentscope_workflow", None)
+        # Check if agentscope_workflow is configured
+        workflow_import = self.config.actor_rollout_ref.rollout.get("agentscope_workflow", None)
                 
-                if workflow_import is not None:
-                    # Use agentscope workflow mode
-                    workflow_cls = dynamic_import(workflow_import)
+        if workflow_import is not None:
+            # Use agentscope workflow mode
+            workflow_cls = dynamic_import(workflow_import)
                     
-                    # Instantiate workflow with llm_chat_fn, config, tokenizer, data_id, and rollout_id
-                    workflow = workflow_cls(
-                        task=task,
-                        llm_chat_fn=llm_chat_fn,
-                        model_name=self.model_name,
-                        config=self.config,
-                        tokenizer=self.tokenizer,
-                        data_id=data_id,
-                        rollout_id=rollout_id,
-                        **kwargs
-                    )
+            # Instantiate workflow with llm_chat_fn, config, tokenizer, data_id, and rollout_id
+            workflow = workflow_cls(
+                task=task,
+                llm_chat_fn=llm_chat_fn,
+                model_name=self.model_name,
+                config=self.config,
+                tokenizer=self.tokenizer,
+                data_id=data_id,
+                rollout_id=rollout_id,
+                **kwargs
+            )
                     
-                    # Execute the workflow
-                    trajectory: Trajectory = workflow.execute()
-                    return trajectory
-                else:
-                    # Use standard env worker mode
-                    reward_caculator = grader_manager.get_calculator(task.evaluator, task=task)
-                    agent_flow: BaseAgentFlow = AgentFlow(
-                        reward_calculator=reward_caculator,
-                        llm_chat_fn=llm_chat_fn,
-                        tokenizer=self.tokenizer,
-                        config=self.config,
-                        **kwargs
-                    )
-
-                    env_worker = EnvWorker(task=task, thread_index=thread_index, config=self.config, tokenizer=self.tokenizer)
-                    trajectory: Trajectory = env_worker.execute(data_id=data_id, rollout_id=rollout_id, traj_exp_config=traj_exp_config, agent_flow=agent_flow, tmux=tmux, stop=stop) # ⭐ Execute the task and generate the trajectory
-                    return trajectory
-
-            except Exception as e:
-                if retry < max_retry - 1:
-                    logger.bind(exception=True).exception(f"rollout_env_worker error: {e.args}, retrying {retry + 1}/{max_retry}")
-                    time.sleep(2 ** retry)
-                else:
-                    logger.bind(exception=True).exception(f"rollout_env_worker failed after {max_retry} retries: {e.args}")
-                    raise e
-
-
-    def rollout(self, tasks: List[Task], task_exp_configs: List[TaskExpConfig], mode: Literal["sample", "validate"], epoch: str) -> List[Trajectory]:
+            # Execute the workflow
+            trajectory: Trajectory = workflow.execute()
+            return trajectory
+        else:
+            # Use standard env worker mode
+            reward_caculator = grader_manager.get_calculator(task.evaluator, task=task)
+            agent_flow: BaseAgentFlow = AgentFlow(
+                reward_calculator=reward_caculator,
+                llm_chat_fn=llm_chat_fn,
+                tokenizer=self.tokenizer,
+                config=self.config,
+                **kwargs
+            )
+
+            env_worker = EnvWorker(task=task, thread_index=thread_index, config=self.config, tokenizer=self.tokenizer)
+            trajectory: Trajectory = env_worker.execute(data_id=data_id, rollout_id=rollout_id, traj_exp_config=traj_exp_config, agent_flow=agent_flow, tmux=tmux, stop=stop) # ⭐ Execute the task and generate the trajectory
+            return trajectory
+
+
+    def rollout(self, tasks: List[Task], task_exp_configs: List[TaskExpConfig], mode: Literal["sample", "validate"], epoch: str,
+                on_group_complete: Optional[Callable[[List[Trajectory]], None]] = None) -> List[Trajectory]:
         """
         Executes a list of tasks in a parallel environment using a thread pool, with automatic retries for failed tasks.
 
+        Failed rollouts are resubmitted by a `RetryScheduler` (per failure class backoff, optional circuit breakers)
+        while the collecting loop keeps handling the other rollouts; it never sleeps while rollouts are running.
+
         Args:
             tasks (List[Task]): A list of tasks to be processed.
             task_exp_configs (List[TaskExpConfig]): A list of experience configurations corresponding to each task.
             mode (Literal["sample", "validate"]): The mode of operation, either 'sample' or 'validate'.
             epoch (str): The current epoch identifier, used for logging and progress bar.
+            on_group_complete (Callable, optional): Called with the trajectories of a task (sorted by rollout_id)
+                as soon as all of its `rollout_n` rollouts succeeded. It runs on the collecting thread and must not block.
 
         Returns:
             List[Trajectory]: A sorted list of Trajectory objects representing the results of the successfully completed tasks.
         """
         traj_cmt_array = []
         rollout_n = self.rollout_config.val_kwargs.n if mode == "validate" else self.rollout_n
+        finished_groups: Dict[str, List[Trajectory]] = defaultdict(list)
         future_to_params: Dict[Future, Tuple[Task, TrajExpConfig, str, str, str, int, dict, list[bool]]] = {}
 
         # Make epoch available to agentscope workflows (without changing rollout_env_worker behavior)
@@ -340,6 +362,23 @@ class ParallelEnvManager(object):
             'token': [0 for _ in range(len(tasks) * rollout_n)],
         }
         stop = [False for _ in range(len(tasks) * rollout_n)]
+        self.last_rollout_metrics = {}
+        judge_stats = get_judge_cache().stats()
+        log_writer = current_rollout_log_writer()  # ⭐ Started by the first AgentFlow, counters start at 0 then
+        log_stats = log_writer.stats() if log_writer is not None else {}
+        straggler_policy = None
+        straggler_config = self.rollout_config.get("straggler", None)
+        if mode == "sample" and straggler_config is not None and straggler_config.get("enable", False):
+            straggler_policy = StragglerPolicy(straggler_config, num_groups=len(tasks), group_size=rollout_n,
+                                               stop=stop, tmux=tmux, max_steps=self.rollout_config.multi_turn.max_steps)
+            straggler_policy.start()
+
+        retry_scheduler = RetryScheduler(self.rollout_config.get("retry", None))
+        if mode == "validate":
+            retry_scheduler.max_attempts = 0  # ⭐ never give up validation trajectories, dropping failures would bias the scores upwards
+        attempts: Dict[int, int] = defaultdict(int)  # failures per thread_index
+        status_interval = self.rollout_config.get("status_interval", 10)
+        next_status_time = time.monotonic() + status_interval
 
         with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
             # 2. submit: submit all tasks to the thread pool
@@ -349,7 +388,8 @@ class ParallelEnvManager(object):
                     add_exp = task_exp_config.add_exp[rollout_id]
                     train_mode = task_exp_config.train_mode
                     traj_exp_config = TrajExpConfig(
-                        add_exp=add_exp, train_mode=train_mode, task_id=task.task_id, data_id=data_id, rollout_id=rollout_id, mode=mode)
+                        add_exp=add_exp, train_mode=train_mode, task_id=task.task_id, data_id=data_id, rollout_id=rollout_id, mode=mode,
+                        prefetched_experience=task_exp_config.experience)
 
                     params = (task, traj_exp_config, str(data_id), str(rollout_id), mode, thread_index, tmux,stop)
                     future = executor.submit(self.rollout_env_worker, *params)
@@ -358,47 +398,112 @@ class ParallelEnvManager(object):
             total_rollouts = len(future_to_params)
             pbar = tqdm(total=total_rollouts, desc=f"Epoch {epoch}: Collecting rollouts")
 
-            # 3. wait for all tasks to complete
-            while future_to_params:
-                # if any future is done, process it
-                for future in as_completed(future_to_params):
+            def resolve(params, result):
+                """A rollout is resolved once it succeeded (result) or was cancelled by the straggler policy (None)."""
+                if result is not None:
+                    traj_cmt_array.append(result)
+                pbar.update(1)
+                if on_group_complete is not None:
+                    group = finished_groups[params[2]]
+                    group.append(result)
+                    if len(group) == rollout_n:
+                        kept = [t for t in group if t is not None]
+                        if kept:
+                            on_group_complete(sorted(kept, key=lambda x: int(x.rollout_id)))
+
+            def submit(params):
+                thread_index = params[5]
+                # reset tmux and stop of a resubmitted rollout
+                for k in tmux: tmux[k][thread_index] = 0
+                stop[thread_index] = False
+                future_to_params[executor.submit(self.rollout_env_worker, *params)] = params  # type: ignore
+
+            def schedule_retry(params, error):
+                thread_index = params[5]
+                attempts[thread_index] += 1
+                failure_class = classify_failure(error)
+                key = self._dependency_key(params[0], failure_class)
+                if retry_scheduler.on_failure(params, failure_class, key, attempts[thread_index]):
+                    log = logger.bind(exception=True).opt(exception=error) if isinstance(error, BaseException) else logger
+                    log.warning(f"Task {params[1]}-{params[2]} failed ({failure_class}, attempt {attempts[thread_index]}): {error}. Retry scheduled. \n Task: {params[0]}")
+                else:
+                    logger.error(f"Task {params[1]}-{params[2]} failed ({failure_class}) {attempts[thread_index]} times, giving up: {error} \n Task: {params[0]}")
+                    resolve(params, None)
+                    self.publish_rollout_status(tmux, retry_scheduler, pbar)  # ⭐ a trajectory left the batch, show it right away
+
+            # 3. collect finished rollouts as they complete, resubmitting failed ones once their backoff expired
+            while future_to_params or len(retry_scheduler):
+                for params in retry_scheduler.pop_ready():
+                    if straggler_policy is not None and straggler_policy.is_cancelled(params[5]):
+                        resolve(params, None)  # cancelled while waiting for its retry
+                    else:
+                        submit(params)
+
+                timeout = retry_scheduler.next_delay()
+                timeout = status_interval if timeout is None else min(timeout, status_interval)
+                if future_to_params:
+                    done, _ = wait(future_to_params, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    done = set()  # only retries are left: nothing to collect until the next one is due
+                    time.sleep(timeout)
+
+                for future in done:
                     # get the corresponding params, and remove it from the dict
                     params = future_to_params.pop(future)
-                    self.step_status_printer(tmux) # cc: i don't know what this is
+                    thread_index = params[5]
+
+                    if straggler_policy is not None and straggler_policy.is_cancelled(thread_index) and (
+                            future.cancelled() or future.exception() is not None):
+                        resolve(params, None)  # cancelled before it could start or while failing, never retry it
+                        continue
 
                     # 4. get the results and handle errors
                     try:
                         result = future.result()  # ⭐ Retrieve the result from the completed future
-
-                        # if the result has metadata error, try to recover
-                        if 'error' in result.metadata:
-                            error_msg = result.metadata['error']
-                            logger.warning(f"Task {params[1]}-{params[2]} failed with metadata error: {error_msg}. Retrying... \n Task: {params[0]}")
-                            # as most errors are internet error or quota, we wait before resubmit it
-                            time.sleep(30)
-                            # resubmit and reset tmux and stop
-                            thread_index=params[5]
-                            for k in tmux: tmux[k][thread_index] = 0
-                            stop[thread_index]=False
-                            new_future = executor.submit(self.rollout_env_worker, *params) # type: ignore
-                            future_to_params[new_future] = params
-                            continue
-
-                        # 5. if the task is successful, add it to the result list
-                        traj_cmt_array.append(result)
-                        pbar.update(1) # update progress bar when success
-
                     except Exception as e:
-                        # handle the uncaught exception
-                        logger.error(f"Task {params[1]}-{params[2]} raised an exception: {e}. Retrying... \n Task: {params[0]}")
-                        # resubmit, and reset tmux and stop
-                        thread_index=params[5]
-                        for k in tmux: tmux[k][thread_index] = 0
-                        stop[thread_index]=False
-                        new_future = executor.submit(self.rollout_env_worker, *params) # type: ignore
-                        future_to_params[new_future] = params
+                        schedule_retry(params, e)
+                        continue
+
+                    if straggler_policy is not None and straggler_policy.is_cancelled(thread_index) and getattr(result, "discarded", False):
+                        # ⭐ stopped by the straggler policy: drop it, or keep the truncated trajectory
+                        resolve(params, result if straggler_policy.action == "truncate" else None)
+                        continue
+
+                    # errors reported by the rollout itself (mostly network or quota) are retried like exceptions
+                    if 'error' in result.metadata:
+                        schedule_retry(params, result.metadata['error'])
+                        continue
+
+                    # 5. if the task is successful, add it to the result list
+                    retry_scheduler.on_success(*{self._dependency_key(params[0], c) for c in ("env", "llm")})
+                    if straggler_policy is not None:
+                        straggler_policy.on_finished(thread_index)
+                    resolve(params, result)
+
+                if straggler_policy is not None:
+                    # queued rollouts of cancelled trajectories do not need to start at all
+                    cancelled = set(straggler_policy.pop_cancelled())
+                    for pending_future, pending_params in future_to_params.items():
+                        if pending_params[5] in cancelled:
+                            pending_future.cancel()
+
+                if time.monotonic() >= next_status_time:
+                    self.publish_rollout_status(tmux, retry_scheduler, pbar)
+                    next_status_time = time.monotonic() + status_interval
             pbar.close()
 
+        if straggler_policy is not None:
+            straggler_policy.close()
+            self.last_rollout_metrics.update(straggler_policy.get_metrics())
+        self.last_rollout_metrics.update(retry_scheduler.get_metrics())
+        if retry_scheduler.given_up:
+            logger.warning(f"{retry_scheduler.given_up} of {len(tasks) * rollout_n} trajectories were given up after "
+                           f"{retry_scheduler.max_attempts} failed attempts and are missing from the batch")
+        self.last_rollout_metrics.update(get_judge_cache().metrics(since=judge_stats))
+        log_writer = current_rollout_log_writer()
+        if log_writer is not None:
+            self.last_rollout_metrics.update(log_writer.get_metrics(since=log_stats))
+
         task_success_rate = np.mean([cmt.reward.success_rate for cmt in traj_cmt_array])
         for cmt in traj_cmt_array:
             cmt.current_batch_success_rate = np.mean(task_success_rate)
@@ -456,7 +561,18 @@ class ParallelEnvManager(object):
         Returns:
             List[Sample]: A list of samples with extras added and adjusted to be divisible by the world size.
         """
-        # Step 1: Conversion
+        return self.trim_samples_to_world_size(self.tokenize_trajectories(cmt_array))
+
+    def tokenize_trajectories(self, cmt_array: List) -> List[Sample]:
+        """
+        Tokenizes trajectories into samples and attaches their extras.
+
+        Args:
+            cmt_array (List): A list of trajectories to be converted into samples.
+
+        Returns:
+            List[Sample]: The samples, in trajectory order.
+        """
         sample_arr_final = []
         for cmt in cmt_array:
             extras = self.get_extra(cmt)
@@ -464,20 +580,28 @@ class ParallelEnvManager(object):
             sample_arr = cmt.group_tokenize()  # ⭐ Tokenize the trajectory into samples
             for sample in sample_arr:
                 sample.extras = extras  # ⭐ Add extra information to each sample
+                sample.compact()  # ⭐ Keep token fields as int32 buffers until collation
             sample_arr_final += sample_arr
+        return sample_arr_final
+
+    def trim_samples_to_world_size(self, sample_arr_final: List[Sample]) -> List[Sample]:
+        """
+        Randomly removes samples so that their number is divisible by the total number of GPUs across all nodes.
+
+        Args:
+            sample_arr_final (List[Sample]): The samples, modified in place.
 
-        # Step 2: Calculate how many samples need to be removed
+        Returns:
+            List[Sample]: The remaining samples.
+        """
         world_size = self.config.trainer.n_gpus_per_node * self.config.trainer.nnodes
         remainder = len(sample_arr_final) % world_size
         if remainder != 0:
-            import random
             remove_indices = random.sample(range(len(sample_arr_final)), remainder)
             # Sort in reverse order to avoid index shifting during removal
             remove_indices.sort(reverse=True)
             for idx in remove_indices:
                 sample_arr_final.pop(idx)  # ⭐ Remove samples to make the total number divisible by world size
-
-        # Randomly remove some samples, so that the number of samples is divisible by 8
         return sample_arr_final
 
     def samples_to_dataproto(self, samples: list[Sample]) -> DataProto:
@@ -490,20 +614,17 @@ class ParallelEnvManager(object):
         Returns:
             DataProto: A DataProto object containing the batched and padded data.
         """
-        # Initialize lists to store batched data
         step_ids_list  = []
         steps_texts_list = []
-        prompt_ids, response_ids = [], []
-        prompt_attention_mask, response_attention_mask = [], []
-        prompt_position_ids, response_position_ids = [], []
-        prompt_loss_mask, response_loss_mask = [], []
-        prompt_exp_mask_list, response_exp_mask_list = [], []  # List of binary masks indicating whether to consider off_clip_high for each sample in the batch
         messages = []
         reward_scores = []
         task_ids = []
         rollout_ids = []
         extras = [] # List of dictionaries containing supplementary data for each trajectory, including "add_exp", "task_train_expmode", "experience_list"
-        k_text_list = []
+
+        # role headers are the same for every sample, extract them once per batch
+        assistant_tpl = _extract_role_header_tokens(self.tokenizer, "assistant")
+        user_tpl = _extract_role_header_tokens(self.tokenizer, "user")
         for sample in samples:
             # Validate that all fields have the same length
             assert len(sample.input_ids) == len(sample.attention_mask) == len(sample.position_ids) == len(
@@ -525,121 +646,38 @@ class ParallelEnvManager(object):
                 )
                 raise RuntimeError(f"Sample has prompt_ids length {len(sample.prompt_ids)} ")
 
-            # ------------- shuchang 0714: append step_ids and steps_texts ------------
-            resp_ids = sample.response_ids
+            assert len(sample.prompt_ids) != 0
+            assert len(sample.response_ids) != 0
+
             # shuchang: 0809
             # FIXME: Solve the issue of misaligned step IDs, use the unified step parsing function parse_response_ids_to_steps
-            resp_ids = sample.response_ids
-            parse_result = parse_response_ids_to_steps(resp_ids, self.tokenizer) # ⭐ Parse the response IDs into step IDs and texts
+            resp_ids = sample.response_ids if isinstance(sample.response_ids, list) else sample.response_ids.tolist()
+            parse_result = parse_response_ids_to_steps(resp_ids, self.tokenizer, assistant_tpl=assistant_tpl, user_tpl=user_tpl) # ⭐ Parse the response IDs into step IDs and texts
 
-            step_ids_list.append(torch.tensor(parse_result.step_ids, dtype=torch.long))
+            step_ids_list.append(parse_result.step_ids)
             # generate steps_texts (for semantic evaluation)
             steps_texts_list.append([
                 {"action": s["action_text"], "observation": s["observation_text"]}
                 for s in parse_result.steps
             ])
 
-            # Append tensors to respective lists
-            assert len(sample.prompt_ids) != 0
-            assert len(sample.response_ids) != 0
-            prompt_ids.append(torch.tensor(sample.prompt_ids, dtype=torch.int))
-            response_ids.append(torch.tensor(sample.response_ids, dtype=torch.int))
-
-            prompt_attention_mask.append(torch.tensor(sample.prompt_attention_mask, dtype=torch.int))
-            response_attention_mask.append(torch.tensor(sample.response_attention_mask, dtype=torch.int))
-
-            prompt_position_ids.append(torch.tensor(sample.prompt_position_ids, dtype=torch.int))
-            response_position_ids.append(torch.tensor(sample.response_position_ids, dtype=torch.int))
-
-            prompt_loss_mask.append(torch.tensor(sample.prompt_loss_mask, dtype=torch.int))
-            response_loss_mask.append(torch.tensor(sample.response_loss_mask, dtype=torch.int))
-
             messages.append({"messages": sample.messages})
             reward_scores.append(sample.reward_scores)
             extras.append(sample.extras)
 
-            # Create experience mask: 1 if off_clip_high conditions met (add_exp=True, task_train_expmode="discard"), else 0
-            if sample.extras.get("add_exp", False) and sample.extras.get("task_train_expmode", None)=="discard":
-                prompt_exp_mask_list.append(torch.ones(len(sample.prompt_loss_mask), dtype=torch.int))
-                response_exp_mask_list.append(torch.ones(len(sample.response_loss_mask), dtype=torch.int))
-            else:
-                prompt_exp_mask_list.append(torch.zeros(len(sample.prompt_loss_mask), dtype=torch.int))
-                response_exp_mask_list.append(torch.zeros(len(sample.response_loss_mask), dtype=torch.int))
-
-
-
-        max_prompt_length_this_batch = max([p.shape[-1] for p in prompt_ids])
-        assert max_prompt_length_this_batch <= self.config.data.max_prompt_length
-        max_response_length_this_batch = max([p.shape[-1] for p in response_ids])
-        assert max_response_length_this_batch <= self.config.data.max_response_length
-
-        # Batch and pad sequences
-        # ------------- shuchang 0714: pad step_ids and steps_texts ------------
-        step_ids_pad = pad_sequence(
-            step_ids_list, batch_first=True, padding_value=-1
+        # ⭐ Pad and concatenate prompts/responses in one pass over preallocated buffers
+        tensors = collate_samples(
+            samples,
+            pad_token_id=self.pad_token_id,
+            step_ids=step_ids_list,
+            step_ids_length=self.config.data.max_response_length,
         )
-
-        step_ids_pad = pad_sequence_to_length(
-            step_ids_pad, self.config.data.max_response_length, -1
-        )  # ⭐ Pad step IDs to the maximum response length
-        # ------------- shuchang 0714: pad step_ids and steps_texts ------------
-
-
-        prompt_ids =            pad_sequence(prompt_ids, batch_first=True, padding_value=self.pad_token_id, padding_side="left")
-        prompt_attention_mask = pad_sequence(prompt_attention_mask, batch_first=True, padding_value=0, padding_side="left")
-        prompt_position_ids =   pad_sequence(prompt_position_ids, batch_first=True, padding_value=0, padding_side="left")
-        prompt_loss_mask =      pad_sequence(prompt_loss_mask, batch_first=True, padding_value=0, padding_side="left")
-        prompt_exp_mask_list =  pad_sequence(prompt_exp_mask_list, batch_first=True, padding_value=0, padding_side="left")
-
-        prompt_ids =            pad_sequence_to_length(prompt_ids, max_prompt_length_this_batch, self.pad_token_id, left_pad=True)
-        prompt_attention_mask = pad_sequence_to_length(prompt_attention_mask, max_prompt_length_this_batch, 0, left_pad=True)
-        prompt_position_ids =   pad_sequence_to_length(prompt_position_ids, max_prompt_length_this_batch, 0, left_pad=True)
-        prompt_loss_mask =      pad_sequence_to_length(prompt_loss_mask, max_prompt_length_this_batch, 0, left_pad=True)
-        prompt_exp_mask_list =  pad_sequence_to_length(prompt_exp_mask_list, max_prompt_length_this_batch, 0, left_pad=True)
-
-        response_ids =            pad_sequence(response_ids, batch_first=True, padding_value=self.pad_token_id)
-        response_attention_mask = pad_sequence(response_attention_mask, batch_first=True, padding_value=0)
-        response_loss_mask =      pad_sequence(response_loss_mask, batch_first=True, padding_value=0)
-        # response_exp_mask_list =  pad_sequence(response_exp_mask_list, batch_first=True, padding_value=0, padding_side="left")
-        response_exp_mask_list  = pad_sequence(response_exp_mask_list,  batch_first=True, padding_value=0)        # shuchang debug: Remove padding_side="left"
-
-
-        response_ids =            pad_sequence_to_length(response_ids, max_response_length_this_batch, self.pad_token_id)  # ⭐ Pad response IDs to the maximum response length
-        response_attention_mask = pad_sequence_to_length(response_attention_mask, max_response_length_this_batch, 0)  # ⭐ Pad response attention mask to the maximum response length
-        response_loss_mask =      pad_sequence_to_length(response_loss_mask, max_response_length_this_batch, 0)  # ⭐ Pad response loss mask to the maximum response length
-        # response_exp_mask_list =  pad_sequence_to_length(response_exp_mask_list, max_prompt_length_this_batch, 0, left_pad=True)  # ⭐ Pad response experience mask list to the maximum prompt length
-        response_exp_mask_list =  pad_sequence_to_length(response_exp_mask_list, max_response_length_this_batch, 0) # shuchang debug: Should pad to max_response_length_this_batch, not the previous max_prompt_length_this_batch
-
-        delta_position_id = torch.arange(1, response_ids.size(1) + 1, device=response_ids.device).unsqueeze(0).repeat(len(samples), 1)
-        response_position_ids = prompt_position_ids[:, -1:] + delta_position_id  # ⭐ Calculate the position IDs for the response
-
-        # Concatenate prompt and response tensors
-        input_ids = torch.cat((prompt_ids, response_ids), dim=-1)  # ⭐ Concatenate prompt and response IDs
-        attention_mask = torch.cat((prompt_attention_mask, response_attention_mask), dim=-1)  # ⭐ Concatenate prompt and response attention masks
-        position_ids = torch.cat((prompt_position_ids, response_position_ids), dim=-1)  # ⭐ Concatenate prompt and response position IDs
-        loss_mask = torch.cat((prompt_loss_mask, response_loss_mask), dim=-1)  # ⭐ Concatenate prompt and response loss masks
-        # shuchang: construct group_id
-        group_ids = torch.tensor([int(s.data_id) for s in samples], dtype=torch.long)  # ⭐ Construct group IDs from sample data
-        # Validate masks have same shape
-        exp_mask = torch.cat((prompt_exp_mask_list, response_exp_mask_list), dim=-1)  # ⭐ Concatenate prompt and response experience masks
-
-        assert exp_mask.shape == loss_mask.shape, f"Shape mismatch: {exp_mask.shape} vs {loss_mask.shape}"
+        assert tensors["prompts"].shape[-1] <= self.config.data.max_prompt_length
+        assert tensors["responses"].shape[-1] <= self.config.data.max_response_length
+        assert tensors["exp_mask"].shape == tensors["loss_mask"].shape, f"Shape mismatch: {tensors['exp_mask'].shape} vs {tensors['loss_mask'].shape}"
 
         # Construct the batch using TensorDict
-        batch = TensorDict(
-            {
-                "prompts": prompt_ids,
-                "responses": response_ids,
-                "input_ids": input_ids,
-                "attention_mask": attention_mask,
-                "position_ids": position_ids,
-                "loss_mask": loss_mask,
-                "exp_mask": exp_mask,        # add exp_mask by ANNI
-                "step_ids": step_ids_pad,
-                "group_ids": group_ids,   # ★ add groupid
-            },
-            batch_size=len(samples),
-        )
+        batch = TensorDict(tensors, batch_size=len(samples))
 
         return DataProto(
             batch=batch,
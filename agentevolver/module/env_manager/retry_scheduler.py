@@ -0,0 +1,229 @@
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from omegaconf import DictConfig
+
+FAILURE_CLASSES = ("quota", "env", "llm", "other")
+
+# checked in order, the first match wins
+_FAILURE_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("quota", re.compile(r"quota|rate.?limit|throttl|too many requests|\b429\b", re.IGNORECASE)),
+    ("env", re.compile(r"create_instance|release_instance|instance_id|env[ _]?(service|client)|HTTPConnectionPool|"
+                       r"requests\.exceptions|ConnectionError|ReadTimeout", re.IGNORECASE)),
+    ("llm", re.compile(r"rollout_server|chat_completion|llm|vllm|completion|\b50[234]\b", re.IGNORECASE)),
+]
+
+_DEFAULT_DELAYS = {"quota": 30.0, "env": 5.0, "llm": 2.0, "other": 2.0}
+
+
+def classify_failure(error: Any) -> str:
+    """
+    Maps a rollout failure (an exception or the `metadata['error']` of a trajectory) to its failure class.
+
+    `EnvWorker` wraps every error in its own RuntimeError, so chained exceptions are classified from the root cause
+    outwards.
+
+    Args:
+        error (Any): The exception or error message.
+
+    Returns:
+        str: One of `FAILURE_CLASSES`: quota / rate limiting, environment service, LLM server, or other.
+    """
+    chain = []
+    while isinstance(error, BaseException) and error not in chain:
+        chain.append(error)
+        error = error.__cause__ or error.__context__
+    texts = [f"{type(e).__name__}: {e}" for e in reversed(chain)] if chain else [str(error)]
+    for text in texts:
+        for failure_class, pattern in _FAILURE_PATTERNS:
+            if pattern.search(text):
+                return failure_class
+    return "other"
+
+
+class CircuitBreaker(object):
+    """
+    Stops retrying against a failing dependency (an env_type or an LLM endpoint) for a while.
+
+    After `failure_threshold` consecutive failures the breaker opens: retries through it wait until `reset_timeout`
+    seconds have passed. Then it is half-open and lets a single probe through; the probe's success closes it, its
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.trips = 0
+
+    def is_open(self, now: float) -> bool:
+        return self.opened_at is not None and now < self.opened_at + self.reset_timeout
+
+    def open_until(self) -> float:
+        return (self.opened_at or 0.0) + self.reset_timeout
+
+    def allow(self, now: float) -> bool:
+        """Whether a retry may start now; past the timeout only one probe is let through."""
+        if self.opened_at is None:
+            return True
+        if self.is_open(now) or self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def on_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def on_failure(self, now: float) -> None:
+        self.failures += 1
+        if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = now
+        self.probing = False
+
+
+class RetryScheduler(object):
+    """
+    Schedules the resubmission of failed rollouts without blocking the collecting thread.
+
+    Every failure class has its own queue of retries ordered by the timestamp at which they become due: an
+    exponential, jittered delay per class (e.g. quota errors back off much longer than a flaky environment instance).
+    The collector polls `pop_ready` and waits for running rollouts at most `next_delay` seconds, instead of sleeping.
+    Optionally a `CircuitBreaker` per dependency holds back all retries against it while it keeps failing.
+    A rollout that failed more than `max_attempts` times (if set) is given up and counted per failure class.
+    """
+
+    def __init__(self, config: Optional[DictConfig] = None, seed: Optional[int] = None):
+        """
+        Args:
+            config (DictConfig, optional): `actor_rollout_ref.rollout.retry`.
+            seed (int, optional): Seed of the jitter. Defaults to None.
+        """
+        config = config or {}
+        delays = config.get("delays", None) or {}
+        self.delays: Dict[str, float] = {c: float(delays.get(c, _DEFAULT_DELAYS[c])) for c in FAILURE_CLASSES}
+        self.max_delay: float = config.get("max_delay", 120.0)
+        self.jitter: float = config.get("jitter", 0.5)
+        self.max_attempts: int = config.get("max_attempts", 0)
+        breaker_config = config.get("circuit_breaker", None) or {}
+        self.breaker_enabled: bool = breaker_config.get("enable", False)
+        self.failure_threshold: int = breaker_config.get("failure_threshold", 5)
+        self.reset_timeout: float = breaker_config.get("reset_timeout", 60.0)
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._queues: Dict[str, List[Tuple[float, int, str, Any]]] = {c: [] for c in FAILURE_CLASSES}
+        self._seq = itertools.count()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._retries: Dict[str, int] = {c: 0 for c in FAILURE_CLASSES}
+        self._given_up: Dict[str, int] = {c: 0 for c in FAILURE_CLASSES}
+
+    def delay(self, failure_class: str, attempt: int) -> float:
+        """Jittered exponential backoff of the `attempt`-th (1-based) retry of a class."""
+        base = min(self.delays[failure_class] * 2 ** max(attempt - 1, 0), self.max_delay)
+        return base * (1.0 - self.jitter * self._rng.random())
+
+    def _breaker(self, key: str) -> CircuitBreaker:
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self._breakers[key]
+
+    def on_success(self, *keys: str) -> None:
+        """Records a rollout that finished against the dependencies `keys`."""
+        if self.breaker_enabled:
+            with self._lock:
+                for key in keys:
+                    self._breaker(key).on_success()
+
+    def on_failure(self, item: Any, failure_class: str, key: str, attempt: int, now: Optional[float] = None) -> bool:
+        """
+        Records a failed rollout and queues its retry.
+
+        Args:
+            item (Any): What `pop_ready` returns once the retry is due, e.g. the rollout parameters.
+            failure_class (str): The `classify_failure` of the error.
+            key (str): The dependency that failed, e.g. "env:appworld"; the circuit breaker is per key.
+            attempt (int): How many times the rollout failed, including this one.
+            now (float, optional): Current `time.monotonic()`.
+
+        Returns:
+            bool: False if `max_attempts` is exhausted and the rollout is given up.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.breaker_enabled:
+                breaker = self._breaker(key)
+                was_open = breaker.opened_at is not None
+                breaker.on_failure(now)
+                if not was_open and breaker.opened_at is not None:
+                    logger.warning(f"Circuit breaker for {key} opened after {breaker.failures} consecutive failures, "
+                                   f"holding its retries for {self.reset_timeout}s")
+            if self.max_attempts and attempt > self.max_attempts:
+                self._given_up[failure_class] += 1
+                return False
+            ready_at = now + self.delay(failure_class, attempt)
+            if self.breaker_enabled and self._breaker(key).is_open(now):
+                ready_at = max(ready_at, self._breaker(key).open_until())
+            heapq.heappush(self._queues[failure_class], (ready_at, next(self._seq), key, item))
+            self._retries[failure_class] += 1
+        return True
+
+    def pop_ready(self, now: Optional[float] = None) -> List[Any]:
+        """Removes and returns the retries that are due and whose circuit breaker lets them through."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self._lock:
+            for queue in self._queues.values():
+                held = []
+                while queue and queue[0][0] <= now:
+                    entry = heapq.heappop(queue)
+                    if self.breaker_enabled and not self._breaker(entry[2]).allow(now):
+                        held.append(entry)
+                        continue
+                    ready.append(entry[3])
+                for ready_at, seq, key, item in held:
+                    # retry once the breaker's timeout expired, or soon after the probe in flight is resolved
+                    breaker = self._breaker(key)
+                    heapq.heappush(queue, (max(breaker.open_until(), now + 1.0), seq, key, item))
+        return ready
+
+    def next_delay(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next retry is due, None if no retry is queued."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due = [queue[0][0] for queue in self._queues.values() if queue]
+        return max(0.0, min(due) - now) if due else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def given_up(self) -> int:
+        """Number of rollouts given up after `max_attempts` failures."""
+        with self._lock:
+            return sum(self._given_up.values())
+
+    def get_metrics(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Retries and rollouts given up per failure class, queued retries and open circuit breakers."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            metrics = {f"rollout/retries_{c}": self._retries[c] for c in FAILURE_CLASSES}
+            metrics["rollout/retries_pending"] = sum(len(queue) for queue in self._queues.values())
+            metrics.update({f"rollout/given_up_{c}": self._given_up[c] for c in FAILURE_CLASSES})
+            metrics["rollout/retries_given_up"] = sum(self._given_up.values())
+            if self.breaker_enabled:
+                metrics["rollout/circuit_breaker_trips"] = sum(b.trips for b in self._breakers.values())
+                metrics["rollout/circuit_breakers_open"] = sum(b.is_open(now) for b in self._breakers.values())
+        return metrics
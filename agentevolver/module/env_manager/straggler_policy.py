@@ -0,0 +1,130 @@
+import math
+import threading
+import time
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+from loguru import logger
+from omegaconf import DictConfig
+
+
+class StragglerPolicy(object):
+    """
+    Decides when the slowest rollouts of a batch get cancelled, through the shared `stop` list that
+    `AgentFlow.execute` checks before and after every LLM call.
+
+    Three triggers are supported, all optional:
+        - `finish_fraction`: once this fraction of all trajectories finished, stop the others;
+        - `group_finish_fraction`: once this fraction of a GRPO group (one data_id) finished, stop its other members;
+        - `time_budget`: once the rollout ran for this many seconds, stop everything still running.
+
+    Cancelled trajectories are either dropped (`action: discard`) or kept as truncated samples (`action: truncate`).
+    """
+
+    def __init__(self, config: DictConfig, num_groups: int, group_size: int, stop: List[bool], tmux: dict, max_steps: int):
+        """
+        Args:
+            config (DictConfig): `actor_rollout_ref.rollout.straggler`.
+            num_groups (int): Number of tasks in the batch.
+            group_size (int): Rollouts per task; thread_index = data_id * group_size + rollout_id.
+            stop (List[bool]): The shared stop flags.
+            tmux (dict): The shared progress counters ('step' per thread).
+            max_steps (int): Maximum number of steps of a trajectory.
+        """
+        self.finish_fraction: float = config.get("finish_fraction", 1.0)
+        self.group_finish_fraction: float = config.get("group_finish_fraction", 1.0)
+        self.time_budget: float = config.get("time_budget", 0)
+        self.action: Literal["discard", "truncate"] = config.get("action", "discard")
+        assert self.action in ("discard", "truncate"), f"unknown straggler action {self.action}"
+
+        self.num_groups = num_groups
+        self.group_size = group_size
+        self.stop = stop
+        self.tmux = tmux
+        self.max_steps = max_steps
+
+        self._lock = threading.Lock()
+        self._finished = set()
+        self._group_finished: Dict[int, int] = {}
+        self._cancelled: Dict[int, float] = {}  # thread_index -> elapsed seconds when cancelled
+        self._saved_steps = 0
+        self._pending_cancel: List[int] = []
+        self._durations: List[float] = []
+        self._start = time.time()
+        self._timer: Optional[threading.Timer] = None
+
+    def start(self) -> None:
+        """Starts the clock and arms the wall-clock budget."""
+        self._start = time.time()
+        if self.time_budget and self.time_budget > 0:
+            self._timer = threading.Timer(self.time_budget, self._on_budget)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _on_budget(self) -> None:
+        with self._lock:
+            running = [i for i in range(len(self.stop)) if i not in self._finished]
+            if running:
+                logger.info(f"rollout time budget of {self.time_budget}s reached, stopping {len(running)} trajectories")
+            self._cancel(running)
+
+    def _cancel(self, indices: List[int]) -> None:
+        elapsed = time.time() - self._start
+        for index in indices:
+            if index in self._finished or index in self._cancelled:
+                continue
+            self.stop[index] = True
+            self._cancelled[index] = elapsed
+            self._saved_steps += max(0, self.max_steps - max(self.tmux['step'][index], 0))
+            self._pending_cancel.append(index)
+
+    def is_cancelled(self, thread_index: int) -> bool:
+        return thread_index in self._cancelled
+
+    def on_finished(self, thread_index: int) -> None:
+        """
+        Records a trajectory that completed on its own and stops the stragglers whose trigger fired.
+
+        Args:
+            thread_index (int): The index of the trajectory in `stop`.
+        """
+        with self._lock:
+            if thread_index in self._cancelled or thread_index in self._finished:
+                return
+            self._finished.add(thread_index)
+            self._durations.append(time.time() - self._start)
+
+            group = thread_index // self.group_size
+            self._group_finished[group] = self._group_finished.get(group, 0) + 1
+            if self._group_finished[group] >= math.ceil(self.group_finish_fraction * self.group_size):
+                self._cancel(list(range(group * self.group_size, (group + 1) * self.group_size)))
+
+            if len(self._finished) >= math.ceil(self.finish_fraction * len(self.stop)):
+                self._cancel(list(range(len(self.stop))))
+
+    def pop_cancelled(self) -> List[int]:
+        """Returns the trajectories cancelled since the last call, so the caller can cancel their queued work."""
+        with self._lock:
+            indices, self._pending_cancel = self._pending_cancel, []
+        return indices
+
+    def get_metrics(self) -> dict:
+        """
+        Returns:
+            dict: Cancelled counts, steps not run, and an estimate of the rollout time saved
+            (mean finish time of completed trajectories minus the time at which each straggler was cancelled).
+        """
+        with self._lock:
+            mean_duration = float(np.mean(self._durations)) if self._durations else 0.0
+            saved_time = sum(max(0.0, mean_duration - elapsed) for elapsed in self._cancelled.values())
+            return {
+                "rollout/straggler_cancelled": len(self._cancelled),
+                "rollout/straggler_discarded": len(self._cancelled) if self.action == "discard" else 0,
+                "rollout/straggler_truncated": len(self._cancelled) if self.action == "truncate" else 0,
+                "rollout/straggler_saved_steps": self._saved_steps,
+                "rollout/straggler_saved_time_est": saved_time,
+            }
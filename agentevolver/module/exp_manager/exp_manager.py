@@ -1,21 +1,25 @@
 import random
 import re
+import threading
+import time
 from loguru import logger
 from dataclasses import dataclass, field
 from omegaconf import DictConfig
 from typing import List, Dict, Any, Optional, Literal, Tuple
-from itertools import groupby
-from concurrent.futures import as_completed, Future
+from concurrent.futures import as_completed
 from concurrent.futures.thread import ThreadPoolExecutor
 from agentevolver.schema.task import Task
 from agentevolver.schema.trajectory import Trajectory
 from agentevolver.client.em_client import EMClient
+from agentevolver.module.exp_manager.experience_cache import ExperienceCache
+from agentevolver.module.exp_manager.summary_pipeline import SummaryPipeline
 
 
 @dataclass
 class TaskExpConfig:
     add_exp: List[bool]
     train_mode: str = "discard"     # "keep" | "discard"
+    experience: Optional[str] = None    # prefetched experience of the task, None if it was not prefetched
 
 @dataclass
 class TrajExpConfig:
@@ -27,6 +31,7 @@ class TrajExpConfig:
     query: str = ""
     mode: str = "sample"            # "sample" | "validate"
     experience_list: List[str] = field(default_factory=list)
+    prefetched_experience: Optional[str] = None
 
 
 
@@ -50,63 +55,83 @@ class ExperienceManager(object):
         self.train_sample_mode = self.exp_manager_config.train_sample_mode
         self.train_sample_keepratio = self.exp_manager_config.train_sample_keepratio
 
-        self.thread_pool = ThreadPoolExecutor(max_workers=self.config.thread_pool.max_workers)
         self.em_client = EMClient(base_url=self.reme_config.base_url)
+        # a client of its own: EMClient keeps the endpoint in `self.url`, which the summarizer calls overwrite
+        self.retrieve_client = EMClient(base_url=self.reme_config.base_url)
+        self.experience_cache = ExperienceCache(ttl=self.reme_config.get("retrieve_cache_ttl", 600))
+        # retrieval requests get threads of their own, so they never queue behind other work
+        self.prefetch_pool: Optional[ThreadPoolExecutor] = None
+        if self.reme_config.get("prefetch_experience", False):
+            self.prefetch_pool = ThreadPoolExecutor(max_workers=self.reme_config.get("prefetch_max_workers", 8),
+                                                    thread_name_prefix="exp_prefetch")
+        # the summarizer threads are only started once something is summarized, see `summary_pipeline`
+        self._summary_pipeline: Optional[SummaryPipeline] = None
+        self._summary_pipeline_lock = threading.Lock()
+
+    @property
+    def summary_pipeline(self) -> SummaryPipeline:
+        """The background summarization pipeline, created on first use."""
+        with self._summary_pipeline_lock:
+            if self._summary_pipeline is None:
+                self._summary_pipeline = SummaryPipeline(
+                    summarize_fn=lambda payloads: self.em_client.call_summarizer_payloads(payloads, workspace_id=self.reme_config.workspace_id),
+                    batch_size=self.exp_manager_config.summary_batch_size,
+                    max_pending=self.exp_manager_config.get("summary_max_pending", 1024),
+                    max_lag_steps=self.exp_manager_config.get("summary_max_lag_steps", 2),
+                    num_workers=self.exp_manager_config.get("summary_num_workers", 2),
+                    on_batch_done=self.experience_cache.invalidate,  # retrieved experience is stale once the pool is updated
+                )
+            return self._summary_pipeline
+
+    def close(self) -> None:
+        """
+        Stops the background threads on trainer shutdown. Summaries still queued are sent first, for at most
+        `summary_close_timeout` seconds; prefetches that have not started are cancelled.
+        """
+        with self._summary_pipeline_lock:
+            pipeline, self._summary_pipeline = self._summary_pipeline, None
+        if pipeline is not None:
+            timeout = self.exp_manager_config.get("summary_close_timeout", 60.0)
+            deadline = time.monotonic() + timeout
+            drained = pipeline.flush(timeout=timeout)
+            if not (pipeline.close(timeout=max(0.0, deadline - time.monotonic())) and drained):
+                logger.warning(f"[Summary] Summaries still pending after {timeout}s at shutdown were discarded")
+        if self.prefetch_pool is not None:
+            self.prefetch_pool.shutdown(wait=False, cancel_futures=True)
+            self.prefetch_pool = None
     
     def summarize_in_batch(self, trajectories: List[Trajectory]) -> None:
-        trajectories_sorted = sorted(trajectories, key=lambda traj: traj.task_id)
-        grouped_trajectories = [list(group) for key, group in groupby(trajectories_sorted, key=lambda traj: traj.task_id)]
-        batch_size = self.exp_manager_config.summary_batch_size
-        all_batches = []
-        for group in grouped_trajectories:
-            for i in range(0, len(group), batch_size):
-                all_batches.append(group[i:i + batch_size])
-        
-        futures = []
-        for batch in all_batches:
-            future = self.thread_pool.submit(
-                self.em_client.call_summarizer,
-                trajectories=batch,
-                workspace_id=self.reme_config.workspace_id
-            )
-            futures.append(future)
-        
-        results = []
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                print(f"Error in summary task: {e}")
-        
+        """
+        Summarizes trajectories into the experience pool and waits until they are all processed.
+
+        Args:
+            trajectories (List[Trajectory]): A list of trajectory objects to be summarized.
+        """
+        # submit in chunks the pipeline can hold, so nothing is shed
+        chunk_size = self.summary_pipeline.max_pending
+        for i in range(0, len(trajectories), chunk_size):
+            self.summary_pipeline.submit(trajectories[i:i + chunk_size], step=0)
+            self.summary_pipeline.flush()
         return
 
-    def submit_summary_task(self, trajectories: List[Trajectory], global_steps: int) -> Optional[Future]:
+    def submit_summary_task(self, trajectories: List[Trajectory], global_steps: int) -> Optional[int]:
         """
-        Submits a summary task to the thread pool for asynchronous processing.
+        Hands trajectories to the summarization pipeline without blocking.
 
         Args:
             trajectories (List[Trajectory]): A list of trajectory objects to be summarized.
             global_steps (int): The current global step count used to determine task submission timing.
 
         Returns:
-            Optional[Future]: A Future object representing the submitted task, or None if the task
-                            should not be submitted or submission fails.
+            Optional[int]: The number of trajectories accepted (the rest was shed because the pipeline is full),
+                            or None if nothing should be submitted at this step.
         """
         if not self._should_submit_summary(global_steps):
             return None
-        
-        try:
-            summary_task = self.thread_pool.submit(
-                self.em_client.call_summarizer,
-                trajectories=trajectories,
-                workspace_id=self.reme_config.workspace_id
-            )
-            print(f"[Summary] Async task submitted at step {global_steps}")
-            return summary_task
-        except Exception as e:
-            print(f"[Summary] Failed to submit task: {e}")
-            return None
+
+        accepted = self.summary_pipeline.submit(trajectories, global_steps)  # ⭐ Only the {messages, score} payload is kept
+        print(f"[Summary] {accepted}/{len(trajectories)} trajectories queued at step {global_steps}")
+        return accepted
 
     def _should_submit_summary(self, global_steps: int) -> bool:
         """
@@ -125,29 +150,12 @@ class ExperienceManager(object):
         )
     
 
-    def collect_summary_result(self, summary_task: Optional[Future]) -> Optional[float]:
+    def get_summary_metrics(self) -> Dict[str, float]:
         """
-        Collects the result from a submitted summary task.
-
-        Args:
-            summary_task (Optional[Future]): The Future object representing the summary task to collect.
-            timeout (Optional[float]): Maximum time in seconds to wait for the task completion.
-                                    Defaults to None (wait indefinitely).
-
-        Returns:
-            Optional[float]: The time cost of the summary task in seconds, or None if the task
-                            is None, times out, or encounters an error.
+        Returns the summarization pipeline metrics: queue depth, lag in steps, memory held, shed trajectories
+        and the mean summarizer latency since the previous call.
         """
-        if summary_task is None:
-            return None
-        try:
-            print("[Summary] Waiting for task completion...")
-            summarizer_response, time_cost = summary_task.result()
-            print(f"[Summary] Task completed in {time_cost:.2f}s")
-            return time_cost
-        except Exception as e:
-            print(f"[Summary] Task failed: {e}")
-            return None
+        return self.summary_pipeline.metrics()
 
     def get_complete_exp_configs(self, tasks: List[Task], mode: Literal["sample", "validate"]) -> List[TaskExpConfig]:
         """
@@ -162,8 +170,65 @@ class ExperienceManager(object):
         """
         exp_manager_configs = self.allocate_train_mode(tasks)
         exp_manager_configs = self.allocate_add_exp(exp_manager_configs, mode)
+        if self.reme_config.enable_context_generator and self.prefetch_pool is not None:
+            self.prefetch_experience(tasks, exp_manager_configs)  # ⭐ Retrieve experience before the rollout threads start
         return exp_manager_configs
 
+    def prefetch_experience(self, tasks: List[Task], exp_configs: List[TaskExpConfig]) -> None:
+        """
+        Retrieves the experience of every task that adds experience to at least one rollout, so rollout threads
+        do not call the experience service themselves.
+
+        Enabled by `exp_manager.reme.prefetch_experience`. Requests are deduplicated per (task_id, query,
+        workspace_id), served from `experience_cache` when possible and sent in parallel on `prefetch_pool`
+        otherwise. Note that the retrieval query is the task query, whereas the per-rollout retrieval of
+        `ExperienceWorker` queries with the serialized initial messages; tasks without a query are left to it.
+        A failed retrieval yields an empty experience (not cached).
+
+        Args:
+            tasks (List[Task]): The tasks of the batch.
+            exp_configs (List[TaskExpConfig]): Their experience configurations, updated in place.
+        """
+        workspace_id = self.reme_config.workspace_id
+        keys = {}
+        for task, exp_config in zip(tasks, exp_configs):
+            if task.query is not None and any(exp_config.add_exp):
+                keys[id(exp_config)] = (task.task_id, task.query, workspace_id)
+        if not keys:
+            return
+
+        experiences = {}
+        misses = []
+        for key in set(keys.values()):
+            experience = self.experience_cache.get(key)
+            if experience is None:
+                misses.append(key)
+            else:
+                experiences[key] = experience
+
+        generation = self.experience_cache.generation
+        futures = {
+            self.prefetch_pool.submit(self.retrieve_client.retrieve_task_memory, key[1], self.reme_config.retrieve_top_k, workspace_id): key
+            for key in misses
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                experience = future.result()
+            except Exception as e:
+                experience = None
+                logger.warning(f"[Experience] Prefetch failed for task {key[0]}: {e}")
+            experiences[key] = experience if experience is not None else ""
+            if experience is not None:
+                self.experience_cache.put(key, experience, generation)
+
+        for exp_config in exp_configs:
+            key = keys.get(id(exp_config))
+            if key is not None:
+                exp_config.experience = experiences[key]
+        logger.info(f"[Experience] Prefetched {len(experiences)} queries for {len(keys)} tasks "
+                    f"({len(experiences) - len(misses)} cache hits, {len(misses)} requests)")
+
     def allocate_train_mode(self, tasks: List[Task]) -> List[TaskExpConfig]:
         """
         Allocates training modes for the given tasks based on the configured training sample experience mode.
@@ -251,13 +316,16 @@ class ExperienceWorker(object):
             query=traj_exp_config.query
         )
 
-        # retrieve experience
-        reme_config = self.config.exp_manager.reme
-        history_experience = self.em_client.call_context_generator(
-            trajectory=trajectory,
-            retrieve_top_k=reme_config.retrieve_top_k,
-            workspace_id=reme_config.workspace_id
-        )
+        # retrieve experience, unless ExperienceManager prefetched it for the whole batch
+        if traj_exp_config.prefetched_experience is not None:
+            history_experience = traj_exp_config.prefetched_experience
+        else:
+            reme_config = self.config.exp_manager.reme
+            history_experience = self.em_client.call_context_generator(
+                trajectory=trajectory,
+                retrieve_top_k=reme_config.retrieve_top_k,
+                workspace_id=reme_config.workspace_id
+            )
 
         # check empty condition
         if not history_experience:
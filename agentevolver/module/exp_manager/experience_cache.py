@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+ExperienceKey = Tuple[str, str, str]  # (task_id, query, workspace_id)
+
+
+class ExperienceCache(object):
+    """
+    TTL cache of retrieved experience, keyed by (task_id, query, workspace_id).
+
+    Entries expire after `ttl` seconds and are all dropped by `invalidate`, which must be called whenever the
+    experience pool changes. A fetch that started before an invalidation cannot write its (now stale) result back:
+    `put` takes the generation returned by `generation` when the fetch started.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 4096):
+        """
+        Args:
+            ttl (float, optional): Lifetime of an entry in seconds, 0 disables caching. Defaults to 600.
+            max_entries (int, optional): Entries kept before the oldest are evicted. Defaults to 4096.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[ExperienceKey, Tuple[float, str]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: ExperienceKey) -> Optional[str]:
+        """Returns the cached experience of `key`, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, experience = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return experience
+
+    def put(self, key: ExperienceKey, experience: str, generation: int) -> None:
+        """Stores `experience` unless caching is disabled or the pool changed since `generation`."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, experience)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drops every entry, called once the experience pool has been updated."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
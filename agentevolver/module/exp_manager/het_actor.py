@@ -39,6 +39,8 @@ from verl.utils.torch_functional import logprobs_from_logits
 from verl.utils.ulysses import gather_outpus_and_unpad, ulysses_pad, ulysses_pad_and_slice_inputs
 from verl.workers.actor import BasePPOActor
 
+from agentevolver.module.exp_manager.token_packing import pack_micro_batches
+
 if is_cuda_available:
     from flash_attn.bert_padding import index_first_axis, pad_input, rearrange, unpad_input
 elif is_npu_available:
@@ -83,6 +85,8 @@ class HETDataParallelPPOActor(DataParallelPPOActor):
         #     select_keys.append("loss_mask")
         if self.config.use_kl_loss:
             select_keys.append("ref_log_prob")
+        # carried along so every micro-batch keeps its per-step / per-group annotations
+        select_keys += [key for key in ("step_ids", "group_ids") if key in data.batch.keys()]
         batch = data.select(batch_keys=select_keys).batch
         has_multi_modal_inputs = "multi_modal_inputs" in data.non_tensor_batch.keys()
         ##################
@@ -96,6 +100,8 @@ class HETDataParallelPPOActor(DataParallelPPOActor):
         else:
             dataloader = batch.split(self.config.ppo_mini_batch_size)
 
+        use_token_packing = self.config.get("use_token_packing", False) and not has_multi_modal_inputs
+
         metrics = {}
         for epoch in range(self.config.ppo_epochs):
             for batch_idx, data in enumerate(dataloader):
@@ -105,6 +111,17 @@ class HETDataParallelPPOActor(DataParallelPPOActor):
                     self.gradient_accumulation = self.config.ppo_mini_batch_size // self.config.ppo_micro_batch_size_per_gpu
                     num_micro_batches = mini_batch.batch.batch_size[0] // self.config.ppo_micro_batch_size_per_gpu
                     micro_batches = data.select(select_keys, non_tensor_select_keys).chunk(num_micro_batches)
+                elif use_token_packing:
+                    max_token_len = self.config.ppo_max_token_len_per_gpu * self.ulysses_sequence_parallel_size
+                    micro_batches, packing_metrics = pack_micro_batches(
+                        mini_batch,
+                        max_token_len=max_token_len,
+                        response_length=mini_batch["responses"].size(1),
+                        micro_batch_size=self.config.ppo_micro_batch_size_per_gpu,
+                        # this mode divides by the response width, which must not depend on the packing
+                        trim_response=self.config.loss_agg_mode != "seq-mean-token-sum-norm",
+                    )  # ⭐ Bin-pack samples by valid tokens and trim padding
+                    append_to_dict(metrics, packing_metrics)
                 elif self.config.use_dynamic_bsz:
                     max_token_len = self.config.ppo_max_token_len_per_gpu * self.ulysses_sequence_parallel_size
                     micro_batches, _ = rearrange_micro_batches(batch=mini_batch, max_token_len=max_token_len)
@@ -115,6 +132,9 @@ class HETDataParallelPPOActor(DataParallelPPOActor):
 
                 self.actor_optimizer.zero_grad()  # ⭐ Zero the gradients before computing the new ones
 
+                # metrics stay on device until the mini-batch is done, so the micro-batch loop never waits on the host
+                micro_batch_metrics = []
+                kl_loss_value = None
                 for data in micro_batches:
                     # Support all hardwares
                     if isinstance(data, DataProto):
@@ -166,8 +186,6 @@ class HETDataParallelPPOActor(DataParallelPPOActor):
                     )  # ⭐ Compute on-policy and off-policy losses
                     pg_loss = ret_dict["pg_loss"]
                     pg_losses = ret_dict["pg_losses"]
-                    on_pg_losses = ret_dict["on_pg_losses"]
-                    off_pg_losses = ret_dict["off_pg_losses"]
                     on_pg_loss = ret_dict["on_pg_loss"]
                     off_pg_loss = ret_dict["off_pg_loss"]
                     on_pg_clipfrac = ret_dict["on_pg_clipfrac"]
@@ -189,10 +207,9 @@ class HETDataParallelPPOActor(DataParallelPPOActor):
                         kl_loss = agg_loss(loss_mat=kld, loss_mask=response_mask, loss_agg_mode=loss_agg_mode)  # ⭐ Aggregate KL divergence loss
 
                         policy_loss = policy_loss + kl_loss * self.config.kl_loss_coef
-                        metrics["actor/kl_loss"] = kl_loss.detach().item()
-                        metrics["actor/kl_coef"] = self.config.kl_loss_coef
+                        kl_loss_value = kl_loss.detach()
 
-                    if self.config.use_dynamic_bsz:
+                    if self.config.use_dynamic_bsz or use_token_packing:
                         # relative to the dynamic bsz
                         loss = policy_loss * (len(data) / self.config.ppo_mini_batch_size)
                     else:
@@ -201,14 +218,16 @@ class HETDataParallelPPOActor(DataParallelPPOActor):
 
                     ##################
                     # ANNI TODO: add metric
-                    data = {
-                        "actor/pg_loss": pg_loss.detach().item(),
-                        "actor/on_pg_clipfrac": on_pg_clipfrac.detach().item(),
-                        "actor/ppo_kl": ppo_kl.detach().item(),
-                        "actor/on_pg_clipfrac_lower": on_pg_clipfrac_lower.detach().item(),
-                    }
+                    micro_batch_metrics.append(torch.stack([pg_loss.detach(), on_pg_clipfrac.detach(), ppo_kl.detach(), on_pg_clipfrac_lower.detach()]).float())
                     ##################
-                    append_to_dict(metrics, data)
+
+                # ⭐ One device-to-host copy per mini-batch instead of four per micro-batch
+                metric_names = ["actor/pg_loss", "actor/on_pg_clipfrac", "actor/ppo_kl", "actor/on_pg_clipfrac_lower"]
+                for values in torch.stack(micro_batch_metrics).tolist():
+                    append_to_dict(metrics, dict(zip(metric_names, values)))
+                if kl_loss_value is not None:
+                    metrics["actor/kl_loss"] = kl_loss_value.item()
+                    metrics["actor/kl_coef"] = self.config.kl_loss_coef
 
                 grad_norm = self._optimizer_step()
                 data = {"actor/grad_norm": grad_norm.detach().item()}
@@ -42,6 +42,61 @@ def agg_loss(loss_mat: torch.Tensor, loss_mask: torch.Tensor, loss_agg_mode: str
 
 
 
+def _zero_if_nan(loss: torch.Tensor) -> torch.Tensor:
+    """Replaces a NaN loss by 0 on device, instead of testing it on the host (`.item()` would sync)."""
+    return torch.where(torch.isnan(loss), torch.zeros_like(loss), loss)
+
+
+def _dual_clip_pg_losses(ratio, advantages, clip_low, clip_high, clip_ratio_c):
+    """
+    Dual-clip PPO token losses for a given ratio clip interval.
+
+    Args:
+        ratio (Tensor): Importance ratio, shape (bs, response_length).
+        advantages (Tensor): Advantage values, shape (bs, response_length).
+        clip_low (float): Lower ratio bound (1 - cliprange_low).
+        clip_high (float | Tensor): Upper ratio bound, a scalar or one bound per token.
+        clip_ratio_c (float): Dual-clip constant.
+
+    Returns:
+        Tuple[Tensor, Tensor, Tensor]: Token losses, and the clipped / dual-clipped indicators.
+    """
+    neg_adv = -advantages
+    pg_losses1 = neg_adv * ratio
+    if torch.is_tensor(clip_high):
+        clipped_ratio = torch.minimum(torch.clamp(ratio, min=clip_low), clip_high)
+    else:
+        clipped_ratio = torch.clamp(ratio, clip_low, clip_high)
+    pg_losses2 = neg_adv * clipped_ratio
+    clip_pg_losses1 = torch.maximum(pg_losses1, pg_losses2)
+    pg_losses3 = neg_adv * clip_ratio_c
+    clip_pg_losses2 = torch.min(pg_losses3, clip_pg_losses1)
+    is_negative = advantages < 0
+    pg_losses = torch.where(is_negative, clip_pg_losses2, clip_pg_losses1)
+    return pg_losses, torch.gt(pg_losses2, pg_losses1), torch.gt(clip_pg_losses1, pg_losses3) & is_negative
+
+
+def _clipfracs(ratio, advantages, response_mask, clip_low, clip_high, clip_ratio_c):
+    """
+    Clip fractions of a clip interval over all response tokens, from the ratio bounds and the advantage sign alone:
+    a token is clipped when its ratio leaves the interval on the side its advantage pushes it towards, and
+    dual-clipped when a negative-advantage ratio exceeds `clip_ratio_c`.
+    """
+    clipped = ((ratio < clip_low) & (advantages < 0)) | ((ratio > clip_high) & (advantages > 0))
+    clipped_lower = (ratio > clip_ratio_c) & (advantages < 0)
+    return verl_F.masked_mean(clipped.float(), response_mask), verl_F.masked_mean(clipped_lower.float(), response_mask)
+
+
+def _fused_on_off_pg_losses(ratio, advantages, exp_mask, clip_low, on_clip_high, off_clip_high, clip_ratio_c):
+    """
+    On- and off-policy dual-clip losses in one pass: off-policy tokens (exp_mask == 1) only differ by their upper
+    clip bound, so a per-token bound replaces the second full evaluation and the blend of both branches.
+    """
+    clip_high = torch.full_like(ratio, on_clip_high).masked_fill_(exp_mask.bool(), off_clip_high)
+    pg_losses, _, _ = _dual_clip_pg_losses(ratio, advantages, clip_low, clip_high, clip_ratio_c)
+    return pg_losses
+
+
 def het_compute_token_on_off_policy_loss(
     old_log_prob,
     log_prob,
@@ -58,6 +113,9 @@ def het_compute_token_on_off_policy_loss(
     """
     Computes the on-policy and off-policy losses for reinforcement learning using PPO.
 
+    Both clip branches are evaluated in a single pass over one ratio tensor (see `_fused_on_off_pg_losses`), and
+    every returned metric stays a device tensor, so the caller decides when to synchronize.
+
     Args:
         old_log_prob (Tensor): Log probabilities of the actions under the old policy.
         log_prob (Tensor): Log probabilities of the actions under the new policy.
@@ -78,41 +136,22 @@ def het_compute_token_on_off_policy_loss(
     ppo_kl = verl_F.masked_mean(-negative_approx_kl, response_mask)
     ratio = torch.exp(negative_approx_kl)
 
-    def compute_pg_losses(cliprange_low, cliprange_high):
-        pg_losses1 = -advantages * ratio
-        pg_losses2 = -advantages * torch.clamp(ratio, 1 - cliprange_low, 1 + cliprange_high)
-        clip_pg_losses1 = torch.maximum(pg_losses1, pg_losses2)
-        pg_losses3 = -advantages * clip_ratio_c
-        clip_pg_losses2 = torch.min(pg_losses3, clip_pg_losses1)
-        pg_losses = torch.where(advantages < 0, clip_pg_losses2, clip_pg_losses1)
-        clipfrac = verl_F.masked_mean(torch.gt(pg_losses2, pg_losses1).float(), response_mask)
-        clipfrac_lower = verl_F.masked_mean(torch.gt(clip_pg_losses1, pg_losses3) * (advantages < 0).float(), response_mask)
-        return pg_losses, clipfrac, clipfrac_lower
-
-    # On-policy calculations
     if cliprange_low is None:
         cliprange_low = cliprange
     if cliprange_high is None:
         cliprange_high = cliprange
-    on_pg_losses, on_pg_clipfrac, on_pg_clipfrac_lower = compute_pg_losses(cliprange_low, cliprange_high)
-    on_pg_loss = verl_F.masked_mean(on_pg_losses, (1.0 - exp_mask) * response_mask)  # ⭐ Compute the on-policy loss
-
-    # Off-policy calculations
-    off_cliprange_low = cliprange_low
-    off_pg_losses, off_pg_clipfrac, off_pg_clipfrac_lower = compute_pg_losses(off_cliprange_low, off_cliprange_high)
-    off_pg_loss = verl_F.masked_mean(off_pg_losses, exp_mask * response_mask)  # ⭐ Compute the off-policy loss
-    off_pg_loss = torch.tensor(0.0) if off_pg_loss.isnan().item() else off_pg_loss
-
-    # Combine on-policy and off-policy losses
-    exp_mask = exp_mask.float()
-    pg_losses = off_pg_losses * exp_mask + on_pg_losses * (1.0 - exp_mask)
+    pg_losses = _fused_on_off_pg_losses(ratio, advantages, exp_mask, 1 - cliprange_low, 1 + cliprange_high, 1 + off_cliprange_high, clip_ratio_c)
+
+    # On-policy clip fractions are reported over all response tokens, as before
+    on_pg_clipfrac, on_pg_clipfrac_lower = _clipfracs(ratio, advantages, response_mask, 1 - cliprange_low, 1 + cliprange_high, clip_ratio_c)
+    on_pg_loss = verl_F.masked_mean(pg_losses, (1.0 - exp_mask) * response_mask)  # ⭐ Compute the on-policy loss
+    off_pg_loss = _zero_if_nan(verl_F.masked_mean(pg_losses, exp_mask * response_mask))  # ⭐ Compute the off-policy loss
+
     pg_loss = agg_loss(loss_mat=pg_losses, loss_mask=response_mask, loss_agg_mode=loss_agg_mode)  # ⭐ Aggregate the combined losses
 
     return {
         "pg_loss": pg_loss,
         "pg_losses": pg_losses,
-        "on_pg_losses": on_pg_losses,
-        "off_pg_losses": off_pg_losses,
         "on_pg_loss": on_pg_loss,
         "off_pg_loss": off_pg_loss,
         "on_pg_clipfrac": on_pg_clipfrac,
@@ -121,6 +160,21 @@ def het_compute_token_on_off_policy_loss(
     }
 
 
+def _bam_on_policy(old_log_prob, log_prob, advantages, response_mask, exp_mask, cliprange, cliprange_low, cliprange_high, clip_ratio_c):
+    """Shared on-policy branch of the BAM losses: ppo_kl, the dual-clip token losses and their metrics."""
+    negative_approx_kl = log_prob - old_log_prob
+    ppo_kl = verl_F.masked_mean(-negative_approx_kl, response_mask)
+    ratio = torch.exp(negative_approx_kl)   # (bs, response_length)
+    if cliprange_low is None:
+        cliprange_low = cliprange
+    if cliprange_high is None:
+        cliprange_high = cliprange
+    on_pg_losses, clipped, clipped_lower = _dual_clip_pg_losses(ratio, advantages, 1 - cliprange_low, 1 + cliprange_high, clip_ratio_c)
+    on_pg_clipfrac = verl_F.masked_mean(clipped.float(), response_mask)
+    on_pg_clipfrac_lower = verl_F.masked_mean(clipped_lower.float(), response_mask)
+    on_pg_loss = verl_F.masked_mean(on_pg_losses, (1.0 - exp_mask) * response_mask)
+    return ppo_kl, on_pg_losses, on_pg_loss, on_pg_clipfrac, on_pg_clipfrac_lower
+
 
 def bam_compute_token_on_off_policy_loss(
     old_log_prob,
@@ -152,41 +206,17 @@ def bam_compute_token_on_off_policy_loss(
     Returns:
         dict: A dictionary containing various computed losses and metrics.
     """
-    negative_approx_kl = log_prob - old_log_prob
-    ppo_kl = verl_F.masked_mean(-negative_approx_kl, response_mask)
-
-    # on-policy: no changes
-    # off-policy: denominator=1 + reshape + no clipping
-
     # on-policy: keep unchanged
-    ratio = torch.exp(negative_approx_kl)   # (bs, response_length)
-    on_pg_losses1 = -advantages * ratio
-    if cliprange_low is None:
-        cliprange_low = cliprange
-    if cliprange_high is None:
-        cliprange_high = cliprange
-    on_pg_losses2 = -advantages * torch.clamp(ratio, 1 - cliprange_low, 1 + cliprange_high)  # - clip(ratio, 1-cliprange, 1+cliprange) * A
-    on_clip_pg_losses1 = torch.maximum(on_pg_losses1, on_pg_losses2)  # max(-ratio * A, -clip(ratio, 1-cliprange, 1+cliprange) * A)
-    on_pg_clipfrac = verl_F.masked_mean(torch.gt(on_pg_losses2, on_pg_losses1).float(), response_mask)
-
-    on_pg_losses3 = -advantages * clip_ratio_c
-    on_clip_pg_losses2 = torch.min(on_pg_losses3, on_clip_pg_losses1)
-    on_pg_clipfrac_lower = verl_F.masked_mean(torch.gt(on_clip_pg_losses1, on_pg_losses3) * (advantages < 0).float(), response_mask)
-
-    on_pg_losses = torch.where(advantages < 0, on_clip_pg_losses2, on_clip_pg_losses1)
-    on_pg_loss = verl_F.masked_mean(on_pg_losses, (1.0-exp_mask) * response_mask)
+    ppo_kl, on_pg_losses, on_pg_loss, on_pg_clipfrac, on_pg_clipfrac_lower = _bam_on_policy(
+        old_log_prob, log_prob, advantages, response_mask, exp_mask, cliprange, cliprange_low, cliprange_high, clip_ratio_c)
 
-    # off-policy
+    # off-policy: denominator=1 + reshape + no clipping
     off_ratio = torch.exp(log_prob)     #(bs, response_length)
     off_ratio = off_ratio / (off_ratio + 0.1)   # ⭐ Reshape the off-policy ratio to stabilize the loss
     off_pg_losses = -advantages * off_ratio
-    off_pg_loss = verl_F.masked_mean(off_pg_losses, exp_mask * response_mask)
-    if off_pg_loss.isnan().item() is True:
-        off_pg_loss = torch.tensor(0.0)
-
-    exp_mask = exp_mask.float()
-    pg_losses = off_pg_losses * exp_mask + on_pg_losses * (1.0 - exp_mask)
+    off_pg_loss = _zero_if_nan(verl_F.masked_mean(off_pg_losses, exp_mask * response_mask))
 
+    pg_losses = torch.where(exp_mask.bool(), off_pg_losses, on_pg_losses)
     pg_loss = agg_loss(loss_mat=pg_losses, loss_mask=response_mask, loss_agg_mode=loss_agg_mode)
 
     ret_dict = {
@@ -233,45 +263,21 @@ def bam_compute_token_on_off_policy_loss_v2(
     Returns:
         dict: A dictionary containing the computed losses and other relevant metrics.
     """
-    negative_approx_kl = log_prob - old_log_prob
-    ppo_kl = verl_F.masked_mean(-negative_approx_kl, response_mask)
-
-    # on-policy: no changes
-    # off-policy: denominator=1 + reshape + no clipping
-
     # on-policy: keep unchanged
-    ratio = torch.exp(negative_approx_kl)   # (bs, response_length)
-    on_pg_losses1 = -advantages * ratio
-    if cliprange_low is None:
-        cliprange_low = cliprange
-    if cliprange_high is None:
-        cliprange_high = cliprange
-    on_pg_losses2 = -advantages * torch.clamp(ratio, 1 - cliprange_low, 1 + cliprange_high)  # - clip(ratio, 1-cliprange, 1+cliprange) * A
-    on_clip_pg_losses1 = torch.maximum(on_pg_losses1, on_pg_losses2)  # max(-ratio * A, -clip(ratio, 1-cliprange, 1+cliprange) * A)
-    on_pg_clipfrac = verl_F.masked_mean(torch.gt(on_pg_losses2, on_pg_losses1).float(), response_mask)
-
-    on_pg_losses3 = -advantages * clip_ratio_c
-    on_clip_pg_losses2 = torch.min(on_pg_losses3, on_clip_pg_losses1)
-    on_pg_clipfrac_lower = verl_F.masked_mean(torch.gt(on_clip_pg_losses1, on_pg_losses3) * (advantages < 0).float(), response_mask)
+    ppo_kl, on_pg_losses, on_pg_loss, on_pg_clipfrac, on_pg_clipfrac_lower = _bam_on_policy(
+        old_log_prob, log_prob, advantages, response_mask, exp_mask, cliprange, cliprange_low, cliprange_high, clip_ratio_c)
 
-    on_pg_losses = torch.where(advantages < 0, on_clip_pg_losses2, on_clip_pg_losses1)
-    on_pg_loss = verl_F.masked_mean(on_pg_losses, (1.0-exp_mask) * response_mask)
-
-    # off-policy
+    # off-policy: denominator=1 + reshape + no clipping
     off_ratio = torch.exp(log_prob)     #(bs, response_length)
     off_ratio = off_ratio / (off_ratio + 0.1)   # ⭐ Reshape the off-policy ratio
     off_pg_losses = -advantages * off_ratio
     ############
     # ANNI add 0728: For negative samples with A<0, do not compute loss gradients, mask them out
     off_positive_mask = (exp_mask > 0) & (advantages >=0) & (response_mask > 0) # mask containing only off-policy data with advantages>=0
-    adjusted_off_pg_losses = torch.where(off_positive_mask, off_pg_losses, torch.zeros_like(off_pg_losses))
-    off_pg_loss = verl_F.masked_mean(off_pg_losses, off_positive_mask)
-    if torch.isnan(off_pg_loss).item():
-        off_pg_loss = torch.tensor(0.0)
-
-    exp_mask = exp_mask.float()
-    pg_losses = adjusted_off_pg_losses * exp_mask + on_pg_losses * (1.0 - exp_mask)
+    off_pg_loss = _zero_if_nan(verl_F.masked_mean(off_pg_losses, off_positive_mask))
 
+    adjusted_off_pg_losses = torch.where(off_positive_mask, off_pg_losses, torch.zeros_like(off_pg_losses))
+    pg_losses = torch.where(exp_mask.bool(), adjusted_off_pg_losses, on_pg_losses)
     pg_loss = agg_loss(loss_mat=pg_losses, loss_mask=response_mask, loss_agg_mode=loss_agg_mode)
 
     ret_dict = {
@@ -279,7 +285,6 @@ def bam_compute_token_on_off_policy_loss_v2(
         "pg_losses": pg_losses,
         "on_pg_losses":  on_pg_losses,
         "off_pg_losses": off_pg_losses,
-        # "adjusted_off_pg_losses": adjusted_off_pg_losses,
         "on_pg_loss": on_pg_loss,
         "off_pg_loss": off_pg_loss,
         "on_pg_clipfrac": on_pg_clipfrac,
@@ -319,56 +324,30 @@ def bam_compute_token_on_off_policy_loss_v3(
     Returns:
         dict: A dictionary containing the computed losses and other relevant metrics.
     """
-    negative_approx_kl = log_prob - old_log_prob
-    ppo_kl = verl_F.masked_mean(-negative_approx_kl, response_mask)
-
     # on-policy: no changes
     # off-policy: cliphigh=1, rest kept consistent with on-policy
-
-    # on-policy: keep unchanged
+    negative_approx_kl = log_prob - old_log_prob
+    ppo_kl = verl_F.masked_mean(-negative_approx_kl, response_mask)
     ratio = torch.exp(negative_approx_kl)   # (bs, response_length) ⭐ Compute the ratio of new to old policy probabilities
-    on_pg_losses1 = -advantages * ratio
     if cliprange_low is None:
         cliprange_low = cliprange
     if cliprange_high is None:
         cliprange_high = cliprange
-    on_pg_losses2 = -advantages * torch.clamp(ratio, 1 - cliprange_low, 1 + cliprange_high)  # - clip(ratio, 1-cliprange, 1+cliprange) * A
-    on_clip_pg_losses1 = torch.maximum(on_pg_losses1, on_pg_losses2)  # max(-ratio * A, -clip(ratio, 1-cliprange, 1+cliprange) * A)
-    on_pg_clipfrac = verl_F.masked_mean(torch.gt(on_pg_losses2, on_pg_losses1).float(), response_mask)
-
-    on_pg_losses3 = -advantages * clip_ratio_c
-    on_clip_pg_losses2 = torch.min(on_pg_losses3, on_clip_pg_losses1)
-    on_pg_clipfrac_lower = verl_F.masked_mean(torch.gt(on_clip_pg_losses1, on_pg_losses3) * (advantages < 0).float(), response_mask)
-
-    on_pg_losses = torch.where(advantages < 0, on_clip_pg_losses2, on_clip_pg_losses1)
-    on_pg_loss = verl_F.masked_mean(on_pg_losses, (1.0-exp_mask) * response_mask)
-
-    # off-policy
-    off_pg_losses1 = -advantages * ratio
-    off_cliprange_low = cliprange_low
     off_cliprange_high = 1.0
-    off_pg_losses2 = -advantages * torch.clamp(ratio, 1 - off_cliprange_low, 1 + off_cliprange_high)  # - clip(ratio, 1-cliprange, 1+cliprange) * A
-    off_clip_pg_losses1 = torch.maximum(off_pg_losses1, off_pg_losses2)  # max(-ratio * A, -clip(ratio, 1-cliprange, 1+cliprange) * A)
-    off_pg_clipfrac = verl_F.masked_mean(torch.gt(off_pg_losses2, off_pg_losses1).float(), response_mask)
-    off_pg_losses3 = -advantages * clip_ratio_c
-    off_clip_pg_losses2 = torch.min(off_pg_losses3, off_clip_pg_losses1)
-    off_pg_clipfrac_lower = verl_F.masked_mean(torch.gt(off_clip_pg_losses1, off_pg_losses3) * (advantages < 0).float(), response_mask)
+    pg_losses = _fused_on_off_pg_losses(ratio, advantages, exp_mask, 1 - cliprange_low, 1 + cliprange_high, 1 + off_cliprange_high, clip_ratio_c)
 
-    off_pg_losses = torch.where(advantages < 0, off_clip_pg_losses2, off_clip_pg_losses1)
-    off_pg_loss = verl_F.masked_mean(off_pg_losses, (1.0-exp_mask) * response_mask)
-    if off_pg_loss.isnan().item() is True:
-        off_pg_loss = torch.tensor(0.0)
-
-    exp_mask = exp_mask.float()
-    pg_losses = off_pg_losses * exp_mask + on_pg_losses * (1.0 - exp_mask)
+    on_pg_clipfrac, on_pg_clipfrac_lower = _clipfracs(ratio, advantages, response_mask, 1 - cliprange_low, 1 + cliprange_high, clip_ratio_c)
+    on_pg_loss = verl_F.masked_mean(pg_losses, (1.0 - exp_mask) * response_mask)
+    # reported over the same tokens as before: the off-policy clip range applied to the on-policy tokens
+    with torch.no_grad():
+        off_pg_losses_on_tokens, _, _ = _dual_clip_pg_losses(ratio.detach(), advantages, 1 - cliprange_low, 1 + off_cliprange_high, clip_ratio_c)
+        off_pg_loss = _zero_if_nan(verl_F.masked_mean(off_pg_losses_on_tokens, (1.0 - exp_mask) * response_mask))
 
     pg_loss = agg_loss(loss_mat=pg_losses, loss_mask=response_mask, loss_agg_mode=loss_agg_mode)
 
     ret_dict = {
         "pg_loss": pg_loss,
         "pg_losses": pg_losses,
-        "on_pg_losses":  on_pg_losses,
-        "off_pg_losses": off_pg_losses,
         "on_pg_loss": on_pg_loss,
         "off_pg_loss": off_pg_loss,
         "on_pg_clipfrac": on_pg_clipfrac,
@@ -376,4 +355,4 @@ def bam_compute_token_on_off_policy_loss_v3(
         "ppo_kl": ppo_kl,
     }
 
-    return ret_dict
\ No newline at end of file
+    return ret_dict
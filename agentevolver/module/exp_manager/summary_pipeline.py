@@ -0,0 +1,199 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from agentevolver.client.em_client import to_summary_payload
+from agentevolver.schema.trajectory import Trajectory
+
+# (step the trajectory was submitted at, summarizer payload, approximate payload size in bytes)
+PendingItem = Tuple[int, dict, int]
+
+
+def payload_nbytes(payload: dict) -> int:
+    """Approximate memory held by a summary payload: the size of its message contents."""
+    return sum(len(str(message.get("content", ""))) for message in payload["messages"] or [])
+
+
+class SummaryPipeline(object):
+    """
+    Background experience summarization with bounded memory.
+
+    Trajectories are reduced to their summary payload on `submit` and coalesced per task_id, across training steps,
+    into batches of `batch_size`. Full batches, and partial ones whose oldest trajectory has waited `max_lag_steps`
+    steps, go to a bounded queue served by `num_workers` threads calling `summarize_fn`. When that queue is full,
+    batches stay pending (backpressure); once `max_pending` trajectories are held, new ones are dropped (load
+    shedding), so the trainer never waits on the experience service.
+    """
+
+    def __init__(
+        self,
+        summarize_fn: Callable[[List[dict]], Tuple[object, float]],
+        batch_size: int = 8,
+        max_pending: int = 1024,
+        max_lag_steps: int = 2,
+        num_workers: int = 2,
+        on_batch_done: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Args:
+            summarize_fn (Callable): Summarizes a list of payloads, returns (response, time cost).
+            batch_size (int, optional): Trajectories per summarizer call. Defaults to 8.
+            max_pending (int, optional): Trajectories held (pending, queued or in flight) before shedding. Defaults to 1024.
+            max_lag_steps (int, optional): Steps a partial batch may wait for more trajectories of its task. Defaults to 2.
+            num_workers (int, optional): Concurrent summarizer calls. Defaults to 2.
+            on_batch_done (Callable, optional): Called after each summarizer call, e.g. to invalidate retrieval caches.
+        """
+        self.summarize_fn = summarize_fn
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max_pending
+        self.max_lag_steps = max_lag_steps
+        self.on_batch_done = on_batch_done
+
+        self._pending: "OrderedDict[str, List[PendingItem]]" = OrderedDict()
+        self._ready: "queue.Queue[Optional[List[PendingItem]]]" = queue.Queue(maxsize=2 * num_workers)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._last_step = 0
+        self._held = 0              # trajectories pending, queued or in flight
+        self._held_bytes = 0
+        self._in_flight = 0
+        self._dropped = 0
+        self._batches = 0
+        self._time_costs: List[float] = []
+
+        self._workers = [threading.Thread(target=self._work, name=f"summary-worker-{i}", daemon=True) for i in range(num_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, trajectories: List[Trajectory], step: int) -> int:
+        """
+        Enqueues trajectories for summarization without blocking.
+
+        Args:
+            trajectories (List[Trajectory]): Finished trajectories, only their summary payload is kept.
+            step (int): The current training step.
+
+        Returns:
+            int: The number of trajectories accepted, the rest was shed.
+        """
+        accepted = 0
+        with self._lock:
+            self._last_step = max(self._last_step, step)
+            for trajectory in trajectories:
+                if self._held >= self.max_pending:
+                    self._dropped += 1
+                    continue
+                payload = to_summary_payload(trajectory)
+                nbytes = payload_nbytes(payload)
+                self._pending.setdefault(str(getattr(trajectory, "task_id", "")), []).append((step, payload, nbytes))
+                self._held += 1
+                self._held_bytes += nbytes
+                accepted += 1
+            self._dispatch_locked(force=False)
+        if accepted < len(trajectories):
+            logger.warning(f"[Summary] Queue full, dropped {len(trajectories) - accepted} trajectories at step {step}")
+        return accepted
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sends every pending trajectory, including partial batches, and waits until all of them are summarized.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait. Defaults to None (wait indefinitely).
+
+        Returns:
+            bool: True if the pipeline drained within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._held > 0:
+                self._dispatch_locked(force=True)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(timeout=remaining if remaining is not None else 1.0)
+        return True
+
+    def metrics(self) -> Dict[str, float]:
+        """Queue depth, lag in steps, memory held and throughput since the previous call."""
+        with self._lock:
+            oldest = min((items[0][0] for items in self._pending.values() if items), default=self._last_step)
+            time_costs, self._time_costs = self._time_costs, []
+            return {
+                "exp_manager/summary_queue_depth": self._held,
+                "exp_manager/summary_in_flight": self._in_flight,
+                "exp_manager/summary_lag_steps": self._last_step - oldest,
+                "exp_manager/summary_memory_mb": self._held_bytes / 2**20,
+                "exp_manager/summary_dropped": self._dropped,
+                "exp_manager/summary_batches": self._batches,
+                "exp_manager/summary": sum(time_costs) / len(time_costs) if time_costs else 0.0,
+            }
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stops the workers once the batches already queued are summarized; pending ones are discarded.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait for the workers. Defaults to None (wait indefinitely).
+
+        Returns:
+            bool: True if every worker stopped within `timeout`; the others are daemon threads left behind.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        try:
+            for _ in self._workers:
+                self._ready.put(None, timeout=remaining())
+        except queue.Full:
+            return False
+        for worker in self._workers:
+            worker.join(timeout=remaining())
+        return not any(worker.is_alive() for worker in self._workers)
+
+    def _dispatch_locked(self, force: bool) -> None:
+        """Moves full (or lagging, or with `force` any) batches to the worker queue while it has room."""
+        for task_id in list(self._pending):
+            items = self._pending[task_id]
+            while items:
+                lagging = self._last_step - items[0][0] >= self.max_lag_steps
+                if len(items) < self.batch_size and not (force or lagging):
+                    break
+                batch = items[:self.batch_size]
+                try:
+                    self._ready.put_nowait(batch)
+                except queue.Full:
+                    return  # backpressure: keep it pending, a worker dispatches again when it frees a slot
+                del items[:self.batch_size]
+            if not items:
+                del self._pending[task_id]
+
+    def _work(self) -> None:
+        while True:
+            batch = self._ready.get()
+            if batch is None:
+                return
+            with self._lock:
+                self._in_flight += 1
+            time_cost = None
+            try:
+                _, time_cost = self.summarize_fn([payload for _, payload, _ in batch])
+            except Exception as e:
+                logger.warning(f"[Summary] Batch of {len(batch)} trajectories failed: {e}")
+            if self.on_batch_done is not None:
+                self.on_batch_done()
+            with self._lock:
+                self._in_flight -= 1
+                self._held -= len(batch)
+                self._held_bytes -= sum(nbytes for _, _, nbytes in batch)
+                self._batches += 1
+                if time_cost is not None:
+                    self._time_costs.append(time_cost)
+                self._dispatch_locked(force=False)
+                self._idle.notify_all()
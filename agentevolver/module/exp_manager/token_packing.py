@@ -0,0 +1,167 @@
+from typing import Dict, List, Optional, Tuple
+
+import torch
+import torch.distributed as dist
+from tensordict import TensorDict
+from verl.utils.device import get_device_name
+
+# Response-aligned tensors that are padded to the configured max response length rather than to the
+# response width of the batch; their columns still line up with `responses` from the left
+WIDE_RESPONSE_KEYS = ("step_ids",)
+
+
+def first_fit_decreasing(lengths: List[int], budget: int) -> List[List[int]]:
+    """
+    Bin-packs samples into micro-batches whose total valid token count stays within `budget`.
+
+    Samples are visited longest first and put into the first micro-batch that still has room, so
+    sequences of similar length end up together. A sample longer than `budget` gets a micro-batch of its own.
+
+    Args:
+        lengths (List[int]): Valid token count of each sample.
+        budget (int): Token budget per micro-batch.
+
+    Returns:
+        List[List[int]]: Sample indices of each micro-batch, in ascending order.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    bins: List[List[int]] = []
+    loads: List[int] = []
+    for i in order:
+        for b, load in enumerate(loads):
+            if load + lengths[i] <= budget:
+                bins[b].append(i)
+                loads[b] += lengths[i]
+                break
+        else:
+            bins.append([i])
+            loads.append(lengths[i])
+    return [sorted(b) for b in bins]
+
+
+def split_bins(bins: List[List[int]], lengths: List[int], num_bins: int) -> List[List[int]]:
+    """
+    Splits the heaviest micro-batches in two until there are `num_bins` of them.
+
+    Args:
+        bins (List[List[int]]): Sample indices of each micro-batch, as returned by `first_fit_decreasing`.
+        lengths (List[int]): Valid token count of each sample.
+        num_bins (int): Number of micro-batches wanted, at most the number of samples.
+
+    Returns:
+        List[List[int]]: Sample indices of each micro-batch, in ascending order.
+    """
+    assert num_bins <= len(lengths), f"cannot split {len(lengths)} samples into {num_bins} micro-batches"
+    bins = [list(b) for b in bins]
+    while len(bins) < num_bins:
+        splittable = [b for b in bins if len(b) > 1]
+        heaviest = max(splittable, key=lambda b: sum(lengths[i] for i in b))
+        bins.remove(heaviest)
+        halves: Tuple[List[int], List[int]] = ([], [])
+        loads = [0, 0]
+        for i in sorted(heaviest, key=lambda i: -lengths[i]):
+            # the lighter half takes the next sample; an empty half always takes one
+            h = 0 if (loads[0], len(halves[0])) <= (loads[1], len(halves[1])) else 1
+            halves[h].append(i)
+            loads[h] += lengths[i]
+        bins.extend(sorted(h) for h in halves)
+    return bins
+
+
+def trim_padding(batch: TensorDict, response_length: int, trim_response: bool = True) -> TensorDict:
+    """
+    Drops the padding columns no sample of `batch` uses: leading prompt padding (prompts are left-padded)
+    and trailing response padding (responses are right-padded).
+
+    Full-sequence tensors (input_ids, attention_mask, position_ids, loss_mask, exp_mask, ...) are cut on both
+    sides, response tensors (responses, old_log_probs, advantages, ...) only at the end, so
+    `x[:, -response_length:]` of a full-sequence tensor still lines up with the response tensors. step_ids is
+    padded to the configured max response length, which may be wider than L_resp; it is cut to the same width
+    as the response tensors. Per-sample tensors such as group_ids are kept as is.
+
+    Args:
+        batch (TensorDict): A micro-batch with `attention_mask` of shape (B, L_prompt + L_resp).
+        response_length (int): L_resp.
+        trim_response (bool, optional): Also trim the response side. Disable for loss aggregations that
+            normalize by the response width. Defaults to True.
+
+    Returns:
+        TensorDict: The trimmed micro-batch.
+    """
+    attention_mask = batch["attention_mask"]
+    total_length = attention_mask.size(1)
+    prompt_length = total_length - response_length
+
+    prompt_used = attention_mask[:, :prompt_length].any(dim=0).nonzero()
+    start = int(prompt_used[0].item()) if prompt_used.numel() > 0 else prompt_length
+    response_used = attention_mask[:, prompt_length:].any(dim=0).nonzero()
+    new_response_length = response_length
+    if trim_response:
+        new_response_length = max(1, int(response_used[-1].item()) + 1 if response_used.numel() > 0 else 1)
+
+    if start == 0 and new_response_length == response_length:
+        return batch
+
+    trimmed = {}
+    for key, value in batch.items():
+        if value.dim() >= 2 and value.size(-1) == total_length:
+            trimmed[key] = value[..., start:prompt_length + new_response_length]
+        elif value.dim() >= 2 and (value.size(-1) == response_length or key in WIDE_RESPONSE_KEYS):
+            trimmed[key] = value[..., :new_response_length]
+        else:
+            trimmed[key] = value
+    return TensorDict(trimmed, batch_size=batch.batch_size)
+
+
+def padding_ratio(micro_batches: List[TensorDict]) -> float:
+    """Fraction of the (B, L) positions of `micro_batches` that are padding."""
+    total = sum(mb["attention_mask"].numel() for mb in micro_batches)
+    valid = sum(int(mb["attention_mask"].sum().item()) for mb in micro_batches)
+    return 1.0 - valid / total if total > 0 else 0.0
+
+
+def pack_micro_batches(
+    batch: TensorDict,
+    max_token_len: int,
+    response_length: int,
+    micro_batch_size: int,
+    trim_response: bool = True,
+    dp_group: Optional[dist.ProcessGroup] = None,
+    same_micro_num_in_dp: bool = True,
+) -> Tuple[List[TensorDict], Dict[str, float]]:
+    """
+    Splits a mini-batch into token-budget micro-batches and trims their padding.
+
+    Every micro-batch runs FSDP collectives in its forward and backward, so with `same_micro_num_in_dp` the
+    data-parallel ranks agree on the largest micro-batch count (like verl's `rearrange_micro_batches`) and the
+    ranks with fewer micro-batches split their heaviest ones until they match.
+
+    Args:
+        batch (TensorDict): The mini-batch.
+        max_token_len (int): Valid token budget per micro-batch.
+        response_length (int): Response width of the mini-batch.
+        micro_batch_size (int): The fixed micro-batch size, only used to report the padding it would have had.
+        trim_response (bool, optional): See `trim_padding`. Defaults to True.
+        dp_group (dist.ProcessGroup, optional): The data-parallel group. Defaults to the default group.
+        same_micro_num_in_dp (bool, optional): Give every data-parallel rank the same number of
+            micro-batches. Defaults to True.
+
+    Returns:
+        Tuple[List[TensorDict], Dict[str, float]]: The micro-batches and padding metrics
+        ("actor/padding_ratio_before", "actor/padding_ratio_after", "actor/num_micro_batches").
+    """
+    lengths = batch["attention_mask"].sum(dim=-1).tolist()
+    bins = first_fit_decreasing(lengths, max_token_len)
+    if dist.is_initialized() and same_micro_num_in_dp:
+        # ⭐ Ranks with different micro-batch counts would wait on each other's collectives forever
+        num_bins = torch.tensor([len(bins)], device=get_device_name())
+        dist.all_reduce(num_bins, op=dist.ReduceOp.MAX, group=dp_group)
+        bins = split_bins(bins, lengths, int(num_bins.item()))
+    micro_batches = [trim_padding(batch[torch.tensor(indices)], response_length, trim_response) for indices in bins]
+
+    metrics = {
+        "actor/padding_ratio_before": padding_ratio(batch.split(micro_batch_size)) if micro_batch_size else padding_ratio([batch]),
+        "actor/padding_ratio_after": padding_ratio(micro_batches),
+        "actor/num_micro_batches": len(micro_batches),
+    }
+    return micro_batches, metrics
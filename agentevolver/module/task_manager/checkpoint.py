@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List
+
+from loguru import logger
+
+from agentevolver.schema.task import Task, TaskObjective
+
+
+def work_item_hash(task: Task, index: int, repetition: int) -> str:
+    """Compact identifier of the `repetition`-th exploration of the `index`-th seed task."""
+    return hashlib.md5(f"{index}:{task.task_id}:{task.env_type}:{repetition}".encode()).hexdigest()[:16]
+
+
+class GenerationCheckpoint(object):
+    """
+    Append-only JSONL checkpoint of `TaskManager.generate_task`.
+
+    The first line is a header with the hash of the seed tasks. Every further line records one finished work item:
+    its hash, the objectives kept by the realtime filters and the results of the post filters (which may rewrite them).
+    A record is a single line, so a crash mid-write can only lose the last (truncated) line, which is dropped on
+    load. Writes are flushed immediately and fsync'ed every `fsync_every` records or `fsync_interval` seconds.
+    """
+
+    def __init__(self, path: str, tasks_hash: str, fsync_every: int = 16, fsync_interval: float = 5.0):
+        """
+        Args:
+            path (str): The checkpoint file.
+            tasks_hash (str): Hash of the seed tasks. A checkpoint written for other tasks is discarded.
+            fsync_every (int, optional): Records written between two fsyncs. Defaults to 16.
+            fsync_interval (float, optional): Maximum seconds between two fsyncs. Defaults to 5.
+        """
+        self.path = path
+        self.tasks_hash = tasks_hash
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self.processed: set = set()
+        self.records: List[Dict] = []
+        self._load()
+
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() == 0:
+            self._write({"tasks_hash": tasks_hash, "timestamp": time.time()})
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for i, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Dropping truncated record at line {i + 1} of checkpoint {self.path}")
+                    break
+                if i == 0:
+                    if record.get("tasks_hash") != self.tasks_hash:
+                        logger.warning(f"Tasks hash mismatch. Expected: {self.tasks_hash}, got: {record.get('tasks_hash')}. Removing checkpoint.")
+                        os.remove(self.path)
+                        return
+                else:
+                    self.processed.add(record["item"])
+                    self.records.append(record)
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(self.path):
+            os.truncate(self.path, valid_bytes)  # so that new records do not follow a partial line
+        logger.info(f"Resumed from checkpoint: {sum(len(r['results']) for r in self.records)} results loaded, {len(self.processed)} items processed")
+
+    @staticmethod
+    def parse(record: Dict, key: str) -> List[TaskObjective]:
+        """The objectives of a record: `objectives` (kept by the realtime filters) or `results` (post-filtered)."""
+        return [TaskObjective.parse_obj(obj) for obj in record[key]]
+
+    def append(self, item: str, objectives: List[TaskObjective], results: List[TaskObjective]) -> None:
+        """
+        Records a finished work item.
+
+        Args:
+            item (str): Its `work_item_hash`.
+            objectives (List[TaskObjective]): The objectives kept by the realtime filters.
+            results (List[TaskObjective]): The objectives returned by the post filters.
+        """
+        self._write({"item": item, "objectives": [obj.dict() for obj in objectives], "results": [obj.dict() for obj in results]})
+        self.processed.add(item)
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        """Forces the written records to disk."""
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
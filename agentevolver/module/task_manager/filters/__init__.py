@@ -18,9 +18,29 @@ class TaskPostFilter(abc.ABC):
         """
         pass
 
+    def filter_incremental(self, tasks: Sequence[TaskObjective]) -> list[TaskObjective]:
+        """
+        Filters newly generated tasks in streaming mode, given every task this filter kept since the last `reset`.
+        Filters that judge each task on its own simply apply `filter`.
+
+        Args:
+            tasks (Sequence[TaskObjective]): The newly generated TaskObjective objects.
+
+        Returns:
+            list[TaskObjective]: The new tasks that are kept.
+        """
+        return self.filter(tasks)
+
+    def reset(self) -> None:
+        """
+        Forgets the tasks kept by `filter_incremental`.
+        """
+        pass
+
 
-from .filters import NaiveTaskPostFilter
+from .filters import MinHashTaskPostFilter, NaiveTaskPostFilter
 
 __all__ = [
+    "MinHashTaskPostFilter",
     "NaiveTaskPostFilter"
 ]
\ No newline at end of file
@@ -2,6 +2,7 @@ import abc
 from typing import Sequence
 
 from agentevolver.module.task_manager.filters import TaskPostFilter
+from agentevolver.module.task_manager.filters.minhash import MinHashLSH
 from agentevolver.schema.task import TaskObjective
 
 
@@ -66,3 +67,61 @@ class NaiveTaskPostFilter(TaskPostFilter):
 
         similarity = len(intersection) / len(union) if union else 0  # ⭐ Calculate the similarity score
         return similarity >= threshold  # ⭐ Compare the similarity with the threshold
+
+
+class MinHashTaskPostFilter(TaskPostFilter):
+    """
+    Removes near-duplicate queries with a MinHash/LSH index, in expected linear time instead of the pairwise
+    comparisons of `NaiveTaskPostFilter`. Queries are tokenized CJK-aware (see `minhash.tokenize`).
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128):
+        """
+        Args:
+            threshold (float, optional): Jaccard similarity at which two queries are duplicates. Defaults to 0.8.
+            num_perm (int, optional): Number of MinHash permutations. Defaults to 128.
+        """
+        self._threshold = threshold
+        self._num_perm = num_perm
+        self._index: MinHashLSH[int] = MinHashLSH(threshold, num_perm)
+
+    def filter(self, tasks: Sequence[TaskObjective]) -> list[TaskObjective]:
+        """
+        Sorts tasks by confidence and keeps those with a ground truth that are not near-duplicates of a kept one.
+
+        Args:
+            tasks (Sequence[TaskObjective]): A sequence of TaskObjective objects to be filtered.
+
+        Returns:
+            list[TaskObjective]: A list of unique and high-confidence TaskObjective objects.
+        """
+        tasks = sorted(tasks, key=lambda x: x.confidence or 0, reverse=True)  # ⭐ Sort tasks by confidence in descending order
+        return self._keep_unique(tasks, MinHashLSH(self._threshold, self._num_perm))
+
+    def filter_incremental(self, tasks: Sequence[TaskObjective]) -> list[TaskObjective]:
+        """
+        Keeps the new tasks that are not near-duplicates of a task kept before (or of a more confident new one),
+        and adds them to the index.
+
+        Args:
+            tasks (Sequence[TaskObjective]): The newly generated TaskObjective objects.
+
+        Returns:
+            list[TaskObjective]: The new tasks that are kept.
+        """
+        tasks = sorted(tasks, key=lambda x: x.confidence or 0, reverse=True)
+        return self._keep_unique(tasks, self._index)
+
+    def reset(self) -> None:
+        self._index = MinHashLSH(self._threshold, self._num_perm)
+
+    @staticmethod
+    def _keep_unique(tasks: Sequence[TaskObjective], index: MinHashLSH[int]) -> list[TaskObjective]:
+        unique_tasks = []
+        for task in tasks:
+            query = task.objective
+            assert query is not None
+            if task.ground_truth != "" and index.find_duplicate(query) is None:
+                index.add(len(index), query)  # ⭐ Index the kept query for later lookups
+                unique_tasks.append(task)
+        return unique_tasks
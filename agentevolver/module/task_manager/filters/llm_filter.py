@@ -74,7 +74,7 @@ class LlmFilter(TaskPostFilter):
         from tqdm import tqdm
         res = []
         
-        progress = tqdm(total=len(tasks), desc="Filtering tasks")
+        progress = tqdm(total=len(tasks), desc="Filtering tasks", disable=len(tasks) == 1)
         with ThreadPoolExecutor(max_workers=self._num_threads) as executor:
             # submit all tasks
             future_to_task = {
@@ -0,0 +1,168 @@
+import functools
+import re
+import zlib
+from typing import Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+K = TypeVar("K", bound=Hashable)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# CJK ideographs, kana and hangul are written without spaces: they are shingled into character bigrams
+_CJK = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(text: str) -> frozenset:
+    """
+    Splits a query into a set of tokens for similarity checks.
+
+    Words of space-separated scripts are lowercased, runs of CJK characters become overlapping character bigrams
+    (a single character stays a unigram), and punctuation is dropped.
+
+    Args:
+        text (str): The query.
+
+    Returns:
+        frozenset: The token set.
+    """
+    tokens = set()
+    for match in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(match) and len(match) > 1:
+            tokens.update(match[i:i + 2] for i in range(len(match) - 1))
+        else:
+            tokens.add(match)
+    return frozenset(tokens)
+
+
+def jaccard(tokens1: frozenset, tokens2: frozenset) -> float:
+    """Jaccard similarity of two token sets, 0 if either is empty."""
+    if not tokens1 or not tokens2:
+        return 0.0
+    return len(tokens1 & tokens2) / len(tokens1 | tokens2)
+
+
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+def _false_rates(threshold: float, bands: int, rows: int, steps: int = 200) -> Tuple[float, float]:
+    """Integrated false positive / false negative probabilities of an LSH index with `bands` x `rows`."""
+    def candidate_prob(s):
+        return 1.0 - (1.0 - s ** rows) ** bands
+
+    xs_fp = np.linspace(0.0, threshold, steps)
+    xs_fn = np.linspace(threshold, 1.0, steps)
+    false_positive = _trapezoid(candidate_prob(xs_fp), xs_fp)
+    false_negative = _trapezoid(1.0 - candidate_prob(xs_fn), xs_fn)
+    return float(false_positive), float(false_negative)
+
+
+@functools.lru_cache(maxsize=None)
+def optimal_bands(threshold: float, num_perm: int, false_negative_weight: float = 0.9) -> Tuple[int, int]:
+    """
+    Picks the (bands, rows) split of `num_perm` hash values that minimizes the weighted false positive and false
+    negative rates around `threshold`. False negatives are weighted higher: candidates are verified exactly, a
+    missed duplicate is not.
+    """
+    best, best_cost = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        if rows == 0:
+            break
+        false_positive, false_negative = _false_rates(threshold, bands, rows)
+        cost = (1 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+        if cost < best_cost:
+            best, best_cost = (bands, rows), cost
+    return best
+
+
+class MinHashLSH(Generic[K]):
+    """
+    Near-duplicate index over query texts: MinHash signatures bucketed by banded LSH.
+
+    `query` returns the keys whose token sets have a Jaccard similarity of at least `threshold` with the text.
+    Candidates come from the LSH buckets (expected O(1) per lookup instead of a scan of every indexed text) and are
+    verified against their exact Jaccard similarity, so there are no false positives. Texts without any token
+    never match, like the word-overlap check this replaces.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, seed: int = 1, recall_margin: float = 0.1):
+        """
+        Args:
+            threshold (float, optional): Jaccard similarity at which two texts are duplicates. Defaults to 0.8.
+            num_perm (int, optional): Number of hash permutations of a signature. Defaults to 128.
+            seed (int, optional): Seed of the permutations. Defaults to 1.
+            recall_margin (float, optional): The bands are tuned for `threshold - recall_margin`. Exact verification
+                discards the extra candidates, and pairs just above `threshold` are found with ~99.8% probability
+                instead of ~90%. Defaults to 0.1.
+        """
+        assert 0.0 < threshold <= 1.0, f"threshold must be in (0, 1], got {threshold}"
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = optimal_bands(round(max(threshold - recall_margin, 0.05), 4), num_perm)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[K]]] = [{} for _ in range(self.bands)]
+        self._tokens: Dict[K, frozenset] = {}
+
+    def signature(self, tokens: frozenset) -> np.ndarray:
+        """MinHash signature (num_perm,) of a non-empty token set."""
+        hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: K, text: str) -> None:
+        """
+        Indexes `text` under `key`.
+
+        Args:
+            key (K): Identifier returned by `query`, must be unique.
+            text (str): The query text.
+        """
+        if key in self._tokens:
+            raise ValueError(f"key {key!r} is already indexed")
+        tokens = tokenize(text)
+        self._tokens[key] = tokens
+        if not tokens:
+            return
+        for bucket, band_key in zip(self._buckets, self._band_keys(self.signature(tokens))):
+            bucket.setdefault(band_key, []).append(key)
+
+    def query(self, text: str) -> List[K]:
+        """
+        Returns the keys of the indexed texts that are near-duplicates of `text`.
+
+        Args:
+            text (str): The query text.
+
+        Returns:
+            List[K]: Matching keys, most similar first.
+        """
+        return [key for key, _ in self._query_tokens(tokenize(text))]
+
+    def find_duplicate(self, text: str) -> Optional[K]:
+        """Returns the key of the most similar near-duplicate of `text`, or None."""
+        matches = self._query_tokens(tokenize(text))
+        return matches[0][0] if matches else None
+
+    def _query_tokens(self, tokens: frozenset) -> List[Tuple[K, float]]:
+        if not tokens:
+            return []
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(self.signature(tokens))):
+            candidates.update(bucket.get(band_key, ()))
+        scored = [(key, jaccard(tokens, self._tokens[key])) for key in candidates]
+        return sorted(((key, score) for key, score in scored if score >= self.threshold), key=lambda x: -x[1])
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._tokens
+
+    def __len__(self) -> int:
+        return len(self._tokens)
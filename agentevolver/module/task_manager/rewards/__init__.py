@@ -93,6 +93,7 @@ from .binary_judge import LlmAsJudgeBinaryRewardCalculator
 from .binary_judge_gt import LlmAsJudgeBinaryRewardCalculatorWithGT
 from .avg_judge import AvgBinaryGTJudge,AvgLlmJudge
 from .env_grader import EnvGrader
+from .judge_cache import JudgeCache, configure_judge_cache, get_judge_cache
 
 __all__=[
     "LlmAsJudgeRewardCalculatorWithGT",
@@ -102,5 +103,8 @@ __all__=[
     "AvgBinaryGTJudge",
     "AvgLlmJudge",
     "EnvGrader",
+    "JudgeCache",
+    "configure_judge_cache",
+    "get_judge_cache",
     "grader_manager"
 ]
\ No newline at end of file
@@ -1,7 +1,7 @@
 import re
 import threading
 from typing import Any, Optional, Type, cast
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from loguru import logger
 from agentevolver.client.env_client import EnvClient
 from agentevolver.client.llm_client import DashScopeClient
@@ -11,6 +11,7 @@ from agentevolver.module.task_manager.rewards.reward import LlmAsJudgeRewardCalc
 from agentevolver.schema.task import Task
 from agentevolver.schema.trajectory import Trajectory
 from . import grader_manager
+from .judge_cache import get_judge_cache
 
 
 class AvgJudge(RewardCalculator):
@@ -27,17 +28,16 @@ class AvgJudge(RewardCalculator):
         """
         self._judges.append(x)
 
-    def calculate_reward(
-        self, trajectory: Trajectory, env: EnvClient, instance_id: str, max_workers: int = 4
-    ) -> GraderResult:
+    def calculate_reward(self, trajectory: Trajectory, env: EnvClient, instance_id: str) -> GraderResult:
         """
         Calculates the average reward from all added judges by running them in parallel and averaging their scores.
 
+        The judges run on the process-wide judge executor, whose size is the global judge concurrency limit.
+
         Args:
             trajectory (Trajectory): The trajectory for which the reward is calculated.
             env (EnvClient): The environment client.
             instance_id (str): The instance ID.
-            max_workers (int, optional): The maximum number of worker threads. Defaults to 4.
 
         Returns:
             GraderResult: The average score and reason.
@@ -53,10 +53,9 @@ class AvgJudge(RewardCalculator):
                 return 0.0
 
         # run judges in parallel
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(worker, j) for j in self._judges]
-            for f in as_completed(futures):
-                rewards.append(f.result())
+        futures = [get_judge_cache().executor.submit(worker, j) for j in self._judges]
+        for f in as_completed(futures):
+            rewards.append(f.result())
 
         if not rewards:
             return {"score": 0.0, "reason": "No valid rewards"}
@@ -81,7 +80,7 @@ class AvgBinaryGTJudge(AvgJudge):
         for i in range(n):
             self.add_judge(
                 LlmAsJudgeBinaryRewardCalculatorWithGT(
-                    task, model_name="qwq-plus", use_mean_constraint=True
+                    task, model_name="qwq-plus", use_mean_constraint=True, sample_id=i
                 )
             )  # ⭐ Adds a judge with a binary reward calculator and a mean constraint
 
@@ -100,6 +99,6 @@ class AvgLlmJudge(AvgJudge):
         for i in range(n):
             self.add_judge(
                 LlmAsJudgeRewardCalculator(
-                    task, model_name="qwq-plus"
+                    task, model_name="qwq-plus", sample_id=i
                 )
             )  # ⭐ Adds a judge with a standard reward calculator
\ No newline at end of file
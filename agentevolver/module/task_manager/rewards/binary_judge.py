@@ -9,6 +9,7 @@ from agentevolver.schema.task import Task
 from agentevolver.schema.trajectory import Trajectory
 
 from . import grader_manager
+from .judge_cache import cached_judge_response
 
 USER_PROMPT = """### Role
 You are an expert AI agent evaluator. Your job is to judge an agent's performance using the following inputs:
@@ -256,9 +257,7 @@ class LlmAsJudgeBinaryRewardCalculator(RewardCalculator):
         Returns:
             float or tuple: The calculated reward score, and optionally the raw LLM response if `eject_llm_output` is True.
         """
-        response=""
-        for chunk in self._client.chat_stream_with_retry(messages=self.pack_message(trajectory),max_retries=64):
-            response += chunk
+        response = cached_judge_response(self, self.pack_message(trajectory))  # ⭐ Judge identical requests once
         if response:
             import re
             reward_match = re.search(r'<reward>([\d\.]+)</reward>', response.strip())
@@ -9,6 +9,7 @@ from agentevolver.schema.task import Task
 from agentevolver.schema.trajectory import Trajectory
 
 from . import grader_manager
+from .judge_cache import cached_judge_response
 
 USER_PROMPT = """### Role
 You are an expert AI agent evaluator. Your job is to judge an agent's performance using the following inputs:
@@ -139,8 +140,9 @@ class LlmAsJudgeBinaryRewardCalculatorWithGT(RewardCalculator):
     _alpha_slow=0.95
     _update_lock = threading.Lock()
 
-    def __init__(self, task: Task, model_name='qwen3-235b-a22b-instruct-2507', use_mean_constraint=True):
+    def __init__(self, task: Task, model_name='qwen3-235b-a22b-instruct-2507', use_mean_constraint=True, sample_id: int = 0):
         super().__init__(task)
+        self.sample_id = sample_id  # judges with different sample ids are cached separately
 
         self._client = DashScopeClient(model_name=model_name)
         self._client.max_tokens=32768
@@ -221,9 +223,7 @@ class LlmAsJudgeBinaryRewardCalculatorWithGT(RewardCalculator):
         Returns:
             float or tuple: The calculated reward score, or a tuple containing the score and the LLM's response if `eject_llm_output` is True.
         """
-        response = ""
-        for chunk in self._client.chat_stream_with_retry(messages=self.pack_message(trajectory), max_retries=64):
-            response += chunk  # ⭐ Accumulate the response chunks from the LLM
+        response = cached_judge_response(self, self.pack_message(trajectory))  # ⭐ Judge identical requests once
         if response:
             import re
             reward_match = re.search(r'<reward>([\d\.]+)</reward>', response.strip())
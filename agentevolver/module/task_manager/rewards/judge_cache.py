@@ -0,0 +1,186 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+from agentevolver.module.agent_flow.reward_calculator import RewardCalculator
+
+
+class JudgeCache(object):
+    """
+    Process-wide content-addressed cache of LLM judge responses.
+
+    A response is keyed by the judge class, the judge model, the packed messages, the ground truth and the judge's
+    sample id (so that the n independent judges of an `AvgJudge` stay independent). Identical trajectories, e.g. in a
+    GRPO group or rerun after a rollout retry, are judged once: concurrent requests for a key wait for the call
+    already in flight instead of issuing their own. Empty responses (failed calls) are not cached.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_concurrency: int = 16):
+        """
+        Args:
+            max_entries (int, optional): Responses kept, least recently used are evicted first. Defaults to 4096.
+            max_concurrency (int, optional): Judge LLM calls running at the same time in this process. Defaults to 16.
+        """
+        self.max_entries = max_entries
+        self.max_concurrency = max_concurrency
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._call_slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._hits = 0
+        self._in_flight_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(judge: RewardCalculator, model_name: str, messages: list, ground_truth: Optional[str]) -> str:
+        """Content hash identifying a judge request."""
+        content = json.dumps(
+            [type(judge).__qualname__, model_name, messages, ground_truth, getattr(judge, "sample_id", 0)],
+            ensure_ascii=False, sort_keys=True,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Shared pool running the judges of `AvgJudge`s, sized to the concurrency limit."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="judge")
+            return self._executor
+
+    def get_or_call(self, key: str, call: Callable[[], str]) -> str:
+        """
+        Returns the cached response of `key`, or runs `call` (at most `max_concurrency` at once) and caches its result.
+
+        Args:
+            key (str): The `make_key` of the request.
+            call (Callable[[], str]): Queries the judge LLM and returns its response.
+
+        Returns:
+            str: The judge response.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+            waiting = self._in_flight.get(key)
+            if waiting is not None:
+                self._in_flight_hits += 1
+            else:
+                future = self._in_flight[key] = Future()
+                self._misses += 1
+        if waiting is not None:
+            return waiting.result()
+
+        try:
+            with self._call_slots:
+                response = call()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            if response:
+                self._entries[key] = response
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        future.set_result(response)
+        return response
+
+    def stats(self) -> Dict[str, float]:
+        """Cumulative counters since the process started."""
+        with self._lock:
+            return {
+                "judge/cache_hits": self._hits,
+                "judge/cache_in_flight_hits": self._in_flight_hits,
+                "judge/cache_misses": self._misses,
+                "judge/cache_evictions": self._evictions,
+                "judge/cache_size": len(self._entries),
+            }
+
+    def metrics(self, since: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        Cache statistics for trainer logging.
+
+        Args:
+            since (Dict[str, float], optional): A previous `stats()` snapshot; counters are reported relative to it.
+
+        Returns:
+            Dict[str, float]: Hits, in-flight hits, misses (= judge LLM calls), evictions, size and hit rate.
+        """
+        stats = self.stats()
+        if since is not None:
+            for name in ("judge/cache_hits", "judge/cache_in_flight_hits", "judge/cache_misses", "judge/cache_evictions"):
+                stats[name] -= since.get(name, 0)
+        requests = stats["judge/cache_hits"] + stats["judge/cache_in_flight_hits"] + stats["judge/cache_misses"]
+        stats["judge/cache_hit_rate"] = (requests - stats["judge/cache_misses"]) / requests if requests else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Drops the cached responses, calls in flight are not affected."""
+        with self._lock:
+            self._entries.clear()
+
+
+_judge_cache = JudgeCache()
+_judge_cache_lock = threading.Lock()
+
+
+def get_judge_cache() -> JudgeCache:
+    """The process-wide `JudgeCache`."""
+    return _judge_cache
+
+
+def configure_judge_cache(max_entries: int = 4096, max_concurrency: int = 16) -> JudgeCache:
+    """
+    Replaces the process-wide `JudgeCache` if its settings differ, e.g. with values from the trainer config.
+
+    Args:
+        max_entries (int, optional): Responses kept. Defaults to 4096.
+        max_concurrency (int, optional): Judge LLM calls running at the same time. Defaults to 16.
+
+    Returns:
+        JudgeCache: The process-wide cache.
+    """
+    global _judge_cache
+    with _judge_cache_lock:
+        if (_judge_cache.max_entries, _judge_cache.max_concurrency) != (max_entries, max_concurrency):
+            logger.info(f"Judge cache: max_entries={max_entries}, max_concurrency={max_concurrency}")
+            _judge_cache = JudgeCache(max_entries=max_entries, max_concurrency=max_concurrency)
+        return _judge_cache
+
+
+def cached_judge_response(judge: RewardCalculator, messages: list, max_retries: int = 64) -> str:
+    """
+    Streams the response of `judge`'s LLM client to `messages` through the process-wide `JudgeCache`.
+
+    Args:
+        judge (RewardCalculator): An LLM judge with a `_client` (`DashScopeClient`).
+        messages (list): The packed messages.
+        max_retries (int, optional): Retries of the streaming call. Defaults to 64.
+
+    Returns:
+        str: The full judge response, empty if the LLM did not answer.
+    """
+    client = judge._client  # type: ignore[attr-defined]
+
+    def call() -> str:
+        response = ""
+        for chunk in client.chat_stream_with_retry(messages=messages, max_retries=max_retries):
+            response += chunk  # ⭐ Accumulate the response chunks from the LLM
+        return response
+
+    cache = get_judge_cache()
+    key = cache.make_key(judge, client.model_name, messages, judge.task.ground_truth)
+    return cache.get_or_call(key, call)
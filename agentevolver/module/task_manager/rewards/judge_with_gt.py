@@ -6,6 +6,7 @@ from agentevolver.schema.task import Task
 from agentevolver.schema.trajectory import Trajectory
 
 from . import grader_manager
+from .judge_cache import cached_judge_response
 
 USER_PROMPT="""Based on the conversation trajectory above and the provided **Reference Solution**, evaluate the task completion quality using the framework provided.
 
@@ -111,9 +112,7 @@ class LlmAsJudgeRewardCalculatorWithGT(RewardCalculator):
         Returns:
             float or tuple: The calculated score, or a tuple of the score and the LLM's full response if `eject_llm_output` is True.
         """
-        response=""
-        for chunk in self._client.chat_stream_with_retry(messages=self.pack_message(trajectory),max_retries=64):
-            response += chunk  # ⭐ Accumulate the response from the LLM
+        response = cached_judge_response(self, self.pack_message(trajectory))  # ⭐ Judge identical requests once
         if response:
             import re
             reward_match = re.search(r'<reward>([\d\.]+)</reward>', response.strip())
@@ -6,6 +6,7 @@ from agentevolver.schema.task import Task
 from agentevolver.schema.trajectory import Trajectory
 
 from . import grader_manager
+from .judge_cache import cached_judge_response
 
 USER_PROMPT="""Based on the conversation trajectory above, evaluate the task completion quality using the framework provided.
 
@@ -91,15 +92,17 @@ class LlmAsJudgeRewardCalculator(RewardCalculator):
     """
     A naive RewardCalculator that uses LLM as judge.
     """
-    def __init__(self,task:Task, model_name='qwen3-235b-a22b-instruct-2507'):
+    def __init__(self,task:Task, model_name='qwen3-235b-a22b-instruct-2507', sample_id: int = 0):
         """
         Initializes the LlmAsJudgeRewardCalculator with a specific task and model name.
 
         Args:
             task (Task): The task to be evaluated.
             model_name (str, optional): The name of the language model to be used as the judge. Defaults to 'qwen3-235b-a22b-instruct-2507'.
+            sample_id (int, optional): Judges with different sample ids are cached separately, i.e. sampled independently. Defaults to 0.
         """
         super().__init__(task)
+        self.sample_id = sample_id
         self._client=DashScopeClient(model_name=model_name)  # ⭐ Initializes the LLM client with the specified model name
 
     def pack_message(self, trajectory: Trajectory):
@@ -140,9 +143,7 @@ class LlmAsJudgeRewardCalculator(RewardCalculator):
         Returns:
             float or tuple: The normalized score, or a tuple of the score and the LLM's full response if `eject_llm_output` is True.
         """
-        response=""
-        for chunk in self._client.chat_stream_with_retry(messages=self.pack_message(trajectory),max_retries=64):
-            response += chunk  # ⭐ Accumulate chunks of the LLM's response
+        response = cached_judge_response(self, self.pack_message(trajectory))  # ⭐ Judge identical requests once
         if response:
             import re
             reward_match = re.search(r'<reward>([\d\.]+)</reward>', response.strip())
@@ -58,4 +58,9 @@ class TaskExploreStrategy(abc.ABC):
     ) -> list[TaskObjective]:
         pass
 
+    def get_metrics(self) -> dict[str, float]:
+        """Metrics of the strategy (e.g. cache hit rates), reported with the trainer metrics.
+        """
+        return {}
+
 
@@ -29,6 +29,9 @@ class LlmDedupExploreStrategyProps(TypedDict):
     
     temp_db_path: NotRequired[str]
     state_similarity_threshold: float
+    embedding_cache_size: NotRequired[int]
+    embedding_cache_path: NotRequired[str]
+    embedding_batch_size: NotRequired[int]
     
     
 
@@ -49,7 +52,13 @@ class LlmDedupSamplingExploreStrategy(TaskExploreStrategy):
         self._temp_db_path=kwargs.get("temp_db_path", "./.temp_vec_db")
         self._state_similarity_threshold=kwargs.get("state_similarity_threshold")
         
-        self._state_recorder=StateRecorder(similarity_threshold=self._state_similarity_threshold,chroma_db_path=self._temp_db_path)
+        self._state_recorder=StateRecorder(
+            similarity_threshold=self._state_similarity_threshold,
+            chroma_db_path=self._temp_db_path,
+            embedding_cache_size=kwargs.get("embedding_cache_size", 10000),
+            embedding_cache_path=kwargs.get("embedding_cache_path", None),
+            embedding_batch_size=kwargs.get("embedding_batch_size", 10),
+        )
         
     
     def explore(self, task: Task, data_id: str, rollout_id: str) -> list[Trajectory]:
@@ -81,8 +90,11 @@ class LlmDedupSamplingExploreStrategy(TaskExploreStrategy):
             system_prompt=get_agent_interaction_system_prompt(task),
             agent_flow=agent_flow,
         )
-
         return [traj]
+
+    def get_metrics(self) -> dict[str, float]:
+        """embedding cache hit rate and size of the state recorder"""
+        return self._state_recorder.get_metrics()
     
     def summarize(self, task: Task, trajectory: Trajectory) -> list[TaskObjective]:
         llm_fn = self._get_llm_chat_fn()
@@ -141,6 +141,7 @@ Now decide the single best next action.""".strip()
             
             # useless: for tool role
             assert len(env_messages)>0, "env returns empty messages"
+            state_records = []
             for env_message in env_messages:
                 if env_message["role"] == "tool":
                     env_message = cast(dict, convert_tool_to_user_message(env_message, format="qwen"))
@@ -157,7 +158,8 @@ Now decide the single best next action.""".strip()
                 trajectory.steps.append(sanitize_env_state(env_message))
                 # log state
                 # use the trajectory that has no last user message as key
-                self._state_recorder.add_state(old_trajectory, llm_output['content'], env_message['content'])
+                state_records.append((old_trajectory, llm_output['content'], env_message['content']))
+            self._state_recorder.add_states(state_records) # the shared key is embedded once for all messages
             trajectory.is_terminated = env_output["is_terminated"]
             
             if trajectory.is_terminated:
@@ -1,24 +1,31 @@
 import os
+import threading
 import uuid
 from typing import Any, Optional, Sequence
 import chromadb
 from chromadb.config import Settings
 from loguru import logger
 
+from agentevolver.client.embedding_cache import EmbeddingCache
 from agentevolver.client.embedding_client import OpenAIEmbeddingClient
 from agentevolver.schema.trajectory import Trajectory
 
 MAX_INPUT_LEN=8192
 
+
 class EmbeddingClient:
     def __init__(self, similarity_threshold: float, base_url: str = 'https://dashscope.aliyuncs.com/compatible-mode/v1', 
                  api_key: Optional[str] = None, model: str = "text-embedding-v4",
-                 chroma_db_path: str = "./chroma_db", collection_name: str = "trajectories"):
+                 chroma_db_path: str = "./chroma_db", collection_name: str = "trajectories",
+                 embedding_cache_size: int = 10000, embedding_cache_path: Optional[str] = None,
+                 embedding_batch_size: int = 10):
         api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
         assert api_key is not None, "DASHSCOPE_API_KEY is required"
         
         self._client = OpenAIEmbeddingClient(api_key=api_key, base_url=base_url, model_name=model)
         self.similarity_threshold = similarity_threshold
+        self._cache = EmbeddingCache(model=model, max_size=embedding_cache_size, cache_path=embedding_cache_path)
+        self._embedding_batch_size = embedding_batch_size
         
         self._chroma_client = chromadb.PersistentClient(
             path=chroma_db_path,
@@ -33,11 +40,12 @@ class EmbeddingClient:
         self._id_mapping: dict[int, str] = {}
         self._reverse_id_mapping: dict[str, int] = {}
     
-    def add(self, text: str, id: int):
+    def add(self, text: str, id: int, embedding: Optional[list[float]] = None):
         """
-        Add text and ID to ChromaDB
+        Add text and ID to ChromaDB. `embedding` can be passed if the caller has already embedded text
         """
-        embedding = self._client.get_single_embedding(text)
+        if embedding is None:
+            embedding = self.embed(text)
         
         chroma_id = f"doc_{id}_{uuid.uuid4().hex[:8]}"
         
@@ -51,32 +59,40 @@ class EmbeddingClient:
             metadatas=[{"original_id": id, "text_length": len(text)}]
         )
     
-    def find_by_text(self, text: str) -> Optional[int]:
+    def find_by_text(self, text: str, embedding: Optional[list[float]] = None) -> Optional[int]:
         """
         Find a similar text in ChromaDB, return the corresponding ID
         """
         if self._collection.count() == 0:
             return None
         
-        query_embedding = self._client.get_single_embedding(text)
-        
+        query_embedding = embedding if embedding is not None else self.embed(text)
+        return self.find_by_embeddings([query_embedding])[0]
+
+    def find_by_embeddings(self, embeddings: Sequence[list[float]]) -> list[Optional[int]]:
+        """
+        Find the most similar stored text of each embedding with one ChromaDB query, return the corresponding IDs
+        """
+        if len(embeddings) == 0 or self._collection.count() == 0:
+            return [None] * len(embeddings)
+
         results = self._collection.query(
-            query_embeddings=[query_embedding],
+            query_embeddings=list(embeddings),
             n_results=1,  # only the top result
-            include=["documents", "metadatas", "distances"]
+            include=["distances"]
         )
-        
-        if not results["ids"] or not results["ids"][0]:
-            return None
-        
-        distance = results["distances"][0][0] # type: ignore
-        similarity = 1 - distance
-        
-        if similarity >= self.similarity_threshold:
-            chroma_id = results["ids"][0][0]
-            return self._reverse_id_mapping.get(chroma_id)
-        else:
-            return None
+
+        found: list[Optional[int]] = []
+        for ids, distances in zip(results["ids"], results["distances"]): # type: ignore
+            if not ids:
+                found.append(None)
+                continue
+            similarity = 1 - distances[0]
+            if similarity >= self.similarity_threshold:
+                found.append(self._reverse_id_mapping.get(ids[0]))
+            else:
+                found.append(None)
+        return found
     
     def find_top_k_by_text(self, text: str, k: int = 5) -> list[tuple[int, float, str]]:
         """
@@ -85,7 +101,7 @@ class EmbeddingClient:
         if self._collection.count() == 0:
             return []
         
-        query_embedding = self._client.get_single_embedding(text)
+        query_embedding = self.embed(text)
         
         results = self._collection.query(
             query_embeddings=[query_embedding],
@@ -117,6 +133,30 @@ class EmbeddingClient:
             res.extend(self._client.get_multiple_embeddings(texts[i:i+bs]))
         
         return res
+
+    def embed(self, text: str) -> list[float]:
+        """
+        Get the embedding of text through the cache
+        """
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> list[list[float]]:
+        """
+        Get the embeddings of texts through the cache. Only distinct texts that miss the cache are sent
+        to the API, in batches of `embedding_batch_size`
+        """
+        res: list[Optional[list[float]]] = [self._cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, res) if vector is None))
+        if missing:
+            fetched = dict(zip(missing, self._embedding(missing, bs=self._embedding_batch_size)))
+            for text, vector in fetched.items():
+                self._cache.put(text, vector)
+            res = [vector if vector is not None else fetched[text] for text, vector in zip(texts, res)]
+        return res # type: ignore
+
+    def get_cache_metrics(self) -> dict[str, float]:
+        """get the hit rate and size of the embedding cache"""
+        return self._cache.get_metrics()
     
     def get_all_stored_texts(self) -> dict[int, str]:
         """
@@ -196,15 +236,20 @@ def pack_trajectory(trajectory: Trajectory) -> str:
 
 
 class StateRecorder:
-    def __init__(self, similarity_threshold: float, chroma_db_path: str = "./chroma_db", collection_name: str = "trajectories"):
+    def __init__(self, similarity_threshold: float, chroma_db_path: str = "./chroma_db", collection_name: str = "trajectories",
+                 embedding_cache_size: int = 10000, embedding_cache_path: Optional[str] = None, embedding_batch_size: int = 10):
         self._client = EmbeddingClient(
             similarity_threshold=similarity_threshold,
             chroma_db_path=chroma_db_path,
-            collection_name=collection_name
+            collection_name=collection_name,
+            embedding_cache_size=embedding_cache_size,
+            embedding_cache_path=embedding_cache_path,
+            embedding_batch_size=embedding_batch_size,
         )
         
         self._mp: dict[int, list[tuple[str, str]]] = {}
         self._idx = 0
+        self._lock = threading.Lock()
     
     def add_state(self, trajectory: Trajectory, action: str, observation: str):
         """
@@ -215,15 +260,28 @@ class StateRecorder:
             action (str): action
             observation (str): observation
         """
-        key = pack_trajectory(trajectory)
-        id = self._client.find_by_text(key)
-        if id is None:
-            id = self._idx
-            self._mp[id] = []
-            self._client.add(key, id)
-            self._idx += 1
-        
-        self._mp[id].append((action, observation))
+        self.add_states([(trajectory, action, observation)])
+
+    def add_states(self, records: Sequence[tuple[Trajectory, str, str]]):
+        """
+        add state records in bulk, all keys are embedded with batched requests
+
+        Args:
+            records (Sequence[tuple[Trajectory, str, str]]): list of (trajectory, action, observation)
+        """
+        keys = [pack_trajectory(trajectory) for trajectory, _, _ in records]
+        embeddings = self._client.embed_many(keys)
+        # lookup and insert stay sequential, so records of the same state in one batch share an id
+        with self._lock:
+            for key, embedding, (_, action, observation) in zip(keys, embeddings, records):
+                id = self._client.find_by_text(key, embedding=embedding)
+                if id is None:
+                    id = self._idx
+                    self._mp[id] = []
+                    self._client.add(key, id, embedding=embedding)
+                    self._idx += 1
+
+                self._mp[id].append((action, observation))
     
     def get_state(self, trajectory: Trajectory) -> list[tuple[str, str]]:
         """
@@ -235,13 +293,34 @@ class StateRecorder:
         Returns:
             list[tuple[str, str]]: list of (action, observation)
         """
-        key = pack_trajectory(trajectory)
-        id = self._client.find_by_text(key)
-        if id is None:
-            return []
-        else:
-            logger.debug(f"[embedding] key hit, similar state detected!, #state={len(self._mp)}")
-            return self._mp[id]
+        return self.query_states([trajectory])[0]
+
+    def query_states(self, trajectories: Sequence[Trajectory]) -> list[list[tuple[str, str]]]:
+        """
+        get the state records of several trajectories with batched embedding and one vector query
+
+        Args:
+            trajectories (Sequence[Trajectory]): trajectories
+
+        Returns:
+            list[list[tuple[str, str]]]: list of (action, observation) of each trajectory
+        """
+        keys = [pack_trajectory(trajectory) for trajectory in trajectories]
+        embeddings = self._client.embed_many(keys)
+        with self._lock:
+            ids = self._client.find_by_embeddings(embeddings)
+            res = []
+            for id in ids:
+                if id is None:
+                    res.append([])
+                else:
+                    logger.debug(f"[embedding] key hit, similar state detected!, #state={len(self._mp)}")
+                    res.append(list(self._mp[id]))
+            return res
+
+    def get_metrics(self) -> dict[str, float]:
+        """get the embedding cache metrics and the number of recorded states"""
+        return {**self._client.get_cache_metrics(), "state_recorder/num_states": float(len(self._mp))}
     
     def get_similar_states(self, trajectory: Trajectory, k: int = 5) -> list[tuple[int, float, list[tuple[str, str]]]]:
         """
@@ -1,5 +1,5 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import copy
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import functools
 import hashlib
 import json
@@ -7,10 +7,10 @@ import os
 import pickle
 import random
 import threading
-import time
 from typing import (
     Callable,
     Iterable,
+    Iterator,
     NotRequired,
     Optional,
     Sequence,
@@ -33,9 +33,10 @@ from agentevolver.module.task_manager.adapter import OnflyRlDataset, to_rl_datas
 from agentevolver.module.task_manager.data_mixture import MixtureStrategy, OriginalOnlyStrategy
 from agentevolver.module.task_manager.filters.llm_filter import LlmFilter
 from agentevolver.module.task_manager.strategies import TaskExploreStrategy
-from agentevolver.module.task_manager.filters.filters import NaiveTaskPostFilter, TaskPostFilter
+from agentevolver.module.task_manager.filters.filters import MinHashTaskPostFilter, TaskPostFilter
 
 from agentevolver.module.task_manager.base import LlmClient, TaskObjectiveRetrieval
+from agentevolver.module.task_manager.checkpoint import GenerationCheckpoint, work_item_hash
 from agentevolver.module.task_manager.strategies.random import LlmRandomSamplingExploreStrategy
 from agentevolver.module.task_manager.env_profiles import EnvProfile
 from agentevolver.schema.task import Task, TaskObjective
@@ -93,7 +94,7 @@ class TaskManager(object):
         self._num_exploration_threads = kwargs["num_explore_threads"] or 10
         self._n = kwargs["n"]
 
-        self._realtime_filters: list[TaskPostFilter] = [NaiveTaskPostFilter()]
+        self._realtime_filters: list[TaskPostFilter] = [MinHashTaskPostFilter(threshold=config.task_manager.get("dedup_threshold", 0.8))]
         self._post_filter: list[TaskPostFilter] = [LlmFilter(env_service_url,llm_client,self._num_exploration_threads,tokenizer=tokenizer,config=config)]  # ⭐ Initialize the post filter
 
         self._tasks: list[Task]=[]
@@ -188,99 +189,119 @@ class TaskManager(object):
         combined_str = "|".join(task_strs)
         return hashlib.md5(combined_str.encode()).hexdigest()  # ⭐ Compute the MD5 hash of the combined string
 
-    def generate_task(self, tasks: Sequence[Task], *, show_progress=False, resume_file: Optional[str] = None) -> list[TaskObjective]:
+    def generate_task(self, tasks: Sequence[Task], *, show_progress=False, resume_file: Optional[str] = None) -> Iterator[TaskObjective]:
         """
         Generates task objectives by exploring and summarizing tasks, with support for resuming from a checkpoint and applying filters.
 
+        Objectives are yielded as soon as their exploration finished and they passed the realtime and post filters,
+        so consumers do not wait for the whole pool. Every finished exploration is appended to a JSONL checkpoint
+        (see `GenerationCheckpoint`); objectives recorded there are yielded first when resuming.
+
         Args:
             tasks (Sequence[Task]): A sequence of Task objects.
             show_progress (bool): Whether to show a progress bar.
             resume_file (Optional[str]): The path to the resume file. If not provided, a default file is used.
 
-        Returns:
-            list[TaskObjective]: A list of generated TaskObjective objects.
+        Yields:
+            TaskObjective: The generated objectives, in completion order.
         """
         if resume_file is None:
-            resume_file = '.generate_task.checkpoint.json'
-
-        # Compute hash of current tasks
-        current_tasks_hash = self._compute_tasks_hash(tasks)
-        # Load from checkpoint if resume_file exists
-        res = []
-        processed_indices = set()
-        if resume_file and os.path.exists(resume_file):
-            try:
-                with open(resume_file, 'r') as f:
-                    checkpoint = json.load(f)
-                    # Check if tasks hash matches
-                    if checkpoint['tasks_hash'] != current_tasks_hash:
-                        logger.warning(f"Tasks hash mismatch. Expected: {current_tasks_hash}, got: {checkpoint['tasks_hash']}. Removing checkpoint.")
-                        os.remove(resume_file)
-                    else:
-                        res = [TaskObjective.parse_raw(json.dumps(obj)) for obj in checkpoint.get('results', [])]
-                        processed_indices = {int(i) for i in checkpoint.get('processed_indices', [])}
-                        logger.info(f"Resumed from checkpoint: {len(res)} results loaded, {len(processed_indices)} batches processed")
-            except Exception as e:
-                logger.warning(f"Failed to load checkpoint: {e}, starting from scratch")
-
-        # we roll n times for each task
-        task_q = list(copy.copy(tasks)) * self._n
-
-        # in each batch, we explore all different tasks or max_threads tasks, in order to avoid generating same task.
-        parallel_num = min(self._num_exploration_threads, len(tasks))
-        with ThreadPoolExecutor(max_workers=self._num_exploration_threads) as pool:
-            batch_indices = list(range(0, len(task_q), parallel_num))
-            for idx, i in enumerate(tqdm(batch_indices, desc="generating tasks", disable=not show_progress)):
-                # Skip already processed batches when resuming
-                if idx in processed_indices:
-                    continue
-
-                futures = [
-                    pool.submit(self._exlore_and_summarize, task, data_id, rollout_id)
-                    for task, data_id, rollout_id in zip(
-                        task_q[i : i + parallel_num],
-                        ["unknown"] * parallel_num,
-                        ["unknown"] * parallel_num,
-                    )
-                ]
-                task_objectives = sum([future.result() for future in futures], [])  # ⭐ Collect results from all futures
-                res.extend(task_objectives)
-                # realtime filter
-                res = functools.reduce(lambda x, f: f.filter(x), self._realtime_filters, res)
-                self._old_retrival.reset()
-                for j in res:
+            resume_file = '.generate_task.checkpoint.jsonl'
+        checkpoint = GenerationCheckpoint(resume_file, self._compute_tasks_hash(tasks)) if resume_file else None
+
+        # streaming filters only see each new objective once, against the ones kept so far
+        for f in self._realtime_filters:
+            f.reset()
+        self._old_retrival.reset()
+        num_before_filter, num_after_filter = 0, 0
+        if checkpoint is not None:
+            for record in checkpoint.records:
+                objectives = functools.reduce(lambda x, f: f.filter_incremental(x), self._realtime_filters, GenerationCheckpoint.parse(record, "objectives"))
+                for j in objectives:
                     self._old_retrival.add_objective(j)
+                results = GenerationCheckpoint.parse(record, "results")
+                num_before_filter, num_after_filter = num_before_filter + len(objectives), num_after_filter + len(results)
+                yield from results
+
+        # we roll n times for each task. A task is explored by one thread at a time, so each exploration sees the
+        # objectives already generated from it (as the batches of distinct tasks did before).
+        work = deque(
+            (i, k) for k in range(self._n) for i in range(len(tasks))
+            if checkpoint is None or work_item_hash(tasks[i], i, k) not in checkpoint.processed
+        )
+        parallel_num = min(self._num_exploration_threads, len(tasks))
+        progress = tqdm(total=len(tasks) * self._n, initial=len(tasks) * self._n - len(work), desc="generating tasks", disable=not show_progress)
+
+        explore_pool = ThreadPoolExecutor(max_workers=self._num_exploration_threads)
+        # each objective is post-filtered on its own, so the post filters' env rollouts keep all threads busy
+        # without waiting for a batch to fill up
+        post_filter_pool = ThreadPoolExecutor(max_workers=self._num_exploration_threads)
+        in_flight: dict[Future, tuple] = {}
+        exploring: set[str] = set()
+        post_filtering: dict[tuple, list] = {}  # (i, k) -> [objectives, results of each objective, #pending]
+        try:
+            while work or in_flight:
+                deferred = []
+                while work and len(exploring) < parallel_num:
+                    i, k = work.popleft()
+                    if tasks[i].task_id in exploring:
+                        deferred.append((i, k))
+                        continue
+                    exploring.add(tasks[i].task_id)
+                    future = explore_pool.submit(self._exlore_and_summarize, tasks[i], "unknown", "unknown")
+                    in_flight[future] = ("explore", i, k, None)
+                work.extendleft(reversed(deferred))
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                finished = []
+                for future in done:
+                    stage, i, k, index = in_flight.pop(future)
+                    if stage == "explore":
+                        exploring.discard(tasks[i].task_id)
+                        # realtime filter
+                        objectives = functools.reduce(lambda x, f: f.filter_incremental(x), self._realtime_filters, future.result())
+                        for j in objectives:
+                            self._old_retrival.add_objective(j)
+                        post_filtering[(i, k)] = [objectives, [[] for _ in objectives], len(objectives)]
+                        for index, objective in enumerate(objectives):
+                            post_future = post_filter_pool.submit(
+                                functools.reduce, lambda x, f: f.filter_incremental(x), self._post_filter, [objective]
+                            )  # ⭐ Apply post filters to the new objectives while exploration goes on
+                            in_flight[post_future] = ("post_filter", i, k, index)
+                        if not objectives:
+                            finished.append((i, k))
+                    else:
+                        item = post_filtering[(i, k)]
+                        item[1][index] = future.result()
+                        item[2] -= 1
+                        if item[2] == 0:
+                            finished.append((i, k))
+
+                for i, k in finished:
+                    objectives, results, _ = post_filtering.pop((i, k))
+                    results = sum(results, [])
+                    if checkpoint is not None:
+                        checkpoint.append(work_item_hash(tasks[i], i, k), objectives, results)
+                    num_before_filter, num_after_filter = num_before_filter + len(objectives), num_after_filter + len(results)
+                    progress.update(1)
+                    yield from results
+        finally:
+            explore_pool.shutdown(wait=False, cancel_futures=True)
+            post_filter_pool.shutdown(wait=False, cancel_futures=True)
+            progress.close()
+            if checkpoint is not None:
+                checkpoint.close()
+        logger.info(f"finish post filter: #before={num_before_filter}, #after={num_after_filter}")
+
+
+    def get_metrics(self) -> dict[str, float]:
+        """
+        Returns the metrics of the exploration strategy, cumulative over all explorations so far.
 
-                # Mark this batch as processed
-                processed_indices.add(idx)
-
-                # Save checkpoint
-                if resume_file:
-                    try:
-                        checkpoint_data = {
-                            'results': [obj.dict() for obj in res],
-                            'processed_indices': list(processed_indices),
-                            'total_batches': len(batch_indices),
-                            'tasks_hash': current_tasks_hash,
-                            'timestamp': time.time()
-                        }
-                        with open(resume_file, 'w') as f:
-                            json.dump(checkpoint_data, f, indent=2)
-                    except Exception as e:
-                        logger.warning(f"Failed to save checkpoint: {e}")
-
-
-
-        res = functools.reduce(lambda x, f: f.filter(x), self._realtime_filters, res)
-        # post filter
-        logger.info("running post filter on generated tasks")
-        cnt_before_filter=len(res)
-        res = functools.reduce(lambda x, f: f.filter(x), self._post_filter, res)  # ⭐ Apply post filters to the results
-        cnt_after_filter=len(res)
-        logger.info(f"finish post filter: #before={cnt_before_filter}, #after={cnt_after_filter}")
-        random.shuffle(res)  # ⭐ Shuffle the final list of task objectives
-
-        return res
+        Returns:
+            dict[str, float]: The strategy metrics, empty if the strategy reports none.
+        """
+        return self._exploration_strategy.get_metrics()
 
 
     def _exlore_and_summarize(self,task:Task,data_id:str,rollout_id:str)->list[TaskObjective]:
@@ -497,10 +518,11 @@ class FullDataset(Dataset):
 
         This method is used to refresh the task objectives and ensure they are up-to-date with the current configuration.
         """
-        self._synthetic_objectives = self._manager.generate_task([x.task for x in self._tasks], show_progress=True)
-        logger.info("patching grader config to all synthetic data")
-        for item in self._synthetic_objectives:
+        self._synthetic_objectives = []
+        for item in self._manager.generate_task([x.task for x in self._tasks], show_progress=True):
             item.task.evaluator=self._reward_config["synthetic_grader"]  # ⭐ Update the evaluator for each task
+            self._synthetic_objectives.append(item)
+        random.shuffle(self._synthetic_objectives)
         
 
     def get_statistics(self) -> dict:
@@ -579,10 +601,11 @@ class AutoReloadDataset(IterableDataset):
             if len(delta) == self._bs:
                 break
 
-        ls = self._manager.generate_task(delta)
+        ls = list(self._manager.generate_task(delta))
         while len(ls) < self._bs * self._manager._n:
             logger.debug("failed to generate enough tasks, retrying")
-            ls = self._manager.generate_task(delta)
+            ls = list(self._manager.generate_task(delta))
+        random.shuffle(ls)
 
         self._dataset.append_dataset(to_rl_dataset(ls, self._tokenizer, self._config,self._processor))
         return self._dataset.num_rest_data
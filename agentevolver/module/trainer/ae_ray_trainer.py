@@ -65,6 +65,8 @@ from agentevolver.schema.trajectory import Trajectory
 from agentevolver.utils.tracking import ValidationGenerationsLogger
 
 from agentevolver.module.adv_processor.adca_grpo_pipeline import apply_adca_grpo
+from agentevolver.module.adv_processor.group_stats import group_mean_std, index_to_group_ids
+from agentevolver.module.trainer.streaming_rollout import StreamingLogProbPipeline
 
 from agentevolver.module.exp_manager.exp_manager import ExperienceManager
 
@@ -183,35 +185,20 @@ def compute_grpo_outcome_advantage(
     """
     scores = token_level_rewards.sum(dim=-1)
 
-    id2score = defaultdict(list)
-    id2mean = {}
-    id2std = {}
-
     if scores.dim()!=1:
         logger.warning("scores.dim()!=1")
 
     with torch.no_grad():
-        bsz = scores.shape[0]
-        
-        for i in range(bsz):
-            id2score[index[i]].append(scores[i])
-        for idx in id2score:
-            if len(id2score[idx]) == 1:
-                id2mean[idx] = torch.tensor(0.0)
-                id2std[idx] = torch.tensor(1.0)
-            elif len(id2score[idx]) > 1:
-                id2mean[idx] = torch.mean(torch.tensor(id2score[idx]))
-                id2std[idx] = torch.std(torch.tensor([id2score[idx]]))
-            else:
-                raise ValueError(f"no score in prompt index: {idx}")
-        for i in range(bsz):
-            if norm_adv_by_std_in_grpo:
-                scores[i] = (scores[i] - id2mean[index[i]]) / (id2std[index[i]] + epsilon)
-            else:
-                scores[i] = scores[i] - id2mean[index[i]]
-                # no std
-                # if llm judge output similar rewards for undistinguishable samples, we may want to reduce its weight according to the batch std
-                # scores[i] = scores[i] / (batch_std + epsilon)
+        # map uids to integer groups once, then reduce every group on the tensor device
+        group_ids = index_to_group_ids(index, device=scores.device)
+        group_mean, group_std, _ = group_mean_std(scores, group_ids)
+        if norm_adv_by_std_in_grpo:
+            scores = (scores - group_mean[group_ids]) / (group_std[group_ids] + epsilon)
+        else:
+            scores = scores - group_mean[group_ids]
+            # no std
+            # if llm judge output similar rewards for undistinguishable samples, we may want to reduce its weight according to the batch std
+            # scores[i] = scores[i] / (batch_std + epsilon)
         scores = scores.unsqueeze(-1) * response_mask
 
     return scores, scores
@@ -1026,6 +1013,47 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
         return
 
 
+    def _create_streaming_pipeline(self) -> Optional[StreamingLogProbPipeline]:
+        """
+        Creates the rollout/log-prob overlap pipeline if `actor_rollout_ref.rollout.stream_log_prob` is enabled.
+
+        Streaming needs the old (and ref) log-probs to run on workers that are not serving rollout. With the hybrid
+        engine, vLLM drives the actor workers while it is awake: a concurrent FSDP forward on them would queue behind
+        generation, or interleave its collectives with vLLM's and deadlock NCCL, next to an engine that holds most of
+        the GPU memory.
+
+        Returns:
+            Optional[StreamingLogProbPipeline]: The pipeline, or None when streaming is disabled.
+
+        Raises:
+            ValueError: If streaming is enabled while the actor worker group is colocated with rollout.
+        """
+        rollout_config = self.config.actor_rollout_ref.rollout
+        if not rollout_config.get("stream_log_prob", False):
+            return None
+        if self.hybrid_engine:
+            raise ValueError("actor_rollout_ref.rollout.stream_log_prob needs old/ref log-probs on a worker group that is "
+                             "not colocated with rollout, but the hybrid engine runs them on the rollout workers; "
+                             "set stream_log_prob=false")
+        compute_ref_log_prob, ref_divisor = None, 1
+        if self.use_reference_policy:
+            ref_wg = self.actor_rollout_wg if self.ref_in_actor else self.ref_policy_wg
+            compute_ref_log_prob, ref_divisor = ref_wg.compute_ref_log_prob, ref_wg.world_size
+        return StreamingLogProbPipeline(
+            env_manager=self.env_manager,
+            compute_log_prob=self.actor_rollout_wg.compute_log_prob,
+            log_prob_divisor=self.actor_rollout_wg.world_size,
+            compute_ref_log_prob=compute_ref_log_prob,
+            ref_divisor=ref_divisor,
+            min_groups=rollout_config.get("stream_min_groups", 4),
+        )
+
+    def close(self):
+        """
+        Stops the background threads of the trainer: the experience summarizer and prefetch pool.
+        """
+        self.exp_manager.close()
+
     def fit(self):
         """
         The training loop of PPO.
@@ -1108,6 +1136,7 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
 
                 with _timer("step", timing_raw):
                     # generate a batch
+                    streaming_pipeline = None
                     with _timer("gen", timing_raw):
                         trajectories: List[Trajectory] = []
                         if not self.async_rollout_mode:
@@ -1131,11 +1160,26 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
 
                             # TODO enable tracing by jinli 0619
                             print("=" * 10 + "start fit rollout" + "=" * 10)
-                            trajectories = self.env_manager.rollout(tasks, task_exp_configs, mode="sample", epoch=f"train.{epoch}.{i}")  # ⭐ Generate trajectories using the environment manager
-                            assert len(trajectories)>0, "{len(trajectories)=}?"
-                            print("=" * 10 + "end fit rollout" + "=" * 10)
-                            gen_batch_output = self.env_manager.to_dataproto(trajectories)
+                            streaming_pipeline = self._create_streaming_pipeline()
+                            if streaming_pipeline is None:
+                                trajectories = self.env_manager.rollout(tasks, task_exp_configs, mode="sample", epoch=f"train.{epoch}.{i}")  # ⭐ Generate trajectories using the environment manager
+                                assert len(trajectories)>0, "{len(trajectories)=}?"
+                                print("=" * 10 + "end fit rollout" + "=" * 10)
+                                gen_batch_output = self.env_manager.to_dataproto(trajectories)
+                            else:
+                                # ⭐ complete GRPO groups go to old_log_prob/ref while the other groups are still rolling out
+                                streaming_pipeline.start()
+                                trajectories = self.env_manager.rollout(tasks, task_exp_configs, mode="sample", epoch=f"train.{epoch}.{i}",
+                                                                        on_group_complete=streaming_pipeline.submit_group)
+                                assert len(trajectories)>0, "{len(trajectories)=}?"
+                                print("=" * 10 + "end fit rollout" + "=" * 10)
+                                streaming_pipeline.finish()
+                                samples = sorted(streaming_pipeline.samples, key=lambda x: (int(x.data_id), int(x.rollout_id), x.minor_index_id))
+                                samples = self.env_manager.trim_samples_to_world_size(samples)
+                                gen_batch_output = self.env_manager.samples_to_dataproto(samples)
+                                streaming_pipeline.attach(gen_batch_output, samples)
                             
+                            metrics.update(self.env_manager.last_rollout_metrics)
                             # update metrics about experience manager
                             exp_mask_ratio = gen_batch_output.batch["exp_mask"].float().mean()
                             metrics.update({"exp_mask_ratio": exp_mask_ratio.detach().item()})
@@ -1154,6 +1198,9 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
                             # gen_batch_output = self.async_rollout_manager.generate_sequences(gen_batch)
                             self.async_rollout_manager.sleep()
 
+                    if streaming_pipeline is not None:
+                        metrics.update(streaming_pipeline.get_metrics(gen_time=timing_raw["gen"]))
+
                     if self.config.algorithm.adv_estimator == AdvantageEstimator.REMAX:
                         with _timer("gen_max", timing_raw):
                             gen_baseline_batch = deepcopy(gen_batch)
@@ -1181,7 +1228,7 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
                     batch.batch["response_mask"] = compute_response_mask(batch)  # ⭐ Compute and add response mask to the batch
 
                     # update experience pool
-                    summary_task = self.exp_manager.submit_summary_task(trajectories, self.global_steps)
+                    self.exp_manager.submit_summary_task(trajectories, self.global_steps)
 
 
                     # balance the number of valid tokens on each dp rank.
@@ -1206,15 +1253,17 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
 
                     # recompute old_log_probs
                     with _timer("old_log_prob", timing_raw):
-                        old_log_prob = self.actor_rollout_wg.compute_log_prob(batch)  # ⭐ Compute old log probabilities
-                        entropys = old_log_prob.batch["entropys"]
+                        if "old_log_probs" in batch.batch.keys():
+                            entropys = batch.batch.pop("entropys")  # already computed during rollout (streaming mode)
+                        else:
+                            old_log_prob = self.actor_rollout_wg.compute_log_prob(batch)  # ⭐ Compute old log probabilities
+                            entropys = old_log_prob.batch.pop("entropys")
+                            batch = batch.union(old_log_prob)
                         response_masks = batch.batch["response_mask"]
                         loss_agg_mode = self.config.actor_rollout_ref.actor.loss_agg_mode
                         entropy_loss = agg_loss(loss_mat=entropys, loss_mask=response_masks, loss_agg_mode=loss_agg_mode)
                         old_log_prob_metrics = {"actor/entropy_loss": entropy_loss.detach().item()}
                         metrics.update(old_log_prob_metrics)
-                        old_log_prob.batch.pop("entropys")
-                        batch = batch.union(old_log_prob)
 
                         if "rollout_log_probs" in batch.batch.keys():
                             # TODO: we may want to add diff of probs too.
@@ -1240,7 +1289,7 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
                                 }
                             )
 
-                    if self.use_reference_policy:
+                    if self.use_reference_policy and "ref_log_prob" not in batch.batch.keys():
                         # compute reference log_prob
                         with _timer("ref", timing_raw):
                             if not self.ref_in_actor:
@@ -1335,10 +1384,9 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
                         actor_output_metrics = reduce_metrics(actor_output.meta_info["metrics"])
                         metrics.update(actor_output_metrics)
                     
-                    # collect summary tasks
-                    if summary_task is not None:
-                        time_cost = self.exp_manager.collect_summary_result(summary_task)
-                        metrics.update({"exp_manager/summary": time_cost})
+                    # summarization runs in the background, only report its state
+                    if self.config.exp_manager.reme.enable_summarizer:
+                        metrics.update(self.exp_manager.get_summary_metrics())
 
 
                     # Log rollout generations if enabled
@@ -1389,6 +1437,8 @@ class AgentEvolverRayPPOTrainer(RayPPOTrainer):
                         "training/num_term_traj": num_term_traj
                     }
                 )
+                # task exploration metrics, e.g. the embedding cache of the dedup strategy
+                metrics.update(self.train_task_manager.get_metrics())
                 # collect metrics
                 metrics.update(compute_data_metrics(batch=batch, use_critic=self.use_critic))
                 metrics.update(compute_timing_metrics(batch=batch, timing_raw=timing_raw))
@@ -0,0 +1,188 @@
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+import torch
+from loguru import logger
+from tensordict import TensorDict
+from verl import DataProto
+from verl.protocol import pad_dataproto_to_divisor, unpad_dataproto
+
+from agentevolver.module.env_manager.collate import collate_samples
+from agentevolver.schema.trajectory import Sample, Trajectory
+
+_DONE = object()
+
+
+class StreamingLogProbPipeline:
+    """
+    Overlaps env rollout with old/ref log-prob computation.
+
+    `ParallelEnvManager.rollout` hands over every complete GRPO group (all `rollout_n` siblings of a data_id)
+    through `submit_group`. A background thread tokenizes the groups, collates them into micro-batches of at
+    least `min_groups` groups and sends them to the actor (and reference) workers while the remaining groups
+    are still rolling out. `attach` then scatters the per-sample results into the final, fully collated batch.
+    The log-prob workers must not serve rollout at the same time; the trainer refuses it with the hybrid engine.
+    """
+
+    def __init__(self, env_manager, compute_log_prob: Callable[[DataProto], DataProto], log_prob_divisor: int,
+                 compute_ref_log_prob: Optional[Callable[[DataProto], DataProto]] = None, ref_divisor: int = 1,
+                 min_groups: int = 1):
+        """
+        Initializes the pipeline.
+
+        Args:
+            env_manager (ParallelEnvManager): Used to tokenize trajectories into samples.
+            compute_log_prob (Callable): `actor_rollout_wg.compute_log_prob`.
+            log_prob_divisor (int): World size of the actor worker group.
+            compute_ref_log_prob (Callable, optional): Reference log-prob function, None without reference policy.
+            ref_divisor (int, optional): World size of the reference worker group. Defaults to 1.
+            min_groups (int, optional): Minimum number of groups per micro-batch. Defaults to 1.
+        """
+        self.env_manager = env_manager
+        self.compute_log_prob = compute_log_prob
+        self.log_prob_divisor = log_prob_divisor
+        self.compute_ref_log_prob = compute_ref_log_prob
+        self.ref_divisor = ref_divisor
+        self.min_groups = max(1, min_groups)
+
+        self.samples: List[Sample] = []
+        self._results = []  # (samples, old_log_probs, entropys, ref_log_prob)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._error: Optional[BaseException] = None
+        self._rollout_end: Optional[float] = None
+        self._intervals = []  # (start, end) of every log-prob call
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def submit_group(self, trajectories: List[Trajectory]) -> None:
+        """Callback for `ParallelEnvManager.rollout(on_group_complete=...)`; never blocks."""
+        self._queue.put(trajectories)
+
+    def finish(self) -> None:
+        """Marks the end of rollout, processes the remaining groups and waits for the worker thread."""
+        self._rollout_end = time.time()
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        pending: List[List[Trajectory]] = []
+        try:
+            while True:
+                item = self._queue.get()
+                done = item is _DONE
+                if not done:
+                    pending.append(item)
+                # take everything already waiting, so late micro-batches are as large as possible
+                while not done:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        done = True
+                    else:
+                        pending.append(item)
+                if pending and (done or len(pending) >= self.min_groups):
+                    self._process([traj for group in pending for traj in group])
+                    pending = []
+                if done:
+                    return
+        except BaseException as e:
+            logger.exception(f"streaming log-prob pipeline failed: {e}")
+            self._error = e
+
+    def _call(self, fn: Callable[[DataProto], DataProto], data: DataProto, divisor: int) -> DataProto:
+        start = time.time()
+        padded, pad_size = pad_dataproto_to_divisor(data, divisor)
+        output = unpad_dataproto(fn(padded), pad_size=pad_size)
+        self._intervals.append((start, time.time()))
+        return output
+
+    def _process(self, trajectories: List[Trajectory]) -> None:
+        samples = self.env_manager.tokenize_trajectories(trajectories)
+        if not samples:
+            return
+        # only the model inputs are needed here, step ids are parsed once on the final batch
+        tensors = collate_samples(samples, pad_token_id=self.env_manager.pad_token_id,
+                                  step_ids=[[] for _ in samples], step_ids_length=0)
+        keys = ("prompts", "responses", "input_ids", "attention_mask", "position_ids")
+        data = DataProto(batch=TensorDict({k: tensors[k] for k in keys}, batch_size=len(samples)))
+
+        old_log_prob = self._call(self.compute_log_prob, data, self.log_prob_divisor)
+        ref_log_prob = None
+        if self.compute_ref_log_prob is not None:
+            ref_log_prob = self._call(self.compute_ref_log_prob, data, self.ref_divisor).batch["ref_log_prob"]
+        self.samples += samples
+        self._results.append((samples, old_log_prob.batch["old_log_probs"], old_log_prob.batch["entropys"], ref_log_prob))
+
+    def attach(self, batch: DataProto, samples: List[Sample]) -> bool:
+        """
+        Writes "old_log_probs", "entropys" and (if computed) "ref_log_prob" into `batch`.
+
+        Nothing is written unless every row has been computed, so the trainer, which skips recomputing
+        whatever is already in the batch, recomputes the whole batch otherwise.
+
+        Args:
+            batch (DataProto): The collated batch of `samples`, as returned by `samples_to_dataproto`.
+            samples (List[Sample]): The samples of `batch`, in row order (a subset of `self.samples`).
+
+        Returns:
+            bool: True if the results were written.
+        """
+        row_of = {}
+        for row, sample in enumerate(samples):
+            row_of.setdefault(id(sample), []).append(row)
+        response_length = batch.batch["responses"].size(1)
+        outputs = {"old_log_probs": [], "entropys": []}
+        if self.compute_ref_log_prob is not None:
+            outputs["ref_log_prob"] = []
+        filled = torch.zeros(len(samples), dtype=torch.bool)
+        for mb_samples, old_log_probs, entropys, ref_log_prob in self._results:
+            mb_rows, rows = [], []
+            for i, s in enumerate(mb_samples):
+                for row in row_of.get(id(s), []):
+                    mb_rows.append(i)
+                    rows.append(row)
+            filled[rows] = True
+            for key, value in (("old_log_probs", old_log_probs), ("entropys", entropys), ("ref_log_prob", ref_log_prob)):
+                if key in outputs:
+                    outputs[key].append((rows, value[mb_rows]))
+
+        if not filled.all():
+            logger.warning(f"streaming log-prob results cover {int(filled.sum())}/{len(samples)} rows, "
+                           f"the trainer recomputes them for the whole batch")
+            return False
+        for key, parts in outputs.items():
+            dtype = parts[0][1].dtype if parts else torch.float32
+            out = torch.zeros((len(samples), response_length), dtype=dtype)
+            for rows, value in parts:
+                # responses are right-padded: positions line up, only the padded tail length differs
+                width = min(response_length, value.size(1))
+                out[rows, :width] = value[:, :width]
+            batch.batch[key] = out
+        return True
+
+    def get_metrics(self, gen_time: float) -> dict:
+        """
+        Args:
+            gen_time (float): Wall time of the whole generation stage.
+
+        Returns:
+            dict: Log-prob time spent while rollout was still running, and its share of the gen stage.
+        """
+        rollout_end = self._rollout_end if self._rollout_end is not None else time.time()
+        total = sum(end - start for start, end in self._intervals)
+        overlap = sum(max(0.0, min(end, rollout_end) - start) for start, end in self._intervals)
+        return {
+            "streaming/num_micro_batches": len(self._results),
+            "streaming/log_prob_time": total,
+            "streaming/overlap_time": overlap,
+            "streaming/overlap_ratio": overlap / total if total > 0 else 0.0,
+            "streaming/overlap_over_gen": overlap / gen_time if gen_time > 0 else 0.0,
+        }
@@ -1,6 +1,10 @@
-from typing import Any, Dict, List
+from array import array
+from typing import Any, Dict, List, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+# token-level fields hold plain lists while tokenizing, and compact `array('i')` buffers once finalized
+TokenIds = Union[List[int], array]
 
 
 class Reward(BaseModel):
@@ -55,24 +59,26 @@ class Trajectory(object):
 class Sample(BaseModel):
     """The data model for single sample."""
 
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     data_id: str = 0
     task_id: str = 0
     rollout_id: str = 0
     minor_index_id: int = 0
     messages: List[dict] = []
     extras: Dict[str, Any] = {}
-    input_ids: List[int] = None
-    prompt_ids: List[int] = None
-    response_ids: List[int] = None
-    attention_mask: List[int] = None
-    prompt_attention_mask: List[int] = None
-    response_attention_mask: List[int] = None
-    position_ids: List[int] = None
-    prompt_position_ids: List[int] = None
-    response_position_ids: List[int] = None
-    loss_mask: List[int] = None
-    prompt_loss_mask: List[int] = None
-    response_loss_mask: List[int] = None
+    input_ids: TokenIds = None
+    prompt_ids: TokenIds = None
+    response_ids: TokenIds = None
+    attention_mask: TokenIds = None
+    prompt_attention_mask: TokenIds = None
+    response_attention_mask: TokenIds = None
+    position_ids: TokenIds = None
+    prompt_position_ids: TokenIds = None
+    response_position_ids: TokenIds = None
+    loss_mask: TokenIds = None
+    prompt_loss_mask: TokenIds = None
+    response_loss_mask: TokenIds = None
     reward_scores: Dict[str, Any] = None
     max_prompt_len: int
     max_response_len: int
@@ -83,7 +89,7 @@ class Sample(BaseModel):
         assert len(self.input_ids) == len(self.attention_mask) == len(self.position_ids) == len(self.loss_mask)
         assert len(self.prompt_ids) == len(self.prompt_attention_mask) == len(self.prompt_position_ids) == len(self.prompt_loss_mask)
         assert len(self.response_ids) == len(self.response_attention_mask) == len(self.response_position_ids) == len(self.response_loss_mask)
-        assert isinstance(self.input_ids, list) and isinstance(self.prompt_ids, list) and isinstance(self.response_ids, list)
+        assert isinstance(self.input_ids, (list, array)) and isinstance(self.prompt_ids, (list, array)) and isinstance(self.response_ids, (list, array))
 
         truncate_any = False
 
@@ -116,6 +122,19 @@ class Sample(BaseModel):
 
 
 
+    def compact(self) -> None:
+        """
+        Converts the token-level fields to `array('i')` buffers (4 bytes per token instead of a Python int object),
+        which the collation in `ParallelEnvManager.samples_to_dataproto` reads without copying.
+        """
+        for name in ("input_ids", "prompt_ids", "response_ids",
+                     "attention_mask", "prompt_attention_mask", "response_attention_mask",
+                     "position_ids", "prompt_position_ids", "response_position_ids",
+                     "loss_mask", "prompt_loss_mask", "response_loss_mask"):
+            value = getattr(self, name)
+            if isinstance(value, list):
+                setattr(self, name, array("i", value))
+
     def discard(self) -> None:
         """
         Discard the experience.
@@ -0,0 +1,79 @@
+"""
+ADCA-GRPO step rewards: the per-trajectory loop implementation vs. the vectorized one, on random batches.
+
+The loop implementation is loaded from git at --baseline-rev (the parent of the commit that vectorized it), so
+nothing of it is kept in the tree. Reports the run times and the largest advantage difference per scheme.
+
+Usage:
+    python benchmarks/bench_adca_grpo.py --baseline-rev <commit>^ --trajectories 8192 --max-steps 40
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+from types import SimpleNamespace
+
+import torch
+
+from agentevolver.module.adv_processor import adca_grpo
+from git_baseline import load_module_at
+
+MODULE_PATH = "agentevolver/module/adv_processor/adca_grpo.py"
+
+
+def make_batch(num_trajectories, group_size, max_steps, seed=0):
+    rng = random.Random(seed)
+    response_length = max_steps * 6
+    step_ids = torch.full((num_trajectories, response_length), -1, dtype=torch.long)
+    step_flags = []
+    for i in range(num_trajectories):
+        num_steps, pos = rng.randint(0, max_steps), 0
+        for step in range(num_steps):
+            length = rng.randint(1, 4)
+            step_ids[i, pos:pos + length] = step
+            pos += length + rng.randint(0, 1)
+        step_flags.append([rng.random() < 0.5 for _ in range(max(0, num_steps + rng.choice([-1, 0, 0, 1])))])
+    rewards = torch.zeros(num_trajectories, response_length)
+    rewards[:, -1] = torch.tensor([rng.choice([0.0, 1.0, 0.3]) for _ in range(num_trajectories)])
+    batch = SimpleNamespace(batch={
+        "responses": torch.zeros(num_trajectories, response_length, dtype=torch.long),
+        "step_ids": step_ids,
+        "group_ids": torch.arange(num_trajectories) // group_size,
+        "token_level_rewards": rewards,
+    })
+    return batch, step_flags
+
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = fn()
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trajectories", type=int, default=8192)
+    parser.add_argument("--group-size", type=int, default=8)
+    parser.add_argument("--max-steps", type=int, default=40)
+    parser.add_argument("--baseline-rev", required=True, help="revision of the loop implementation")
+    args = parser.parse_args()
+
+    baseline = load_module_at(args.baseline_rev, MODULE_PATH, "adca_grpo_baseline")
+    batch, step_flags = make_batch(args.trajectories, args.group_size, args.max_steps)
+    print(f"baseline {args.baseline_rev}, trajectories={args.trajectories} group_size={args.group_size} max_steps={args.max_steps}")
+    print(f"{'scheme':<11} {'batch norm':<11} {'loop (s)':>9} {'vectorized (s)':>15} {'max |diff|':>11} {'equal':>6}")
+    for scheme in ("allocation", "decouple"):
+        for do_batch_norm in (True, False):
+            loop_time, expected = timed(lambda: baseline.compute_prm_grpo_advantages(
+                batch, step_flags, baseline.PRMHyper(do_batch_norm=do_batch_norm), scheme=scheme))
+            vec_time, actual = timed(lambda: adca_grpo.compute_prm_grpo_advantages(
+                batch, step_flags, adca_grpo.PRMHyper(do_batch_norm=do_batch_norm), scheme=scheme))
+            diff = (actual["advantages"] - expected["advantages"]).abs().max().item()
+            equal = torch.equal(actual["advantages"], expected["advantages"])
+            print(f"{scheme:<11} {str(do_batch_norm):<11} {loop_time:>9.2f} {vec_time:>15.2f} {diff:>11.2e} {str(equal):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Arena execution modes: one thread + event loop per game vs. worker processes running games on one event loop each.
+
+Games are the mock game from games/test/mock_arena_game.py: every turn does --engine-ms of
+pure-Python engine work and then awaits a --latency-ms model call, so the modes differ only in
+how games are scheduled. Results are recorded in a temporary leaderboard as in run_arena.py.
+
+Usage:
+    python benchmarks/bench_arena.py --games 64 --max-workers 16 --num-processes 2 --games-per-process 16
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+from games.evaluation.eval_base import build_task_configs
+from games.evaluation.leaderboard.arena_runner import ArenaRunStats, run_arena_in_processes
+from games.evaluation.leaderboard.leaderboard_db import LeaderboardDB
+from games.evaluation.leaderboard.run_arena import _run_games_in_threads, create_arena_evaluator
+from games.test.mock_arena_game import mock_arena_config, register_mock_arena_workflow
+
+MODELS = [f"model-{i}" for i in range(8)]
+
+
+def run_mode(mode, args, tmp):
+    db = LeaderboardDB(str(Path(tmp) / f"leaderboard_{mode}.json"))
+    for model in MODELS:
+        db.add_model(model)
+    config = mock_arena_config(MODELS, turns=args.turns, engine_ms=args.engine_ms, latency_ms=args.latency_ms)
+    task_configs = build_task_configs(config, args.games)
+
+    stats = ArenaRunStats()
+    if mode == "thread":
+        finished = _run_games_in_threads(task_configs, args.max_workers, create_arena_evaluator("mock", db))
+    else:
+        finished = run_arena_in_processes("mock", task_configs, db, num_processes=args.num_processes,
+                                          games_per_process=args.games_per_process,
+                                          initializer=register_mock_arena_workflow)
+    for _, result, wall_time in finished:
+        stats.record(wall_time, succeeded=result is not None)
+        if result is not None:
+            db.update_from_game_results([result])
+    assert db.get_leaderboard_data()["total_games"] == args.games - stats.failed
+    return stats.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--engine-ms", type=float, default=2.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--max-workers", type=int, default=16)
+    parser.add_argument("--num-processes", type=int, default=2)
+    parser.add_argument("--games-per-process", type=int, default=16)
+    args = parser.parse_args()
+    register_mock_arena_workflow()
+
+    print(f"cpus={os.cpu_count()} games={args.games} turns={args.turns} engine={args.engine_ms}ms latency={args.latency_ms}ms")
+    print(f"{'mode':<34} {'elapsed (s)':>11} {'games/min':>10} {'wall mean (s)':>14} {'wall p95 (s)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, label in [("thread", f"thread x{args.max_workers}"),
+                            ("process", f"process x{args.num_processes}, {args.games_per_process} games/loop")]:
+            s = run_mode(mode, args, tmp)
+            print(f"{label:<34} {s['elapsed']:>11.2f} {s['games_per_min']:>10.1f} "
+                  f"{s['wall_time_mean']:>14.2f} {s['wall_time_p95']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Tokenizer work per trajectory: full re-tokenization vs. `IncrementalTokenizer`.
+
+Replays the per-turn tokenization pattern of `Linear_CMT` (context token check, generation prompt
+increment, completion increment) on a synthetic multi-turn trajectory, and reports tokenizer calls,
+characters tokenized and wall time for both paths. Token ids are checked to be identical.
+
+Usage:
+    python benchmarks/bench_cmt_tokenization.py --tokenizer Qwen/Qwen2.5-0.5B-Instruct --turns 30
+"""
+import argparse
+import random
+import time
+
+import transformers
+
+from agentevolver.module.context_manager.cmt_token_cache import IncrementalTokenizer
+
+
+class CountingTokenizer:
+    """Forwards to a HF tokenizer and counts the calls that actually tokenize text."""
+
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+        self.calls = 0
+        self.chars = 0
+
+    def __call__(self, text, **kwargs):
+        self.calls += 1
+        self.chars += len(text)
+        return self._tokenizer(text, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._tokenizer, name)
+
+
+def synthetic_turns(turns: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["apis", "spotify", "login", "password", "print", "result", "=", "(", ")", "[", "]", "song", "id", "\n"]
+    history = [{"role": "system", "content": "You are a helpful agent. " * 40},
+               {"role": "user", "content": "Find the most played song in my library. " * 5}]
+    for _ in range(turns):
+        llm = {"role": "assistant", "content": "```python\n" + " ".join(rng.choices(words, k=120)) + "\n```"}
+        env = {"role": "user", "content": " ".join(rng.choices(words, k=400))}
+        yield list(history), llm
+        history += [llm, env]
+
+
+def replay(tokenizer, turns, encode, render):
+    token_arrs = []
+    for history, llm in turns:
+        encode(render(history, True))  # check_context_token_num_safe
+        gen_from, gen_to = render(history, False), render(history, True)
+        comp_from, comp_to = render(history, False), render(history + [llm], False)
+        for text_from, text_to in ((gen_from, gen_to), (comp_from, comp_to)):
+            ids_from, ids_to = encode(text_from), encode(text_to)
+            token_arrs.append(ids_to[len(ids_from):])
+    return token_arrs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokenizer", default="Qwen/Qwen2.5-0.5B-Instruct")
+    parser.add_argument("--turns", type=int, default=30)
+    args = parser.parse_args()
+
+    hf_tokenizer = transformers.AutoTokenizer.from_pretrained(args.tokenizer, trust_remote_code=True)
+    turns = list(synthetic_turns(args.turns))
+
+    baseline = CountingTokenizer(hf_tokenizer)
+    start = time.perf_counter()
+    expected = replay(
+        baseline, turns,
+        encode=lambda text: baseline(text, return_tensors="pt", padding=False)["input_ids"][0].tolist(),
+        render=lambda msgs, gen: hf_tokenizer.apply_chat_template(msgs, tokenize=False, add_generation_prompt=gen),
+    )
+    baseline_time = time.perf_counter() - start
+
+    counted = CountingTokenizer(hf_tokenizer)
+    cache = IncrementalTokenizer(counted)
+    start = time.perf_counter()
+    actual = replay(counted, turns, encode=cache.encode, render=cache.render)
+    cached_time = time.perf_counter() - start
+
+    assert actual == expected, "incremental tokenization diverged from full tokenization"
+    print(f"{'':>12} {'calls':>8} {'chars':>12} {'wall (s)':>10}")
+    print(f"{'full':>12} {baseline.calls:>8} {baseline.chars:>12} {baseline_time:>10.3f}")
+    print(f"{'incremental':>12} {counted.calls:>8} {counted.chars:>12} {cached_time:>10.3f}")
+    print(f"chat template renders: {5 * len(turns)} -> {cache.render_calls}")
+
+
+if __name__ == "__main__":
+    main()
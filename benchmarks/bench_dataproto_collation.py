@@ -0,0 +1,107 @@
+"""
+Sample collation: per-sample tensors + `pad_sequence` vs. preallocated NumPy buffers (`collate_samples`).
+
+Builds a synthetic batch of samples (by default 4096 samples with up to 16k tokens each), collates it with
+both paths in separate processes and reports wall time and the peak RSS growth of the collation step.
+
+Usage:
+    python benchmarks/bench_dataproto_collation.py --batch-size 4096 --max-prompt 4096 --max-response 12288
+"""
+import argparse
+import multiprocessing as mp
+import random
+import resource
+import time
+
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+from agentevolver.module.env_manager.collate import collate_samples
+from agentevolver.schema.trajectory import Sample
+
+PAD = 151643
+
+
+def make_samples(batch_size, max_prompt, max_response, compact, seed=0):
+    rng = random.Random(seed)
+    samples = []
+    for i in range(batch_size):
+        p, r = rng.randint(max_prompt // 2, max_prompt), rng.randint(1, max_response)
+        prompt_ids, response_ids = [rng.randint(0, 150000) for _ in range(p)], [rng.randint(0, 150000) for _ in range(r)]
+        response_loss = [1] * r
+        sample = Sample(
+            data_id=str(i // 8), rollout_id=str(i % 8), task_id=str(i // 8),
+            extras={"add_exp": i % 2 == 0, "task_train_expmode": "discard"},
+            input_ids=prompt_ids + response_ids, prompt_ids=prompt_ids, response_ids=response_ids,
+            attention_mask=[1] * (p + r), prompt_attention_mask=[1] * p, response_attention_mask=[1] * r,
+            position_ids=list(range(p + r)), prompt_position_ids=list(range(p)), response_position_ids=list(range(p, p + r)),
+            loss_mask=[0] * p + response_loss, prompt_loss_mask=[0] * p, response_loss_mask=response_loss,
+            max_prompt_len=max_prompt, max_response_len=max_response, max_model_len=max_prompt + max_response,
+        )
+        if compact:
+            sample.compact()
+        samples.append(sample)
+    return samples
+
+
+def legacy_collate(samples, step_ids, max_response):
+    def stack(field, value, side):
+        return pad_sequence([torch.tensor(getattr(s, field), dtype=torch.int) for s in samples],
+                            batch_first=True, padding_value=value, padding_side=side)
+
+    prompts, responses = stack("prompt_ids", PAD, "left"), stack("response_ids", PAD, "right")
+    prompt_position_ids = stack("prompt_position_ids", 0, "left")
+    delta = torch.arange(1, responses.size(1) + 1).unsqueeze(0).repeat(len(samples), 1)
+    exp = [s.extras["add_exp"] and s.extras["task_train_expmode"] == "discard" for s in samples]
+    exp_p = pad_sequence([(torch.ones if e else torch.zeros)(len(s.prompt_ids), dtype=torch.int) for s, e in zip(samples, exp)],
+                         batch_first=True, padding_value=0, padding_side="left")
+    exp_r = pad_sequence([(torch.ones if e else torch.zeros)(len(s.response_ids), dtype=torch.int) for s, e in zip(samples, exp)],
+                         batch_first=True, padding_value=0)
+    step_ids_pad = pad_sequence([torch.tensor(s, dtype=torch.long) for s in step_ids], batch_first=True, padding_value=-1)
+    return {
+        "prompts": prompts,
+        "responses": responses,
+        "input_ids": torch.cat((prompts, responses), dim=-1),
+        "attention_mask": torch.cat((stack("prompt_attention_mask", 0, "left"), stack("response_attention_mask", 0, "right")), dim=-1),
+        "position_ids": torch.cat((prompt_position_ids, prompt_position_ids[:, -1:] + delta), dim=-1),
+        "loss_mask": torch.cat((stack("prompt_loss_mask", 0, "left"), stack("response_loss_mask", 0, "right")), dim=-1),
+        "exp_mask": torch.cat((exp_p, exp_r), dim=-1),
+        "step_ids": torch.nn.functional.pad(step_ids_pad, (0, max_response - step_ids_pad.size(1)), value=-1),
+        "group_ids": torch.tensor([int(s.data_id) for s in samples], dtype=torch.long),
+    }
+
+
+def run(mode, args, queue):
+    samples = make_samples(args.batch_size, args.max_prompt, args.max_response, compact=(mode == "numpy"))
+    step_ids = [[-1] * len(s.response_ids) for s in samples]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "legacy":
+        tensors = legacy_collate(samples, step_ids, args.max_response)
+    else:
+        tensors = collate_samples(samples, pad_token_id=PAD, step_ids=step_ids, step_ids_length=args.max_response)
+    elapsed = time.perf_counter() - start
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((mode, elapsed, (rss_peak - rss_before) / 1024, tuple(tensors["input_ids"].shape)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--max-prompt", type=int, default=4096)
+    parser.add_argument("--max-response", type=int, default=12288)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    print(f"{'mode':>8} {'wall (s)':>10} {'peak RSS +MiB':>14} {'shape':>16}")
+    for mode in ("legacy", "numpy"):
+        proc = ctx.Process(target=run, args=(mode, args, queue))
+        proc.start()
+        mode, elapsed, rss_mib, shape = queue.get()
+        proc.join()
+        print(f"{mode:>8} {elapsed:>10.3f} {rss_mib:>14.1f} {str(shape):>16}")
+
+
+if __name__ == "__main__":
+    main()
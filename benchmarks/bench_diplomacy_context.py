@@ -0,0 +1,97 @@
+"""
+Diplomacy prompt contexts per phase: per-power board queries vs. one shared phase snapshot.
+
+The per-power path is what `DiplomacyGame._get_context_str` did before the snapshot: every power
+called `get_all_possible_orders()` and rebuilt the unit and supply-center strings. Both paths build
+the context prompt of all seven powers each phase of a game played with random orders.
+
+Usage:
+    python benchmarks/bench_diplomacy_context.py --phases 20 --repeats 5
+"""
+import argparse
+import os
+import random
+import time
+
+from diplomacy import Game
+
+from games.games.diplomacy.board import BoardSnapshotCache
+
+PROMPT_PATH = os.path.join(os.path.dirname(__file__), "..", "games", "games", "diplomacy", "prompt",
+                           "prompts_simple", "context_prompt.txt")
+
+
+def per_power_context(game, power_name, template):
+    power = game.powers[power_name]
+    all_unit_locations_str = "\n".join(f"{p_name}: {p_obj.units}" for p_name, p_obj in game.powers.items())
+    all_supply_centers_str = "\n".join(f"{p_name}: {p_obj.centers}" for p_name, p_obj in game.powers.items())
+    possible_orders = game.get_all_possible_orders()
+    orderable_locations = game.get_orderable_locations(power_name)
+    possible_orders_str = ""
+    if orderable_locations:
+        for loc in orderable_locations:
+            if loc in possible_orders and possible_orders[loc]:
+                possible_orders_str += f"  {loc}: {possible_orders[loc]}\n"
+    else:
+        possible_orders_str = "None"
+    return template.format(power_name=power_name, current_phase=game.get_current_phase(), home_centers=str(power.homes),
+                           agent_goals="Survive and expand.", order_history=game.order_history,
+                           all_unit_locations=all_unit_locations_str, all_supply_centers=all_supply_centers_str,
+                           possible_orders=possible_orders_str)
+
+
+def snapshot_context(game, board, power_name, template):
+    power = game.powers[power_name]
+    snapshot = board.get()
+    if snapshot.orderable_locations.get(power_name):
+        possible_orders_str = "".join(f"  {loc}: {orders}\n" for loc, orders in snapshot.power_orders(power_name))
+    else:
+        possible_orders_str = "None"
+    return template.format(power_name=power_name, current_phase=snapshot.phase, home_centers=str(power.homes),
+                           agent_goals="Survive and expand.", order_history=game.order_history,
+                           all_unit_locations=snapshot.all_unit_locations, all_supply_centers=snapshot.all_supply_centers,
+                           possible_orders=possible_orders_str)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--phases", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    with open(PROMPT_PATH, encoding="utf-8") as f:
+        template = f.read()
+
+    game = Game(map_name="standard", seed=42)
+    board = BoardSnapshotCache(game)
+    rng = random.Random(0)
+    per_power_ms, snapshot_ms = [], []
+    for _ in range(args.phases):
+        if game.is_game_done:
+            break
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            expected = [per_power_context(game, p, template) for p in game.powers]
+        per_power_ms.append((time.perf_counter() - start) / args.repeats * 1e3)
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            board.invalidate()
+            contexts = [snapshot_context(game, board, p, template) for p in game.powers]
+        snapshot_ms.append((time.perf_counter() - start) / args.repeats * 1e3)
+        assert contexts == expected
+
+        snapshot = board.get()
+        for power_name in game.powers:
+            game.set_orders(power_name, [rng.choice(orders) for _, orders in snapshot.power_orders(power_name)])
+        game.process()
+
+    per_power, shared = sum(per_power_ms) / len(per_power_ms), sum(snapshot_ms) / len(snapshot_ms)
+    print(f"phases={len(per_power_ms)} powers={len(game.powers)}")
+    print(f"{'path':<12} {'ms/phase (all powers)':>22}")
+    print(f"{'per-power':<12} {per_power:>22.2f}")
+    print(f"{'snapshot':<12} {shared:>22.2f}")
+    print(f"speedup: {per_power / shared:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Diplomacy map rendering inside the game loop vs. off-loop rendering with the shared render cache.
+
+--games random-order games run concurrently on one event loop and render the map after orders and
+after processing each phase, as `DiplomacyGame.run` does. A ticker coroutine measures how long the
+loop is blocked. The web history of one game is recorded twice: as plain SVG strings per snapshot,
+and in a GameStateManager that stores distinct maps once, compressed.
+
+Usage:
+    python benchmarks/bench_diplomacy_render.py --games 4 --phases 10
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from diplomacy import Game
+from diplomacy.engine.renderer import Renderer
+
+from games.games.diplomacy.board import MapRenderCache, board_render_key
+from games.web.game_state_manager import GameStateManager
+
+
+def render_svg(game):
+    return Renderer(game).render(output_path=None, incl_abbrev=True)
+
+
+async def play(game_id, args, render, history):
+    game = Game(map_name="standard", seed=game_id)
+    rng = random.Random(game_id)
+    await render(game)
+    for _ in range(args.phases):
+        await asyncio.sleep(args.latency_ms / 1000)  # the agents' model calls
+        possible_orders = game.get_all_possible_orders()
+        for power_name in game.powers:
+            game.set_orders(power_name, [rng.choice(possible_orders[loc]) for loc in game.get_orderable_locations(power_name)
+                                         if possible_orders[loc]])
+        history.append(await render(game))
+        game.process()
+        history.append(await render(game))
+
+
+async def run(args, render):
+    lags = []
+
+    async def ticker():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - start - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    histories = [[] for _ in range(args.games)]
+    start = time.perf_counter()
+    await asyncio.gather(*(play(i, args, render, histories[i]) for i in range(args.games)))
+    elapsed = time.perf_counter() - start
+    tick.cancel()
+    lags.sort()
+    return elapsed, lags[int(len(lags) * 0.99)], lags[-1], histories[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=4)
+    parser.add_argument("--phases", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    async def inline(game):
+        return render_svg(game)
+
+    cache = MapRenderCache()
+
+    async def off_loop(game):
+        return await cache.render(board_render_key(game), lambda: render_svg(game))
+
+    print(f"games={args.games} phases={args.phases} renders/game={2 * args.phases + 1}")
+    print(f"{'render':<10} {'elapsed (s)':>11} {'p99 loop stall (ms)':>20} {'max loop stall (ms)':>20}")
+    for name, render in [("inline", inline), ("off-loop", off_loop)]:
+        elapsed, p99_lag, max_lag, history = asyncio.run(run(args, render))
+        print(f"{name:<10} {elapsed:>11.2f} {p99_lag * 1e3:>20.1f} {max_lag * 1e3:>20.1f}")
+    print(f"render cache: hits={cache.hits} misses={cache.misses}")
+
+    manager = GameStateManager()
+    manager.set_mode("observe", game="diplomacy")
+    for i, svg in enumerate(history):
+        manager.update_game_state(round=i, map_svg=svg)
+        manager.save_history_snapshot(kind="orders")
+    plain_bytes = sum(len(svg) for svg in history)  # every render was a new string, shared by its snapshots
+    stats = manager.get_history_stats()
+    print(f"history of one game: {stats['snapshots']} snapshots, plain svgs {plain_bytes / 2**20:.1f} MB, "
+          f"stored {stats['map_bytes'] / 2**20:.2f} MB ({stats['distinct_maps']} distinct maps)")
+
+
+if __name__ == "__main__":
+    main()
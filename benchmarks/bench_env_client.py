@@ -0,0 +1,132 @@
+"""
+Env client throughput benchmark.
+
+Starts a local dummy env service (same routes and payloads as `env_service/env_service.py`, no ray)
+and measures env steps/sec at several concurrency levels for:
+
+    * thread:  one thread per instance, `requests.post` per call (the previous EnvClient behaviour)
+    * pooled:  one thread per instance, shared keep-alive `EnvClient` session
+    * async:   `AsyncEnvClient.step` from one event loop
+    * batch:   `AsyncEnvClient.batch_step`, one round trip per step of all instances
+
+Usage:
+    python benchmarks/bench_env_client.py --instances 64 256 1024 --steps 10
+"""
+import argparse
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from aiohttp import web
+
+from agentevolver.client.env_client import AsyncEnvClient, EnvClient
+
+
+def build_dummy_app() -> web.Application:
+    instances = {}
+
+    def state(instance_id):
+        instances[instance_id] += 1
+        return {"state": [{"role": "user", "content": f"obs {instances[instance_id]}"}], "reward": 0,
+                "is_terminated": False, "info": {"instance_id": instance_id}}
+
+    async def create(request):
+        body = await request.json()
+        instance_id = body.get("instance_id") or uuid.uuid4().hex
+        instances[instance_id] = 0
+        return web.json_response({"success": True, "data": state(instance_id)})
+
+    async def step(request):
+        body = await request.json()
+        return web.json_response({"success": True, "data": state(body["instance_id"])})
+
+    async def batch_step(request):
+        body = await request.json()
+        data = [{"success": True, "data": state(item["instance_id"]), "error": None} for item in body["steps"]]
+        return web.json_response({"success": True, "data": data})
+
+    async def release(request):
+        body = await request.json()
+        return web.json_response({"success": instances.pop(body["instance_id"], None) is not None, "data": None})
+
+    app = web.Application()
+    app.add_routes([web.post("/create", create), web.post("/step", step),
+                    web.post("/batch_step", batch_step), web.post("/release", release)])
+    return app
+
+
+def serve_in_background(port: int) -> None:
+    def run():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(build_dummy_app(), access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port, backlog=4096).start())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    time.sleep(0.5)
+
+
+def run_threaded(base_url: str, n: int, steps: int, pooled: bool) -> float:
+    def post(endpoint, **data):
+        if pooled:
+            return EnvClient(base_url)._make_request(endpoint, **data)
+        return requests.post(f"{base_url}/{endpoint}", json=data, timeout=300).json()
+
+    def trajectory(i):
+        instance_id = f"inst_{i}_{uuid.uuid4().hex[:6]}"
+        post("create", env_type="dummy", task_id="0", instance_id=instance_id)
+        for _ in range(steps):
+            post("step", instance_id=instance_id, messages={"role": "assistant", "content": "noop"})
+        post("release", instance_id=instance_id)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        list(pool.map(trajectory, range(n)))
+    return n * steps / (time.perf_counter() - start)
+
+
+async def run_async(base_url: str, n: int, steps: int, batched: bool) -> float:
+    async with AsyncEnvClient(base_url, max_connections=min(n, 512)) as client:
+        ids = [f"inst_{i}_{uuid.uuid4().hex[:6]}" for i in range(n)]
+        action = {"role": "assistant", "content": "noop"}
+        start = time.perf_counter()
+        await asyncio.gather(*[client.create_instance("dummy", "0", instance_id) for instance_id in ids])
+        if batched:
+            for _ in range(steps):
+                await client.batch_step([(instance_id, action) for instance_id in ids])
+        else:
+            async def trajectory(instance_id):
+                for _ in range(steps):
+                    await client.step(instance_id, action)
+            await asyncio.gather(*[trajectory(instance_id) for instance_id in ids])
+        await asyncio.gather(*[client.release_instance(instance_id) for instance_id in ids])
+        return n * steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instances", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--port", type=int, default=18765)
+    args = parser.parse_args()
+
+    serve_in_background(args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"{'instances':>10} {'thread':>12} {'pooled':>12} {'async':>12} {'batch':>12}   (env steps/sec)")
+    for n in args.instances:
+        row = [
+            run_threaded(base_url, n, args.steps, pooled=False),
+            run_threaded(base_url, n, args.steps, pooled=True),
+            asyncio.run(run_async(base_url, n, args.steps, batched=False)),
+            asyncio.run(run_async(base_url, n, args.steps, batched=True)),
+        ]
+        print(f"{n:>10} " + " ".join(f"{v:>12.1f}" for v in row))
+
+
+if __name__ == "__main__":
+    main()
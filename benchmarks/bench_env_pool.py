@@ -0,0 +1,89 @@
+"""
+Env instance create latency: a fresh Ray actor per instance vs. the warm `EnvActorPool`.
+
+A stand-in env actor pays a configurable import cost when its process starts (like importing AppWorld or
+BFCL) and a small per-task setup cost. Episodes are replayed with `--concurrency` instances alive at a time;
+the time from "create" to "initial state received" is reported as p50/p99 for both modes.
+
+Usage:
+    python benchmarks/bench_env_pool.py --episodes 200 --concurrency 16 --import-cost 1.5
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import ray
+
+from env_service.actor_pool import EnvActorPool
+
+
+def make_actor_cls(import_cost: float, setup_cost: float):
+    @ray.remote
+    class FakeEnvActor:
+        def __init__(self, task_id, instance_id, params):
+            time.sleep(import_cost)  # module import at process start
+            self.task_id = None
+            if task_id is not None:
+                self.reset(task_id, instance_id, params)
+
+        def reset(self, task_id, instance_id, params):
+            time.sleep(setup_cost)
+            self.task_id = task_id
+
+        def ping(self):
+            return True
+
+        def get_init_state(self, params):
+            return {"state": [{"role": "system", "content": ""}, {"role": "user", "content": self.task_id}]}
+
+        def close(self):
+            self.task_id = None
+
+    return FakeEnvActor
+
+
+async def run(mode: str, actor_cls, args) -> list:
+    pool = EnvActorPool("fake", actor_cls, min_size=args.concurrency if mode == "pool" else 0,
+                        max_size=args.concurrency if mode == "pool" else 0)
+    await pool.warm_up()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def episode(i):
+        async with semaphore:
+            start = time.perf_counter()
+            lease = await pool.acquire(f"task_{i}", f"instance_{i}", {})
+            await lease.handle.get_init_state.remote({})
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(args.episode_time)
+            await pool.release(lease)
+
+    await asyncio.gather(*[episode(i) for i in range(args.episodes)])
+    print(f"{mode:>6} stats: {pool.get_stats()}")
+    pool.shutdown()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--import-cost", type=float, default=1.5)
+    parser.add_argument("--setup-cost", type=float, default=0.05)
+    parser.add_argument("--episode-time", type=float, default=0.2)
+    args = parser.parse_args()
+
+    ray.init(address="local")
+    actor_cls = make_actor_cls(args.import_cost, args.setup_cost)
+    results = {}
+    for mode in ("fresh", "pool"):
+        results[mode] = asyncio.run(run(mode, actor_cls, args))
+
+    print(f"{'mode':>6} {'p50 (s)':>10} {'p99 (s)':>10} {'mean (s)':>10}")
+    for mode, latencies in results.items():
+        print(f"{mode:>6} {np.percentile(latencies, 50):>10.3f} {np.percentile(latencies, 99):>10.3f} {np.mean(latencies):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
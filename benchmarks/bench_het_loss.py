@@ -0,0 +1,80 @@
+"""
+HET on/off-policy loss: two dual-clip passes blended by exp_mask vs. one pass with a per-token clip bound.
+
+Reports forward+backward time and the bytes autograd keeps alive for the backward pass (saved tensors), which is
+what bounds the activation memory of the loss on the accelerator. The two-pass implementation is loaded from git at
+--baseline-rev (the parent of the commit that fused it).
+
+Usage:
+    python benchmarks/bench_het_loss.py --baseline-rev <commit>^ --batch-sizes 16 64 256 --response-length 4096
+"""
+import argparse
+import time
+
+import torch
+
+from agentevolver.module.exp_manager.het_core_algos import het_compute_token_on_off_policy_loss
+from git_baseline import load_module_at
+
+MODULE_PATH = "agentevolver/module/exp_manager/het_core_algos.py"
+
+
+def make_inputs(bsz, response_length, device):
+    old_log_prob = -torch.rand(bsz, response_length, device=device)
+    log_prob = (old_log_prob + 0.3 * torch.randn_like(old_log_prob)).requires_grad_(True)
+    advantages = torch.randn(bsz, response_length, device=device)
+    response_mask = (torch.rand(bsz, response_length, device=device) > 0.1).float()
+    exp_mask = (torch.rand(bsz, 1, device=device) > 0.5).float().expand(-1, response_length).contiguous()
+    return old_log_prob, log_prob, advantages, response_mask, exp_mask
+
+
+def run(loss_fn, inputs):
+    old_log_prob, log_prob, advantages, response_mask, exp_mask = inputs
+    saved = []
+
+    def pack(t):
+        saved.append(t.numel() * t.element_size())
+        return t
+
+    with torch.autograd.graph.saved_tensors_hooks(pack, lambda t: t):
+        out = loss_fn(old_log_prob=old_log_prob, log_prob=log_prob, advantages=advantages, response_mask=response_mask,
+                      exp_mask=exp_mask, cliprange=0.2, off_cliprange_high=0.6)
+    out["pg_loss"].backward()
+    metrics = [out[k] for k in ("on_pg_loss", "off_pg_loss", "on_pg_clipfrac", "ppo_kl")]
+    log_prob.grad = None
+    return sum(saved), metrics
+
+
+def timed(loss_fn, inputs, repeat, device):
+    best = float("inf")
+    for _ in range(repeat):
+        if device == "cuda":
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        saved_bytes, metrics = run(loss_fn, inputs)
+        [float(m.detach()) for m in metrics]
+        best = min(best, time.perf_counter() - start)
+    return best, saved_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--response-length", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--baseline-rev", required=True, help="revision of the two-pass implementation")
+    args = parser.parse_args()
+
+    legacy = load_module_at(args.baseline_rev, MODULE_PATH, "het_core_algos_legacy")
+    print(f"{'batch':>8} {'legacy (ms)':>12} {'fused (ms)':>11} {'speedup':>8} {'legacy saved (MB)':>18} {'fused saved (MB)':>17}")
+    for bsz in args.batch_sizes:
+        inputs = make_inputs(bsz, args.response_length, args.device)
+        legacy_time, legacy_saved = timed(legacy.het_compute_token_on_off_policy_loss, inputs, args.repeat, args.device)
+        fused_time, fused_saved = timed(het_compute_token_on_off_policy_loss, inputs, args.repeat, args.device)
+        print(f"{bsz:>8} {legacy_time * 1e3:>12.2f} {fused_time * 1e3:>11.2f} {legacy_time / fused_time:>8.1f}x "
+              f"{legacy_saved / 2**20:>18.1f} {fused_saved / 2**20:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
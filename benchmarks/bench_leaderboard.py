@@ -0,0 +1,78 @@
+"""
+Arena leaderboard writes: the JSON-file LeaderboardDB (whole file rewritten per game) vs. the SQLite/WAL store.
+
+Each game is recorded with its own `update_from_game_results` call, as `run_arena.py` does, from --threads threads.
+The JSON-file implementation is loaded from git at --baseline-rev (the parent of the commit that moved the
+leaderboard to SQLite).
+
+Usage:
+    python benchmarks/bench_leaderboard.py --baseline-rev <commit>^ --games 500 2000 5000 --threads 8
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from games.evaluation.leaderboard.leaderboard_db import LeaderboardDB
+from git_baseline import load_module_at
+
+MODULE_PATH = "games/evaluation/leaderboard/leaderboard_db.py"
+MODELS = [f"model-{i}" for i in range(8)]
+ROLES = ["Merlin_0", "Servant_0", "Servant_1", "Assassin_0", "Minion_0"]
+
+
+def make_results(n, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for _ in range(n):
+        good_wins = rng.random() < 0.5
+        results.append({"roles": [{"role_name": role, "model_name": rng.choice(MODELS),
+                                   "score": int(good_wins == (role in ("Merlin_0", "Servant_0", "Servant_1")))}
+                                  for role in ROLES], "language": "en"})
+    return results
+
+
+def record(db, results, threads):
+    def worker(chunk):
+        for result in chunk:
+            db.update_from_game_results([result])
+
+    pool = [threading.Thread(target=worker, args=(results[i::threads],)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, nargs="+", default=[500, 2000, 5000])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--baseline-rev", required=True, help="revision of the JSON-file implementation")
+    args = parser.parse_args()
+
+    JsonLeaderboardDB = load_module_at(args.baseline_rev, MODULE_PATH, "leaderboard_db_baseline").LeaderboardDB
+    print(f"baseline {args.baseline_rev}")
+
+    print(f"{'games':>7} {'json (s)':>9} {'sqlite (s)':>11} {'speedup':>8} {'json ms/game':>13} {'sqlite ms/game':>15} {'standings ms':>13}")
+    for n in args.games:
+        results = make_results(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            json_time = record(JsonLeaderboardDB(str(Path(tmp) / "baseline.json")), results, args.threads)
+            db = LeaderboardDB(str(Path(tmp) / "leaderboard.json"))
+            sqlite_time = record(db, results, args.threads)
+            start = time.perf_counter()
+            data = db.get_leaderboard_data()
+            db.get_games_history(limit=50)
+            standings_time = time.perf_counter() - start
+            assert data["total_games"] == n
+        print(f"{n:>7} {json_time:>9.2f} {sqlite_time:>11.2f} {json_time / sqlite_time:>7.1f}x "
+              f"{json_time / n * 1e3:>13.2f} {sqlite_time / n * 1e3:>15.2f} {standings_time * 1e3:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
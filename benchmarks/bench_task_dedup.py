@@ -0,0 +1,64 @@
+"""
+Near-duplicate task filtering: pairwise word-set Jaccard (NaiveTaskPostFilter) vs. MinHash/LSH (MinHashTaskPostFilter).
+
+The pairwise filter is quadratic in the number of kept tasks and is only run up to --naive-max tasks.
+
+Usage:
+    python benchmarks/bench_task_dedup.py --sizes 1000 10000 100000 --naive-max 10000
+"""
+import argparse
+import random
+import time
+
+from agentevolver.module.task_manager.filters import MinHashTaskPostFilter, NaiveTaskPostFilter
+from agentevolver.schema.task import Task, TaskObjective
+
+
+def make_tasks(n, vocab_size=20000, length=16, duplicate_ratio=0.3, seed=0):
+    """Synthetic objectives, `duplicate_ratio` of them a copy of an earlier one with one word replaced."""
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(vocab_size)]
+    queries = []
+    for _ in range(n):
+        if queries and rng.random() < duplicate_ratio:
+            words = rng.choice(queries).split()
+            words[rng.randrange(length)] = rng.choice(vocab)
+            queries.append(" ".join(words))
+        else:
+            queries.append(" ".join(rng.sample(vocab, length)))
+    return [TaskObjective(task=Task(task_id=str(i), open_query=False, query=q, ground_truth="gt"), confidence=rng.random())
+            for i, q in enumerate(queries)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--naive-max", type=int, default=10000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8} {'naive (s)':>10} {'minhash (s)':>12} {'streaming (s)':>14} {'speedup':>8} {'kept':>7} {'equal':>6}")
+    for n in args.sizes:
+        tasks = make_tasks(n)
+        minhash_time, kept = timed(lambda: MinHashTaskPostFilter(args.threshold).filter(tasks))
+
+        # streaming mode, as in TaskManager.generate_task: batches of 64 new objectives
+        stream_filter = MinHashTaskPostFilter(args.threshold)
+        stream_time, _ = timed(lambda: [stream_filter.filter_incremental(tasks[i:i + 64]) for i in range(0, n, 64)])
+
+        naive_time, equal = float("nan"), "-"
+        if n <= args.naive_max:
+            naive_time, expected = timed(lambda: NaiveTaskPostFilter().filter(tasks))
+            equal = str([t.task.task_id for t in kept] == [t.task.task_id for t in expected])
+        print(f"{n:>8} {naive_time:>10.2f} {minhash_time:>12.2f} {stream_time:>14.2f} {naive_time / minhash_time:>8.1f}x "
+              f"{len(kept):>7} {equal:>6}")
+
+
+if __name__ == "__main__":
+    main()
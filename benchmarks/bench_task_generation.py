@@ -0,0 +1,120 @@
+"""
+Task generation end to end: the batch path (explore in barrier batches, then post-filter the whole pool) vs.
+the streaming `TaskManager.generate_task`.
+
+Exploration and the post filter's env rollouts are simulated with sleeps of random length. The post filter
+validates objectives on --threads threads, as `LlmFilter` does.
+
+Usage:
+    python benchmarks/bench_task_generation.py --tasks 40 --n 2 --threads 8
+"""
+import argparse
+import functools
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agentevolver.module.task_manager.base import NaiveTaskObjectiveRetrieval
+from agentevolver.module.task_manager.filters import MinHashTaskPostFilter, TaskPostFilter
+from agentevolver.module.task_manager.task_manager import TaskManager
+from agentevolver.schema.task import Task, TaskObjective
+
+
+class SimulatedLlmFilter(TaskPostFilter):
+    """Runs one simulated env rollout per objective on `num_threads` threads and keeps half of them."""
+
+    def __init__(self, num_threads, latency, seed=0):
+        self._num_threads = num_threads
+        self._latency = latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.concurrent = self.max_concurrent = 0
+
+    def _rollout(self, objective):
+        with self._lock:
+            latency = self._rng.uniform(0.5, 1.5) * self._latency
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        time.sleep(latency)
+        with self._lock:
+            self.concurrent -= 1
+        return objective if hash(objective.objective) % 2 == 0 else None
+
+    def filter(self, tasks):
+        with ThreadPoolExecutor(max_workers=self._num_threads) as pool:
+            return [t for t in pool.map(self._rollout, tasks) if t is not None]
+
+
+def make_explore(latency, objectives_per_task, seed=0):
+    rng, lock, ids = random.Random(seed), threading.Lock(), itertools.count()
+
+    def explore(task, data_id, rollout_id):
+        with lock:
+            sleep = rng.uniform(0.5, 1.5) * latency
+            first = next(ids)
+            for _ in range(objectives_per_task - 1):
+                next(ids)
+        time.sleep(sleep)
+        return [TaskObjective(task=Task(task_id=task.task_id, open_query=True, query=f"objective {first + j} " + " ".join(
+            f"w{first + j}x{w}" for w in range(8)), ground_truth="gt"), confidence=1.0) for j in range(objectives_per_task)]
+
+    return explore
+
+
+def make_manager(args):
+    manager = TaskManager.__new__(TaskManager)
+    manager._n = args.n
+    manager._num_exploration_threads = args.threads
+    manager._realtime_filters = [MinHashTaskPostFilter()]
+    manager._post_filter = [SimulatedLlmFilter(args.threads, args.filter_latency)]
+    manager._old_retrival = NaiveTaskObjectiveRetrieval()
+    manager._exlore_and_summarize = make_explore(args.explore_latency, args.objectives)
+    return manager
+
+
+def batch_generate(manager, tasks):
+    """The generation loop before streaming: barrier batches of distinct tasks, then one post-filter call."""
+    res = []
+    task_q = list(tasks) * manager._n
+    parallel_num = min(manager._num_exploration_threads, len(tasks))
+    with ThreadPoolExecutor(max_workers=manager._num_exploration_threads) as pool:
+        for i in range(0, len(task_q), parallel_num):
+            futures = [pool.submit(manager._exlore_and_summarize, task, "unknown", "unknown") for task in task_q[i:i + parallel_num]]
+            objectives = sum([future.result() for future in futures], [])
+            objectives = functools.reduce(lambda x, f: f.filter_incremental(x), manager._realtime_filters, objectives)
+            res.extend(objectives)
+    return functools.reduce(lambda x, f: f.filter(x), manager._post_filter, res)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=40)
+    parser.add_argument("--n", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--objectives", type=int, default=2, help="objectives per exploration")
+    parser.add_argument("--explore-latency", type=float, default=0.2)
+    parser.add_argument("--filter-latency", type=float, default=0.2)
+    args = parser.parse_args()
+    tasks = [Task(task_id=f"t{i}", open_query=False) for i in range(args.tasks)]
+
+    print(f"tasks={args.tasks} n={args.n} threads={args.threads} objectives/exploration={args.objectives}")
+    print(f"{'path':<10} {'first objective (s)':>20} {'all objectives (s)':>19} {'kept':>6} {'max concurrent rollouts':>24}")
+    for name in ("batch", "streaming"):
+        manager = make_manager(args)
+        start = time.perf_counter()
+        if name == "batch":
+            kept = batch_generate(manager, tasks)
+            first = time.perf_counter() - start
+        else:
+            kept, first = [], None
+            for objective in manager.generate_task(tasks, resume_file=""):
+                first = first if first is not None else time.perf_counter() - start
+                kept.append(objective)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} {first:>20.2f} {elapsed:>19.2f} {len(kept):>6} {manager._post_filter[0].max_concurrent:>24}")
+
+
+if __name__ == "__main__":
+    main()
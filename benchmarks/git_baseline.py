@@ -0,0 +1,26 @@
+"""
+Loads an earlier revision of a module from git, so benchmarks can compare against it without keeping a copy in the tree.
+"""
+import subprocess
+import sys
+import types
+
+
+def load_module_at(rev, path, name):
+    """
+    Imports `path` as it was at `rev`, straight from `git show` (no temporary file).
+
+    Args:
+        rev (str): Any git revision, e.g. a commit hash or `<hash>^`.
+        path (str): Repository-relative path of the module.
+        name (str): Name to register the module under in `sys.modules`.
+
+    Returns:
+        types.ModuleType: The loaded module.
+    """
+    source = subprocess.check_output(["git", "show", f"{rev}:{path}"], text=True)
+    module = types.ModuleType(name)
+    module.__file__ = f"{rev}:{path}"
+    sys.modules[name] = module  # dataclasses look their module up while the body executes
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
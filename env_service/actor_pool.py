@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=broad-except
+"""
+Warm pool of environment actors.
+
+Starting a Ray actor and importing the environment module dominates the
+creation latency of short episodes. The pool keeps started actors around:
+a released actor closes its environment, and the next `acquire` resets it
+with a new task instead of starting a new process.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import ray
+
+
+@dataclass
+class PooledActor:
+    """
+    A Ray env actor together with its pool bookkeeping.
+    """
+
+    handle: Any
+    env_type: str
+    uses: int = 0
+    healthy: bool = True
+
+
+class EnvActorPool:
+    """
+    Warm pool of env actors of a single `env_type`.
+
+    Idle actors are health-checked (`ping`) before they are handed out and
+    reset (`reset`) to the requested task. Actors that fail a health check,
+    a reset or a close, that misbehaved while leased, or that served
+    `max_uses` episodes are evicted (`ray.kill`) instead of being reused.
+    """
+
+    def __init__(
+        self,
+        env_type: str,
+        actor_cls,
+        min_size: int = 0,
+        max_size: int = 0,
+        max_uses: int = 100,
+        health_check_timeout: float = 10.0,
+    ):
+        """
+        Args:
+            env_type (str): The environment type served by this pool.
+            actor_cls: Ray remote actor class exposing `reset`, `ping`
+                and `close`.
+            min_size (int, optional): Idle actors kept started.
+                Defaults to 0.
+            max_size (int, optional): Maximum idle actors kept for reuse.
+                0 disables reuse. Defaults to 0.
+            max_uses (int, optional): Episodes served before an actor is
+                recycled. Defaults to 100.
+            health_check_timeout (float, optional): Seconds to wait for
+                `ping`. Defaults to 10.0.
+        """
+        self.env_type = env_type
+        self.actor_cls = actor_cls
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.max_uses = max_uses
+        self.health_check_timeout = health_check_timeout
+
+        self._idle: List[PooledActor] = []
+        self._refilling = 0
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evicted": 0,
+            "recycled": 0,
+        }
+
+    @property
+    def num_idle(self) -> int:
+        """Number of idle actors ready to be handed out."""
+        return len(self._idle)
+
+    async def _is_healthy(self, actor: PooledActor) -> bool:
+        try:
+            await asyncio.wait_for(
+                actor.handle.ping.remote(),
+                timeout=self.health_check_timeout,
+            )
+            return True
+        except Exception:
+            return False
+
+    def _evict(self, actor: PooledActor) -> None:
+        self.stats["evicted"] += 1
+        try:
+            ray.kill(actor.handle)
+        except Exception as e:
+            print(f"Error killing evicted {self.env_type} actor: {e}")
+
+    async def _spawn_idle(self) -> None:
+        """Starts one actor without a task and adds it to the idle list."""
+        self._refilling += 1
+        try:
+            handle = self.actor_cls.remote(None, None, None)
+            actor = PooledActor(handle=handle, env_type=self.env_type)
+            try:
+                # no timeout here: a cold start may legitimately be slow
+                await handle.ping.remote()
+                self._idle.append(actor)
+            except Exception as e:
+                print(f"Error starting pooled {self.env_type} actor: {e}")
+                self._evict(actor)
+        finally:
+            self._refilling -= 1
+
+    def _refill(self) -> None:
+        """Tops the idle list up to `min_size` in the background."""
+        missing = self.min_size - len(self._idle) - self._refilling
+        for _ in range(max(0, missing)):
+            asyncio.ensure_future(self._spawn_idle())
+
+    async def warm_up(self) -> None:
+        """Starts `min_size` actors."""
+        missing = self.min_size - len(self._idle) - self._refilling
+        await asyncio.gather(
+            *[self._spawn_idle() for _ in range(max(0, missing))],
+        )
+
+    async def acquire(
+        self,
+        task_id: str,
+        instance_id: str,
+        params: Dict = None,
+    ) -> PooledActor:
+        """
+        Hands out an actor whose environment is set up for `task_id`.
+
+        Args:
+            task_id (str): The task of the new episode.
+            instance_id (str): The ID of the environment instance.
+            params (Dict, optional): Creation parameters of the env.
+
+        Returns:
+            PooledActor: A reset idle actor, or a newly started one.
+        """
+        while self._idle:
+            actor = self._idle.pop()
+            if not await self._is_healthy(actor):
+                self._evict(actor)
+                continue
+            try:
+                await actor.handle.reset.remote(task_id, instance_id, params)
+            except Exception as e:
+                print(f"Error resetting pooled {self.env_type} actor: {e}")
+                self._evict(actor)
+                continue
+            actor.uses += 1
+            self.stats["hits"] += 1
+            self._refill()
+            return actor
+
+        self.stats["misses"] += 1
+        self._refill()
+        handle = self.actor_cls.remote(task_id, instance_id, params)
+        return PooledActor(handle=handle, env_type=self.env_type, uses=1)
+
+    async def release(self, actor: PooledActor) -> None:
+        """
+        Closes the actor's environment and keeps the actor for reuse when
+        it is healthy, under `max_uses` and the pool has room.
+
+        Args:
+            actor (PooledActor): An actor returned by `acquire`.
+        """
+        try:
+            await actor.handle.close.remote()
+        except Exception as e:
+            print(f"Error closing {self.env_type} env: {e}")
+            actor.healthy = False
+
+        if not actor.healthy:
+            self._evict(actor)
+        elif actor.uses >= self.max_uses or len(self._idle) >= self.max_size:
+            self.stats["recycled"] += 1
+            ray.kill(actor.handle)
+        else:
+            self._idle.append(actor)
+
+    async def health_check(self) -> None:
+        """Pings every idle actor and evicts the ones that do not answer."""
+        idle = list(self._idle)
+        healthy = await asyncio.gather(*[self._is_healthy(a) for a in idle])
+        for actor, ok in zip(idle, healthy):
+            if not ok and actor in self._idle:
+                self._idle.remove(actor)
+                self._evict(actor)
+        self._refill()
+
+    def shutdown(self) -> None:
+        """Kills all idle actors."""
+        idle, self._idle = self._idle, []
+        for actor in idle:
+            try:
+                ray.kill(actor.handle)
+            except Exception:
+                pass
+
+    def get_stats(self) -> Dict[str, Optional[int]]:
+        """Returns hit/miss/eviction counters and the idle count."""
+        return {**self.stats, "idle": len(self._idle)}
@@ -28,6 +28,7 @@ from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 
 
+from .actor_pool import EnvActorPool, PooledActor
 from .registry import Registry
 
 
@@ -121,6 +122,24 @@ class ServiceRequest(BaseModel):
     params: Dict[str, Any] = {}
 
 
+class BatchStepItem(BaseModel):
+    """
+    A single `(instance_id, action)` pair of a batch step request.
+    """
+
+    instance_id: str
+    action: Dict[str, Any] = {}
+
+
+class BatchStepRequest(BaseModel):
+    """
+    Batch step request class.
+    """
+
+    steps: List[BatchStepItem] = []
+    params: Dict[str, Any] = {}
+
+
 class EnvService:
     """
     Manages the lifecycle of training environment instances.
@@ -147,6 +166,53 @@ class EnvService:
         self.cleanup_interval = 300
         self.max_idle_time = 3600
 
+        # warm actor pools, see `configure_pool`
+        self.pools: Dict[str, EnvActorPool] = {}
+        self.warm_env_types: List[str] = []
+        self.pool_config: Dict[str, Any] = {"min_size": 0, "max_size": 0}
+        self.leases: Dict[str, PooledActor] = {}
+
+    def configure_pool(
+        self,
+        min_size: int = 0,
+        max_size: int = 0,
+        max_uses: int = 100,
+        health_check_timeout: float = 10.0,
+    ) -> None:
+        """
+        Enable warm actor reuse for every env_type.
+
+        Args:
+            min_size (int, optional): Idle actors kept started per env_type.
+                Defaults to 0.
+            max_size (int, optional): Maximum idle actors per env_type.
+                Reuse is disabled when both sizes are 0. Defaults to 0.
+            max_uses (int, optional): Episodes served by one actor before it
+                is recycled. Defaults to 100.
+            health_check_timeout (float, optional): Seconds to wait for a
+                health check. Defaults to 10.0.
+        """
+        self.pool_config = {
+            "min_size": min_size,
+            "max_size": max_size,
+            "max_uses": max_uses,
+            "health_check_timeout": health_check_timeout,
+        }
+
+    def get_pool(self, env_type: str) -> Optional[EnvActorPool]:
+        """
+        Get the warm actor pool of `env_type`, or None if pooling is off.
+        """
+        if not (self.pool_config["min_size"] or self.pool_config["max_size"]):
+            return None
+        if env_type not in self.pools:
+            self.pools[env_type] = EnvActorPool(
+                env_type,
+                self.get_remote_env_cls(env_type),
+                **self.pool_config,
+            )
+        return self.pools[env_type]
+
     async def cleanup_inactive_instances(self):
         """
         Periodically clean up inactive environment instances.
@@ -155,6 +221,9 @@ class EnvService:
         specified maximum idle time.
         """
 
+        for pool in self.pools.values():
+            await pool.health_check()
+
         current_time = datetime.now()
         instances_to_release = []
         for instance_id, last_access in self.last_access_time.items():
@@ -204,14 +273,27 @@ class EnvService:
                         f"env_service.environments.{env_type}."
                         f"{env_type}_env",
                     )
-                    envir_class = getattr(
+                    self.envir_class = getattr(
                         module,
                         f"{env_type.capitalize()}Env",
                     )
-                    self.env = envir_class(task_id, instance_id, params)
                 except ImportError as e:
                     print(f"Error importing {env_type}_env: {e}")
                     raise
+                # a pooled actor is started without a task and reset later
+                self.env = None
+                if task_id is not None:
+                    self.env = self.envir_class(task_id, instance_id, params)
+
+            def reset(self, task_id, instance_id, params):
+                """set up a new env in this (warm) actor"""
+                if self.env is not None:
+                    self.env.close()
+                self.env = self.envir_class(task_id, instance_id, params)
+
+            def ping(self):
+                """health check"""
+                return True
 
             def get_init_state(self, params):
                 """remote init state"""
@@ -231,7 +313,10 @@ class EnvService:
 
             def close(self):
                 """remote close"""
-                return self.env.close()
+                if self.env is None:
+                    return None
+                env, self.env = self.env, None
+                return env.close()
 
         self.remote_env[env_type] = RemoteEnv
         return RemoteEnv
@@ -327,7 +412,12 @@ class EnvService:
 
             if env_type == "webshop":
                 params["server"] = SIM_SERVER
-                env_actor = env_remote_cls.remote(task_id, instance_id, params)
+
+            pool = self.get_pool(env_type)
+            if pool is not None:
+                lease = await pool.acquire(task_id, instance_id, params)
+                self.leases[instance_id] = lease
+                env_actor = lease.handle
             else:
                 env_actor = env_remote_cls.remote(task_id, instance_id, params)
 
@@ -340,6 +430,7 @@ class EnvService:
 
         except Exception as e:
             print(f"Error in create_instance: {str(e)}")
+            self._mark_unhealthy(instance_id)
             print(f"Current working directory: {os.getcwd()}")
             print(f"PYTHONPATH: {os.environ.get('PYTHONPATH', '')}")
             print(f"sys.path: {sys.path}")
@@ -381,8 +472,40 @@ class EnvService:
 
         except Exception as e:
             print(f"Error in step: {str(e)}")
+            self._mark_unhealthy(instance_id)
             raise
 
+    async def batch_step(
+        self,
+        steps: List[BatchStepItem],
+        params: Dict = None,
+    ) -> List[dict]:
+        """
+        Execute one step in each of several environment instances concurrently.
+
+        A failing instance does not fail the whole batch; its entry carries
+        the error instead.
+
+        Args:
+            steps (List[BatchStepItem]):
+                The `(instance_id, action)` pairs to execute.
+            params (Dict, optional):
+                Additional parameters applied to every step.
+
+        Returns:
+            List[dict]: One result per pair, in request order.
+        """
+        results = await asyncio.gather(
+            *[self.step(item.instance_id, item.action, params) for item in steps],
+            return_exceptions=True,
+        )
+        return [
+            {"success": False, "data": None, "error": str(result)}
+            if isinstance(result, Exception)
+            else {"success": True, "data": result, "error": None}
+            for result in results
+        ]
+
     async def evaluate(
         self,
         instance_id: str,
@@ -414,6 +537,7 @@ class EnvService:
             )
         except Exception as e:
             print(f"Error in evaluate: {str(e)}")
+            self._mark_unhealthy(instance_id)
             raise
 
     async def release_instance(self, instance_id: str) -> bool:
@@ -431,13 +555,23 @@ class EnvService:
         """
         if instance_id not in self.env_actors:
             return False
-        env_actor = self.env_actors[instance_id]
-        await env_actor.close.remote()
-        ray.kill(self.env_actors[instance_id])
-        del self.env_actors[instance_id]
+        env_actor = self.env_actors.pop(instance_id)
         self.last_access_time.pop(instance_id, None)
+        lease = self.leases.pop(instance_id, None)
+        if lease is not None:
+            # ⭐ close the env and keep the warm actor for the next instance
+            await self.pools[lease.env_type].release(lease)
+            return True
+        await env_actor.close.remote()
+        ray.kill(env_actor)
         return True
 
+    def _mark_unhealthy(self, instance_id: str) -> None:
+        """A pooled actor that failed is evicted instead of reused."""
+        lease = self.leases.get(instance_id)
+        if lease is not None:
+            lease.healthy = False
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -449,6 +583,10 @@ async def lifespan(app: FastAPI):
     and cancels it during the shutdown process.
     """
     cleanup_task = asyncio.create_task(cleanup_loop())
+    for env_type in env_service.warm_env_types:
+        pool = env_service.get_pool(env_type)
+        if pool is not None:
+            asyncio.create_task(pool.warm_up())
 
     yield
 
@@ -457,6 +595,8 @@ async def lifespan(app: FastAPI):
         await cleanup_task
     except asyncio.CancelledError:
         pass
+    for pool in env_service.pools.values():
+        pool.shutdown()
 
 
 async def cleanup_loop():
@@ -491,6 +631,24 @@ async def healthz():
     return Response(content="OK", status_code=200)
 
 
+@app.get(
+    "/pool_stats",
+    summary="Warm actor pool counters per env_type",
+)
+async def pool_stats():
+    """
+    Report the warm actor pool counters.
+
+    Returns:
+        dict: Hits, misses, evictions, recycled and idle actors
+            per env_type.
+    """
+    return {
+        "success": True,
+        "data": {k: p.get_stats() for k, p in env_service.pools.items()},
+    }
+
+
 @app.post("/get_env_profile")
 async def handle_env_profile(request: ServiceRequest):
     """
@@ -606,6 +764,44 @@ async def handle_step(request: ServiceRequest):
         raise HTTPException(status_code=500, detail=tb) from e
 
 
+@app.post("/batch_step")
+async def handle_batch_step(request: BatchStepRequest):
+    """
+    Execute one step in each of several environment instances.
+
+    This endpoint takes N `(instance_id, action)` pairs and returns N
+    states in one round trip, so clients driving many instances do not
+    pay one HTTP request per step.
+
+    Args:
+        request (BatchStepRequest): The batch request containing
+            the step pairs and shared parameters.
+
+    Returns:
+        dict: A dictionary with the batch status and per-instance results.
+
+    Raises:
+        HTTPException: If the request is malformed (400) or the batch
+            could not be dispatched (500).
+    """
+    try:
+        if not request.steps:
+            raise ValueError("steps is required")
+
+        results = await env_service.batch_step(
+            steps=request.steps,
+            params=request.params,
+        )
+        return {"success": True, "data": results}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        import traceback
+
+        tb = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+        raise HTTPException(status_code=500, detail=tb) from e
+
+
 @app.post("/evaluate")
 async def handle_evaluate(request: ServiceRequest):
     """
@@ -750,8 +946,33 @@ if __name__ == "__main__":
         default=False,
         help="debug mode or not",
     )
+    parser.add_argument(
+        "--pool_min_size",
+        type=int,
+        default=0,
+        help="Warm env actors kept started per env type",
+    )
+    parser.add_argument(
+        "--pool_max_size",
+        type=int,
+        default=0,
+        help="Idle env actors kept for reuse per env type, 0 disables reuse",
+    )
+    parser.add_argument(
+        "--pool_max_uses",
+        type=int,
+        default=100,
+        help="Episodes served by a pooled env actor before it is recycled",
+    )
     args = parser.parse_args()
 
+    env_service.configure_pool(
+        min_size=args.pool_min_size,
+        max_size=args.pool_max_size,
+        max_uses=args.pool_max_uses,
+    )
+    env_service.warm_env_types = [args.env]
+
     env_class = import_and_register_env(args.env, args.env_file_name)
     if env_class is None:
         print(f"Failed to import and register environment {args.env}")
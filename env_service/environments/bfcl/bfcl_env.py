@@ -28,6 +28,7 @@ from env_service.trajectory import StateMessage, ActionMessage, ToolCall
 
 
 from env_service.environments.bfcl.env_handler import EnvHandler
+from env_service.environments.bfcl.test_case_store import get_test_case_store, load_split_ids
 
 # 默认路径，可用环境变量覆盖
 os.environ.setdefault("BFCL_DATA_PATH", "./bfcl_data/multiturn_data.jsonl")
@@ -427,19 +428,8 @@ class BfclEnv(BaseEnv):
         if test_id is None:
             raise ValueError("task_id is required")
 
-        with open(data_path, "r", encoding="utf-8") as f:
-            if str(test_id).isdigit():
-                idx = int(test_id)
-                for line_no, line in enumerate(f):
-                    if line_no == idx:
-                        return json.loads(line)
-                raise ValueError(f"Test case index {idx} not found in {data_path}")
-            else:
-                for line in f:
-                    data = json.loads(line)
-                    if data.get("id") == test_id:
-                        return data
-                raise ValueError(f"Test case id '{test_id}' not found in {data_path}")
+        # 偏移索引 + mmap，避免每次线性扫描整个 JSONL
+        return get_test_case_store(data_path).get(test_id)
 
     # 静态接口给 env_service 用
     @staticmethod
@@ -456,6 +446,4 @@ class BfclEnv(BaseEnv):
         """
 
         path = os.getenv("BFCL_SPLID_ID_PATH")
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)[split]
-            # return [json.loads(l)["id"] for l in f]
+        return list(load_split_ids(path)[split])
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Indexed, memory-mapped access to the BFCL JSONL test cases.
+
+`BfclEnv` loads one test case per `get_init_state`. Scanning the JSONL file
+for every environment makes instance creation O(file size); here the file is
+scanned once to record the byte offset of every line and the line of every
+test id. The index is stored next to the data file (`<data>.idx.json`) and
+rebuilt whenever the data file's mtime or size changes. A lookup is then a
+slice of the memory-mapped file and a single `json.loads`.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class TestCaseStore:
+    """
+    Offset index plus mmap over one BFCL JSONL data file.
+
+    Parsed entries are kept in a small LRU. Callers mutate test entries
+    (e.g. holdout functions are appended to `function`), so `get` always
+    returns a deep copy of the cached entry.
+    """
+
+    __test__ = False  # not a pytest class
+
+    def __init__(self, data_path: str, cache_size: int = 256):
+        """
+        Args:
+            data_path (str): Path of the JSONL data file.
+            cache_size (int, optional): Parsed entries kept in memory.
+                0 disables the cache. Defaults to 256.
+        """
+        self.data_path = str(data_path)
+        self.index_path = self.data_path + INDEX_SUFFIX
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._offsets: List[int] = []
+        self._ids: Dict[str, int] = {}
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+
+    # ------------------------------------------------------------------ #
+    # index
+    # ------------------------------------------------------------------ #
+    def _build_index(self) -> Tuple[List[int], Dict[str, int]]:
+        """Scans the data file once: byte offset of every line, line of every id."""
+        offsets: List[int] = []
+        ids: Dict[str, int] = {}
+        offset = 0
+        with open(self.data_path, "rb") as f:
+            for line_no, line in enumerate(f):
+                offsets.append(offset)
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    test_id = json.loads(line).get("id")
+                except (json.JSONDecodeError, AttributeError):
+                    continue
+                if test_id is not None:
+                    # keep the first occurrence, like the linear scan did
+                    ids.setdefault(str(test_id), line_no)
+        return offsets, ids
+
+    def _load_index(self, signature: Tuple[int, int]) -> bool:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (
+            index.get("version") != INDEX_VERSION
+            or index.get("mtime_ns") != signature[0]
+            or index.get("size") != signature[1]
+        ):
+            return False
+        self._offsets = index["offsets"]
+        self._ids = index["ids"]
+        return True
+
+    def _save_index(self, signature: Tuple[int, int]) -> None:
+        index = {
+            "version": INDEX_VERSION,
+            "mtime_ns": signature[0],
+            "size": signature[1],
+            "offsets": self._offsets,
+            "ids": self._ids,
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            # atomic, so concurrent env actors never read a partial index
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            # read-only data directory: keep the in-memory index only
+            print(f"Could not persist BFCL index {self.index_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _ensure_open(self) -> None:
+        """(Re)loads the index and the mmap when the data file changed."""
+        if not os.path.exists(self.data_path):
+            raise FileNotFoundError(f"BFCL data file '{self.data_path}' not found")
+        signature = _file_signature(self.data_path)
+        if signature == self._signature:
+            return
+
+        self.close()
+        if not self._load_index(signature):
+            self._offsets, self._ids = self._build_index()
+            self._save_index(signature)
+
+        self._file = open(self.data_path, "rb")
+        if signature[1] > 0:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._signature = signature
+        self._cache.clear()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._signature = None
+
+    # ------------------------------------------------------------------ #
+    # lookup
+    # ------------------------------------------------------------------ #
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_open()
+            return len(self._offsets)
+
+    def _read_line(self, line_no: int) -> Dict[str, Any]:
+        start = self._offsets[line_no]
+        if line_no + 1 < len(self._offsets):
+            end = self._offsets[line_no + 1]
+        else:
+            end = self._signature[1]
+        return json.loads(self._mm[start:end])
+
+    def _get_line(self, line_no: int) -> Dict[str, Any]:
+        entry = self._cache.get(line_no)
+        if entry is not None:
+            self._cache.move_to_end(line_no)
+            return entry
+        entry = self._read_line(line_no)
+        if self.cache_size > 0:
+            self._cache[line_no] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def get(self, test_id: str | int) -> Dict[str, Any]:
+        """
+        Loads one test case by line number (digit ids) or by `id`.
+
+        Args:
+            test_id (str | int): Line index, or the test case `id`.
+
+        Returns:
+            Dict[str, Any]: A private copy of the test case.
+
+        Raises:
+            FileNotFoundError: The data file does not exist.
+            ValueError: No such line or id.
+        """
+        with self._lock:
+            self._ensure_open()
+            if str(test_id).isdigit():
+                line_no = int(test_id)
+                if line_no >= len(self._offsets):
+                    raise ValueError(f"Test case index {line_no} not found in {self.data_path}")
+            else:
+                line_no = self._ids.get(str(test_id))
+                if line_no is None:
+                    raise ValueError(f"Test case id '{test_id}' not found in {self.data_path}")
+            entry = self._get_line(line_no)
+        return copy.deepcopy(entry)
+
+
+_stores: Dict[str, TestCaseStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_test_case_store(data_path: str) -> TestCaseStore:
+    """Returns the process-wide store of `data_path`."""
+    key = os.path.abspath(str(data_path))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            cache_size = int(os.getenv("BFCL_TEST_CASE_CACHE_SIZE", "256"))
+            store = _stores[key] = TestCaseStore(key, cache_size=cache_size)
+        return store
+
+
+_splits: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def load_split_ids(path: str) -> Dict[str, Any]:
+    """
+    Loads the split -> ids JSON, parsed once per process and re-read only
+    when the file's mtime or size changes.
+    """
+    key = os.path.abspath(str(path))
+    signature = _file_signature(key)
+    with _stores_lock:
+        cached = _splits.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    with open(key, "r", encoding="utf-8") as f:
+        splits = json.load(f)
+    with _stores_lock:
+        _splits[key] = (signature, splits)
+    return splits
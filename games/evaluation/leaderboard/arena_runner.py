@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Multi-process arena runner.
+
+The thread mode of `run_arena.py` gives every game its own thread and its own event loop
+(`workflow.execute()` calls `asyncio.run`), so the Python-heavy game engines of all games compete
+for one GIL while their LLM calls wait. Here every worker process keeps one long-lived event loop
+and runs `games_per_process` games on it as concurrent tasks; games are spread over the processes
+through a shared queue and results flow back to the parent, which records them in the leaderboard.
+"""
+import asyncio
+import multiprocessing
+import queue
+import statistics
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from games.evaluation.leaderboard.arena_workflow import create_arena_workflow
+from games.evaluation.leaderboard.leaderboard_db import LeaderboardDB
+from games.evaluation.leaderboard.rate_limiter import set_global_rate_limiter, apply_rate_limiting_to_openai_model
+
+
+def prepare_arena_game_config(
+    config_dict: Dict[str, Any],
+    game_id: int,
+    timestamp: str,
+    leaderboard_db: LeaderboardDB,
+) -> Dict[str, Any]:
+    """Build the per-game config: game id, seed offset and current model game counts.
+
+    Args:
+        config_dict: Game configuration from `build_task_configs`
+        game_id: Index of the game in this arena run
+        timestamp: Evaluation timestamp shared by all games of the run
+        leaderboard_db: Leaderboard database to get game counts for fairness
+
+    Returns:
+        Configuration for `create_arena_workflow`
+    """
+    config_dict = config_dict.copy()
+    config_dict['game_id'] = game_id
+    config_dict['evaluation_timestamp'] = timestamp
+
+    # Use game_id as seed offset for reproducibility
+    arena_config = config_dict.get('arena', {})
+    base_seed = arena_config.get('seed')
+    if base_seed is not None:
+        arena_config['seed'] = base_seed + game_id
+        config_dict['arena'] = arena_config
+
+    # Pass game counts for fair model assignment
+    # Update counts before each game to ensure fairness
+    # Pass arena models to ensure all are included (new models get count 0)
+    arena_models = config_dict.get('arena', {}).get('models', [])
+    config_dict['_model_game_counts'] = leaderboard_db.get_model_game_counts(arena_models)
+    return config_dict
+
+
+class ArenaRunStats:
+    """Throughput and per-game wall time of an arena run."""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.wall_times: List[float] = []
+        self.failed = 0
+
+    def record(self, wall_time: float, succeeded: bool):
+        self.wall_times.append(wall_time)
+        if not succeeded:
+            self.failed += 1
+
+    def summary(self) -> Dict[str, float]:
+        elapsed = time.perf_counter() - self.start_time
+        wall_times = sorted(self.wall_times) or [0.0]
+        return {
+            'games': len(self.wall_times),
+            'failed': self.failed,
+            'elapsed': elapsed,
+            'games_per_min': len(self.wall_times) / elapsed * 60 if elapsed > 0 else 0.0,
+            'wall_time_mean': statistics.mean(wall_times),
+            'wall_time_p50': wall_times[len(wall_times) // 2],
+            'wall_time_p95': wall_times[min(len(wall_times) - 1, int(len(wall_times) * 0.95))],
+        }
+
+    def format(self) -> str:
+        s = self.summary()
+        return (f"{s['games']} games ({s['failed']} failed) in {s['elapsed']:.1f}s, "
+                f"{s['games_per_min']:.1f} games/min | per-game wall time: mean={s['wall_time_mean']:.1f}s, "
+                f"p50={s['wall_time_p50']:.1f}s, p95={s['wall_time_p95']:.1f}s")
+
+
+async def run_arena_game_async(
+    game_name: str,
+    config_dict: Dict[str, Any],
+    game_id: int,
+    timestamp: str,
+    leaderboard_db: LeaderboardDB,
+) -> Dict[str, Any]:
+    """Run a single arena game on the running event loop (the async counterpart of `workflow.execute()`)."""
+    config_dict = prepare_arena_game_config(config_dict, game_id, timestamp, leaderboard_db)
+    workflow = create_arena_workflow(game_name, config_dict)
+    return await workflow._execute_async()
+
+
+async def _serve_games(
+    game_name: str,
+    leaderboard_db: LeaderboardDB,
+    timestamp: str,
+    games_per_process: int,
+    task_queue,
+    result_queue,
+):
+    """Run games from `task_queue` as concurrent tasks on this process's event loop until a sentinel arrives."""
+    loop = asyncio.get_running_loop()
+    # ⭐ Only blocking queue reads leave the loop, games themselves all run on it
+    with ThreadPoolExecutor(max_workers=games_per_process, thread_name_prefix="arena_queue") as queue_reader:
+        async def consume():
+            while (task := await loop.run_in_executor(queue_reader, task_queue.get)) is not None:
+                game_id, config_dict = task
+                start = time.perf_counter()
+                try:
+                    result, error = await run_arena_game_async(game_name, config_dict, game_id, timestamp, leaderboard_db), None
+                except Exception as e:
+                    print(f"[arena] Game {game_id} failed: {e}", file=sys.stderr)
+                    traceback.print_exc()
+                    result, error = None, f"{type(e).__name__}: {e}"
+                result_queue.put((game_id, result, time.perf_counter() - start, error))
+
+        await asyncio.gather(*(consume() for _ in range(games_per_process)))
+
+
+def _arena_worker(
+    game_name: str,
+    db_path: str,
+    timestamp: str,
+    games_per_process: int,
+    api_call_interval: float,
+    initializer: Optional[Callable[[], None]],
+    task_queue,
+    result_queue,
+):
+    """Worker process entry point: one event loop for the lifetime of the process."""
+    if initializer is not None:
+        initializer()
+    if api_call_interval > 0.0:
+        set_global_rate_limiter(api_call_interval)
+        apply_rate_limiting_to_openai_model()
+    leaderboard_db = LeaderboardDB(db_path)  # the SQLite store is safe to share between processes
+    try:
+        asyncio.run(_serve_games(game_name, leaderboard_db, timestamp, games_per_process, task_queue, result_queue))
+    finally:
+        leaderboard_db.close()
+
+
+def run_arena_in_processes(
+    game_name: str,
+    task_configs: List[Dict[str, Any]],
+    leaderboard_db: LeaderboardDB,
+    num_processes: int,
+    games_per_process: int = 8,
+    api_call_interval: float = 0.0,
+    timestamp: Optional[str] = None,
+    initializer: Optional[Callable[[], None]] = None,
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]], float]]:
+    """Run arena games on worker processes and yield results as games finish.
+
+    Args:
+        game_name: Name of the game (e.g., 'avalon', 'diplomacy')
+        task_configs: One configuration per game, from `build_task_configs`
+        leaderboard_db: Leaderboard database; workers open their own connection to it for fair model assignment
+        num_processes: Number of worker processes
+        games_per_process: Number of concurrent games on each worker's event loop
+        api_call_interval: Minimum seconds between API calls across all workers (0.0: no limit)
+        timestamp: Evaluation timestamp shared by all games (default: now)
+        initializer: Optional picklable callable run at the start of each worker, e.g. to register
+            an arena workflow that is not built in
+
+    Yields:
+        (game_id, result or None if the game failed, wall time of the game in seconds)
+    """
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    num_processes = max(1, min(num_processes, len(task_configs)))
+    ctx = multiprocessing.get_context('spawn')
+    task_queue, result_queue = ctx.Queue(), ctx.Queue()
+    for game_id, config_dict in enumerate(task_configs):
+        task_queue.put((game_id, config_dict))
+    for _ in range(num_processes * games_per_process):
+        task_queue.put(None)
+
+    # Each process limits its own calls, so spread the interval to keep the overall rate
+    worker_interval = api_call_interval * num_processes
+    workers = [
+        ctx.Process(
+            target=_arena_worker,
+            args=(game_name, str(leaderboard_db.db_path), timestamp, games_per_process, worker_interval,
+                  initializer, task_queue, result_queue),
+            name=f"arena_worker_{i}",
+            daemon=True,
+        )
+        for i in range(num_processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        remaining = len(task_configs)
+        while remaining:
+            try:
+                game_id, result, wall_time, _ = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    print(f"[arena] All workers exited with {remaining} games unfinished", file=sys.stderr)
+                    break
+                continue
+            remaining -= 1
+            yield game_id, result, wall_time
+    finally:
+        for worker in workers:
+            worker.join(timeout=5.0)
+            if worker.is_alive():
+                worker.terminate()
@@ -1,316 +1,467 @@
 # -*- coding: utf-8 -*-
-"""Leaderboard database for persistent storage and incremental updates."""
+"""Leaderboard database for persistent storage and incremental updates.
+
+The leaderboard lives in an SQLite database in WAL mode. Every batch of game results is one short transaction that
+appends the games and updates only the ratings and statistics of the models that played, so evaluation threads and
+several arena processes can write to the same leaderboard concurrently without losing updates. Standings and history
+pages are SQL queries that never load the full game history.
+
+For compatibility, `db_path` may still name the legacy JSON file: the database is then stored next to it with a
+`.sqlite` suffix, the JSON content is imported when the database is created, and `save()` exports a JSON snapshot.
+Later edits to the JSON file are not imported; a warning is printed when it is newer than the last import or export.
+"""
 import json
+import os
+import sqlite3
+import statistics
 import threading
-from pathlib import Path
-from typing import Dict, Any, List, Optional
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS models (
+    model TEXT PRIMARY KEY,
+    elo REAL NOT NULL,
+    total_games INTEGER NOT NULL DEFAULT 0,
+    total_wins REAL NOT NULL DEFAULT 0,
+    first_seen TEXT NOT NULL,
+    last_updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS role_stats (
+    model TEXT NOT NULL,
+    role TEXT NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (model, role)
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    language TEXT,
+    results TEXT NOT NULL
+);
+"""
+
+
+def resolve_db_path(db_path: str) -> Path:
+    """The SQLite file of a leaderboard path: `x.json` is stored in `x.sqlite`, any other path is used as is."""
+    path = Path(db_path)
+    return path.with_suffix('.sqlite') if path.suffix == '.json' else path
 
 
 class LeaderboardDB:
     """Persistent leaderboard database."""
-    
-    def __init__(self, db_path: str = "games/evaluation/leaderboard/leaderboard.json"):
+
+    def __init__(self, db_path: str = "games/evaluation/leaderboard/leaderboard.json", timeout: float = 60.0):
         """Initialize leaderboard database.
-        
+
         Args:
-            db_path: Path to JSON database file
+            db_path: Path to the database, or to a legacy JSON leaderboard (imported on first use)
+            timeout: Seconds a writer waits for another process's transaction before failing
         """
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.data = self._load()
-        self._lock = threading.Lock()  # Thread-safe operations
-    
-    def _load(self) -> Dict[str, Any]:
-        """Load leaderboard data from file."""
-        if self.db_path.exists():
+        self.sqlite_path = resolve_db_path(db_path)
+        self.sqlite_path.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self._local = threading.local()  # one connection per thread (and process)
+        self._init_db()
+
+    @staticmethod
+    def exists(db_path: str) -> bool:
+        """Whether a leaderboard exists at `db_path`, as a database or as a legacy JSON file."""
+        return resolve_db_path(db_path).exists() or Path(db_path).exists()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(str(self.sqlite_path), timeout=self.timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction; BEGIN IMMEDIATE takes the write lock upfront so read-modify-write cannot interleave."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _init_db(self):
+        """Create the schema, and import the legacy JSON leaderboard into a new database."""
+        self._connect().executescript(_SCHEMA)
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'created_at'").fetchone():
+                self._warn_if_json_edited(conn)
+                return
+            data = self._load_json()
+            now = datetime.now().isoformat()
+            meta = {
+                'version': '2.0',
+                'created_at': data.get('created_at', now),
+                'updated_at': data.get('updated_at', now),
+                'elo_initial': data.get('elo_initial', 1500),
+                'elo_k': data.get('elo_k', 32),
+                'total_games': len(data.get('games_history', [])),
+            }
+            if data:
+                meta['json_mtime_ns'] = self.db_path.stat().st_mtime_ns
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                             [(key, json.dumps(value)) for key, value in meta.items()])
+            for model, stats in data.get('models', {}).items():
+                conn.execute(
+                    "INSERT INTO models (model, elo, total_games, total_wins, first_seen, last_updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (model, stats['elo'], stats['total_games'], stats['total_wins'],
+                     stats.get('first_seen', now), stats.get('last_updated', now)))
+                conn.executemany(
+                    "INSERT INTO role_stats (model, role, games, wins) VALUES (?, ?, ?, ?)",
+                    [(model, role, s['games'], s['wins']) for role, s in stats.get('role_stats', {}).items()])
+            conn.executemany(
+                "INSERT INTO games (timestamp, language, results) VALUES (?, ?, ?)",
+                [(entry.get('timestamp', now), entry.get('language'), json.dumps(entry.get('results', {}), ensure_ascii=False))
+                 for entry in data.get('games_history', [])])
+            if data.get('models'):
+                print(f"Imported leaderboard {self.db_path} into {self.sqlite_path}: "
+                      f"{len(data['models'])} models, {meta['total_games']} games")
+
+    def _warn_if_json_edited(self, conn: sqlite3.Connection):
+        """Warn when the legacy JSON changed after it was imported or last exported: the database ignores it."""
+        if self.db_path == self.sqlite_path or not self.db_path.exists():
+            return
+        synced = self._get_meta(conn, 'json_mtime_ns', 0)
+        if self.db_path.stat().st_mtime_ns > synced:
+            print(f"Warning: {self.db_path} is newer than its last import or export; the leaderboard is read from "
+                  f"{self.sqlite_path} and ignores edits to the JSON file")
+
+    def _load_json(self) -> Dict[str, Any]:
+        """Load the legacy JSON leaderboard, if `db_path` names one."""
+        if self.db_path != self.sqlite_path and self.db_path.exists():
             try:
                 with open(self.db_path, 'r', encoding='utf-8') as f:
                     return json.load(f)
             except Exception as e:
                 print(f"Warning: Failed to load leaderboard: {e}, starting fresh")
-        
+        return {}
+
+    def _get_meta(self, conn: sqlite3.Connection, key: str, default: Any = None) -> Any:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def _set_meta(self, conn: sqlite3.Connection, key: str, value: Any):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def set_elo_config(self, elo_initial: Optional[float] = None, elo_k: Optional[float] = None):
+        """Set the initial Elo of new models and the K-factor of rating updates.
+
+        Args:
+            elo_initial: Initial Elo rating of models added from now on
+            elo_k: K-factor of the Elo updates
+        """
+        with self._transaction() as conn:
+            if elo_initial is not None:
+                self._set_meta(conn, 'elo_initial', elo_initial)
+            if elo_k is not None:
+                self._set_meta(conn, 'elo_k', elo_k)
+
+    def save(self, path: Optional[str] = None):
+        """Export a JSON snapshot of the leaderboard, in the legacy format (including the full history).
+
+        Args:
+            path: Output file, defaults to the legacy JSON path of this leaderboard
+        """
+        path = Path(path) if path else (self.db_path if self.db_path != self.sqlite_path else self.sqlite_path.with_suffix('.json'))
+        conn = self._connect()
+        conn.execute("BEGIN")  # a consistent snapshot across the queries below
+        try:
+            data = {
+                'version': '1.0',
+                'created_at': self._get_meta(conn, 'created_at'),
+                'updated_at': self._get_meta(conn, 'updated_at'),
+                'models': {model: self._model_stats(conn, model) for model in self._model_names(conn)},
+                'games_history': [self._history_entry(row) for row in conn.execute("SELECT * FROM games ORDER BY id")],
+                'elo_initial': self._get_meta(conn, 'elo_initial', 1500),
+                'elo_k': self._get_meta(conn, 'elo_k', 32),
+            }
+        finally:
+            conn.execute("COMMIT")
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        if path == self.db_path:
+            with self._transaction() as conn:
+                self._set_meta(conn, 'json_mtime_ns', path.stat().st_mtime_ns)
+
+    def _model_names(self, conn: sqlite3.Connection) -> List[str]:
+        return [row['model'] for row in conn.execute("SELECT model FROM models ORDER BY rowid")]
+
+    def _model_stats(self, conn: sqlite3.Connection, model: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute("SELECT * FROM models WHERE model = ?", (model,)).fetchone()
+        if row is None:
+            return None
+        role_rows = conn.execute("SELECT role, games, wins FROM role_stats WHERE model = ? ORDER BY rowid", (model,))
         return {
-            'version': '1.0',
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat(),
-            'models': {},
-            'games_history': [],
-            'elo_initial': 1500,
-            'elo_k': 32
+            'elo': row['elo'],
+            'total_games': row['total_games'],
+            'total_wins': row['total_wins'],
+            'role_stats': {r['role']: {'wins': r['wins'], 'games': r['games']} for r in role_rows},
+            'first_seen': row['first_seen'],
+            'last_updated': row['last_updated'],
         }
-    
-    def save(self):
-        """Save leaderboard data to file (thread-safe)."""
-        with self._lock:
-            self.data['updated_at'] = datetime.now().isoformat()
-            with open(self.db_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-    
+
+    @staticmethod
+    def _history_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        results = json.loads(row['results'])
+        entry = {'timestamp': row['timestamp'], 'models': list(results.keys()), 'results': results}
+        if row['language'] is not None:
+            entry['language'] = row['language']
+        return entry
+
     def get_model_stats(self, model: str) -> Dict[str, Any]:
         """Get statistics for a model."""
-        return self.data['models'].get(model, {
-            'elo': self.data.get('elo_initial', 1500),
+        stats = self._model_stats(self._connect(), model)
+        if stats is not None:
+            return stats
+        return {
+            'elo': self._get_meta(self._connect(), 'elo_initial', 1500),
             'total_games': 0,
             'total_wins': 0,
             'role_stats': {},
             'first_seen': datetime.now().isoformat(),
             'last_updated': datetime.now().isoformat()
-        })
-    
+        }
+
+    def _insert_model(self, conn: sqlite3.Connection, model: str, elo: float) -> bool:
+        now = datetime.now().isoformat()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO models (model, elo, total_games, total_wins, first_seen, last_updated) VALUES (?, ?, 0, 0, ?, ?)",
+            (model, elo, now, now))
+        return cursor.rowcount > 0
+
     def add_model(self, model: str, initial_elo: Optional[int] = None):
         """Add a new model to the leaderboard.
-        
+
         Args:
             model: Model name
             initial_elo: Initial Elo rating (defaults to elo_initial)
         """
-        with self._lock:
-            if model not in self.data['models']:
-                self.data['models'][model] = {
-                    'elo': initial_elo or self.data.get('elo_initial', 1500),
-                    'total_games': 0,
-                    'total_wins': 0,
-                    'role_stats': {},
-                    'first_seen': datetime.now().isoformat(),
-                    'last_updated': datetime.now().isoformat()
-                }
-                self.data['updated_at'] = datetime.now().isoformat()
-                with open(self.db_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.data, f, indent=2, ensure_ascii=False)
-                print(f"Added new model to leaderboard: {model} (Elo: {self.data['models'][model]['elo']})")
-    
+        with self._transaction() as conn:
+            elo = initial_elo or self._get_meta(conn, 'elo_initial', 1500)
+            added = self._insert_model(conn, model, elo)
+            if added:
+                self._set_meta(conn, 'updated_at', datetime.now().isoformat())
+        if added:
+            print(f"Added new model to leaderboard: {model} (Elo: {elo})")
+
     def update_from_game_results(self, results: List[Dict[str, Any]]):
-        """Update leaderboard from game results (thread-safe).
-        
+        """Update leaderboard from game results (safe across threads and processes).
+
+        Each call is one transaction: the games are appended to the history and only the models that played are
+        read and updated.
+
         Args:
             results: List of game results, each containing 'roles' with model_name and score
         """
         from games.evaluation.leaderboard.leaderboard import calculate_elo
-        
-        # Thread-safe update
-        with self._lock:
-            elo_k = self.data.get('elo_k', 32)
-            
+
+        with self._transaction() as conn:
+            elo_k = self._get_meta(conn, 'elo_k', 32)
+            elo_initial = self._get_meta(conn, 'elo_initial', 1500)
+            games_added = 0
+
             for result in results:
                 if 'roles' not in result:
                     continue
-                
+
                 # Extract models and their scores in this game
                 game_models = {}
                 for role_info in result['roles']:
                     if 'model_name' in role_info and 'score' in role_info:
                         model = role_info['model_name']
-                        score = role_info['score']
                         role_name = role_info.get('role_name', 'unknown').split('_')[0]  # Extract base role
-                        
-                        # Ensure model exists
-                        if model not in self.data['models']:
-                            # Create model entry without saving (will save at end)
-                            self.data['models'][model] = {
-                                'elo': self.data.get('elo_initial', 1500),
-                                'total_games': 0,
-                                'total_wins': 0,
-                                'role_stats': {},
-                                'first_seen': datetime.now().isoformat(),
-                                'last_updated': datetime.now().isoformat()
-                            }
-                        
+                        self._insert_model(conn, model, elo_initial)  # Ensure model exists
                         game_models[model] = {
-                            'score': score,
+                            'score': role_info['score'],
                             'role': role_name
                         }
-                
+                if not game_models:
+                    continue
+
                 # Update statistics
+                now = datetime.now().isoformat()
                 for model, info in game_models.items():
-                    stats = self.data['models'][model]
-                    stats['total_games'] += 1
-                    stats['total_wins'] += info['score']
-                    
-                    # Update role stats
-                    role = info['role']
-                    if role not in stats['role_stats']:
-                        stats['role_stats'][role] = {'wins': 0, 'games': 0}
-                    stats['role_stats'][role]['games'] += 1
-                    stats['role_stats'][role]['wins'] += info['score']
-                    stats['last_updated'] = datetime.now().isoformat()
-                
+                    conn.execute(
+                        "UPDATE models SET total_games = total_games + 1, total_wins = total_wins + ?, last_updated = ? WHERE model = ?",
+                        (info['score'], now, model))
+                    conn.execute(
+                        "INSERT INTO role_stats (model, role, games, wins) VALUES (?, ?, 1, ?) "
+                        "ON CONFLICT (model, role) DO UPDATE SET games = games + 1, wins = wins + excluded.wins",
+                        (model, info['role'], info['score']))
+
                 # Update Elo scores (pairwise comparison)
                 # Normalize scores to 0-1 range for Elo calculation
+                placeholders = ",".join("?" * len(game_models))
+                elos = {row['model']: row['elo'] for row in conn.execute(
+                    f"SELECT model, elo FROM models WHERE model IN ({placeholders})", list(game_models))}
                 scores = [info['score'] for info in game_models.values()]
-                if scores:
-                    min_score = min(scores)
-                    max_score = max(scores)
-                    score_range = max_score - min_score if max_score > min_score else 1
-                    
-                    model_list = list(game_models.keys())
-                    for i, model_a in enumerate(model_list):
-                        for model_b in model_list[i+1:]:
-                            score_a_raw = game_models[model_a]['score']
-                            score_b_raw = game_models[model_b]['score']
-                            
-                            # Normalize to 0-1: (score - min) / range
-                            # For binary scores (0/1), this gives 0 or 1
-                            # For continuous scores, this gives relative performance
-                            score_a = (score_a_raw - min_score) / score_range if score_range > 0 else 0.5
-                            
-                            elo_a = self.data['models'][model_a]['elo']
-                            elo_b = self.data['models'][model_b]['elo']
-                            
-                            new_elo_a, new_elo_b = calculate_elo(elo_a, elo_b, score_a, elo_k)
-                            
-                            self.data['models'][model_a]['elo'] = new_elo_a
-                            self.data['models'][model_b]['elo'] = new_elo_b
-                
-                    # Record game in history
-                    history_entry = {
-                        'timestamp': datetime.now().isoformat(),
-                        'models': list(game_models.keys()),
-                        'results': {m: info['score'] for m, info in game_models.items()}
-                    }
-                    # Add language if available in result
-                    if 'language' in result:
-                        history_entry['language'] = result['language']
-                    self.data['games_history'].append(history_entry)
-            
-            # Save after all updates (inside lock)
-            self.data['updated_at'] = datetime.now().isoformat()
-            with open(self.db_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-    
+                min_score = min(scores)
+                max_score = max(scores)
+                score_range = max_score - min_score if max_score > min_score else 1
+
+                model_list = list(game_models.keys())
+                for i, model_a in enumerate(model_list):
+                    for model_b in model_list[i+1:]:
+                        # Normalize to 0-1: (score - min) / range
+                        # For binary scores (0/1), this gives 0 or 1
+                        # For continuous scores, this gives relative performance
+                        score_a = (game_models[model_a]['score'] - min_score) / score_range if score_range > 0 else 0.5
+                        elos[model_a], elos[model_b] = calculate_elo(elos[model_a], elos[model_b], score_a, elo_k)
+                conn.executemany("UPDATE models SET elo = ? WHERE model = ?", [(elo, model) for model, elo in elos.items()])
+
+                # Record game in history
+                conn.execute(
+                    "INSERT INTO games (timestamp, language, results) VALUES (?, ?, ?)",
+                    (now, result.get('language'),
+                     json.dumps({m: info['score'] for m, info in game_models.items()}, ensure_ascii=False)))
+                games_added += 1
+
+            if games_added:
+                self._set_meta(conn, 'total_games', self._get_meta(conn, 'total_games', 0) + games_added)
+            self._set_meta(conn, 'updated_at', datetime.now().isoformat())
+
+    def get_games_history(self, limit: int = 50, offset: int = 0, model: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of the game history, newest first.
+
+        Args:
+            limit: Maximum number of games returned
+            offset: Number of newer games skipped
+            model: Only return games this model played in
+
+        Returns:
+            List of history entries with 'timestamp', 'models', 'results' and 'language' if known
+        """
+        conn = self._connect()
+        if model is None:
+            rows = conn.execute("SELECT * FROM games ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset))
+        else:
+            rows = conn.execute(
+                "SELECT * FROM games WHERE EXISTS (SELECT 1 FROM json_each(games.results) WHERE json_each.key = ?) "
+                "ORDER BY id DESC LIMIT ? OFFSET ?", (model, limit, offset))
+        return [self._history_entry(row) for row in rows]
+
     def get_all_models(self) -> List[str]:
-        """Get list of all models in leaderboard - thread-safe."""
-        with self._lock:
-            return list(self.data['models'].keys())
-    
+        """Get list of all models in leaderboard."""
+        return self._model_names(self._connect())
+
     def get_model_game_counts(self, model_list: Optional[List[str]] = None) -> Dict[str, int]:
-        """Get game count for models (for fair assignment) - thread-safe.
-        
+        """Get game count for models (for fair assignment).
+
         Args:
             model_list: Optional list of specific models to get counts for.
                        If None, returns counts for all models in database.
                        Models not in database will have count 0.
-        
+
         Returns:
             Dictionary mapping model names to their game counts
         """
-        with self._lock:
-            if model_list is None:
-                # Return all models in database
-                return {model: self.data['models'][model]['total_games'] 
-                        for model in self.data['models'].keys()}
-            else:
-                # Return counts for specific models, ensuring all are included
-                counts = {}
-                for model in model_list:
-                    if model in self.data['models']:
-                        counts[model] = self.data['models'][model]['total_games']
-                    else:
-                        # Model not in database yet, return 0
-                        counts[model] = 0
-                return counts
-    
+        counts = {row['model']: row['total_games']
+                  for row in self._connect().execute("SELECT model, total_games FROM models ORDER BY rowid")}
+        if model_list is None:
+            return counts
+        return {model: counts.get(model, 0) for model in model_list}
+
     def get_min_game_count(self) -> int:
         """Get minimum game count among all models."""
         counts = self.get_model_game_counts().values()
         return min(counts) if counts else 0
-    
+
     def get_max_game_count(self) -> int:
         """Get maximum game count among all models."""
         counts = self.get_model_game_counts().values()
         return max(counts) if counts else 0
-    
-    def get_game_count_balance(self) -> Dict[str, Any]:
-        """Get statistics about game count balance - thread-safe."""
-        with self._lock:
-            counts = [self.data['models'][model]['total_games'] 
-                     for model in self.data['models'].keys()]
-            if not counts:
-                return {
-                    'min': 0,
-                    'max': 0,
-                    'mean': 0,
-                    'std': 0,
-                    'balance_ratio': 1.0
-                }
-            
-            import statistics
-            mean_count = statistics.mean(counts)
-            std_count = statistics.stdev(counts) if len(counts) > 1 else 0
-            min_count = min(counts)
-            max_count = max(counts)
-            
-            # Balance ratio: min/max (1.0 = perfectly balanced, 0.0 = completely unbalanced)
-            balance_ratio = min_count / max_count if max_count > 0 else 1.0
-            
+
+    @staticmethod
+    def _balance_stats(counts: List[int]) -> Dict[str, Any]:
+        if not counts:
             return {
-                'min': min_count,
-                'max': max_count,
-                'mean': round(mean_count, 1),
-                'std': round(std_count, 1),
-                'balance_ratio': round(balance_ratio, 3)
+                'min': 0,
+                'max': 0,
+                'mean': 0,
+                'std': 0,
+                'balance_ratio': 1.0
             }
-    
+        min_count = min(counts)
+        max_count = max(counts)
+        # Balance ratio: min/max (1.0 = perfectly balanced, 0.0 = completely unbalanced)
+        balance_ratio = min_count / max_count if max_count > 0 else 1.0
+        return {
+            'min': min_count,
+            'max': max_count,
+            'mean': round(statistics.mean(counts), 1),
+            'std': round(statistics.stdev(counts) if len(counts) > 1 else 0, 1),
+            'balance_ratio': round(balance_ratio, 3)
+        }
+
+    def get_game_count_balance(self) -> Dict[str, Any]:
+        """Get statistics about game count balance."""
+        return self._balance_stats(list(self.get_model_game_counts().values()))
+
     def get_leaderboard_data(self) -> Dict[str, Any]:
-        """Get formatted leaderboard data for display - thread-safe."""
-        with self._lock:
-            models = list(self.data['models'].keys())
-            model_stats = {}
-            
-            for model in models:
-                stats = self.data['models'][model]
-                total_games = stats['total_games']
-                total_wins = stats['total_wins']
-                win_rate = (total_wins / total_games * 100) if total_games > 0 else 0
-                
-                # Calculate role win rates
-                role_stats = {}
-                for role, role_data in stats['role_stats'].items():
-                    role_games = role_data['games']
-                    role_wins = role_data['wins']
-                    if role_games > 0:
-                        role_stats[role] = {
-                            'win_rate': (role_wins / role_games * 100),
-                            'games': role_games
-                        }
-                
-                model_stats[model] = {
-                    'elo': stats['elo'],
-                    'win_rate': win_rate,
-                    'total_games': total_games,
-                    'total_wins': total_wins,
-                    'role_stats': role_stats
-                }
-            
-            # Calculate balance (outside lock to avoid nested lock)
-            counts = [stats['total_games'] for stats in self.data['models'].values()]
-            if counts:
-                import statistics
-                mean_count = statistics.mean(counts)
-                std_count = statistics.stdev(counts) if len(counts) > 1 else 0
-                min_count = min(counts)
-                max_count = max(counts)
-                balance_ratio = min_count / max_count if max_count > 0 else 1.0
-                balance_stats = {
-                    'min': min_count,
-                    'max': max_count,
-                    'mean': round(mean_count, 1),
-                    'std': round(std_count, 1),
-                    'balance_ratio': round(balance_ratio, 3)
-                }
-            else:
-                balance_stats = {
-                    'min': 0,
-                    'max': 0,
-                    'mean': 0,
-                    'std': 0,
-                    'balance_ratio': 1.0
+        """Get formatted leaderboard data for display."""
+        conn = self._connect()
+        conn.execute("BEGIN")  # a consistent snapshot across the queries below
+        try:
+            model_rows = conn.execute("SELECT * FROM models ORDER BY rowid").fetchall()
+            role_rows = conn.execute("SELECT model, role, games, wins FROM role_stats ORDER BY rowid").fetchall()
+            total_games = self._get_meta(conn, 'total_games', 0)
+            updated_at = self._get_meta(conn, 'updated_at')
+        finally:
+            conn.execute("COMMIT")
+
+        # Calculate role win rates
+        role_stats: Dict[str, Dict[str, Any]] = {row['model']: {} for row in model_rows}
+        for row in role_rows:
+            if row['games'] > 0 and row['model'] in role_stats:
+                role_stats[row['model']][row['role']] = {
+                    'win_rate': (row['wins'] / row['games'] * 100),
+                    'games': row['games']
                 }
-            
-            return {
-                'models': model_stats,
-                'total_games': len(self.data['games_history']),
-                'updated_at': self.data['updated_at'],
-                'balance': balance_stats
+
+        model_stats = {}
+        for row in model_rows:
+            total = row['total_games']
+            model_stats[row['model']] = {
+                'elo': row['elo'],
+                'win_rate': (row['total_wins'] / total * 100) if total > 0 else 0,
+                'total_games': total,
+                'total_wins': row['total_wins'],
+                'role_stats': role_stats[row['model']]
             }
 
+        return {
+            'models': model_stats,
+            'total_games': total_games,
+            'updated_at': updated_at,
+            'balance': self._balance_stats([row['total_games'] for row in model_rows])
+        }
+
+    def close(self):
+        """Close the connection of the calling thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -3,8 +3,9 @@
 """Run arena evaluation and generate leaderboard."""
 import argparse
 import sys
+import time
 from pathlib import Path
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 # Add project root to path
@@ -14,6 +15,7 @@ sys.path.insert(0, str(project_root))
 from games.utils import load_config
 from games.evaluation.eval_base import build_task_configs
 from games.evaluation.leaderboard.arena_workflow import create_arena_workflow
+from games.evaluation.leaderboard.arena_runner import ArenaRunStats, prepare_arena_game_config, run_arena_in_processes
 from games.evaluation.leaderboard.leaderboard_db import LeaderboardDB
 from games.evaluation.leaderboard.leaderboard import generate_leaderboard_from_db
 from games.evaluation.leaderboard.rate_limiter import set_global_rate_limiter, apply_rate_limiting_to_openai_model
@@ -35,23 +37,7 @@ def create_arena_evaluator(game_name: str, leaderboard_db: LeaderboardDB):
     def run_single_game(config_dict: Dict[str, Any], game_id: int) -> Dict[str, Any]:
         """Run a single arena game."""
         try:
-            config_dict = config_dict.copy()
-            config_dict['game_id'] = game_id
-            config_dict['evaluation_timestamp'] = timestamp
-            
-            # Use game_id as seed offset for reproducibility
-            arena_config = config_dict.get('arena', {})
-            base_seed = arena_config.get('seed')
-            if base_seed is not None:
-                arena_config['seed'] = base_seed + game_id
-                config_dict['arena'] = arena_config
-            
-            # Pass game counts for fair model assignment
-            # Update counts before each game to ensure fairness
-            # Pass arena models to ensure all are included (new models get count 0)
-            arena_models = config_dict.get('arena', {}).get('models', [])
-            config_dict['_model_game_counts'] = leaderboard_db.get_model_game_counts(arena_models)
-            
+            config_dict = prepare_arena_game_config(config_dict, game_id, timestamp, leaderboard_db)
             workflow = create_arena_workflow(game_name, config_dict)
             return workflow.execute()
         except Exception as e:
@@ -63,6 +49,32 @@ def create_arena_evaluator(game_name: str, leaderboard_db: LeaderboardDB):
     return run_single_game
 
 
+def _run_games_in_threads(
+    task_configs: List[Dict[str, Any]],
+    max_workers: int,
+    run_single_game_fn: Callable,
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]], float]]:
+    """Run games on a thread pool (one event loop per game) and yield (game_id, result, wall_time) as they finish."""
+    def timed_game(game_id: int):
+        start = time.perf_counter()
+        return run_single_game_fn(task_configs[game_id], game_id), time.perf_counter() - start
+    
+    if len(task_configs) == 1:
+        yield (0, *timed_game(0))
+        return
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(timed_game, game_id): game_id for game_id in range(len(task_configs))}
+        for future in as_completed(futures):
+            game_id = futures[future]
+            try:
+                result, wall_time = future.result()
+            except Exception as e:
+                print(f"[arena] Game {game_id} error: {e}", file=sys.stderr)
+                result, wall_time = None, 0.0
+            yield game_id, result, wall_time
+
+
 def run_arena_with_db_update(
     config_dict: Dict[str, Any],
     num_games: int,
@@ -70,6 +82,11 @@ def run_arena_with_db_update(
     leaderboard_db: LeaderboardDB,
     run_single_game_fn: Callable,
     update_counts_interval: int = 10,
+    game_name: Optional[str] = None,
+    num_processes: int = 0,
+    games_per_process: int = 8,
+    api_call_interval: float = 0.0,
+    initializer: Optional[Callable[[], None]] = None,
 ) -> list:
     """Run arena games and update leaderboard incrementally.
     
@@ -79,6 +96,11 @@ def run_arena_with_db_update(
         max_workers: Maximum number of parallel workers
         leaderboard_db: Leaderboard database instance
         run_single_game_fn: Function to run a single game
+        game_name: Name of the game, required when num_processes > 0
+        num_processes: If > 0, run games on this many worker processes instead of the thread pool
+        games_per_process: Number of concurrent games on each worker process's event loop
+        api_call_interval: Minimum seconds between API calls, spread over the worker processes
+        initializer: Optional picklable callable run at the start of each worker process
     
     Returns:
         List of game results
@@ -90,45 +112,40 @@ def run_arena_with_db_update(
         experiment_name=config_dict.get('experiment_name', 'arena_leaderboard'),
     )
     
+    if num_processes > 0:
+        finished_games = run_arena_in_processes(
+            game_name, task_configs, leaderboard_db,
+            num_processes=num_processes,
+            games_per_process=games_per_process,
+            api_call_interval=api_call_interval,
+            initializer=initializer,
+        )
+    else:
+        finished_games = _run_games_in_threads(task_configs, max_workers, run_single_game_fn)
+    
     # Run games and collect results
     results = []
-    if num_games == 1:
-        result = run_single_game_fn(task_configs[0], 0)
-        if result is not None:
-            results.append(result)
-            # Update leaderboard incrementally
-            leaderboard_db.update_from_game_results([result])
-    else:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(run_single_game_fn, task_configs[game_id], game_id): game_id
-                for game_id in range(num_games)
-            }
-            
-            completed_count = 0
-            for future in as_completed(futures):
-                game_id = futures[future]
-                try:
-                    result = future.result()
-                    if result is not None:
-                        results.append(result)
-                        # Update leaderboard incrementally after each game
-                        leaderboard_db.update_from_game_results([result])
-                        completed_count += 1
-                        
-                        # Periodically show balance stats
-                        if completed_count % update_counts_interval == 0:
-                            balance = leaderboard_db.get_game_count_balance()
-                            print(f"[arena] Game {game_id} completed | "
-                                  f"Balance: {balance['balance_ratio']:.1%} "
-                                  f"(min={balance['min']}, max={balance['max']})")
-                        else:
-                            print(f"[arena] Game {game_id} completed")
-                    else:
-                        print(f"[arena] Game {game_id} failed")
-                except Exception as e:
-                    print(f"[arena] Game {game_id} error: {e}", file=sys.stderr)
+    stats = ArenaRunStats()
+    for game_id, result, wall_time in finished_games:
+        stats.record(wall_time, succeeded=result is not None)
+        if result is None:
+            print(f"[arena] Game {game_id} failed")
+            continue
+        
+        results.append(result)
+        # Update leaderboard incrementally after each game
+        leaderboard_db.update_from_game_results([result])
+        
+        # Periodically show balance stats
+        if len(results) % update_counts_interval == 0:
+            balance = leaderboard_db.get_game_count_balance()
+            print(f"[arena] Game {game_id} completed in {wall_time:.1f}s | "
+                  f"Balance: {balance['balance_ratio']:.1%} "
+                  f"(min={balance['min']}, max={balance['max']})")
+        else:
+            print(f"[arena] Game {game_id} completed in {wall_time:.1f}s")
     
+    print(f"[arena] Throughput: {stats.format()}")
     return results
 
 
@@ -151,6 +168,14 @@ Examples:
       --config games/games/diplomacy/configs/arena_config.yaml \\
       --num-games 100 \\
       --max-workers 10
+  
+  # Run games on 4 worker processes, 16 concurrent games on each process's event loop
+  python games/evaluation/leaderboard/run_arena.py \\
+      --game avalon \\
+      --config games/games/avalon/configs/arena_config.yaml \\
+      --num-games 200 \\
+      --num-processes 4 \\
+      --games-per-process 16
         """
     )
     
@@ -186,6 +211,20 @@ Examples:
         default=10,
         help="Maximum number of parallel workers (default: 10)",
     )
+    parser.add_argument(
+        "--num-processes",
+        "-p",
+        type=int,
+        default=0,
+        help="Run games on this many worker processes, each running games concurrently on one event loop "
+             "(default: 0, run each game on its own thread)",
+    )
+    parser.add_argument(
+        "--games-per-process",
+        type=int,
+        default=8,
+        help="Number of concurrent games per worker process when --num-processes > 0 (default: 8)",
+    )
     parser.add_argument(
         "--experiment-name",
         type=str,
@@ -256,10 +295,7 @@ Examples:
     leaderboard_db = LeaderboardDB(args.leaderboard_db)
     
     # Update Elo settings from config if provided
-    if 'elo_initial' in arena_config:
-        leaderboard_db.data['elo_initial'] = arena_config['elo_initial']
-    if 'elo_k' in arena_config:
-        leaderboard_db.data['elo_k'] = arena_config['elo_k']
+    leaderboard_db.set_elo_config(elo_initial=arena_config.get('elo_initial'), elo_k=arena_config.get('elo_k'))
     
     # Always load existing leaderboard data and add any new models
     existing_models = leaderboard_db.get_all_models()
@@ -294,7 +330,11 @@ Examples:
     # Run evaluation with leaderboard updates
     try:
         print(f"[arena] Starting {args.game} arena evaluation with models: {arena_config['models']}")
-        print(f"[arena] Running {args.num_games} games with {args.max_workers} workers")
+        if args.num_processes > 0:
+            print(f"[arena] Running {args.num_games} games on {args.num_processes} processes "
+                  f"({args.games_per_process} concurrent games per process)")
+        else:
+            print(f"[arena] Running {args.num_games} games with {args.max_workers} workers")
         
         results = run_arena_with_db_update(
             config_dict=config_dict,
@@ -302,6 +342,10 @@ Examples:
             max_workers=args.max_workers,
             leaderboard_db=leaderboard_db,
             run_single_game_fn=run_single_game_fn,
+            game_name=args.game,
+            num_processes=args.num_processes,
+            games_per_process=args.games_per_process,
+            api_call_interval=args.api_call_interval,
         )
         
         if not results:
@@ -315,7 +359,9 @@ Examples:
         leaderboard = generate_leaderboard_from_db(leaderboard_data, arena_config, args.game)
         print(leaderboard)
         
-        print(f"[arena] Leaderboard saved to: {args.leaderboard_db}")
+        # Export a JSON snapshot once at the end; games were recorded in the database as they finished
+        leaderboard_db.save()
+        print(f"[arena] Leaderboard saved to: {leaderboard_db.sqlite_path} (JSON snapshot: {args.leaderboard_db})")
         
     except Exception as e:
         print(f"Error during arena evaluation: {e}", file=sys.stderr)
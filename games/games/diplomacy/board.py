@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Phase-scoped board snapshot shared by every power's prompt construction, and the map render cache."""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from diplomacy import Game
+
+
+@dataclass
+class BoardSnapshot:
+    """Everything the prompts read from the board, computed once per phase."""
+    phase: str
+    possible_orders: Dict[str, List[str]]
+    orderable_locations: Dict[str, List[str]]
+    all_unit_locations: str
+    all_supply_centers: str
+    _power_orders: Dict[str, List[Tuple[str, List[str]]]] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_game(cls, game: Game) -> "BoardSnapshot":
+        return cls(
+            phase=game.get_current_phase(),
+            possible_orders=game.get_all_possible_orders(),
+            orderable_locations={p: game.get_orderable_locations(p) for p in game.powers},
+            all_unit_locations="\n".join(f"{p_name}: {p_obj.units}" for p_name, p_obj in game.powers.items()),
+            all_supply_centers="\n".join(f"{p_name}: {p_obj.centers}" for p_name, p_obj in game.powers.items()),
+        )
+
+    def power_orders(self, power_name: str) -> List[Tuple[str, List[str]]]:
+        """(location, legal orders) for each orderable location of a power that has legal orders."""
+        if power_name not in self._power_orders:
+            self._power_orders[power_name] = [
+                (loc, self.possible_orders[loc])
+                for loc in self.orderable_locations.get(power_name) or []
+                if self.possible_orders.get(loc)
+            ]
+        return self._power_orders[power_name]
+
+
+class BoardSnapshotCache:
+    """Holds the snapshot of the current phase and rebuilds it only when the phase advances."""
+
+    def __init__(self, game: Game):
+        self.game = game
+        self._snapshot: BoardSnapshot | None = None
+        self.builds = 0
+        self.hits = 0
+        self.build_time = 0.0
+
+    def get(self) -> BoardSnapshot:
+        """Return the snapshot of the current phase."""
+        if self._snapshot is not None and self._snapshot.phase == self.game.get_current_phase():
+            self.hits += 1
+            return self._snapshot
+        start = time.perf_counter()
+        self._snapshot = BoardSnapshot.from_game(self.game)
+        self.build_time += time.perf_counter() - start
+        self.builds += 1
+        return self._snapshot
+
+    def invalidate(self):
+        """Drop the snapshot, e.g. after `game.process()`."""
+        self._snapshot = None
+
+
+def board_render_key(game: Game) -> str:
+    """Content key of everything the map renderer draws: phase, note, units, influence and orders."""
+    powers = [
+        [name, power.units, power.retreats, power.centers, power.influence, power.orders, power.adjust]
+        for name, power in game.powers.items()
+    ]
+    payload = json.dumps([game.map_name, game.get_current_phase(), game.note, powers], sort_keys=True, default=list)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class MapRenderCache:
+    """Renders map SVGs on worker threads and reuses the SVG of identical boards.
+
+    The cache is shared by all games of the process, so concurrent games that reach the same board
+    (e.g. the opening position) render it once; a render already in flight is awaited, not repeated.
+    The game must not change while its render is awaited.
+    """
+
+    def __init__(self, max_entries: int = 32, max_workers: int = 2):
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self._svgs: "OrderedDict[str, str]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _done(self, key: str, future: Future):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if future.cancelled() or future.exception() is not None or not future.result():
+                return
+            self._svgs[key] = future.result()
+            while len(self._svgs) > self.max_entries:
+                self._svgs.popitem(last=False)
+
+    async def render(self, key: str, render_fn: Callable[[], Optional[str]]) -> Optional[str]:
+        """Return the SVG for `key`, calling `render_fn` on a worker thread if it is not cached."""
+        with self._lock:
+            if key in self._svgs:
+                self._svgs.move_to_end(key)
+                self.hits += 1
+                return self._svgs[key]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="map_render")
+                future = self._executor.submit(render_fn)
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+        if owner:
+            future.add_done_callback(lambda f: self._done(key, f))
+        # other games may be waiting on the same render, so one cancelled waiter must not cancel it
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def clear(self):
+        with self._lock:
+            self._svgs.clear()
+
+
+_map_render_cache = MapRenderCache()
+
+
+def get_map_render_cache() -> MapRenderCache:
+    """Process-wide map render cache."""
+    return _map_render_cache
@@ -4,6 +4,7 @@ import random
 import os
 import json
 import asyncio
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
@@ -17,6 +18,7 @@ from agentscope.memory import InMemoryMemory
 # Import refactored utility functions
 from .utils import Colors, add_legend_to_svg, save_game_logs, order_to_natural_language, load_prompts, parse_negotiation_messages
 from .engine import DiplomacyConfig
+from .board import BoardSnapshotCache, board_render_key, get_map_render_cache
 
 class DiplomacyGame:
     """
@@ -60,6 +62,9 @@ class DiplomacyGame:
             init_msg = f"{Colors.HEADER}=== Initializing Diplomacy (Map: {self.config.map_name}, Seed: {self.config.seed}) ==={Colors.ENDC}"
         self._debug_print(init_msg)
         self.game = Game(map_name=self.config.map_name, seed=self.config.seed)
+        # ⭐ Legal orders, units and centers are computed once per phase and shared by all powers
+        self.board = BoardSnapshotCache(self.game)
+        self.context_build_time = 0.0  # seconds spent building prompt contexts in the current phase
         
         # Initialize Logging
         self.game_log = {
@@ -112,39 +117,28 @@ class DiplomacyGame:
         
     def _get_context_str(self, power_name: str) -> str:
         """Generate context string for a specific power."""
+        start = time.perf_counter()
         power = self.game.powers[power_name]
-        
-        all_unit_locations = []
-        for p_name, p_obj in self.game.powers.items():
-            all_unit_locations.append(f"{p_name}: {p_obj.units}")
-        all_unit_locations_str = "\n".join(all_unit_locations)
-
-        all_supply_centers = []
-        for p_name, p_obj in self.game.powers.items():
-            all_supply_centers.append(f"{p_name}: {p_obj.centers}")
-        all_supply_centers_str = "\n".join(all_supply_centers)
-
-        possible_orders = self.game.get_all_possible_orders()
-        orderable_locations = self.game.get_orderable_locations(power_name)
-        possible_orders_str = ""
-        if orderable_locations:
-            for loc in orderable_locations:
-                if loc in possible_orders and possible_orders[loc]:
-                    possible_orders_str += f"  {loc}: {possible_orders[loc]}\n"
+        board = self.board.get()
+
+        if board.orderable_locations.get(power_name):
+            possible_orders_str = "".join(f"  {loc}: {orders}\n" for loc, orders in board.power_orders(power_name))
         else:
             possible_orders_str = "None"
 
         context_template = self.prompts.get('context_prompt.txt', '')
-        return context_template.format(
+        context_str = context_template.format(
             power_name=power_name,
-            current_phase=self.game.get_current_phase(),
+            current_phase=board.phase,
             home_centers=str(power.homes),
             agent_goals="Survive and expand.",
             order_history=self.game.order_history,
-            all_unit_locations=all_unit_locations_str,
-            all_supply_centers=all_supply_centers_str,
+            all_unit_locations=board.all_unit_locations,
+            all_supply_centers=board.all_supply_centers,
             possible_orders=possible_orders_str,
         )
+        self.context_build_time += time.perf_counter() - start
+        return context_str
 
     async def _initialize_agents(self):
         """Send initial system prompts to agents."""
@@ -161,26 +155,29 @@ class DiplomacyGame:
             context_str = self._get_context_str(power_name)
             await agent.observe(Msg(name="Moderator", content=context_str, role="assistant"))
 
+    def _render_svg(self) -> str | None:
+        """Render the current board with abbreviations and the power legend (runs on a worker thread)."""
+        renderer = Renderer(self.game)
+        svg_content = renderer.render(output_path=None, incl_abbrev=True)
+        if svg_content:
+            svg_content = add_legend_to_svg(svg_content, renderer.metadata['color'])
+        return svg_content
+
+    @staticmethod
+    def _write_svg(output_dir: str, filename: str, svg_content: str):
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, filename), 'w') as f:
+            f.write(svg_content)
+
     async def _render_map(self, phase_name: str, save: bool = True):
         """Render the map and update state manager."""
         try:
-            output_dir = os.path.join(self.game_log_dir, 'images')
-            if not os.path.exists(output_dir) and save:
-                os.makedirs(output_dir)
-            
-            renderer = Renderer(self.game)
+            # ⭐ Render off the event loop; identical boards reuse the SVG already rendered
+            svg_content = await get_map_render_cache().render(board_render_key(self.game), self._render_svg)
             
-            # Render with abbreviations
-            svg_content = renderer.render(output_path=None, incl_abbrev=True)
-            
-            if svg_content:
-                svg_content = add_legend_to_svg(svg_content, renderer.metadata['color'])
-                
-                if save:
-                    filename = f"phase_{phase_name}.svg"
-                    output_path = os.path.join(output_dir, filename)
-                    with open(output_path, 'w') as f:
-                        f.write(svg_content)
+            if svg_content and save:
+                output_dir = os.path.join(self.game_log_dir, 'images')
+                await asyncio.to_thread(self._write_svg, output_dir, f"phase_{phase_name}.svg", svg_content)
             
             if self.state_manager:
                 sc_counts = {p: len(power.centers) for p, power in self.game.powers.items()}
@@ -203,6 +200,8 @@ class DiplomacyGame:
             self.state_manager.update_game_state(status="running")
 
         await self._initialize_agents()
+        self.game_log["initialization"]["context_build_time"] = self.context_build_time
+        self.context_build_time = 0.0
         await self._render_map(f"init_{self.game.get_current_phase()}",save=False)
         if self.state_manager:
             self.state_manager.save_history_snapshot(kind="init")
@@ -247,11 +246,14 @@ class DiplomacyGame:
 
             # Order Phase
             await self._handle_order_phase(current_phase, phase_log)
+            phase_log["context_build_time"] = self.context_build_time
+            self.context_build_time = 0.0
             await self._render_map(f"orders_{current_phase}")
             if self.state_manager:
                 self.state_manager.save_history_snapshot(kind="orders")
             # Process and Render
             self.game.process()
+            self.board.invalidate()
             phases_processed += 1
 
             sc_counts = {p: len(power.centers) for p, power in self.game.powers.items() if not power.is_eliminated()}
@@ -396,14 +398,15 @@ class DiplomacyGame:
             self._debug_print(f"{Colors.OKBLUE}--- 开始书写命令 ---{Colors.ENDC}")
         else:
             self._debug_print(f"{Colors.OKBLUE}--- Starting Order Phase ---{Colors.ENDC}")
-        possible_orders = self.game.get_all_possible_orders()
+        board = self.board.get()
         
         async def process_agent_orders(power_name, power, agent):
             submitted_orders = []
-            orderable_locations = self.game.get_orderable_locations(power_name)
-            if not orderable_locations:
+            if not board.orderable_locations.get(power_name):
                 return power_name, submitted_orders, []
 
+            start = time.perf_counter()
+
             phase_type = current_phase[-1] if current_phase else ''
             phase_instruction = ''
             if phase_type == 'M': phase_instruction = self.prompts.get('order_instructions_movement_phase.txt', '')
@@ -413,12 +416,9 @@ class DiplomacyGame:
 
             valid_orders_str = ""
             valid_orders_for_agent = []
-            if orderable_locations:
-                for loc in orderable_locations:
-                    if loc in possible_orders and possible_orders[loc]:
-                        orders = possible_orders[loc]
-                        valid_orders_str += f"  Location {loc}: {orders}\n"
-                        valid_orders_for_agent.extend(orders)
+            for loc, orders in board.power_orders(power_name):
+                valid_orders_str += f"  Location {loc}: {orders}\n"
+                valid_orders_for_agent.extend(orders)
             
             order_prompt = (
                 "---PHASE_INSTRUCTIONS---\n"
@@ -427,6 +427,7 @@ class DiplomacyGame:
                 "Valid Orders Reference:\n"
                 f"{valid_orders_str}"
             )
+            self.context_build_time += time.perf_counter() - start
 
             msg = Msg(name="Moderator", content=order_prompt, role="user")
             response_msg = await agent(msg)
@@ -482,12 +483,7 @@ class DiplomacyGame:
 
         # Random fallback
         for power_name in random_fallback_powers:
-            orderable_locations = self.game.get_orderable_locations(power_name)
-            if not orderable_locations: continue
-            submitted_orders = []
-            for loc in orderable_locations:
-                if loc in possible_orders and possible_orders[loc]:
-                    submitted_orders.append(random.choice(possible_orders[loc]))
+            submitted_orders = [random.choice(orders) for _, orders in board.power_orders(power_name)]
             if submitted_orders:
                 self.game.set_orders(power_name, submitted_orders)
                 phase_log["orders"][power_name] = submitted_orders
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""A mock arena game for exercising the arena runners without an LLM endpoint.
+
+Each turn spends `engine_ms` of pure-Python work (the game engine, holding the GIL) and then
+awaits `latency_ms` (the model call). Register it in worker processes with
+`register_mock_arena_workflow` as the `initializer` of `run_arena_in_processes`.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+from games.evaluation.leaderboard.arena_workflow import (
+    ARENA_WORKFLOW_REGISTRY,
+    BaseArenaWorkflow,
+    register_arena_workflow,
+)
+
+ROLE_NAMES = ['Merlin_0', 'Servant_0', 'Servant_1', 'Assassin_0', 'Minion_0']
+
+_running_games: Dict[int, int] = {}  # event loop id -> games currently running on it
+
+
+def _engine_step(engine_ms: float):
+    deadline = time.perf_counter() + engine_ms / 1000
+    x = 0
+    while time.perf_counter() < deadline:
+        x += sum(i * i for i in range(200))
+    return x
+
+
+class MockGameWorkflow:
+    """Game workflow with configurable engine work and model latency per turn."""
+
+    def __init__(self, config_dict: Dict[str, Any]):
+        self.config_dict = config_dict
+
+    async def _execute_async(self) -> Dict[str, Any]:
+        game_config = self.config_dict.get('game', {})
+        if game_config.get('fail'):
+            raise RuntimeError(f"mock game {self.config_dict.get('game_id')} failed")
+
+        loop_id = id(asyncio.get_running_loop())
+        _running_games[loop_id] = _running_games.get(loop_id, 0) + 1
+        max_running = _running_games[loop_id]
+        try:
+            for _ in range(game_config.get('turns', 10)):
+                _engine_step(game_config.get('engine_ms', 1.0))
+                await asyncio.sleep(game_config.get('latency_ms', 10.0) / 1000)
+                max_running = max(max_running, _running_games[loop_id])
+        finally:
+            _running_games[loop_id] -= 1
+
+        good_wins = random.Random(self.config_dict.get('game_id', 0)).random() < 0.5
+        return {
+            'game_result': {'good_victory': int(good_wins), 'pid': os.getpid(), 'max_running': max_running},
+            'roles': [{'role_name': role, 'score': int(good_wins == (role in ROLE_NAMES[:3]))} for role in ROLE_NAMES],
+        }
+
+    def execute(self) -> Dict[str, Any]:
+        return asyncio.run(self._execute_async())
+
+
+class ArenaMockWorkflow(BaseArenaWorkflow, MockGameWorkflow):
+    """Arena workflow for the mock game."""
+
+    def __init__(self, config_dict: Dict[str, Any]):
+        self._initialize_arena(config_dict)
+        super().__init__(config_dict)
+
+    def _get_role_names(self, config_dict: Dict[str, Any]) -> List[str]:
+        return ROLE_NAMES
+
+    def _create_model_assignment(self, role_names: List[str], assigned_models: List[str]) -> List[str]:
+        return assigned_models
+
+    def _add_models_to_results(self, result: Dict[str, Any], model_assignment: List[str]):
+        for role_info, model_name in zip(result['roles'], model_assignment):
+            role_info['model_name'] = model_name
+
+
+def register_mock_arena_workflow():
+    """Register the mock game as the 'mock' arena workflow."""
+    if 'mock' not in ARENA_WORKFLOW_REGISTRY:
+        register_arena_workflow('mock')(ArenaMockWorkflow)
+
+
+def mock_arena_config(models: List[str], turns: int = 10, engine_ms: float = 1.0, latency_ms: float = 10.0) -> Dict[str, Any]:
+    """Base arena config for the mock game."""
+    return {
+        'arena': {'models': models, 'seed': 0},
+        'game': {'turns': turns, 'engine_ms': engine_ms, 'latency_ms': latency_ms},
+    }
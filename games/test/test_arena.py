@@ -96,6 +96,8 @@ def test_leaderboard_db():
     finally:
         # Cleanup
         Path(db_path).unlink(missing_ok=True)
+        for suffix in ('.sqlite', '.sqlite-wal', '.sqlite-shm'):
+            Path(db_path).with_suffix(suffix).unlink(missing_ok=True)
         print(f"\nCleaned up test database: {db_path}")
 
 
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Tests of the thread and multi-process arena runners with a mock game."""
+import copy
+
+import pytest
+
+from games.evaluation.leaderboard.arena_runner import ArenaRunStats, run_arena_in_processes
+from games.evaluation.leaderboard.leaderboard_db import LeaderboardDB
+from games.evaluation.leaderboard.run_arena import create_arena_evaluator, run_arena_with_db_update
+from games.test.mock_arena_game import mock_arena_config, register_mock_arena_workflow
+
+MODELS = ['qwen-plus', 'qwen-max', 'qwen2.5-14b', 'qwen2.5-32b', 'qwen3-8b', 'qwen3-32b']
+
+
+@pytest.fixture
+def leaderboard_db(tmp_path):
+    register_mock_arena_workflow()
+    db = LeaderboardDB(str(tmp_path / 'leaderboard_mock.json'))
+    for model in MODELS:
+        db.add_model(model)
+    return db
+
+
+def test_process_mode_runs_games_concurrently_on_each_worker_loop(leaderboard_db):
+    config = mock_arena_config(MODELS, turns=10, latency_ms=20)
+    results = run_arena_with_db_update(
+        config_dict=config,
+        num_games=12,
+        max_workers=1,
+        leaderboard_db=leaderboard_db,
+        run_single_game_fn=None,
+        game_name='mock',
+        num_processes=2,
+        games_per_process=4,
+        initializer=register_mock_arena_workflow,
+    )
+
+    assert len(results) == 12
+    assert len({r['game_result']['pid'] for r in results}) <= 2
+    assert max(r['game_result']['max_running'] for r in results) > 1
+    assert all(len({role['model_name'] for role in r['roles']}) == 5 for r in results)
+
+    data = leaderboard_db.get_leaderboard_data()
+    assert data['total_games'] == 12
+    assert sum(s['total_games'] for s in data['models'].values()) == 12 * 5
+
+
+def test_process_mode_reports_failed_games(leaderboard_db):
+    task_configs = [copy.deepcopy(mock_arena_config(MODELS, turns=2, latency_ms=1)) for _ in range(6)]
+    task_configs[3]['game']['fail'] = True
+
+    stats = ArenaRunStats()
+    finished = {}
+    for game_id, result, wall_time in run_arena_in_processes('mock', task_configs, leaderboard_db, num_processes=2,
+                                                             games_per_process=2, initializer=register_mock_arena_workflow):
+        stats.record(wall_time, succeeded=result is not None)
+        finished[game_id] = result
+
+    assert sorted(finished) == list(range(6))
+    assert finished[3] is None and all(finished[i] is not None for i in range(6) if i != 3)
+    summary = stats.summary()
+    assert (summary['games'], summary['failed']) == (6, 1)
+    assert summary['wall_time_p95'] >= summary['wall_time_p50'] > 0
+
+
+def test_thread_mode_matches_process_mode_records(leaderboard_db):
+    results = run_arena_with_db_update(
+        config_dict=mock_arena_config(MODELS, turns=3, latency_ms=1),
+        num_games=5,
+        max_workers=3,
+        leaderboard_db=leaderboard_db,
+        run_single_game_fn=create_arena_evaluator('mock', leaderboard_db),
+    )
+
+    assert len(results) == 5
+    assert {r['game_result']['max_running'] for r in results} == {1}  # one game per event loop
+    assert leaderboard_db.get_leaderboard_data()['total_games'] == 5
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Tests of the phase-scoped Diplomacy board snapshot and the map render cache."""
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("diplomacy")
+
+from diplomacy import Game
+
+from games.games.diplomacy.board import BoardSnapshotCache, MapRenderCache, board_render_key
+
+
+def random_orders(game, rng):
+    possible_orders = game.get_all_possible_orders()
+    for power_name in game.powers:
+        orders = [rng.choice(possible_orders[loc]) for loc in game.get_orderable_locations(power_name)
+                  if possible_orders[loc]]
+        game.set_orders(power_name, orders)
+
+
+def test_snapshot_matches_engine_every_phase():
+    game = Game(map_name="standard", seed=42)
+    board = BoardSnapshotCache(game)
+    rng = random.Random(0)
+
+    for _ in range(12):
+        snapshot = board.get()
+        possible_orders = game.get_all_possible_orders()
+        assert snapshot.phase == game.get_current_phase()
+        assert snapshot.possible_orders == possible_orders
+        assert snapshot.all_unit_locations == "\n".join(f"{p}: {o.units}" for p, o in game.powers.items())
+        assert snapshot.all_supply_centers == "\n".join(f"{p}: {o.centers}" for p, o in game.powers.items())
+        for power_name in game.powers:
+            expected = [(loc, possible_orders[loc]) for loc in game.get_orderable_locations(power_name)
+                        if loc in possible_orders and possible_orders[loc]]
+            assert snapshot.power_orders(power_name) == expected
+
+        random_orders(game, rng)
+        game.process()
+        board.invalidate()
+
+
+def test_snapshot_is_shared_within_a_phase():
+    game = Game(map_name="standard", seed=42)
+    board = BoardSnapshotCache(game)
+
+    snapshots = [board.get() for _ in game.powers]
+    assert all(s is snapshots[0] for s in snapshots)
+    assert (board.builds, board.hits) == (1, len(game.powers) - 1)
+
+    # orders do not change the board, only processing the phase does
+    random_orders(game, random.Random(1))
+    assert board.get() is snapshots[0]
+    game.process()
+    assert board.get() is not snapshots[0]
+    assert board.get().phase == game.get_current_phase() != snapshots[0].phase
+    assert board.builds == 2
+
+
+def test_render_key_tracks_what_the_map_shows():
+    game = Game(map_name="standard", seed=42)
+    key = board_render_key(game)
+    assert key == board_render_key(Game(map_name="standard", seed=7))  # same opening board
+
+    random_orders(game, random.Random(2))
+    with_orders = board_render_key(game)
+    assert with_orders != key
+    game.process()
+    assert board_render_key(game) not in (key, with_orders)
+
+
+def test_map_render_cache_renders_each_board_once_off_the_loop():
+    cache = MapRenderCache(max_entries=2)
+    calls = []
+    lock = threading.Lock()
+
+    def render_fn(name):
+        def render():
+            with lock:
+                calls.append((name, threading.current_thread().name))
+            time.sleep(0.05)
+            return f"<svg>{name}</svg>"
+        return render
+
+    async def main():
+        loop_thread = threading.current_thread().name
+        first = await asyncio.gather(*(cache.render("a", render_fn("a")) for _ in range(5)))
+        again = await cache.render("a", render_fn("a"))
+        others = [await cache.render(k, render_fn(k)) for k in ("b", "c")]
+        evicted = await cache.render("a", render_fn("a"))
+        return loop_thread, first, again, others, evicted
+
+    loop_thread, first, again, others, evicted = asyncio.run(main())
+    assert first == ["<svg>a</svg>"] * 5 and again == evicted == "<svg>a</svg>"
+    assert others == ["<svg>b</svg>", "<svg>c</svg>"]
+    assert [name for name, _ in calls] == ["a", "b", "c", "a"]  # "a" was evicted by "b" and "c"
+    assert all(thread != loop_thread for _, thread in calls)
+    assert (cache.hits, cache.misses) == (5, 4)
+
+
+def test_map_render_cache_does_not_keep_failures():
+    cache = MapRenderCache()
+
+    def broken():
+        raise RuntimeError("renderer failed")
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await cache.render("k", broken)
+        return await cache.render("k", lambda: "<svg/>")
+
+    assert asyncio.run(main()) == "<svg/>"
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""Tests of the SQLite leaderboard store."""
+import json
+import multiprocessing
+import os
+import random
+import threading
+
+import pytest
+
+from games.evaluation.leaderboard.leaderboard_db import LeaderboardDB
+
+MODELS = ['qwen-plus', 'qwen-max', 'qwen2.5-14b', 'qwen2.5-32b', 'qwen3-8b']
+ROLES = ['Merlin_0', 'Servant_0', 'Servant_1', 'Assassin_0', 'Minion_0']
+
+
+def make_results(n, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for _ in range(n):
+        good_wins = rng.random() < 0.5
+        result = {'roles': [
+            {'role_name': role, 'model_name': rng.choice(MODELS), 'score': int(good_wins == (role[0] in 'MS' and role != 'Minion_0'))}
+            for role in ROLES
+        ]}
+        if rng.random() < 0.5:
+            result['language'] = rng.choice(['en', 'zh'])
+        results.append(result)
+    results.append({'no_roles': True})
+    results.append({'roles': [{'role_name': 'Merlin_0', 'model_name': 'qwen-plus', 'score': 0.25},
+                              {'role_name': 'Minion_0', 'model_name': 'qwen-max', 'score': 0.75}]})
+    return results
+
+
+def game(*roles, language=None):
+    result = {'roles': [{'role_name': role, 'model_name': model, 'score': score} for role, model, score in roles]}
+    if language:
+        result['language'] = language
+    return result
+
+
+# Game sequences and the standings the JSON-file leaderboard computed for them (Elo 1500, K 32)
+SEQUENCES = {
+    'wins_losses_and_partial_scores': (
+        [game(('Merlin_0', 'a', 1), ('Assassin_0', 'b', 0)),
+         game(('Servant_0', 'a', 0), ('Assassin_0', 'b', 1), ('Minion_0', 'c', 1), language='en'),
+         game(('Merlin_0', 'b', 0.25), ('Minion_0', 'c', 0.75), language='zh')],
+        3,
+        {'a': (1482.5981711137829, 50.0, 2, 1, {'Merlin': {'win_rate': 100.0, 'games': 1}, 'Servant': {'win_rate': 0.0, 'games': 1}}),
+         'b': (1501.2670824227082, 41.66666666666667, 3, 1.25, {'Assassin': {'win_rate': 50.0, 'games': 2}, 'Merlin': {'win_rate': 25.0, 'games': 1}}),
+         'c': (1516.134746463509, 87.5, 2, 1.75, {'Minion': {'win_rate': 87.5, 'games': 2}})},
+        {'min': 2, 'max': 3, 'mean': 2.3, 'std': 0.6, 'balance_ratio': 0.667},
+    ),
+    'skipped_results_repeated_and_lone_models': (
+        [{'no_roles': True},
+         game(('Merlin_0', 'a', 1), ('Servant_0', 'a', 1), ('Assassin_0', 'b', 0)),  # one game for a, as a Servant
+         game(('Merlin_0', 'c', 1)),  # nobody to compare with: no Elo change
+         game(('Merlin_0', 'a', 0), ('Assassin_0', 'c', 1))],
+        3,
+        {'a': (1499.263693206478, 50.0, 2, 1, {'Servant': {'win_rate': 100.0, 'games': 1}, 'Merlin': {'win_rate': 0.0, 'games': 1}}),
+         'b': (1484.0, 0.0, 1, 0, {'Assassin': {'win_rate': 0.0, 'games': 1}}),
+         'c': (1516.736306793522, 100.0, 2, 2, {'Merlin': {'win_rate': 100.0, 'games': 1}, 'Assassin': {'win_rate': 100.0, 'games': 1}})},
+        {'min': 1, 'max': 2, 'mean': 1.7, 'std': 0.6, 'balance_ratio': 0.5},
+    ),
+}
+
+
+def assert_standings(data, total_games, models, balance):
+    assert data['total_games'] == total_games
+    assert data['balance'] == balance
+    assert list(data['models']) == list(models)
+    for model, (elo, win_rate, games, wins, role_stats) in models.items():
+        got = data['models'][model]
+        assert got['elo'] == pytest.approx(elo, abs=1e-9)
+        assert got['win_rate'] == pytest.approx(win_rate)
+        assert (got['total_games'], got['total_wins']) == (games, wins)
+        assert got['role_stats'].keys() == role_stats.keys()
+        for role, stats in role_stats.items():
+            assert got['role_stats'][role] == pytest.approx(stats)
+
+
+@pytest.mark.parametrize('name', SEQUENCES)
+def test_standings_of_known_game_sequences(tmp_path, name):
+    results, total_games, models, balance = SEQUENCES[name]
+    db = LeaderboardDB(str(tmp_path / 'leaderboard.json'))
+    db.update_from_game_results(results[:2])
+    db.update_from_game_results(results[2:])
+    assert_standings(db.get_leaderboard_data(), total_games, models, balance)
+    assert db.get_model_game_counts(['a', 'b', 'c', 'unknown']) == {m: models[m][2] for m in models} | {'unknown': 0}
+    assert db.get_model_stats('b')['role_stats'] == {role: {'games': s['games'], 'wins': s['win_rate'] / 100 * s['games']}
+                                                     for role, s in models['b'][4].items()}
+
+
+def test_games_history_pages(tmp_path):
+    db = LeaderboardDB(str(tmp_path / 'leaderboard.json'))
+    results = make_results(60)
+    for i in range(0, len(results), 7):
+        db.update_from_game_results(results[i:i + 7])
+
+    history = [({role['model_name']: role['score'] for role in r['roles']}, r.get('language')) for r in results if 'roles' in r]
+    page = db.get_games_history(limit=5, offset=2)
+    assert [(e['results'], e.get('language')) for e in page] == history[::-1][2:7]
+    with_model = [results for results, _ in history if 'qwen3-8b' in results][::-1][:4]
+    assert [e['results'] for e in db.get_games_history(limit=4, model='qwen3-8b')] == with_model
+
+
+LEGACY_JSON = {
+    'version': '1.0',
+    'created_at': '2025-01-01T00:00:00',
+    'updated_at': '2025-01-02T00:00:00',
+    'models': {
+        'a': {'elo': 1516.0, 'total_games': 1, 'total_wins': 1, 'role_stats': {'Merlin': {'games': 1, 'wins': 1}},
+              'first_seen': '2025-01-01T00:00:00', 'last_updated': '2025-01-02T00:00:00'},
+        'b': {'elo': 1484.0, 'total_games': 1, 'total_wins': 0, 'role_stats': {'Assassin': {'games': 1, 'wins': 0}},
+              'first_seen': '2025-01-01T00:00:00', 'last_updated': '2025-01-02T00:00:00'},
+    },
+    'games_history': [{'timestamp': '2025-01-02T00:00:00', 'results': {'a': 1, 'b': 0}, 'language': 'en'}],
+    'elo_initial': 1500,
+    'elo_k': 32,
+}
+
+
+def test_imports_legacy_json_and_exports_snapshot(tmp_path):
+    json_path = tmp_path / 'leaderboard_avalon.json'
+    json_path.write_text(json.dumps(LEGACY_JSON), encoding='utf-8')
+
+    db = LeaderboardDB(str(json_path))
+    assert db.sqlite_path == tmp_path / 'leaderboard_avalon.sqlite'
+    # the first game of the 'wins_losses_and_partial_scores' sequence, played by the legacy leaderboard
+    results, total_games, models, balance = SEQUENCES['wins_losses_and_partial_scores']
+    db.update_from_game_results(results[1:])
+    assert_standings(db.get_leaderboard_data(), total_games, models, balance)
+
+    # the database is now the source of truth, the JSON is only read once
+    reopened = LeaderboardDB(str(json_path))
+    assert_standings(reopened.get_leaderboard_data(), total_games, models, balance)
+
+    reopened.save()
+    with open(json_path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert [e['results'] for e in snapshot['games_history']] == [{'a': 1, 'b': 0}, {'a': 0, 'b': 1, 'c': 1}, {'b': 0.25, 'c': 0.75}]
+    assert snapshot['created_at'] == LEGACY_JSON['created_at']
+    assert snapshot['models'].keys() == models.keys()
+    assert snapshot['models']['a']['role_stats'] == {'Merlin': {'games': 1, 'wins': 1}, 'Servant': {'games': 1, 'wins': 0}}
+
+
+def test_warns_when_the_legacy_json_was_edited_after_the_import(tmp_path, capsys):
+    json_path = tmp_path / 'leaderboard.json'
+    json_path.write_text(json.dumps(LEGACY_JSON), encoding='utf-8')
+    db = LeaderboardDB(str(json_path))
+    LeaderboardDB(str(json_path))
+    assert 'Warning' not in capsys.readouterr().out
+
+    # an export keeps the JSON in sync
+    db.update_from_game_results([game(('Merlin_0', 'a', 1), ('Assassin_0', 'b', 0))])
+    db.save()
+    LeaderboardDB(str(json_path))
+    assert 'Warning' not in capsys.readouterr().out
+
+    edited = json.loads(json_path.read_text(encoding='utf-8'))
+    edited['models']['a']['elo'] = 2000
+    json_path.write_text(json.dumps(edited), encoding='utf-8')
+    stat = json_path.stat()
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    reopened = LeaderboardDB(str(json_path))
+    assert 'ignores edits to the JSON file' in capsys.readouterr().out
+    assert reopened.get_model_stats('a')['elo'] != 2000
+
+
+def test_elo_config(tmp_path):
+    db = LeaderboardDB(str(tmp_path / 'lb.sqlite'))
+    db.set_elo_config(elo_initial=1000, elo_k=16)
+    db.add_model('a')
+    db.update_from_game_results([{'roles': [{'role_name': 'x', 'model_name': 'a', 'score': 1},
+                                            {'role_name': 'y', 'model_name': 'b', 'score': 0}]}])
+    models = db.get_leaderboard_data()['models']
+    assert models['a']['elo'] == pytest.approx(1008)
+    assert models['b']['elo'] == pytest.approx(992)
+
+
+def test_concurrent_threads_do_not_lose_updates(tmp_path):
+    db = LeaderboardDB(str(tmp_path / 'lb.sqlite'))
+    results = make_results(200, seed=3)
+    valid = [r for r in results if 'roles' in r]
+
+    threads = [threading.Thread(target=lambda chunk=results[i::8]: [db.update_from_game_results([r]) for r in chunk])
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    data = db.get_leaderboard_data()
+    assert data['total_games'] == len(valid)
+    assert sum(s['total_games'] for s in data['models'].values()) == \
+        sum(len({role['model_name'] for role in r['roles']}) for r in valid)
+
+
+def _write_games(path, seed, n):
+    db = LeaderboardDB(path)
+    for result in make_results(n, seed=seed)[:n]:
+        db.update_from_game_results([result])
+
+
+def test_concurrent_processes_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / 'lb.json')
+    LeaderboardDB(path)
+    ctx = multiprocessing.get_context('spawn')
+    processes = [ctx.Process(target=_write_games, args=(path, seed, 40)) for seed in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    data = LeaderboardDB(path).get_leaderboard_data()
+    assert data['total_games'] == 4 * 40
+    expected_games = sum(len({role['model_name'] for role in r['roles']})
+                         for seed in range(4) for r in make_results(40, seed=seed)[:40])
+    assert sum(s['total_games'] for s in data['models'].values()) == expected_games
+    # Elo is zero-sum: the ratings were updated by complete, serialized transactions
+    assert sum(s['elo'] for s in data['models'].values()) == pytest.approx(1500 * len(data['models']))
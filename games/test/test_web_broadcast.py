@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Tests of the WebSocket fan-out with fake clients of different speeds."""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from games.web.broadcast import Broadcaster
+from games.web.game_state_manager import GameStateManager
+
+
+class FakeWebSocket:
+    """Records what it is sent; every send takes `delay` seconds, or fails / hangs on request."""
+
+    def __init__(self, delay=0.0, fail_after=None, hang=False):
+        self.delay = delay
+        self.fail_after = fail_after
+        self.hang = hang
+        self.texts = []
+
+    async def send_text(self, text):
+        if self.hang:
+            await asyncio.Event().wait()
+        if self.fail_after is not None and len(self.texts) >= self.fail_after:
+            raise ConnectionError("client went away")
+        await asyncio.sleep(self.delay)
+        self.texts.append(text)
+
+    @property
+    def messages(self):
+        return [json.loads(text) for text in self.texts]
+
+
+async def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_slow_client_does_not_stall_the_game_and_gets_the_latest_state():
+    async def main():
+        manager = GameStateManager()
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.05)
+        manager.add_websocket_connection("fast", fast)
+        manager.add_websocket_connection("slow", slow)
+
+        publish_times = []
+        for i in range(100):
+            await asyncio.sleep(0.002)  # the agents' model calls
+            start = time.perf_counter()
+            manager.update_game_state(round=i)
+            await manager.broadcast_message(manager.format_game_state())
+            await manager.broadcast_message(manager.format_message("Player0", f"message {i}"))
+            publish_times.append(time.perf_counter() - start)
+
+        await wait_until(lambda: len(fast.texts) == 200)
+        await wait_until(lambda: slow.messages and slow.messages[-1].get("content") == "message 99", timeout=10.0)
+        return manager, fast, slow, max(publish_times)
+
+    manager, fast, slow, publish_time = asyncio.run(main())
+    assert publish_time < 0.05  # less than a single send to the slow client
+
+    # the fast client sees everything in order, serialized once for all clients
+    assert [m.get("round", m.get("content")) for m in fast.messages] == \
+        [x for i in range(100) for x in (i, f"message {i}")]
+
+    # the slow client's queue stayed bounded: intermediate states were coalesced, the final state arrived
+    states = [m for m in slow.messages if m["type"] == "game_state"]
+    assert states[-1]["round"] == 99
+    assert len(states) < 100
+    assert set(slow.texts) <= set(fast.texts)
+
+
+def test_bounded_queue_drops_the_oldest_messages():
+    async def main():
+        broadcaster = Broadcaster(max_queue=8)
+        slow = FakeWebSocket(delay=0.02)
+        broadcaster.add("slow", slow)
+        for i in range(50):
+            broadcaster.publish({"type": "message", "content": f"m{i}"})
+            assert broadcaster.connections["slow"].pending <= 8
+        await wait_until(lambda: slow.texts and json.loads(slow.texts[-1])["content"] == "m49")
+        return broadcaster.stats()["slow"], slow
+
+    stats, slow = asyncio.run(main())
+    received = [m["content"] for m in slow.messages]
+    assert received == sorted(received, key=lambda c: int(c[1:]))
+    assert received[-8:] == [f"m{i}" for i in range(42, 50)]
+    assert stats["dropped"] == 50 - len(received)
+
+
+def test_full_queue_drops_chat_messages_but_never_input_requests():
+    async def main():
+        broadcaster = Broadcaster(max_queue=4)
+        slow = FakeWebSocket(delay=0.02)
+        broadcaster.add("slow", slow)
+        for i in range(10):  # published in one go: nothing is sent in between
+            broadcaster.publish({"type": "message", "content": f"m{i}"})
+            if i % 3 == 0:
+                broadcaster.publish({"type": "user_input_request", "agent_id": i})
+        await wait_until(lambda: len(slow.texts) == 4)
+        await asyncio.sleep(0.05)
+        return broadcaster.stats()["slow"], slow
+
+    stats, slow = asyncio.run(main())
+    # the pending chat messages made room for the requests, the last one found no room and was dropped
+    assert slow.messages == [{"type": "user_input_request", "agent_id": i} for i in (0, 3, 6, 9)]
+    assert stats["dropped"] == 10
+
+
+def test_client_that_cannot_take_an_input_request_is_disconnected(caplog):
+    caplog.set_level(logging.INFO, logger="games.web.broadcast")
+
+    async def main():
+        broadcaster = Broadcaster(max_queue=2)
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.02)
+        broadcaster.add("fast", fast)
+        broadcaster.add("slow", slow)
+        for i in range(2):
+            broadcaster.publish({"type": "user_input_request", "agent_id": i})
+        await asyncio.sleep(0)  # the fast client takes its requests, the slow one is still sending its first
+        broadcaster.publish({"type": "user_input_request", "agent_id": 2})
+        broadcaster.publish({"type": "user_input_request", "agent_id": 3}, connection_id="slow")
+        await wait_until(lambda: set(broadcaster.connections) == {"fast"} and len(fast.texts) == 3)
+        return fast, slow
+
+    fast, slow = asyncio.run(main())
+    assert [m["agent_id"] for m in fast.messages] == [0, 1, 2]
+    assert [m["agent_id"] for m in slow.messages] in ([], [0])
+    assert "Closing WebSocket slow: 2 messages that cannot be dropped are pending" in caplog.text
+
+
+def test_failing_and_hung_clients_are_disconnected_without_blocking(caplog):
+    caplog.set_level(logging.INFO, logger="games.web.broadcast")
+
+    async def main():
+        broadcaster = Broadcaster(send_timeout=0.1)
+        ok, broken, hung = FakeWebSocket(), FakeWebSocket(fail_after=2), FakeWebSocket(hang=True)
+        for name, ws in [("ok", ok), ("broken", broken), ("hung", hung)]:
+            broadcaster.add(name, ws)
+        for i in range(10):
+            broadcaster.publish({"type": "message", "content": i})
+            await asyncio.sleep(0.02)
+        await wait_until(lambda: set(broadcaster.connections) == {"ok"})
+        return ok, broken
+
+    ok, broken = asyncio.run(main())
+    assert [m["content"] for m in ok.messages] == list(range(10))
+    assert len(broken.texts) == 2
+    assert "Closing WebSocket broken after a failed send: ConnectionError('client went away')" in caplog.text
+    assert "Closing WebSocket hung after a failed send: TimeoutError" in caplog.text
+
+
+def test_publishing_from_the_game_thread_delivers_on_the_server_loop():
+    async def main():
+        manager = GameStateManager()
+        client = FakeWebSocket()
+        manager.add_websocket_connection("c", client)
+        manager.send_to_connection("c", {"type": "mode_info"})
+
+        def game_thread():
+            async def game():
+                for i in range(20):
+                    await manager.broadcast_message({"type": "message", "content": i})
+            asyncio.run(game())
+
+        thread = threading.Thread(target=game_thread)
+        thread.start()
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        await wait_until(lambda: len(client.texts) == 21)
+        manager.remove_websocket_connection("c")
+        await wait_until(lambda: manager.websocket_connections == {})
+        return client
+
+    client = asyncio.run(main())
+    assert client.messages[0] == {"type": "mode_info"}
+    assert [m["content"] for m in client.messages[1:]] == list(range(20))
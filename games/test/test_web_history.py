@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Tests of the diplomacy history kept by the web GameStateManager."""
+from games.web.game_state_manager import GameStateManager
+
+
+def make_svg(i, size=20000):
+    return f"<svg><!-- board {i} -->" + "".join(f"<path id='p{j}' d='M {i} {j}'/>" for j in range(size // 30)) + "</svg>"
+
+
+def test_history_keeps_each_distinct_map_once_and_restores_it():
+    manager = GameStateManager()
+    manager.set_mode("observe", game="diplomacy")
+    boards = [make_svg(i) for i in range(3)]
+
+    for phase, svg in enumerate(boards):
+        manager.update_game_state(phase=f"S190{phase}M", map_svg=svg)
+        manager.save_history_snapshot(kind="orders")
+        # a re-render of the same board is a different string with the same content
+        manager.update_game_state(map_svg="".join(list(svg)))
+        manager.save_history_snapshot(kind="result")
+        manager.update_game_state(status="running")
+
+    stats = manager.get_history_stats()
+    assert stats["snapshots"] == len(manager.history) == 15
+    assert stats["distinct_maps"] == 3
+    assert stats["map_bytes"] < sum(len(svg) for svg in boards)
+
+    for index, snapshot in enumerate(manager.history):
+        restored = manager.get_history_snapshot(index)
+        assert restored["map_svg"] == boards[index // 5]
+        assert restored["phase"] == f"S190{index // 5}M"
+        assert restored["kind"] == snapshot["kind"]
+        assert "map_svg_hash" not in restored
+
+
+def test_history_map_memory_is_capped():
+    manager = GameStateManager(max_history_bytes=3000)
+    manager.set_mode("observe", game="diplomacy")
+    boards = [make_svg(i) for i in range(20)]
+    for i, svg in enumerate(boards):
+        manager.update_game_state(phase=f"P{i}", map_svg=svg)
+
+    stats = manager.get_history_stats()
+    assert stats["map_bytes"] <= 3000 or stats["distinct_maps"] == 1
+    assert stats["maps_dropped"] > 0
+    assert len(manager.history) == 20
+    assert manager.get_history_snapshot(0)["map_svg"] is None
+    assert manager.get_history_snapshot(0)["phase"] == "P0"
+    assert manager.get_history_snapshot(19)["map_svg"] == boards[19]
+
+    manager.reset()
+    assert manager.get_history_stats() == {"snapshots": 0, "distinct_maps": 0, "map_bytes": 0, "maps_dropped": 0}
+
+
+def test_history_is_only_kept_for_diplomacy():
+    manager = GameStateManager()
+    manager.set_mode("observe", game="avalon")
+    manager.update_game_state(map_svg=make_svg(0))
+    assert manager.history == [] and manager.get_history_stats()["map_bytes"] == 0
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""WebSocket fan-out: each message is serialized once and sent to every connection from its own task."""
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Each of these messages is a full snapshot, so a client that falls behind only needs the latest one
+COALESCED_MESSAGE_TYPES = {"game_state"}
+# Messages a client that falls behind may miss; any other message (input requests, errors, ...) always arrives
+DROPPABLE_MESSAGE_TYPES = COALESCED_MESSAGE_TYPES | {"message"}
+
+
+def serialize_message(message: Dict[str, Any]) -> str:
+    """Encode a message exactly as `WebSocket.send_json` does."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ConnectionSender:
+    """Bounded send queue and sender task of one WebSocket connection.
+
+    A queued message that is superseded by a newer one of the same coalesced type is dropped. When the
+    queue is full, the oldest pending droppable message (or the new one, if only it is droppable) is
+    dropped; if there is none, the client cannot keep up with messages that must not be lost and the
+    connection is closed. A send that fails or does not finish within `send_timeout` closes it too.
+    """
+
+    def __init__(
+        self,
+        connection_id: str,
+        websocket: Any,
+        max_queue: int = 64,
+        send_timeout: float = 10.0,
+        on_close: Optional[Callable[["ConnectionSender"], None]] = None,
+    ):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._on_close = on_close
+        self._queue: Deque[Tuple[Optional[str], str]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.closed = False
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the sender task on the running loop, which must be the loop that owns the websocket."""
+        self.loop = asyncio.get_running_loop()
+        self._task = self.loop.create_task(self._run(), name=f"ws_send_{self.connection_id}")
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def put(self, text: str, message_type: Optional[str] = None):
+        """Queue a serialized message. Runs on the sender's loop."""
+        if self.closed:
+            return
+        if message_type in COALESCED_MESSAGE_TYPES:
+            for i, (queued_type, _) in enumerate(self._queue):
+                if queued_type == message_type:
+                    del self._queue[i]
+                    self.coalesced += 1
+                    break
+        if len(self._queue) >= self.max_queue:
+            for i, (queued_type, _) in enumerate(self._queue):
+                if queued_type in DROPPABLE_MESSAGE_TYPES:
+                    del self._queue[i]
+                    self.dropped += 1
+                    break
+            else:
+                if message_type in DROPPABLE_MESSAGE_TYPES:
+                    self.dropped += 1
+                    return
+                logger.info("Closing WebSocket %s: %d messages that cannot be dropped are pending",
+                            self.connection_id, len(self._queue))
+                self.closed = True
+                self.close()
+                return
+        self._queue.append((message_type, text))
+        self._wakeup.set()
+
+    async def _run(self):
+        try:
+            while True:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                _, text = self._queue.popleft()
+                await self._send(text)
+                self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:  # disconnected, or too slow to take a single message
+            logger.info("Closing WebSocket %s after a failed send: %r", self.connection_id, e)
+        finally:
+            self.closed = True
+            self._queue.clear()
+            if self._on_close:
+                self._on_close(self)
+
+    async def _send(self, text: str):
+        # ⭐ Not `asyncio.wait_for`: on Python < 3.12 it can swallow a cancellation that races with the
+        # send finishing, which would leave this task running after the connection is closed
+        send = asyncio.ensure_future(self.websocket.send_text(text))
+        try:
+            done, _ = await asyncio.wait({send}, timeout=self.send_timeout)
+        finally:
+            if not send.done():
+                send.cancel()
+        if not done:
+            raise asyncio.TimeoutError(f"send to {self.connection_id} took longer than {self.send_timeout}s")
+        send.result()
+
+    def close(self):
+        """Stop the sender task; pending messages are discarded. Safe to call from any thread."""
+        if self._task is None or self._task.done():
+            self.closed = True
+            return
+        try:
+            if _running_loop() is self.loop:
+                self._task.cancel()
+            else:
+                self.loop.call_soon_threadsafe(self._task.cancel)
+        except RuntimeError:  # the owning loop is already closed
+            self.closed = True
+
+    def stats(self) -> Dict[str, int]:
+        return {"sent": self.sent, "coalesced": self.coalesced, "dropped": self.dropped, "pending": self.pending}
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class Broadcaster:
+    """Publishes messages to all WebSocket connections without waiting for any of them.
+
+    Connections are added on the loop that serves them (the web server), while games publish from
+    their own thread and loop; messages are handed over to each connection's loop thread-safely.
+    """
+
+    def __init__(self, max_queue: int = 64, send_timeout: float = 10.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.connections: Dict[str, ConnectionSender] = {}
+        self._lock = threading.Lock()
+
+    def add(self, connection_id: str, websocket: Any) -> ConnectionSender:
+        """Register a connection. Must be called on the loop that owns the websocket."""
+        sender = ConnectionSender(connection_id, websocket, self.max_queue, self.send_timeout, on_close=self._forget)
+        sender.start()
+        with self._lock:
+            previous = self.connections.get(connection_id)
+            self.connections[connection_id] = sender
+        if previous is not None:
+            previous.close()
+        return sender
+
+    def _forget(self, sender: ConnectionSender):
+        with self._lock:
+            if self.connections.get(sender.connection_id) is sender:
+                del self.connections[sender.connection_id]
+
+    def remove(self, connection_id: str):
+        with self._lock:
+            sender = self.connections.pop(connection_id, None)
+        if sender is not None:
+            sender.close()
+
+    def publish(self, message: Dict[str, Any], connection_id: Optional[str] = None):
+        """Queue a message for every connection, or only for `connection_id`. Never blocks on a client."""
+        text = serialize_message(message)
+        message_type = message.get("type")
+        with self._lock:
+            if connection_id is None:
+                senders = list(self.connections.values())
+            else:
+                senders = [self.connections[connection_id]] if connection_id in self.connections else []
+
+        current_loop = _running_loop()
+        for sender in senders:
+            if sender.loop is current_loop:
+                sender.put(text, message_type)
+                continue
+            try:
+                sender.loop.call_soon_threadsafe(sender.put, text, message_type)
+            except RuntimeError:  # the owning loop is closed
+                self.remove(sender.connection_id)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {connection_id: sender.stats() for connection_id, sender in self.connections.items()}
@@ -1,18 +1,31 @@
 # -*- coding: utf-8 -*-
 """Game state manager for unified web (avalon + diplomacy)."""
 import asyncio
+import hashlib
+import os
 import queue
+import zlib
 from typing import Dict, Optional, Any
 from datetime import datetime
 
+from games.web.broadcast import Broadcaster
+
+HISTORY_SNAPSHOT_KEYS = ["phase", "round", "status", "map_svg", "obs_log_entry", "logs", "mission_id", "round_id", "leader"]
+
 
 class GameStateManager:
     """Manages game state, message queues, and WebSocket connections."""
     
-    def __init__(self):
+    def __init__(self, max_history_bytes: Optional[int] = None):
+        """
+        Args:
+            max_history_bytes: Cap on the compressed map SVGs kept for the diplomacy history. When it is
+                exceeded the maps of the oldest snapshots are dropped. Defaults to the
+                WEB_HISTORY_MAX_MB environment variable (64 MB).
+        """
         self.input_queues: Dict[str, queue.Queue] = {}
-        self.message_queue: asyncio.Queue = asyncio.Queue()
-        self.websocket_connections: Dict[str, Any] = {}
+        # ⭐ Each connection gets its own bounded send queue; broadcasting never waits for a client
+        self.broadcaster = Broadcaster()
         self.game_state: Dict[str, Any] = {
             "game": None,
             "phase": None,
@@ -30,6 +43,19 @@ class GameStateManager:
         self.should_stop: bool = False
         self.game_thread: Optional[Any] = None
         self.history: list[Dict[str, Any]] = []
+        if max_history_bytes is None:
+            max_history_bytes = int(float(os.environ.get("WEB_HISTORY_MAX_MB", 64)) * 1024 * 1024)
+        self.max_history_bytes = max_history_bytes
+        self._reset_svg_store()
+    
+    def _reset_svg_store(self):
+        # History snapshots refer to map SVGs by content hash; each distinct SVG is kept once, compressed
+        self._svg_store: Dict[str, bytes] = {}
+        self._svg_refs: Dict[str, int] = {}
+        self._svg_store_bytes = 0
+        self._last_svg: Optional[str] = None
+        self._last_svg_hash: Optional[str] = None
+        self._history_maps_dropped = 0  # the oldest snapshots whose map was dropped to respect the cap
     
     def set_mode(self, mode: str, user_agent_id: Optional[str] = None, game: Optional[str] = None):
         """Set the game mode and game name."""
@@ -65,6 +91,7 @@ class GameStateManager:
             "logs": None,
         }
         self.history = []
+        self._reset_svg_store()
     
     def set_game_thread(self, thread: Any):
         """Set the game thread reference."""
@@ -103,44 +130,82 @@ class GameStateManager:
     async def broadcast_message(self, message: Dict[str, Any]):
         if self.should_stop:
             return
-        
-        await self.message_queue.put(message)
-        
-        disconnected = []
-        for conn_id, websocket in self.websocket_connections.items():
-            try:
-                await websocket.send_json(message)
-            except Exception:
-                disconnected.append(conn_id)
-        
-        for conn_id in disconnected:
-            self.websocket_connections.pop(conn_id, None)
+        self.broadcaster.publish(message)
+    
+    def send_to_connection(self, connection_id: str, message: Dict[str, Any]):
+        """Queue a message for a single connection, in order with the broadcasts it receives."""
+        self.broadcaster.publish(message, connection_id=connection_id)
+    
+    @property
+    def websocket_connections(self) -> Dict[str, Any]:
+        """Open WebSocket connections by connection id."""
+        return {conn_id: sender.websocket for conn_id, sender in self.broadcaster.connections.items()}
     
     def add_websocket_connection(self, connection_id: str, websocket: Any):
-        """Add a WebSocket connection."""
-        self.websocket_connections[connection_id] = websocket
+        """Add a WebSocket connection. Must be called on the event loop serving the connection."""
+        self.broadcaster.add(connection_id, websocket)
     
     def remove_websocket_connection(self, connection_id: str):
         """Remove a WebSocket connection."""
-        self.websocket_connections.pop(connection_id, None)
+        self.broadcaster.remove(connection_id)
     
     def update_game_state(self, **kwargs):
         self.game_state.update(kwargs)
-        if self.game_state.get("game") == "diplomacy":
-            snapshot_keys = ["phase", "round", "status", "map_svg", "obs_log_entry", "logs", "mission_id", "round_id", "leader"]
-            snapshot = {k: self.game_state.get(k) for k in snapshot_keys}
-            snapshot["timestamp"] = datetime.now().isoformat()
-            snapshot["kind"] = "state"
-            self.history.append(snapshot)
+        self.save_history_snapshot(kind="state")
+    
+    def _store_svg(self, svg: Optional[str]) -> Optional[str]:
+        if not svg:
+            return None
+        if svg is not self._last_svg:
+            self._last_svg = svg
+            self._last_svg_hash = hashlib.sha1(svg.encode("utf-8")).hexdigest()
+        svg_hash = self._last_svg_hash
+        if svg_hash not in self._svg_store:
+            self._svg_store[svg_hash] = zlib.compress(svg.encode("utf-8"), 1)
+            self._svg_store_bytes += len(self._svg_store[svg_hash])
+        self._svg_refs[svg_hash] = self._svg_refs.get(svg_hash, 0) + 1
+        return svg_hash
+    
+    def _release_svg(self, svg_hash: Optional[str]):
+        if svg_hash is None:
+            return
+        self._svg_refs[svg_hash] -= 1
+        if self._svg_refs[svg_hash] == 0:
+            del self._svg_refs[svg_hash]
+            self._svg_store_bytes -= len(self._svg_store.pop(svg_hash))
     
     def save_history_snapshot(self, kind: str = "state"):
         if self.game_state.get("game") != "diplomacy":
             return
-        snapshot_keys = ["phase", "round", "status", "map_svg", "obs_log_entry", "logs", "mission_id", "round_id", "leader"]
-        snapshot = {k: self.game_state.get(k) for k in snapshot_keys}
+        snapshot = {k: self.game_state.get(k) for k in HISTORY_SNAPSHOT_KEYS if k != "map_svg"}
+        snapshot["map_svg_hash"] = self._store_svg(self.game_state.get("map_svg"))
         snapshot["timestamp"] = datetime.now().isoformat()
         snapshot["kind"] = kind
         self.history.append(snapshot)
+        
+        # Drop the maps of the oldest snapshots (never the latest) until the store fits the cap
+        while self._svg_store_bytes > self.max_history_bytes and self._history_maps_dropped < len(self.history) - 1:
+            oldest = self.history[self._history_maps_dropped]
+            self._release_svg(oldest["map_svg_hash"])
+            oldest["map_svg_hash"] = None
+            self._history_maps_dropped += 1
+    
+    def get_history_snapshot(self, index: int) -> Dict[str, Any]:
+        """History snapshot with its map SVG restored, as it was when the snapshot was saved."""
+        snapshot = dict(self.history[index])
+        svg_hash = snapshot.pop("map_svg_hash", None)
+        compressed = self._svg_store.get(svg_hash) if svg_hash else None
+        snapshot["map_svg"] = zlib.decompress(compressed).decode("utf-8") if compressed else None
+        return snapshot
+    
+    def get_history_stats(self) -> Dict[str, int]:
+        """Size of the diplomacy history: snapshots, distinct maps and their compressed bytes."""
+        return {
+            "snapshots": len(self.history),
+            "distinct_maps": len(self._svg_store),
+            "map_bytes": self._svg_store_bytes,
+            "maps_dropped": self._history_maps_dropped,
+        }
     
     def get_game_state(self) -> Dict[str, Any]:
         """Get current game state."""
@@ -7,6 +7,7 @@ import uuid
 from typing import Optional, Dict, Any
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.websockets import WebSocketState
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse
 from pydantic import BaseModel
@@ -98,8 +99,9 @@ async def _handle_websocket_connection(websocket: WebSocket, path: str = ""):
         if state_manager.game_state.get("status") == "stopped":
             state_manager.reset()
         
-        await websocket.send_json(state_manager.format_game_state())
-        await websocket.send_json({
+        # Sent through the connection's queue so that its sender task stays the only writer
+        state_manager.send_to_connection(connection_id, state_manager.format_game_state())
+        state_manager.send_to_connection(connection_id, {
             "type": "mode_info",
             "mode": state_manager.mode,
             "user_agent_id": state_manager.user_agent_id,
@@ -118,15 +120,13 @@ async def _handle_websocket_connection(websocket: WebSocket, path: str = ""):
             except WebSocketDisconnect:
                 break
             except json.JSONDecodeError:
-                try:
-                    await websocket.send_json({"type": "error", "message": "Invalid JSON format"})
-                except WebSocketDisconnect:
-                    break
+                state_manager.send_to_connection(connection_id, {"type": "error", "message": "Invalid JSON format"})
             except Exception as e:
-                try:
-                    await websocket.send_json({"type": "error", "message": str(e)})
-                except WebSocketDisconnect:
+                connected = websocket.client_state == WebSocketState.CONNECTED and \
+                    websocket.application_state == WebSocketState.CONNECTED
+                if not connected or connection_id not in state_manager.broadcaster.connections:
                     break
+                state_manager.send_to_connection(connection_id, {"type": "error", "message": str(e)})
                 
     except WebSocketDisconnect:
         pass
@@ -259,7 +259,7 @@ async def get_history_item(index: int):
         raise HTTPException(status_code=404, detail="history only for diplomacy")
     if not (0 <= index < len(state_manager.history)):
         raise HTTPException(status_code=404, detail="Index out of bounds")
-    s = dict(state_manager.history[index])
+    s = state_manager.get_history_snapshot(index)
     s.setdefault("kind", "state")
     s.setdefault("meta", {})
     s["phase"] = s.get("phase") or s["meta"].get("phase") or "Init"
@@ -368,7 +368,7 @@ async def get_leaderboard(game: str):
         project_root = Path(__file__).parent.parent.parent
         db_path = project_root / f"games/evaluation/leaderboard/leaderboard_{game}.json"
         
-        if not db_path.exists():
+        if not LeaderboardDB.exists(str(db_path)):
             # Return empty leaderboard if database doesn't exist
             # Get role names based on game type
             if game == "avalon":
@@ -0,0 +1,160 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from agentevolver.module.adv_processor.adca_grpo import (
+    PRMHyper,
+    _group_normalize_orm,
+    _group_zscore_on_steps,
+    broadcast_step_adv_to_tokens,
+    compute_prm_grpo_advantages,
+    suffix_sum_on_steps,
+)
+
+
+# Two groups (ids 7 and 9) of two trajectories. Trajectory 3 has no response tokens at all.
+STEP_IDS = [
+    [0, 0, 1, 1, -1],
+    [0, -1, -1, -1, -1],
+    [0, 1, 2, -1, -1],
+    [-1, -1, -1, -1, -1],
+]
+STEP_FLAGS = [[True, False], [False], [True, True, True]]  # the last trajectory has no flags
+ORM = [1.0, 0.0, 1.0, 1.0]  # group 7 normalizes to +-1, group 9 is constant and centers to 0
+
+
+def make_batch():
+    rewards = torch.zeros(4, 5)
+    rewards[:, -1] = torch.tensor(ORM)
+    return SimpleNamespace(batch={
+        "responses": torch.zeros(4, 5, dtype=torch.long),
+        "step_ids": torch.tensor(STEP_IDS),
+        "group_ids": torch.tensor([7, 7, 9, 9]),
+        "token_level_rewards": rewards,
+    })
+
+
+def to_tokens(step_advantages):
+    """Spreads hand-computed step advantages over the tokens of STEP_IDS."""
+    return torch.tensor([[adv[s] if s >= 0 else 0.0 for s in ids] for ids, adv in zip(STEP_IDS, step_advantages)])
+
+
+def advantages(scheme, **hyper):
+    return compute_prm_grpo_advantages(make_batch(), STEP_FLAGS, PRMHyper(**hyper), scheme=scheme)["advantages"]
+
+
+def test_decouple_without_batch_norm_is_exact():
+    # PRM: +-0.25 per GOOD/BAD step; ORM (last step): group 7 -> +-1, group 9 -> 0. All of it is exact in float32.
+    actual = advantages("decouple", fix_base=0.25, do_batch_norm=False)
+    expected = to_tokens([[0.25 + 0.75, -0.25 + 1.0], [-0.25 - 1.0], [0.75, 0.5, 0.25], []])
+    assert torch.equal(actual, expected)
+
+
+def test_decouple_equal_trajectory_weight_with_length_normalization():
+    # group 7 steps: [0.25, -0.25] and [-0.25]; mean of trajectory means -0.125,
+    # mean of trajectory variances ((0.375^2 + 0.125^2) / 2 + 0.125^2) / 2 = 0.046875
+    sd = math.sqrt(0.046875 + 1e-8)
+    traj0 = [(0.5 * 0.375 / sd + 1.0) / math.sqrt(2), (0.5 * -0.125 / sd + 1.0) / math.sqrt(2)]
+    traj1 = [0.5 * -0.125 / sd - 1.0]
+    # group 9: a single constant trajectory -> PRM 0, ORM 0
+    expected = to_tokens([[traj0[0] + traj0[1], traj0[1]], traj1, [0.0, 0.0, 0.0], []])
+    actual = advantages("decouple", fix_base=0.25, alpha=0.5, orm_distribution="all_steps", enable_length_normalization=True)
+    torch.testing.assert_close(actual, expected)
+
+
+def test_decouple_flattened_group_zscore():
+    # group 7 steps [0.25, -0.25, -0.25]: mean -1/12, population std sqrt(1/18) -> z-scores [sqrt(2), -sqrt(2)/2, -sqrt(2)/2]
+    r = math.sqrt(2)
+    expected = to_tokens([[r + (1.0 - r / 2), 1.0 - r / 2], [-r / 2 - 1.0], [0.0, 0.0, 0.0], []])
+    actual = advantages("decouple", fix_base=0.25, equal_trajectory_weight=False)
+    torch.testing.assert_close(actual, expected)
+
+
+def test_allocation_without_batch_norm():
+    # success [GOOD, BAD]: weights 1 and 0.2 normalized to sum +1 -> [5/6, 1/6], then + ORM 1 on the last step
+    # failure [BAD]: consistent weight -> [-1], then + ORM -1; group 9 success with 3 GOOD steps -> 1/3 each, ORM 0
+    expected = to_tokens([[5 / 6 + 7 / 6, 1 / 6 + 1.0], [-2.0], [1.0, 2 / 3, 1 / 3], []])
+    actual = advantages("allocation", do_batch_norm=False)
+    torch.testing.assert_close(actual, expected)
+
+
+def test_suffix_sum_and_broadcast_match_the_step_loop_bit_for_bit():
+    generator = torch.Generator().manual_seed(0)
+    num_steps = torch.randint(0, 12, (64,), generator=generator)
+    step_rewards = torch.randn(64, 12, generator=generator, dtype=torch.float64)
+    step_rewards *= torch.arange(12) < num_steps.unsqueeze(1)
+    step_ids = torch.full((64, 40), -1)
+    for i, k in enumerate(num_steps.tolist()):
+        step_ids[i, :3 * k] = torch.arange(k).repeat_interleave(3)
+
+    actual = broadcast_step_adv_to_tokens(suffix_sum_on_steps(step_rewards), step_ids)
+
+    # per trajectory, as the step loop did: float32 suffix sum of the valid steps, one value per step token
+    expected = torch.zeros(64, 40)
+    for i, k in enumerate(num_steps.tolist()):
+        t = step_rewards[i, :k].to(torch.float32)
+        adv = torch.flip(torch.cumsum(torch.flip(t, dims=[0]), dim=0), dims=[0])
+        for j in range(3 * k):
+            expected[i, j] = adv[j // 3]
+    assert torch.equal(actual, expected)
+
+
+def random_steps(seed, batch_size=96, max_steps=10):
+    generator = torch.Generator().manual_seed(seed)
+    num_steps = torch.randint(0, max_steps + 1, (batch_size,), generator=generator)
+    mask = torch.arange(max_steps) < num_steps.unsqueeze(1)
+    step_rewards = torch.randn(batch_size, max_steps, generator=generator, dtype=torch.float64) * mask
+    group_ids = torch.randint(0, batch_size // 6, (batch_size,), generator=generator)
+    return step_rewards, mask, group_ids
+
+
+@pytest.mark.parametrize("equal_trajectory_weight", [True, False])
+@pytest.mark.parametrize("seed", range(3))
+def test_group_zscore_matches_the_trajectory_loop_bit_for_bit(seed, equal_trajectory_weight):
+    step_rewards, mask, group_ids = random_steps(seed)
+    hyper = PRMHyper(equal_trajectory_weight=equal_trajectory_weight)
+
+    actual = _group_zscore_on_steps(step_rewards, mask, group_ids, hyper)
+
+    # per group, as the trajectory loop did: fsum per trajectory, accumulated in batch order
+    rows = [step_rewards[i, :int(k)].tolist() for i, k in enumerate(mask.sum(dim=1).tolist())]
+    expected = torch.zeros_like(step_rewards)
+    for g in group_ids.unique().tolist():
+        idxs = [i for i in range(len(rows)) if group_ids[i] == g and rows[i]]
+        if not idxs:
+            continue
+        if equal_trajectory_weight:
+            mu = sum(math.fsum(rows[i]) / len(rows[i]) for i in idxs) / len(idxs)
+            var = sum(math.fsum((x - mu) * (x - mu) for x in rows[i]) / len(rows[i]) for i in idxs) / len(idxs)
+            sd = math.sqrt(var + hyper.eps)
+        else:
+            count = sum(len(rows[i]) for i in idxs)
+            mu = sum(math.fsum(rows[i]) for i in idxs) / count
+            sd = max(math.sqrt(sum(math.fsum((x - mu) * (x - mu) for x in rows[i]) for i in idxs) / count), hyper.eps)
+        inv = 1.0 / (sd + 1e-12)
+        for i in idxs:
+            expected[i, :len(rows[i])] = torch.tensor([(x - mu) * inv for x in rows[i]], dtype=torch.float64)
+    assert torch.equal(actual, expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_group_normalized_orm_matches_the_group_loop_bit_for_bit(seed):
+    generator = torch.Generator().manual_seed(seed)
+    orm = torch.randint(0, 4, (96,), generator=generator).to(torch.float32) * 0.3
+    group_ids = torch.randint(0, 20, (96,), generator=generator)
+
+    actual = _group_normalize_orm(orm, group_ids, PRMHyper())
+
+    # per group, as the loop did: float32 mean/population std, then float64 arithmetic
+    expected = torch.zeros(96, dtype=torch.float64)
+    for g in group_ids.unique().tolist():
+        idxs = (group_ids == g).nonzero().view(-1).tolist()
+        t = torch.tensor([orm[i].item() for i in idxs], dtype=torch.float32)
+        m, s = t.mean(), t.std(unbiased=False)
+        for i in idxs:
+            centered = orm[i].item() - m.item()
+            expected[i] = centered if s <= PRMHyper().eps else centered / (s.item() + 1e-12)
+    assert torch.equal(actual, expected)
@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+from env_service.environments.bfcl.test_case_store import INDEX_SUFFIX, TestCaseStore
+
+
+def write_cases(path, cases):
+    with open(path, "w", encoding="utf-8") as f:
+        for case in cases:
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "multiturn_data.jsonl"
+    write_cases(path, [{"id": f"multi_turn_base_{i}", "function": [], "question": [[{"content": "é" * i}]]} for i in range(20)])
+    return str(path)
+
+
+def test_lookup_by_id_and_line(data_path):
+    store = TestCaseStore(data_path)
+    assert store.get("multi_turn_base_7")["id"] == "multi_turn_base_7"
+    assert store.get("12")["id"] == "multi_turn_base_12"
+    assert store.get(19)["question"][0][0]["content"] == "é" * 19
+    with pytest.raises(ValueError):
+        store.get("missing")
+    with pytest.raises(ValueError):
+        store.get("20")
+
+
+def test_entries_are_private_copies(data_path):
+    store = TestCaseStore(data_path)
+    store.get("multi_turn_base_3")["function"].append("holdout")
+    assert store.get("multi_turn_base_3")["function"] == []
+
+
+def test_index_is_persisted_and_invalidated(data_path):
+    TestCaseStore(data_path).get("0")
+    assert os.path.exists(data_path + INDEX_SUFFIX)
+
+    write_cases(data_path, [{"id": "replaced", "function": [], "question": [[]]}])
+    os.utime(data_path, ns=(0, 10**9))  # make sure the mtime moves on coarse filesystems
+    store = TestCaseStore(data_path)
+    assert store.get("replaced")["id"] == "replaced"
+    assert len(store) == 1
@@ -0,0 +1,60 @@
+import pytest
+
+from agentevolver.client.embedding_cache import EmbeddingCache
+from agentevolver.schema.task import Task
+
+
+def test_cache_persists_across_instances(tmp_path):
+    cache_path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(model="m", cache_path=cache_path)
+    assert cache.get("hello") is None
+    cache.put("hello", [0.5, 0.25])
+    assert cache.get("hello") == [0.5, 0.25]
+    assert cache.hit_rate == 0.5
+    cache.close()
+
+    reloaded = EmbeddingCache(model="m", cache_path=cache_path)
+    assert reloaded.get("hello") == [0.5, 0.25]
+    assert EmbeddingCache(model="other", cache_path=cache_path).get("hello") is None
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache(model="m", max_size=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.get_metrics()["embedding_cache/size"] == 2.0
+
+
+def test_exploration_strategy_metrics_are_exposed_to_the_trainer():
+    pytest.importorskip("verl")
+    from agentevolver.module.task_manager.strategies import TaskExploreStrategy
+    from agentevolver.module.task_manager.task_manager import TaskManager
+
+    class CachingStrategy(TaskExploreStrategy):
+        def __init__(self):
+            self.hits = 0
+
+        def explore(self, task, data_id, rollout_id):
+            self.hits += 1
+            return []
+
+        def summarize(self, task, trajectory):
+            return []
+
+        def get_metrics(self):
+            return {"embedding_cache/hits": float(self.hits)}
+
+    class NoMetricsStrategy(CachingStrategy):
+        get_metrics = TaskExploreStrategy.get_metrics
+
+    manager = TaskManager.__new__(TaskManager)
+    manager._exploration_strategy = CachingStrategy()
+    manager._step_explore(Task(task_id="t0", open_query=False), "unknown", "unknown")
+    assert manager.get_metrics() == {"embedding_cache/hits": 1.0}
+
+    manager._exploration_strategy = NoMetricsStrategy()
+    assert manager.get_metrics() == {}
@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("ray")
+
+from env_service import actor_pool
+from env_service.actor_pool import EnvActorPool
+
+
+class RemoteMethod:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def remote(self, *args):
+        return self._fn(*args)
+
+
+class FakeRemoteEnv:
+    """Stands in for the `RemoteEnv` Ray actor class: `FakeRemoteEnv.remote(...)` starts an actor."""
+
+    started = []
+
+    def __init__(self, task_id, instance_id, params):
+        self.calls = [("start", task_id, instance_id)]
+        self.ping_fails = False
+        self.ping_hangs = False
+        self.close_fails = False
+        self.ping = RemoteMethod(self._ping)
+        self.reset = RemoteMethod(self._reset)
+        self.close = RemoteMethod(self._close)
+
+    @classmethod
+    def remote(cls, *args):
+        actor = cls(*args)
+        cls.started.append(actor)
+        return actor
+
+    async def _ping(self):
+        if self.ping_hangs:
+            await asyncio.Event().wait()
+        if self.ping_fails:
+            raise ConnectionError("actor died")
+        return "pong"
+
+    async def _reset(self, task_id, instance_id, params):
+        self.calls.append(("reset", task_id, instance_id))
+
+    async def _close(self):
+        if self.close_fails:
+            raise RuntimeError("close failed")
+        self.calls.append(("close",))
+
+
+@pytest.fixture
+def killed(monkeypatch):
+    FakeRemoteEnv.started = []
+    killed = []
+    monkeypatch.setattr(actor_pool.ray, "kill", killed.append)
+    return killed
+
+
+async def settle():
+    """Lets the background refills run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_warm_up_and_refill_keep_min_size_idle_actors(killed):
+    async def main():
+        pool = EnvActorPool("fake", FakeRemoteEnv, min_size=2, max_size=3)
+        await pool.warm_up()
+        assert pool.num_idle == 2 and len(FakeRemoteEnv.started) == 2
+
+        # three episodes start at once: two idle actors are reset, the third is a cold start
+        leased = await asyncio.gather(*[pool.acquire(f"t{i}", f"i{i}") for i in range(3)])
+        assert [a.handle in FakeRemoteEnv.started[:2] for a in leased] == [True, True, False]
+        await settle()
+        assert pool.num_idle == 2  # refilled in the background
+        return pool, leased
+
+    pool, leased = asyncio.run(main())
+    assert pool.get_stats() == {"hits": 2, "misses": 1, "evicted": 0, "recycled": 0, "idle": 2}
+    assert leased[2].handle.calls == [("start", "t2", "i2")]  # a cold start gets its task directly
+    assert killed == []
+
+
+def test_released_actors_are_kept_up_to_max_size(killed):
+    async def main():
+        pool = EnvActorPool("fake", FakeRemoteEnv, min_size=0, max_size=2)
+        leased = [await pool.acquire(f"t{i}", f"i{i}") for i in range(3)]
+        for actor in leased:
+            await pool.release(actor)
+        return pool, leased
+
+    pool, leased = asyncio.run(main())
+    assert pool.num_idle == 2
+    assert killed == [leased[2].handle]
+    assert pool.get_stats()["recycled"] == 1
+
+
+def test_env_is_closed_on_release_and_reset_to_the_next_task(killed):
+    async def main():
+        pool = EnvActorPool("fake", FakeRemoteEnv, max_size=1)
+        first = await pool.acquire("t0", "i0", {"x": 1})
+        await pool.release(first)
+        second = await pool.acquire("t1", "i1")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert second.handle is first.handle and second.uses == 2
+    assert first.handle.calls == [("start", "t0", "i0"), ("close",), ("reset", "t1", "i1")]
+
+
+def test_actors_retire_after_max_uses(killed):
+    async def main():
+        pool = EnvActorPool("fake", FakeRemoteEnv, max_size=1, max_uses=2)
+        handles = []
+        for i in range(3):
+            actor = await pool.acquire(f"t{i}", f"i{i}")
+            handles.append(actor.handle)
+            await pool.release(actor)
+        return pool, handles
+
+    pool, handles = asyncio.run(main())
+    # the first actor served two episodes and was recycled, the third episode started a new one
+    assert handles[0] is handles[1] and handles[2] is not handles[0]
+    assert killed == [handles[0]]
+    assert pool.get_stats() == {"hits": 1, "misses": 2, "evicted": 0, "recycled": 1, "idle": 1}
+
+
+def test_unhealthy_actors_are_evicted(killed):
+    async def main():
+        pool = EnvActorPool("fake", FakeRemoteEnv, min_size=0, max_size=3, health_check_timeout=0.05)
+        leased = [await pool.acquire(f"t{i}", f"i{i}") for i in range(3)]
+        for actor in leased:
+            await pool.release(actor)
+        dead, hung, ok = (a.handle for a in leased[::-1])  # idle actors are handed out last-in first-out
+        dead.ping_fails = True
+        hung.ping_hangs = True
+
+        # the failing and the hanging actor are evicted, the healthy one is reset to the task
+        actor = await pool.acquire("t3", "i3")
+        assert actor.handle is ok
+        assert killed == [dead, hung]
+
+        # a periodic health check evicts idle actors that stopped answering
+        await pool.release(actor)
+        ok.ping_fails = True
+        await pool.health_check()
+        assert pool.num_idle == 0 and killed == [dead, hung, ok]
+
+        # an env that fails to close is not reused
+        broken = await pool.acquire("t4", "i4")
+        broken.handle.close_fails = True
+        await pool.release(broken)
+        assert pool.num_idle == 0 and killed[-1] is broken.handle
+        return pool
+
+    pool = asyncio.run(main())
+    assert pool.get_stats()["evicted"] == 4
@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+from omegaconf import OmegaConf
+
+from agentevolver.client.em_client import EMClient
+from agentevolver.module.exp_manager.exp_manager import ExperienceManager, ExperienceWorker, TrajExpConfig
+from agentevolver.module.exp_manager.experience_cache import ExperienceCache
+from agentevolver.schema.task import Task
+from agentevolver.schema.trajectory import Reward, Trajectory
+
+
+def make_config(**reme):
+    return OmegaConf.create({
+        "thread_pool": {"max_workers": 4},
+        "actor_rollout_ref": {"rollout": {"n": 4, "val_kwargs": {"n": 1}}},
+        "exp_manager": {
+            "val_rollout_mode": "woexp", "train_rollout_mode": "all", "rollout_ratio": 0.0,
+            "train_sample_mode": "alldiscard", "train_sample_keepratio": 1.0, "summary_batch_size": 8,
+            "experience_template": "<EXP>{}</EXP>",
+            "reme": {"base_url": "http://127.0.0.1:1", "workspace_id": "ws", "enable_summarizer": True,
+                     "enable_context_generator": True, "retrieve_top_k": 3, "updated_freq": 1, **reme},
+        },
+    })
+
+
+@pytest.fixture
+def retrievals(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def retrieve_task_memory(self, query, retrieve_top_k=1, workspace_id="default"):
+        with lock:
+            calls.append((query, workspace_id))
+        return f"exp[{query}]"
+
+    monkeypatch.setattr(EMClient, "retrieve_task_memory", retrieve_task_memory)
+    return calls
+
+
+def make_trajectory(task_id, content="x"):
+    trajectory = Trajectory(steps=[{"role": "user", "content": content}], reward=Reward(outcome=1.0))
+    trajectory.task_id = task_id
+    return trajectory
+
+
+def make_tasks():
+    return [Task(task_id="a", open_query=False, query="qa"), Task(task_id="a", open_query=False, query="qa"),
+            Task(task_id="b", open_query=False, query="qb"), Task(task_id="c", open_query=False)]
+
+
+def test_prefetch_deduplicates_and_caches_until_the_pool_changes(retrievals, monkeypatch):
+    manager = ExperienceManager(make_config(prefetch_experience=True))
+    configs = manager.get_complete_exp_configs(make_tasks(), mode="sample")
+    assert sorted(retrievals) == [("qa", "ws"), ("qb", "ws")]
+    assert [c.experience for c in configs] == ["exp[qa]", "exp[qa]", "exp[qb]", None]
+
+    manager.get_complete_exp_configs(make_tasks(), mode="sample")
+    assert len(retrievals) == 2
+
+    # a finished summary invalidates the cache
+    monkeypatch.setattr(EMClient, "call_summarizer_payloads", lambda self, payloads, workspace_id="default": ({}, 0.0))
+    manager.submit_summary_task([make_trajectory("a")], global_steps=1)
+    assert manager.summary_pipeline.flush(timeout=10)
+    manager.get_complete_exp_configs(make_tasks(), mode="sample")
+    assert len(retrievals) == 4
+
+    # validation does not add experience, nothing to retrieve
+    manager.get_complete_exp_configs(make_tasks(), mode="validate")
+    assert len(retrievals) == 4
+
+
+def test_experience_is_retrieved_per_rollout_by_default(retrievals, monkeypatch):
+    manager = ExperienceManager(make_config())
+    assert manager.prefetch_pool is None
+    configs = manager.get_complete_exp_configs(make_tasks(), mode="sample")
+    assert retrievals == []
+    assert [c.experience for c in configs] == [None] * 4
+
+    queries = []
+
+    def call_context_generator(self, trajectory, retrieve_top_k=1, workspace_id="default"):
+        queries.append([dict(m) for m in trajectory.steps])
+        return "tip"
+
+    monkeypatch.setattr(EMClient, "call_context_generator", call_context_generator)
+    worker = ExperienceWorker(make_config())
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "question"}]
+    new_messages, _ = worker.manage_rollout_context(messages, TrajExpConfig(add_exp=True, query="qa"))
+    assert queries == [[{"role": "system", "content": "sys"}, {"role": "user", "content": "question"}]]  # not the task query
+    assert new_messages[-1]["content"] == "<EXP>tip</EXP>question"
+
+
+def test_rollout_uses_the_prefetched_experience(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("rollout threads must not call the experience service")
+
+    monkeypatch.setattr(EMClient, "call_context_generator", fail)
+    worker = ExperienceWorker(make_config())
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "question"}]
+    new_messages, config = worker.manage_rollout_context(messages, TrajExpConfig(add_exp=True, prefetched_experience="tip"))
+    assert new_messages[-1]["content"] == "<EXP>tip</EXP>question"
+    assert config.experience_list == ["<EXP>tip</EXP>"]
+
+
+def summary_threads():
+    return [t for t in threading.enumerate() if t.name.startswith(("summary-worker", "exp_prefetch"))]
+
+
+def test_background_threads_start_on_first_use_and_stop_on_close(monkeypatch):
+    before = summary_threads()
+    manager = ExperienceManager(make_config(enable_summarizer=False))
+    assert summary_threads() == before  # no summarizer, no prefetch: nothing runs in the background
+    manager.close()
+
+    summarized = []
+    monkeypatch.setattr(EMClient, "call_summarizer_payloads", lambda self, payloads, workspace_id="default": (summarized.extend(payloads), 0.0))
+    manager = ExperienceManager(make_config(prefetch_experience=True))
+    manager.submit_summary_task([make_trajectory("a")], global_steps=1)  # a partial batch, still pending
+    assert len(summary_threads()) > len(before)
+
+    manager.close()
+    assert len(summarized) == 1  # queued summaries are sent before the workers stop
+    assert summary_threads() == before and manager.prefetch_pool is None
+
+
+def test_cache_drops_results_fetched_before_an_invalidation():
+    cache = ExperienceCache(ttl=60)
+    generation = cache.generation
+    cache.invalidate()
+    cache.put(("a", "q", "ws"), "stale", generation)
+    assert cache.get(("a", "q", "ws")) is None
+    cache.put(("a", "q", "ws"), "fresh", cache.generation)
+    assert cache.get(("a", "q", "ws")) == "fresh"
+
+    expired = ExperienceCache(ttl=1e-9)
+    expired.put(("a", "q", "ws"), "x", expired.generation)
+    assert expired.get(("a", "q", "ws")) is None
@@ -0,0 +1,126 @@
+import itertools
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("verl")
+
+from agentevolver.module.task_manager.base import NaiveTaskObjectiveRetrieval
+from agentevolver.module.task_manager.checkpoint import GenerationCheckpoint
+from agentevolver.module.task_manager.filters import MinHashTaskPostFilter, TaskPostFilter
+from agentevolver.module.task_manager.task_manager import TaskManager
+from agentevolver.schema.task import Task, TaskObjective
+
+
+QUERY_IDS = itertools.count()
+
+
+class KeepAll(TaskPostFilter):
+    def __init__(self):
+        self.calls = 0
+
+    def filter(self, tasks):
+        self.calls += 1
+        return list(tasks)
+
+
+def make_manager(tmp_path, explore, n=2, threads=3):
+    manager = TaskManager.__new__(TaskManager)
+    manager._n = n
+    manager._num_exploration_threads = threads
+    manager._realtime_filters = [MinHashTaskPostFilter()]
+    manager._post_filter = [KeepAll()]
+    manager._old_retrival = NaiveTaskObjectiveRetrieval()
+    manager._exlore_and_summarize = explore
+    return manager
+
+
+def make_explore(fail_after=None):
+    lock = threading.Lock()
+    state = {"calls": 0, "concurrent": set(), "overlap": False}
+
+    def explore(task, data_id, rollout_id):
+        with lock:
+            state["calls"] += 1
+            if fail_after is not None and state["calls"] > fail_after:
+                raise RuntimeError("exploration crashed")
+            state["overlap"] |= task.task_id in state["concurrent"]
+            state["concurrent"].add(task.task_id)
+            query_id = next(QUERY_IDS)
+        time.sleep(0.01)
+        with lock:
+            state["concurrent"].discard(task.task_id)
+        query = f"objective of {task.task_id} " + " ".join(f"w{query_id}x{j}" for j in range(8))
+        return [TaskObjective(task=Task(task_id=task.task_id, open_query=False, query=query, ground_truth="gt"), confidence=1.0)]
+
+    return explore, state
+
+
+def test_generate_task_streams_and_resumes_from_the_jsonl_checkpoint(tmp_path):
+    tasks = [Task(task_id=f"t{i}", open_query=False) for i in range(5)]
+    resume_file = str(tmp_path / "ckpt.jsonl")
+
+    explore, state = make_explore(fail_after=6)
+    generator = make_manager(tmp_path, explore).generate_task(tasks, resume_file=resume_file)
+    first = []
+    with pytest.raises(RuntimeError):
+        for objective in generator:
+            first.append(objective)
+    assert not state["overlap"]
+    assert 0 < len(first) <= 6
+
+    # simulate a crash in the middle of a write
+    with open(resume_file, "a") as f:
+        f.write('{"item": "deadbeef", "objectives": [')
+    lines = open(resume_file).read().splitlines()
+    assert json.loads(lines[0])["tasks_hash"]
+
+    explore, state = make_explore()
+    manager = make_manager(tmp_path, explore)
+    resumed = list(manager.generate_task(tasks, resume_file=resume_file))
+    assert len(resumed) == 10
+    assert [o.objective for o in resumed[:len(first)]] == [o.objective for o in first]
+    assert state["calls"] == 10 - len(first)
+    assert len({o.objective for o in resumed}) == 10
+    assert sum(len(v) for v in manager._old_retrival._mp.values()) == 10
+
+    # every item is checkpointed: nothing is explored again
+    explore, state = make_explore()
+    assert len(list(make_manager(tmp_path, explore).generate_task(tasks, resume_file=resume_file))) == 10
+    assert state["calls"] == 0
+
+
+def test_checkpoint_of_other_tasks_is_discarded(tmp_path):
+    path = str(tmp_path / "ckpt.jsonl")
+    with GenerationCheckpoint(path, "hash-a") as checkpoint:
+        checkpoint.append("item", [], [])
+    assert GenerationCheckpoint(path, "hash-a").processed == {"item"}
+    assert GenerationCheckpoint(path, "hash-b").processed == set()
+
+
+class SlowValidator(TaskPostFilter):
+    """Validates one objective per call in 20ms, like one env rollout of LlmFilter."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.concurrent = self.max_concurrent = 0
+
+    def filter(self, tasks):
+        with self.lock:
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        time.sleep(0.02)
+        with self.lock:
+            self.concurrent -= 1
+        return list(tasks)
+
+
+def test_post_filter_runs_on_every_exploration_thread(tmp_path):
+    tasks = [Task(task_id=f"t{i}", open_query=False) for i in range(8)]
+    explore, _ = make_explore()
+    manager = make_manager(tmp_path, explore, n=3, threads=4)
+    manager._post_filter = [SlowValidator()]
+    assert len(list(manager.generate_task(tasks, resume_file=""))) == 24
+    assert 1 < manager._post_filter[0].max_concurrent <= 4
@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("verl")
+
+from agentevolver.module.trainer.ae_ray_trainer import compute_grpo_outcome_advantage
+
+
+def legacy_grpo_outcome_advantage(token_level_rewards, response_mask, index, epsilon=1e-6,
+                                  norm_adv_by_std_in_grpo=True):
+    """The dict-and-loop implementation that `compute_grpo_outcome_advantage` replaced."""
+    scores = token_level_rewards.sum(dim=-1)
+    id2score = defaultdict(list)
+    id2mean = {}
+    id2std = {}
+    with torch.no_grad():
+        bsz = scores.shape[0]
+        for i in range(bsz):
+            id2score[index[i]].append(scores[i])
+        for idx in id2score:
+            if len(id2score[idx]) == 1:
+                id2mean[idx] = torch.tensor(0.0)
+                id2std[idx] = torch.tensor(1.0)
+            else:
+                id2mean[idx] = torch.mean(torch.tensor(id2score[idx]))
+                id2std[idx] = torch.std(torch.tensor([id2score[idx]]))
+        for i in range(bsz):
+            if norm_adv_by_std_in_grpo:
+                scores[i] = (scores[i] - id2mean[index[i]]) / (id2std[index[i]] + epsilon)
+            else:
+                scores[i] = scores[i] - id2mean[index[i]]
+        scores = scores.unsqueeze(-1) * response_mask
+    return scores, scores
+
+
+def make_batch(group_sizes, response_length=16, discrete=False, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    bsz = sum(group_sizes)
+    index = np.array([f"uid-{g}" for g, size in enumerate(group_sizes) for _ in range(size)], dtype=object)
+    index = index[torch.randperm(bsz, generator=generator).numpy()]  # groups are interleaved in real batches
+    if discrete:
+        outcome = torch.randint(0, 2, (bsz,), generator=generator).float()
+    else:
+        outcome = torch.randn(bsz, generator=generator)
+    last = torch.randint(1, response_length, (bsz,), generator=generator)
+    token_level_rewards = torch.zeros(bsz, response_length)
+    token_level_rewards[torch.arange(bsz), last] = outcome
+    response_mask = (torch.arange(response_length).unsqueeze(0) <= last.unsqueeze(-1)).float()
+    return token_level_rewards, response_mask, index
+
+
+@pytest.mark.parametrize("norm_adv_by_std_in_grpo", [True, False])
+@pytest.mark.parametrize("discrete", [True, False])
+@pytest.mark.parametrize("group_sizes", [[8] * 16, [1, 4, 8, 3, 8, 1, 2], [5]])
+def test_vectorized_grpo_matches_legacy(group_sizes, discrete, norm_adv_by_std_in_grpo):
+    token_level_rewards, response_mask, index = make_batch(group_sizes, discrete=discrete)
+
+    expected, _ = legacy_grpo_outcome_advantage(token_level_rewards.clone(), response_mask, index,
+                                                norm_adv_by_std_in_grpo=norm_adv_by_std_in_grpo)
+    actual, returns = compute_grpo_outcome_advantage(token_level_rewards.clone(), response_mask, index,
+                                                     norm_adv_by_std_in_grpo=norm_adv_by_std_in_grpo)
+
+    assert torch.equal(actual, expected)
+    assert torch.equal(returns, expected)
@@ -0,0 +1,115 @@
+import math
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("verl")
+
+from agentevolver.module.exp_manager.het_core_algos import (
+    _clipfracs,
+    _dual_clip_pg_losses,
+    bam_compute_token_on_off_policy_loss,
+    bam_compute_token_on_off_policy_loss_v2,
+    bam_compute_token_on_off_policy_loss_v3,
+    het_compute_token_on_off_policy_loss,
+)
+
+
+def run(loss_fn, ratios, advantages, exp_mask, response_mask=None, log_prob=None, **kwargs):
+    """Evaluates `loss_fn` on rows of tokens with the given new/old probability ratios (old_log_prob = 0)."""
+    ratios = torch.tensor(ratios, dtype=torch.float32)
+    log_prob = torch.log(ratios) if log_prob is None else torch.tensor(log_prob, dtype=torch.float32)
+    old_log_prob = log_prob - torch.log(ratios)
+    advantages = torch.tensor(advantages, dtype=torch.float32)
+    exp_mask = torch.tensor(exp_mask, dtype=torch.float32).expand_as(ratios)
+    response_mask = torch.ones_like(ratios) if response_mask is None else torch.tensor(response_mask, dtype=torch.float32)
+    log_prob.requires_grad_(True)
+    out = loss_fn(old_log_prob=old_log_prob, log_prob=log_prob, advantages=advantages,
+                  response_mask=response_mask, exp_mask=exp_mask, **kwargs)
+    out["pg_loss"].backward()
+    return out, log_prob.grad
+
+
+def assert_values(out, **expected):
+    for key, value in expected.items():
+        torch.testing.assert_close(out[key], torch.tensor(value, dtype=out[key].dtype), msg=key)
+
+
+HET = dict(cliprange=0.2, off_cliprange_high=0.6, clip_ratio_c=3.0)  # on-policy ratios in [0.8, 1.2], off-policy up to 1.6
+RATIOS, ADVANTAGES = [[1.5, 0.5, 0.5, 5.0, 1.1]], [[1.0, 1.0, -1.0, -1.0, 2.0]]
+
+
+def test_het_on_policy_only():
+    out, grad = run(het_compute_token_on_off_policy_loss, RATIOS, ADVANTAGES, exp_mask=[[0.0]], **HET)
+    # clipped at 1.2, unclipped, clipped at 0.8, dual-clipped at 3, unclipped
+    assert_values(out, pg_losses=[[-1.2, -0.5, 0.8, 3.0, -2.2]], pg_loss=-0.1 / 5, on_pg_loss=-0.1 / 5, off_pg_loss=0.0,
+                  on_pg_clipfrac=2 / 5, on_pg_clipfrac_lower=1 / 5,
+                  ppo_kl=-sum(math.log(r) for r in RATIOS[0]) / 5)
+    # clipped tokens get no gradient, the others -A * ratio / num_tokens
+    torch.testing.assert_close(grad, torch.tensor([[0.0, -0.5 / 5, 0.0, 0.0, -2.2 / 5]]))
+
+
+def test_het_off_policy_only():
+    out, _ = run(het_compute_token_on_off_policy_loss, RATIOS, ADVANTAGES, exp_mask=[[1.0]], **HET)
+    # 1.5 is inside the off-policy bound; the lower and dual clips are those of the on-policy tokens
+    assert_values(out, pg_losses=[[-1.5, -0.5, 0.8, 3.0, -2.2]], pg_loss=-0.4 / 5, on_pg_loss=0.0, off_pg_loss=-0.4 / 5,
+                  on_pg_clipfrac=2 / 5, on_pg_clipfrac_lower=1 / 5)
+
+
+@pytest.mark.parametrize("loss_agg_mode, pg_loss", [
+    ("token-mean", (-1.2 + 0.8 - 1.5 - 1.6 + 0.8) / 5),
+    ("seq-mean-token-sum", ((-1.2 + 0.8) + (-1.5 - 1.6 + 0.8)) / 2),
+    ("seq-mean-token-mean", ((-1.2 + 0.8) / 2 + (-1.5 - 1.6 + 0.8) / 3) / 2),
+])
+def test_het_mixed_rows(loss_agg_mode, pg_loss):
+    # row 0 on-policy, row 1 off-policy; the second token of row 0 is not part of the response
+    out, _ = run(het_compute_token_on_off_policy_loss, [[1.5, 2.0, 0.5]] * 2, [[1.0, 1.0, -1.0]] * 2,
+                 exp_mask=[[0.0], [1.0]], response_mask=[[1.0, 0.0, 1.0], [1.0, 1.0, 1.0]], loss_agg_mode=loss_agg_mode, **HET)
+    assert_values(out, pg_losses=[[-1.2, -1.2, 0.8], [-1.5, -1.6, 0.8]], pg_loss=pg_loss,
+                  on_pg_loss=(-1.2 + 0.8) / 2, off_pg_loss=(-1.5 - 1.6 + 0.8) / 3)
+
+
+def test_het_clip_boundaries():
+    out, _ = run(het_compute_token_on_off_policy_loss, [[1.19, 1.21, 0.81, 0.79, 2.99, 3.01], [1.59, 1.61, 1.0, 1.0, 1.0, 1.0]],
+                 [[1.0, 1.0, -1.0, -1.0, -1.0, -1.0], [1.0, 1.0, 0.0, 0.0, 0.0, 0.0]], exp_mask=[[0.0], [1.0]], **HET)
+    assert_values(out, pg_losses=[[-1.19, -1.2, 0.81, 0.8, 2.99, 3.0], [-1.59, -1.6, 0.0, 0.0, 0.0, 0.0]])
+    # on-policy clip interval over all response tokens: 1.21, 0.79 and 1.59, 1.61 (> 1.2) are clipped, 3.01 dual-clipped
+    assert_values(out, on_pg_clipfrac=4 / 12, on_pg_clipfrac_lower=1 / 12)
+
+
+def test_clipfracs_match_the_dual_clip_indicators():
+    generator = torch.Generator().manual_seed(0)
+    ratio = torch.exp(torch.randn(64, 128, generator=generator))
+    advantages = torch.randn(64, 128, generator=generator) * (torch.rand(64, 128, generator=generator) > 0.1)
+    response_mask = (torch.rand(64, 128, generator=generator) > 0.2).float()
+    _, clipped, clipped_lower = _dual_clip_pg_losses(ratio, advantages, 0.8, 1.28, 3.0)
+    clipfrac, clipfrac_lower = _clipfracs(ratio, advantages, response_mask, 0.8, 1.28, 3.0)
+    assert clipfrac.item() == pytest.approx((clipped.float() * response_mask).sum().item() / response_mask.sum().item())
+    assert clipfrac_lower.item() == pytest.approx((clipped_lower.float() * response_mask).sum().item() / response_mask.sum().item())
+
+
+def test_het_nan_off_policy_loss_is_reported_as_zero():
+    out, _ = run(het_compute_token_on_off_policy_loss, [[1.0, 1.0], [1.0, 1.0]], [[1.0, 1.0], [float("nan"), 1.0]],
+                 exp_mask=[[0.0], [1.0]], **HET)
+    assert torch.isnan(out["pg_losses"][1, 0])
+    assert_values(out, off_pg_loss=0.0)
+
+
+def test_bam_off_policy_branches():
+    # off-policy tokens use p / (p + 0.1) of the new probability p = 0.4 -> 0.8, unclipped
+    log_prob = [[math.log(0.4)] * 3, [0.0] * 3]
+    ratios = [[1.0, 1.0, 1.0], [1.5, 0.5, 1.0]]
+    advantages = [[1.0, -1.0, 2.0], [1.0, -1.0, 0.5]]
+    args = dict(exp_mask=[[1.0], [0.0]], log_prob=log_prob, cliprange=0.2)
+
+    out, _ = run(bam_compute_token_on_off_policy_loss, ratios, advantages, **args)
+    assert_values(out, pg_losses=[[-0.8, 0.8, -1.6], [-1.2, 0.8, -0.5]], off_pg_loss=(-0.8 + 0.8 - 1.6) / 3, on_pg_loss=(-1.2 + 0.8 - 0.5) / 3)
+
+    # v2 drops the off-policy tokens with negative advantages
+    out, _ = run(bam_compute_token_on_off_policy_loss_v2, ratios, advantages, **args)
+    assert_values(out, pg_losses=[[-0.8, 0.0, -1.6], [-1.2, 0.8, -0.5]], off_pg_loss=(-0.8 - 1.6) / 2)
+
+    # v3 clips off-policy ratios at 2 instead of p / (p + 0.1)
+    out, _ = run(bam_compute_token_on_off_policy_loss_v3, [[2.5, 1.5, 1.0], [1.5, 0.5, 1.0]], advantages, **args)
+    assert_values(out, pg_losses=[[-2.0, 1.5, -2.0], [-1.2, 0.8, -0.5]], on_pg_loss=(-1.2 + 0.8 - 0.5) / 3,
+                  off_pg_loss=(-1.5 + 0.8 - 0.5) / 3)
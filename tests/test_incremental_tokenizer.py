@@ -0,0 +1,106 @@
+import pytest
+
+pytest.importorskip("tokenizers")
+transformers = pytest.importorskip("transformers")
+
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+
+from agentevolver.module.context_manager.cmt_token_cache import IncrementalTokenizer
+
+SPECIAL_TOKENS = ["<|endoftext|>", "<|im_start|>", "<|im_end|>"]
+
+# a reduced Qwen-style template that also reads list content, names and tool calls
+CHAT_TEMPLATE = (
+    "{% for m in messages %}<|im_start|>{{ m['role'] }}{% if m.get('name') %} ({{ m['name'] }}){% endif %}\n"
+    "{% if m['content'] is string %}{{ m['content'] }}{% else %}{% for part in m['content'] %}{{ part['text'] }}{% endfor %}{% endif %}"
+    "{% for call in m.get('tool_calls', []) %}\n<tool_call>{{ call['function']['name'] }}({{ call['function']['arguments'] }})</tool_call>{% endfor %}"
+    "<|im_end|>\n{% endfor %}{% if add_generation_prompt %}<|im_start|>assistant\n{% endif %}"
+)
+
+CORPUS = [
+    "You are a helpful assistant. Find the weather in Paris and book a table for two.",
+    "The weather in Paris is sunny, 21 degrees. I booked a table for two at eight.",
+    "search(query) returned three results; open the first one and read the page.",
+]
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    """A small byte-level BPE tokenizer with a chat template, trained in memory."""
+    backend = Tokenizer(models.BPE())
+    backend.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    backend.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=400, special_tokens=SPECIAL_TOKENS,
+                                  initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    backend.train_from_iterator(CORPUS * 4, trainer=trainer)
+    tok = transformers.PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="<|im_end|>", pad_token="<|endoftext|>",
+                                               additional_special_tokens=["<|im_start|>"])
+    tok.chat_template = CHAT_TEMPLATE
+    return tok
+
+
+def reference_ids(tokenizer, messages, add_generation_prompt):
+    text = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=add_generation_prompt)
+    return text, tokenizer(text)["input_ids"]
+
+
+def test_growing_trajectory_matches_apply_chat_template(tokenizer):
+    engine = IncrementalTokenizer(tokenizer)
+    turns = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": [{"type": "text", "text": "Find the weather in Paris"}, {"type": "text", "text": " and book a table."}]},
+        {"role": "assistant", "content": "Let me search.", "tool_calls": [{"function": {"name": "search", "arguments": "{\"query\": \"Paris\"}"}}]},
+        {"role": "tool", "name": "search", "content": "sunny, 21 degrees"},
+        {"role": "assistant", "content": "The weather in Paris is sunny. I booked a table for two."},
+    ]
+    for n in range(1, len(turns) + 1):
+        for add_generation_prompt in (True, False):
+            text, ids = reference_ids(tokenizer, turns[:n], add_generation_prompt)
+            assert engine.render(turns[:n], add_generation_prompt=add_generation_prompt) == text
+            assert engine.encode_messages(turns[:n], add_generation_prompt=add_generation_prompt) == ids
+    # later turns re-tokenize only what follows the cached prefixes
+    assert engine.tokenized_chars < sum(len(reference_ids(tokenizer, turns[:n], g)[0]) for n in range(1, 6) for g in (True, False))
+
+
+def test_messages_differing_outside_role_and_content_are_rendered_separately(tokenizer):
+    engine = IncrementalTokenizer(tokenizer)
+    base = [{"role": "user", "content": "Find the weather."}]
+    variants = [
+        base + [{"role": "assistant", "content": "", "tool_calls": [{"function": {"name": "search", "arguments": "Paris"}}]}],
+        base + [{"role": "assistant", "content": "", "tool_calls": [{"function": {"name": "search", "arguments": "Rome"}}]}],
+        base + [{"role": "assistant", "content": ""}],
+        base + [{"role": "assistant", "name": "planner", "content": ""}],
+    ]
+    for messages in variants + variants:
+        text, ids = reference_ids(tokenizer, messages, False)
+        assert engine.render(messages) == text
+        assert engine.encode_messages(messages) == ids
+    assert engine.render_calls == len(variants)
+
+    # key order does not matter
+    assert engine.render([dict(reversed(list(m.items()))) for m in variants[3]]) == engine.render(variants[3])
+    assert engine.render_calls == len(variants)
+
+
+def test_sentencepiece_tokenizers_are_tokenized_whole():
+    # Llama 2 / Mistral style: '▁' marks word starts and the start of the input, not of the text after a special token
+    backend = Tokenizer(models.BPE())
+    backend.pre_tokenizer = pre_tokenizers.Metaspace(prepend_scheme="first")
+    backend.decoder = decoders.Metaspace()
+    backend.train_from_iterator(CORPUS * 4, trainer=trainers.BpeTrainer(vocab_size=300, special_tokens=SPECIAL_TOKENS))
+    tokenizer = transformers.PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="<|im_end|>",
+                                                     pad_token="<|endoftext|>", additional_special_tokens=["<|im_start|>"])
+    tokenizer.chat_template = CHAT_TEMPLATE
+    # so splitting after a special token changes the tokenization
+    split = tokenizer("<|im_end|>\nweather")["input_ids"]
+    assert split != tokenizer("<|im_end|>")["input_ids"] + tokenizer("\nweather", add_special_tokens=False)["input_ids"]
+
+    engine = IncrementalTokenizer(tokenizer)
+    turns = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": "Find the weather in Paris."},
+        {"role": "assistant", "content": "The weather in Paris is sunny."},
+    ]
+    for n in range(1, len(turns) + 1):
+        _, ids = reference_ids(tokenizer, turns[:n], True)
+        assert engine.encode_messages(turns[:n], add_generation_prompt=True) == ids
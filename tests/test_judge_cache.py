@@ -0,0 +1,209 @@
+import threading
+import time
+
+import pytest
+
+from agentevolver.module.task_manager.rewards import judge_cache
+from agentevolver.module.task_manager.rewards.avg_judge import AvgBinaryGTJudge, AvgLlmJudge
+from agentevolver.module.task_manager.rewards.binary_judge_gt import LlmAsJudgeBinaryRewardCalculatorWithGT
+from agentevolver.module.task_manager.rewards.judge_cache import JudgeCache
+from agentevolver.module.task_manager.rewards.reward import LlmAsJudgeRewardCalculator
+from agentevolver.schema.task import Task
+from agentevolver.schema.trajectory import Trajectory
+
+
+class FakeClient:
+    """Stands in for DashScopeClient: counts calls and answers with a score derived from the prompt."""
+
+    def __init__(self, model_name, delay=0.0, response=None):
+        self.model_name = model_name
+        self.delay = delay
+        self.response = response
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def chat_stream_with_retry(self, messages, max_retries=3, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            response = self.response if self.response is not None else f"analysis <reward>{len(messages[0]['content']) % 100}</reward>"
+            for i in range(0, len(response), 7):
+                yield response[i:i + 7]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "test-key")
+    cache = JudgeCache(max_entries=16, max_concurrency=3)
+    monkeypatch.setattr(judge_cache, "_judge_cache", cache)
+    return cache
+
+
+def make_task(ground_truth="call the api twice"):
+    return Task(task_id="t0", open_query=False, query="q", ground_truth=ground_truth)
+
+
+def make_trajectory(answer="42"):
+    return Trajectory(steps=[
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "what is the answer?"},
+        {"role": "assistant", "content": f"print({answer})"},
+        {"role": "user", "content": answer},
+    ])
+
+
+def make_judge(cls, client, task=None, **kwargs):
+    judge = cls(task or make_task(), **kwargs)
+    judge._client = client
+    return judge
+
+
+def test_identical_trajectories_are_judged_once(cache):
+    client = FakeClient("judge-model")
+    scores = [make_judge(LlmAsJudgeRewardCalculator, client).calculate_reward(make_trajectory(), None, "i")["score"]
+              for _ in range(4)]
+
+    assert client.calls == 1
+    assert len(set(scores)) == 1
+    assert cache.metrics()["judge/cache_hits"] == 3
+    assert cache.metrics()["judge/cache_misses"] == 1
+
+
+@pytest.mark.parametrize("change", ["trajectory", "ground_truth", "model", "judge_class", "sample_id"])
+def test_key_covers_every_input(cache, change):
+    client = FakeClient("judge-model")
+    make_judge(LlmAsJudgeBinaryRewardCalculatorWithGT, client, use_mean_constraint=False).calculate_reward(make_trajectory(), None, "i")
+
+    if change == "trajectory":
+        judge, trajectory = make_judge(LlmAsJudgeBinaryRewardCalculatorWithGT, client, use_mean_constraint=False), make_trajectory("43")
+    elif change == "ground_truth":
+        judge = make_judge(LlmAsJudgeBinaryRewardCalculatorWithGT, client, task=make_task("other"), use_mean_constraint=False)
+        trajectory = make_trajectory()
+    elif change == "model":
+        client = FakeClient("other-model")
+        judge, trajectory = make_judge(LlmAsJudgeBinaryRewardCalculatorWithGT, client, use_mean_constraint=False), make_trajectory()
+    elif change == "judge_class":
+        judge, trajectory = make_judge(LlmAsJudgeRewardCalculator, client), make_trajectory()
+    else:
+        judge = make_judge(LlmAsJudgeBinaryRewardCalculatorWithGT, client, use_mean_constraint=False, sample_id=1)
+        trajectory = make_trajectory()
+    judge.calculate_reward(trajectory, None, "i")
+
+    assert cache.metrics()["judge/cache_misses"] == 2
+    assert cache.metrics()["judge/cache_hits"] == 0
+
+
+def test_concurrent_identical_requests_share_one_call(cache):
+    client = FakeClient("judge-model", delay=0.2)
+    results = []
+
+    def grade():
+        results.append(make_judge(LlmAsJudgeRewardCalculator, client).calculate_reward(make_trajectory(), None, "i")["score"])
+
+    threads = [threading.Thread(target=grade) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.calls == 1
+    assert len(results) == 8 and len(set(results)) == 1
+    metrics = cache.metrics()
+    assert metrics["judge/cache_misses"] == 1
+    assert metrics["judge/cache_hits"] + metrics["judge/cache_in_flight_hits"] == 7
+    assert metrics["judge/cache_hit_rate"] == pytest.approx(7 / 8)
+
+
+def test_global_concurrency_limit(cache):
+    client = FakeClient("judge-model", delay=0.1)
+    threads = [
+        threading.Thread(target=lambda i=i: make_judge(LlmAsJudgeRewardCalculator, client).calculate_reward(make_trajectory(str(i)), None, "i"))
+        for i in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.calls == 10
+    assert client.max_active <= cache.max_concurrency
+
+
+def test_empty_responses_are_not_cached(cache):
+    client = FakeClient("judge-model", response="")
+    judge = make_judge(LlmAsJudgeRewardCalculator, client)
+    assert judge.calculate_reward(make_trajectory(), None, "i")["score"] == 0.0
+    assert judge.calculate_reward(make_trajectory(), None, "i")["score"] == 0.0
+    assert client.calls == 2
+
+
+def test_failures_propagate_to_waiters_and_are_retried(cache):
+    started = threading.Event()
+
+    def failing_call():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def wait():
+        started.wait()
+        try:
+            cache.get_or_call("k", lambda: "unused")
+        except RuntimeError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    with pytest.raises(RuntimeError):
+        cache.get_or_call("k", failing_call)
+    waiter.join()
+
+    assert len(errors) == 1
+    assert cache.get_or_call("k", lambda: "ok") == "ok"
+
+
+def test_lru_eviction(cache):
+    for i in range(20):
+        cache.get_or_call(str(i), lambda i=i: f"r{i}")
+    assert cache.stats()["judge/cache_size"] == 16
+    assert cache.stats()["judge/cache_evictions"] == 4
+    assert cache.get_or_call("19", lambda: "recomputed") == "r19"
+    assert cache.get_or_call("0", lambda: "recomputed") == "recomputed"
+
+
+def test_metrics_since_snapshot(cache):
+    cache.get_or_call("a", lambda: "x")
+    snapshot = cache.stats()
+    cache.get_or_call("a", lambda: "x")
+    cache.get_or_call("b", lambda: "y")
+
+    metrics = cache.metrics(since=snapshot)
+    assert metrics["judge/cache_hits"] == 1
+    assert metrics["judge/cache_misses"] == 1
+    assert metrics["judge/cache_hit_rate"] == pytest.approx(0.5)
+    assert metrics["judge/cache_size"] == 2
+
+
+@pytest.mark.parametrize("avg_cls", [AvgBinaryGTJudge, AvgLlmJudge])
+def test_avg_judge_keeps_independent_samples_and_reuses_them(cache, avg_cls):
+    client = FakeClient("qwq-plus")
+    group = []
+    for _ in range(4):  # a GRPO group of identical trajectories
+        avg = avg_cls(make_task(), n=3)
+        for judge in avg._judges:
+            judge._client = client
+        group.append(avg.calculate_reward(make_trajectory(), None, "i")["score"])
+
+    assert client.calls == 3  # one call per judge sample, none for the repeated trajectories
+    assert len(set(group)) == 1
+    assert cache.metrics()["judge/cache_hits"] + cache.metrics()["judge/cache_in_flight_hits"] == 9
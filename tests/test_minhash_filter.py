@@ -0,0 +1,56 @@
+import random
+
+from agentevolver.module.task_manager.filters import MinHashTaskPostFilter, NaiveTaskPostFilter
+from agentevolver.module.task_manager.filters.minhash import MinHashLSH, tokenize
+from agentevolver.schema.task import Task, TaskObjective
+
+WORDS = [f"w{i}" for i in range(2000)]
+
+
+def make_objective(query, confidence=None, ground_truth="gt"):
+    return TaskObjective(task=Task(task_id="t", open_query=False, query=query, ground_truth=ground_truth), confidence=confidence)
+
+
+def make_queries(n, seed=0):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        if queries and rng.random() < 0.3:
+            words = rng.choice(queries).split()
+            words[rng.randrange(len(words))] = rng.choice(WORDS)  # one word changed out of 20: Jaccard >= 0.9
+            queries.append(" ".join(words))
+        else:
+            queries.append(" ".join(rng.sample(WORDS, 20)))
+    return queries
+
+
+def test_minhash_filter_matches_pairwise_filter():
+    rng = random.Random(1)
+    tasks = [make_objective(q, confidence=rng.random()) for q in make_queries(500)]
+    tasks.append(make_objective("no ground truth", ground_truth=""))
+    expected = NaiveTaskPostFilter().filter(tasks)
+    actual = MinHashTaskPostFilter().filter(tasks)
+    assert [t.objective for t in actual] == [t.objective for t in expected]
+    assert len(actual) < len(tasks) - 100
+
+
+def test_incremental_filter_only_checks_new_tasks_against_kept_ones():
+    f = MinHashTaskPostFilter()
+    base = "book a table for two at an italian restaurant tonight near the office"
+    assert len(f.filter_incremental([make_objective(base)])) == 1
+    assert f.filter_incremental([make_objective(base + " please")]) == []
+    kept = f.filter_incremental([make_objective("send the quarterly report to my manager by email")])
+    assert len(kept) == 1
+    f.reset()
+    assert len(f.filter_incremental([make_objective(base)])) == 1
+
+
+def test_cjk_queries_are_compared_on_character_bigrams():
+    assert tokenize("查找文件") == {"查找", "找文", "文件"}
+    index = MinHashLSH(threshold=0.7)
+    index.add("a", "请帮我查找上周的会议记录并发送给张三")
+    index.add("b", "Find the meeting notes")
+    assert index.query("请帮我查找上周的会议记录并发送给张三。") == ["a"]
+    assert index.query("帮我订一张明天去北京的火车票") == []
+    assert index.query("find the Meeting notes!") == ["b"]
+    assert index.query("") == []
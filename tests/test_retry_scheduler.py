@@ -0,0 +1,211 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("omegaconf")
+
+from omegaconf import OmegaConf
+
+from agentevolver.module.env_manager.retry_scheduler import CircuitBreaker, RetryScheduler, classify_failure
+
+
+def make_scheduler(**config):
+    return RetryScheduler(OmegaConf.create(config), seed=0)
+
+
+@pytest.mark.parametrize("error,expected", [
+    ("Throttling.RateQuota: Requests rate limit exceeded", "quota"),
+    ("HTTP 429 Too Many Requests", "quota"),
+    (RuntimeError("env.create_instance failed! error=('timeout',)"), "env"),
+    ("rollout_server.2 error", "llm"),
+    (ValueError("something else"), "other"),
+])
+def test_classify_failure(error, expected):
+    assert classify_failure(error) == expected
+
+
+def test_classify_failure_uses_the_root_cause_first():
+    try:
+        try:
+            raise RuntimeError("Throttling: quota exceeded")
+        except RuntimeError as e:
+            raise RuntimeError(f"env.create_instance failed! error={e.args}") from e
+    except RuntimeError as wrapped:
+        assert classify_failure(wrapped) == "quota"
+
+
+def test_retries_become_ready_by_timestamp_per_class():
+    scheduler = make_scheduler(delays={"quota": 30, "env": 5, "llm": 2, "other": 2}, jitter=0.0)
+    scheduler.on_failure("a", "quota", "llm:m", attempt=1, now=0.0)
+    scheduler.on_failure("b", "env", "env:x", attempt=1, now=0.0)
+    scheduler.on_failure("c", "env", "env:x", attempt=2, now=0.0)
+
+    assert scheduler.next_delay(now=0.0) == pytest.approx(5.0)
+    assert scheduler.pop_ready(now=4.9) == []
+    assert scheduler.pop_ready(now=5.0) == ["b"]
+    assert scheduler.pop_ready(now=10.0) == ["c"]  # the second failure waits twice as long
+    assert scheduler.pop_ready(now=29.0) == []
+    assert scheduler.pop_ready(now=30.0) == ["a"]
+    assert len(scheduler) == 0 and scheduler.next_delay() is None
+
+    metrics = scheduler.get_metrics()
+    assert metrics["rollout/retries_quota"] == 1
+    assert metrics["rollout/retries_env"] == 2
+    assert "rollout/circuit_breaker_trips" not in metrics
+
+
+def test_delay_is_jittered_and_capped():
+    scheduler = make_scheduler(delays={"llm": 10}, max_delay=40, jitter=0.5)
+    delays = [scheduler.delay("llm", attempt=1) for _ in range(200)]
+    assert all(5.0 <= d <= 10.0 for d in delays)
+    assert len(set(delays)) > 100
+    assert all(20.0 <= scheduler.delay("llm", attempt=10) <= 40.0 for _ in range(20))
+
+
+def test_max_attempts_gives_up():
+    scheduler = make_scheduler(max_attempts=2, jitter=0.0)
+    assert scheduler.on_failure("a", "other", "env:x", attempt=1, now=0.0)
+    assert scheduler.on_failure("a", "other", "env:x", attempt=2, now=0.0)
+    assert not scheduler.on_failure("a", "other", "env:x", attempt=3, now=0.0)
+    assert not scheduler.on_failure("b", "quota", "llm:m", attempt=3, now=0.0)
+    metrics = scheduler.get_metrics()
+    assert metrics["rollout/retries_given_up"] == scheduler.given_up == 2
+    assert metrics["rollout/given_up_other"] == metrics["rollout/given_up_quota"] == 1
+
+
+def test_retries_forever_by_default():
+    scheduler = RetryScheduler()
+    assert all(scheduler.on_failure("a", "env", "env:x", attempt=i, now=0.0) for i in range(1, 50))
+    assert make_scheduler(max_attempts=5).on_failure("a", "env", "env:x", attempt=6, now=0.0) is False
+
+
+def test_circuit_breaker_holds_retries_and_probes_once():
+    scheduler = make_scheduler(jitter=0.0, delays={"env": 1},
+                               circuit_breaker={"enable": True, "failure_threshold": 3, "reset_timeout": 60})
+    for i in range(3):
+        scheduler.on_failure(f"r{i}", "env", "env:x", attempt=1, now=0.0)
+    scheduler.on_failure("other-env", "env", "env:y", attempt=1, now=0.0)
+
+    # env:x is open: only the retry against env:y may start
+    assert scheduler.pop_ready(now=1.0) == ["other-env"]
+    assert scheduler.get_metrics(now=1.0)["rollout/circuit_breakers_open"] == 1
+    assert scheduler.next_delay(now=1.0) == pytest.approx(59.0)
+
+    # after the timeout a single probe goes through, the others wait for its outcome
+    probe = scheduler.pop_ready(now=60.0)
+    assert len(probe) == 1
+    assert scheduler.pop_ready(now=60.5) == []
+    scheduler.on_success("env:x")
+    assert sorted(scheduler.pop_ready(now=61.0) + probe) == ["r0", "r1", "r2"]
+    assert scheduler.get_metrics()["rollout/circuit_breaker_trips"] == 1
+
+
+def test_circuit_breaker_reopens_when_the_probe_fails():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.on_failure(0.0)
+    assert breaker.allow(1.0)
+    breaker.on_failure(1.0)
+    assert not breaker.allow(5.0)
+    assert breaker.allow(11.0)
+    breaker.on_failure(12.0)
+    assert not breaker.allow(15.0) and breaker.is_open(15.0)
+    assert breaker.allow(22.0)
+    assert breaker.trips == 1
+
+
+def make_env_manager(retry):
+    env_manager_module = pytest.importorskip("agentevolver.module.env_manager.env_manager")
+    manager = env_manager_module.ParallelEnvManager.__new__(env_manager_module.ParallelEnvManager)
+    manager.rollout_config = OmegaConf.create({
+        "val_kwargs": {"n": 1}, "multi_turn": {"max_steps": 30}, "status_interval": 0.05, "retry": retry,
+    })
+    manager.rollout_n = 2
+    manager.max_parallel = 4
+    manager.model_name = "policy"
+    manager.current_token = 0
+    manager.current_token_count_time = time.time()
+    return manager
+
+
+def make_tasks(n):
+    from agentevolver.module.exp_manager.exp_manager import TaskExpConfig
+    from agentevolver.schema.task import Task
+
+    tasks = [Task(task_id=f"t{i}", open_query=False, query="q") for i in range(n)]
+    return tasks, [TaskExpConfig(add_exp=[False, False]) for _ in tasks]
+
+
+def test_rollout_keeps_collecting_while_a_retry_waits():
+    manager = make_env_manager({"delays": {"quota": 0.3}, "jitter": 0.0})
+    from agentevolver.schema.trajectory import Reward, Trajectory
+
+    lock = threading.Lock()
+    calls = {}
+
+    def rollout_env_worker(task, traj_exp_config, data_id, rollout_id, mode, thread_index, tmux, stop):
+        with lock:
+            calls[thread_index] = calls.get(thread_index, 0) + 1
+            attempt = calls[thread_index]
+        time.sleep(0.05 * thread_index)
+        tmux["step"][thread_index] = -1
+        metadata = {"error": "Throttling: quota exceeded"} if thread_index == 0 and attempt == 1 else {}
+        return Trajectory(data_id=data_id, rollout_id=rollout_id, reward=Reward(success_rate=1.0), metadata=metadata)
+
+    manager.rollout_env_worker = rollout_env_worker
+    tasks, configs = make_tasks(2)
+
+    t0 = time.monotonic()
+    trajectories = manager.rollout(tasks, configs, mode="sample", epoch="0")
+    elapsed = time.monotonic() - t0
+
+    assert [(t.data_id, t.rollout_id) for t in trajectories] == [("0", "0"), ("0", "1"), ("1", "0"), ("1", "1")]
+    assert calls == {0: 2, 1: 1, 2: 1, 3: 1}
+    assert elapsed < 1.0  # one 0.3s backoff, not a 30s sleep
+    assert manager.last_rollout_metrics["rollout/retries_quota"] == 1
+    assert "rollout/threads_finished" in manager.live_rollout_status
+
+
+def test_rollout_counts_trajectories_it_gives_up():
+    manager = make_env_manager({"max_attempts": 2, "delays": {"env": 0.01}, "jitter": 0.0})
+    from agentevolver.schema.trajectory import Reward, Trajectory
+
+    calls = []
+
+    def rollout_env_worker(task, traj_exp_config, data_id, rollout_id, mode, thread_index, tmux, stop):
+        calls.append(thread_index)
+        tmux["step"][thread_index] = -1
+        metadata = {"error": "env.create_instance failed"} if thread_index == 1 else {}
+        return Trajectory(data_id=data_id, rollout_id=rollout_id, reward=Reward(success_rate=1.0), metadata=metadata)
+
+    manager.rollout_env_worker = rollout_env_worker
+    groups = []
+    tasks, configs = make_tasks(1)
+    trajectories = manager.rollout(tasks, configs, mode="sample", epoch="0", on_group_complete=groups.append)
+
+    assert [(t.data_id, t.rollout_id) for t in trajectories] == [("0", "0")]
+    assert calls.count(1) == 3  # the first run and two retries
+    assert [[t.rollout_id for t in group] for group in groups] == [["0"]]
+    for metrics in (manager.last_rollout_metrics, manager.live_rollout_status):
+        assert metrics["rollout/retries_given_up"] == metrics["rollout/given_up_env"] == 1
+
+
+def test_validation_never_gives_up_a_trajectory():
+    manager = make_env_manager({"max_attempts": 1, "delays": {"env": 0.01}, "jitter": 0.0})
+    from agentevolver.schema.trajectory import Reward, Trajectory
+
+    calls = []
+
+    def rollout_env_worker(task, traj_exp_config, data_id, rollout_id, mode, thread_index, tmux, stop):
+        calls.append(thread_index)
+        tmux["step"][thread_index] = -1
+        metadata = {"error": "env.create_instance failed"} if len(calls) <= 3 else {}
+        return Trajectory(data_id=data_id, rollout_id=rollout_id, reward=Reward(success_rate=1.0), metadata=metadata)
+
+    manager.rollout_env_worker = rollout_env_worker
+    tasks, configs = make_tasks(1)
+    trajectories = manager.rollout(tasks, configs, mode="validate", epoch="0")
+
+    assert [(t.data_id, t.rollout_id) for t in trajectories] == [("0", "0")]
+    assert len(calls) == 4
+    assert manager.last_rollout_metrics["rollout/retries_given_up"] == 0
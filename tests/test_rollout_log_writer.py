@@ -0,0 +1,115 @@
+import pytest
+from omegaconf import OmegaConf
+
+from agentevolver.module.agent_flow import rollout_log_writer
+from agentevolver.module.agent_flow.rollout_log_writer import RolloutLogWriter, get_rollout_log_writer
+
+
+def _idle_worker(log_queue, tokenizer, config, log_path):
+    """A log worker that never takes anything from the queue, so it fills up deterministically."""
+
+
+@pytest.fixture
+def idle_writer(monkeypatch):
+    monkeypatch.setattr(rollout_log_writer, "_log_worker", _idle_worker)
+    writers = []
+
+    def make(**kwargs):
+        writers.append(RolloutLogWriter(tokenizer=None, config=None, **kwargs))
+        return writers[-1]
+
+    yield make
+    for writer in writers:
+        writer.close(timeout=1.0)
+
+
+def log_trajectories(writer, n):
+    logged = []
+    for i in range(n):
+        if writer.should_log():
+            logged.append(writer.submit({"trajectory": i}))
+    return logged
+
+
+def test_log_every_n_samples_one_trajectory_in_n(idle_writer):
+    writer = idle_writer(log_every_n=3, queue_size=16)
+    assert log_trajectories(writer, 10) == [True] * 4  # trajectories 0, 3, 6 and 9
+    assert writer.get_metrics() == {"rollout_log/submitted": 4, "rollout_log/dropped": 0, "rollout_log/skipped": 6}
+
+
+def test_full_queue_drops_payloads_without_blocking(idle_writer):
+    writer = idle_writer(log_every_n=1, queue_size=2)
+    before = writer.stats()
+    # the third trajectory is turned away by `should_log`, before its payload is built
+    assert log_trajectories(writer, 3) == [True, True]
+    # a payload built while the queue had room is dropped by `submit`
+    assert writer.submit({"trajectory": 3}) is False
+    assert writer.get_metrics(since=before) == {"rollout_log/submitted": 2, "rollout_log/dropped": 2, "rollout_log/skipped": 0}
+
+    after = writer.stats()
+    assert log_trajectories(writer, 2) == []
+    assert writer.get_metrics(since=after) == {"rollout_log/submitted": 0, "rollout_log/dropped": 2, "rollout_log/skipped": 0}
+
+
+def test_closed_writer_drops_everything(idle_writer):
+    writer = idle_writer(log_every_n=1, queue_size=2)
+    writer.close(timeout=1.0)
+    assert log_trajectories(writer, 2) == []
+    assert writer.submit({"trajectory": 2}) is False
+    assert writer.stats()["rollout_log/dropped"] == 2
+
+
+def test_log_every_n_zero_disables_rollout_logs():
+    config = OmegaConf.create({"actor_rollout_ref": {"rollout": {"log_every_n": 0}}})
+    assert get_rollout_log_writer(config, tokenizer=None) is None
+
+
+class FakeCMT:
+    """Tokenizes each step (a string) to one token per character; steps after the first are the response."""
+
+    def tokenize_steps(self, ext_steps):
+        prompt_ids = [ord(c) for c in ext_steps[0]]
+        response_ids = [ord(c) for step in ext_steps[1:] for c in step]
+        return {"input_ids": prompt_ids + response_ids, "prompt_ids": prompt_ids, "response_ids": response_ids,
+                "loss_mask": [0] * len(prompt_ids) + [1] * len(response_ids)}
+
+
+def test_raw_steps_are_tokenized_off_the_rollout_thread():
+    from agentevolver.module.context_manager.cmt_log import tokenize_log_payload
+
+    payload = {"header": "Training, task 7", "attach": "copy this", "metadata": {}, "items": {
+        "7.1.0": {"ext_steps": ["ab", "c"], "outcome": "1", "reward": "1.000"},
+        "7.1.1": {"ext_steps": ["ab", "cd", "e"], "outcome": "1", "reward": "1.000"},
+    }}
+    items = tokenize_log_payload(payload, FakeCMT())["items"]
+    assert items["7.1.0"] == {"input_ids": [97, 98, 99], "loss_mask": [0, 0, 1], "outcome": "1",
+                              "len_prompt_ids": 2, "len_response_ids": 1, "len_input_ids": 3, "reward": "1.000"}
+    assert list(items["7.1.1"]) == ["input_ids", "loss_mask", "outcome", "len_prompt_ids", "len_response_ids", "len_input_ids", "reward"]
+    assert items["7.1.1"]["len_response_ids"] == 3
+    assert tokenize_log_payload(None, FakeCMT()) is None
+
+
+def test_grouped_context_managers_log_one_item_per_group():
+    from types import SimpleNamespace
+
+    from agentevolver.module.context_manager.cmt_linear import Linear_CMT
+    from agentevolver.module.context_manager.cmt_linear_think import LinearThinkCMT
+    from agentevolver.schema.trajectory import Reward
+
+    class FakeCMT(SimpleNamespace):
+        build_log_payload = Linear_CMT.build_log_payload
+
+        def reward_patch(self, reward):
+            return reward
+
+    linear = FakeCMT(reward=Reward(outcome=1.0, success_rate=1.0), metadata={}, steps=[{"role": "user", "content": "hi"}],
+                     get_log_step_groups=lambda: {"": ["a", "b"]})
+    payload = linear.build_log_payload(task_id="7")
+    assert list(payload["items"]) == ["7.1.0"]
+    assert payload["items"]["7.1.0"]["ext_steps"] == ["a", "b"] and payload["conversation"] == linear.steps
+
+    think = FakeCMT(reward=linear.reward, metadata={}, grouped_steps=[["a"], ["b", "c"]])
+    think.get_log_step_groups = lambda: LinearThinkCMT.get_log_step_groups(think)
+    payload = think.build_log_payload(task_id="7")
+    assert {k: v["ext_steps"] for k, v in payload["items"].items()} == {"7.1.0.0": ["a"], "7.1.0.1": ["b", "c"]}
+    assert payload["conversation"] is None
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("pydantic")
+
+from torch.nn.utils.rnn import pad_sequence
+
+from agentevolver.module.env_manager.collate import collate_samples
+from agentevolver.schema.trajectory import Sample
+
+PAD = 151643
+MAX_RESPONSE_LENGTH = 64
+
+
+def make_sample(rng, data_id, add_exp=False):
+    prompt_len, response_len = rng.randint(1, 20), rng.randint(1, 40)
+    prompt_ids = [rng.randint(0, 1000) for _ in range(prompt_len)]
+    response_ids = [rng.randint(0, 1000) for _ in range(response_len)]
+    prompt_loss = [0] * prompt_len
+    response_loss = [rng.randint(0, 1) for _ in range(response_len)]
+    return Sample(
+        data_id=str(data_id),
+        rollout_id="0",
+        task_id=str(data_id),
+        extras={"add_exp": add_exp, "task_train_expmode": "discard"},
+        input_ids=prompt_ids + response_ids,
+        prompt_ids=prompt_ids,
+        response_ids=response_ids,
+        attention_mask=[1] * (prompt_len + response_len),
+        prompt_attention_mask=[1] * prompt_len,
+        response_attention_mask=[1] * response_len,
+        position_ids=list(range(prompt_len + response_len)),
+        prompt_position_ids=list(range(prompt_len)),
+        response_position_ids=list(range(prompt_len, prompt_len + response_len)),
+        loss_mask=prompt_loss + response_loss,
+        prompt_loss_mask=prompt_loss,
+        response_loss_mask=response_loss,
+        max_prompt_len=20,
+        max_response_len=MAX_RESPONSE_LENGTH,
+        max_model_len=20 + MAX_RESPONSE_LENGTH,
+    )
+
+
+def legacy_collate(samples, step_ids):
+    """The per-sample tensor + pad_sequence collation that `collate_samples` replaced."""
+    def left(field, value):
+        return pad_sequence([torch.tensor(getattr(s, field), dtype=torch.int) for s in samples],
+                            batch_first=True, padding_value=value, padding_side="left")
+
+    def right(field, value):
+        return pad_sequence([torch.tensor(getattr(s, field), dtype=torch.int) for s in samples],
+                            batch_first=True, padding_value=value)
+
+    def exp(field, side):
+        flags = [s.extras["add_exp"] and s.extras["task_train_expmode"] == "discard" for s in samples]
+        masks = [(torch.ones if f else torch.zeros)(len(getattr(s, field)), dtype=torch.int) for s, f in zip(samples, flags)]
+        return pad_sequence(masks, batch_first=True, padding_value=0, padding_side=side)
+
+    prompts, responses = left("prompt_ids", PAD), right("response_ids", PAD)
+    prompt_position_ids = left("prompt_position_ids", 0)
+    delta = torch.arange(1, responses.size(1) + 1).unsqueeze(0).repeat(len(samples), 1)
+    step_ids_pad = pad_sequence([torch.tensor(s, dtype=torch.long) for s in step_ids], batch_first=True, padding_value=-1)
+    step_ids_pad = torch.nn.functional.pad(step_ids_pad, (0, MAX_RESPONSE_LENGTH - step_ids_pad.size(1)), value=-1)
+    return {
+        "prompts": prompts,
+        "responses": responses,
+        "input_ids": torch.cat((prompts, responses), dim=-1),
+        "attention_mask": torch.cat((left("prompt_attention_mask", 0), right("response_attention_mask", 0)), dim=-1),
+        "position_ids": torch.cat((prompt_position_ids, prompt_position_ids[:, -1:] + delta), dim=-1),
+        "loss_mask": torch.cat((left("prompt_loss_mask", 0), right("response_loss_mask", 0)), dim=-1),
+        "exp_mask": torch.cat((exp("prompt_loss_mask", "left"), exp("response_loss_mask", "right")), dim=-1),
+        "step_ids": step_ids_pad,
+        "group_ids": torch.tensor([int(s.data_id) for s in samples], dtype=torch.long),
+    }
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_collate_samples_matches_legacy(compact):
+    rng = random.Random(0)
+    samples = [make_sample(rng, data_id=i // 4, add_exp=(i % 3 == 0)) for i in range(16)]
+    step_ids = [[rng.choice([-1, 0, 1]) for _ in s.response_ids] for s in samples]
+    expected = legacy_collate(samples, step_ids)
+    if compact:
+        for sample in samples:
+            sample.compact()
+
+    actual = collate_samples(samples, pad_token_id=PAD, step_ids=step_ids, step_ids_length=MAX_RESPONSE_LENGTH)
+
+    assert actual.keys() == expected.keys()
+    for key in expected:
+        assert actual[key].dtype == expected[key].dtype, key
+        assert torch.equal(actual[key], expected[key]), key
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("verl")
+pytest.importorskip("openai")
+web = pytest.importorskip("aiohttp.web")
+
+from agentevolver.module.adv_processor import judgment_cache
+from agentevolver.module.adv_processor.semantic_attribution import evaluate_step_flags_parallel
+
+
+class FakeTokenizer:
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(str(int(i)) for i in ids)
+
+
+def make_batch(prompts, num_steps=3, response_length=4):
+    batch_size = len(prompts)
+    rewards = torch.zeros(batch_size, response_length)
+    rewards[:, -1] = 1.0
+    return SimpleNamespace(
+        batch={
+            "prompts": torch.tensor(prompts),
+            "responses": torch.ones(batch_size, response_length, dtype=torch.long),
+            "advantages": torch.ones(batch_size, response_length),
+            "token_level_rewards": rewards,
+            "loss_mask": torch.ones(batch_size, response_length),
+        },
+        non_tensor_batch={
+            "steps": [[{"action": f"action {j}", "observation": ""} for j in range(num_steps)] for _ in prompts],
+        },
+    )
+
+
+async def run_with_server(coro_fn):
+    """Runs `coro_fn(base_url, calls)` against a local OpenAI-compatible chat completions stand-in."""
+    calls = []
+
+    async def chat_completions(request):
+        body = await request.json()
+        calls.append(body)
+        content = "Step 0 Judgment: GOOD\nStep 1 Judgment: BAD\nStep 2 Judgment: GOOD"
+        return web.json_response({
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await coro_fn(f"http://127.0.0.1:{port}/v1", calls)
+    finally:
+        await runner.cleanup()
+
+
+def test_judgments_are_cached_on_disk_and_deduplicated(tmp_path, monkeypatch):
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "test")
+    monkeypatch.setattr(judgment_cache, "_caches", {})
+    # samples 0 and 1 share prompt and steps: one call serves both
+    batch = make_batch([[1, 2], [1, 2], [3, 4], [5, 6]])
+
+    async def scenario(base_url, calls):
+        kwargs = dict(overall_score_source="token_level_rewards", skip_type="none", max_concurrent=2,
+                      cache_dir=str(tmp_path), base_url=base_url)
+        flags, stats = await evaluate_step_flags_parallel(FakeTokenizer(), batch, **kwargs)
+        assert flags == [[True, False, True]] * 4
+        assert len(calls) == 3
+        assert stats["prm/judge_dedup_hits"] == 1
+        assert stats["prm/judge_cache_hit_rate"] == pytest.approx(0.25)
+
+        # a fresh process only has the disk cache
+        monkeypatch.setattr(judgment_cache, "_caches", {})
+        flags, stats = await evaluate_step_flags_parallel(FakeTokenizer(), batch, **kwargs)
+        assert flags == [[True, False, True]] * 4
+        assert len(calls) == 3
+        assert stats["prm/judge_cache_hit_rate"] == 1.0
+        assert stats["total_api_calls"] == 0
+
+    asyncio.run(run_with_server(scenario))
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("omegaconf")
+
+from agentevolver.module.env_manager.straggler_policy import StragglerPolicy
+
+
+def make_policy(num_groups=2, group_size=4, max_steps=30, **config):
+    stop = [False] * (num_groups * group_size)
+    tmux = {"step": [3] * len(stop), "token": [0] * len(stop)}
+    policy = StragglerPolicy(config, num_groups=num_groups, group_size=group_size, stop=stop, tmux=tmux, max_steps=max_steps)
+    return policy, stop
+
+
+def test_group_finish_fraction_only_stops_that_group():
+    policy, stop = make_policy(group_finish_fraction=0.5)
+    policy.start()
+    policy.on_finished(0)
+    assert not any(stop)
+    policy.on_finished(1)
+    assert stop == [False, False, True, True, False, False, False, False]
+    assert sorted(policy.pop_cancelled()) == [2, 3]
+    assert policy.pop_cancelled() == []
+    metrics = policy.get_metrics()
+    assert metrics["rollout/straggler_cancelled"] == 2
+    assert metrics["rollout/straggler_discarded"] == 2
+    assert metrics["rollout/straggler_saved_steps"] == 2 * (30 - 3)
+
+
+def test_finish_fraction_stops_the_whole_batch():
+    policy, stop = make_policy(finish_fraction=0.25, action="truncate")
+    policy.start()
+    policy.on_finished(5)
+    assert not any(stop)
+    policy.on_finished(0)
+    assert stop == [False, True, True, True, True, False, True, True]
+    assert policy.get_metrics()["rollout/straggler_truncated"] == 6
+    # a cancelled trajectory that finishes anyway is not counted as finished
+    policy.on_finished(1)
+    assert policy.is_cancelled(1)
+
+
+def test_time_budget_stops_everything_still_running():
+    policy, stop = make_policy(time_budget=0.05)
+    policy.start()
+    policy.on_finished(2)
+    time.sleep(0.2)
+    policy.close()
+    assert stop == [True, True, False, True, True, True, True, True]
+
+
+def test_defaults_never_stop():
+    policy, stop = make_policy()
+    policy.start()
+    for i in range(len(stop)):
+        policy.on_finished(i)
+    assert not any(stop)
+    assert policy.get_metrics()["rollout/straggler_cancelled"] == 0
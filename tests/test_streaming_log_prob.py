@@ -0,0 +1,127 @@
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("verl")
+
+from tensordict import TensorDict
+from verl import DataProto
+
+from agentevolver.module.env_manager.collate import collate_samples
+from agentevolver.module.trainer.streaming_rollout import StreamingLogProbPipeline
+from agentevolver.schema.trajectory import Sample
+
+PAD = 0
+
+
+def make_sample(rng, data_id, rollout_id):
+    prompt_len, response_len = rng.randint(1, 6), rng.randint(1, 12)
+    prompt_ids = [rng.randint(1, 100) for _ in range(prompt_len)]
+    response_ids = [rng.randint(1, 100) for _ in range(response_len)]
+    return Sample(
+        data_id=str(data_id), rollout_id=str(rollout_id), task_id=str(data_id),
+        input_ids=prompt_ids + response_ids, prompt_ids=prompt_ids, response_ids=response_ids,
+        attention_mask=[1] * (prompt_len + response_len), prompt_attention_mask=[1] * prompt_len,
+        response_attention_mask=[1] * response_len, position_ids=list(range(prompt_len + response_len)),
+        prompt_position_ids=list(range(prompt_len)), response_position_ids=list(range(prompt_len, prompt_len + response_len)),
+        loss_mask=[0] * prompt_len + [1] * response_len, prompt_loss_mask=[0] * prompt_len, response_loss_mask=[1] * response_len,
+        max_prompt_len=6, max_response_len=12, max_model_len=18,
+    )
+
+
+class FakeEnvManager:
+    """Each trajectory carries the sample it tokenizes to."""
+
+    pad_token_id = PAD
+
+    def tokenize_trajectories(self, trajectories):
+        return [trajectory.sample for trajectory in trajectories]
+
+
+def fake_compute(key, fn, calls):
+    """A log-prob function of the response tokens only, so every row's result identifies its sample."""
+    def compute(data):
+        calls.append(len(data))
+        responses = data.batch["responses"].float()
+        if key == "old_log_probs":
+            batch = {"old_log_probs": fn(responses), "entropys": responses + 1}
+        else:
+            batch = {key: fn(responses)}
+        return DataProto(batch=TensorDict(batch, batch_size=len(data)))
+    return compute
+
+
+def final_batch(samples):
+    tensors = collate_samples(samples, pad_token_id=PAD, step_ids=[[] for _ in samples], step_ids_length=0)
+    return DataProto(batch=TensorDict({"responses": tensors["responses"]}, batch_size=len(samples)))
+
+
+def run_pipeline(groups, min_groups=2):
+    calls = {"actor": [], "ref": []}
+    pipeline = StreamingLogProbPipeline(
+        FakeEnvManager(),
+        compute_log_prob=fake_compute("old_log_probs", lambda r: r * 0.5, calls["actor"]), log_prob_divisor=4,
+        compute_ref_log_prob=fake_compute("ref_log_prob", lambda r: r - 3, calls["ref"]), ref_divisor=3,
+        min_groups=min_groups,
+    )
+    pipeline.start()
+    for group in groups:
+        pipeline.submit_group([SimpleNamespace(sample=sample) for sample in group])
+        time.sleep(0.05)  # rollout keeps going while the first micro-batches are computed
+    pipeline.finish()
+    return pipeline, calls
+
+
+def test_results_land_at_the_rows_of_their_samples():
+    rng = random.Random(0)
+    groups = [[make_sample(rng, data_id, rollout_id) for rollout_id in range(3)] for data_id in (4, 1, 3, 0, 2)]
+    pipeline, calls = run_pipeline(groups)
+    # several micro-batches of at least two groups, padded to the worker group sizes
+    assert len(calls["actor"]) >= 2 and sum(calls["actor"]) >= 15 and all(n % 4 == 0 for n in calls["actor"])
+    assert all(n % 3 == 0 for n in calls["ref"])
+
+    # the trainer's batch: sorted, one sample dropped to fit the world size
+    samples = sorted(pipeline.samples, key=lambda s: (int(s.data_id), int(s.rollout_id)))
+    del samples[5]
+    batch = final_batch(samples)
+    assert pipeline.attach(batch, samples)
+
+    for row, sample in enumerate(samples):
+        # past the response the values depend on the micro-batch padding; those positions are masked out downstream
+        n = len(sample.response_ids)
+        response = torch.tensor(sample.response_ids, dtype=torch.float32)
+        torch.testing.assert_close(batch.batch["old_log_probs"][row, :n], response * 0.5)
+        torch.testing.assert_close(batch.batch["entropys"][row, :n], response + 1)
+        torch.testing.assert_close(batch.batch["ref_log_prob"][row, :n], response - 3)
+
+
+def test_trainer_recomputes_unless_every_row_is_filled():
+    rng = random.Random(1)
+    pipeline, _ = run_pipeline([[make_sample(rng, data_id, 0)] for data_id in range(4)], min_groups=1)
+    samples = list(pipeline.samples) + [make_sample(rng, 9, 0)]  # a sample the pipeline never saw
+    batch = final_batch(samples)
+    assert not pipeline.attach(batch, samples)
+    # the trainer recomputes whatever is missing from the batch
+    assert {"old_log_probs", "entropys", "ref_log_prob"}.isdisjoint(batch.batch.keys())
+
+    batch = final_batch(samples[:-1])
+    assert pipeline.attach(batch, samples[:-1])
+    assert {"old_log_probs", "entropys", "ref_log_prob"} <= set(batch.batch.keys())
+
+
+def test_streaming_is_refused_on_workers_colocated_with_rollout():
+    from omegaconf import OmegaConf
+
+    from agentevolver.module.trainer.ae_ray_trainer import AgentEvolverRayPPOTrainer
+
+    trainer = AgentEvolverRayPPOTrainer.__new__(AgentEvolverRayPPOTrainer)
+    trainer.config = OmegaConf.create({"actor_rollout_ref": {"rollout": {"stream_log_prob": False}}})
+    trainer.hybrid_engine = True
+    assert trainer._create_streaming_pipeline() is None
+
+    trainer.config.actor_rollout_ref.rollout.stream_log_prob = True
+    with pytest.raises(ValueError, match="colocated"):
+        trainer._create_streaming_pipeline()
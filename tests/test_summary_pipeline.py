@@ -0,0 +1,81 @@
+import threading
+
+from agentevolver.module.exp_manager.summary_pipeline import SummaryPipeline
+from agentevolver.schema.trajectory import Reward, Trajectory
+
+
+def make_trajectory(task_id, content="hello"):
+    trajectory = Trajectory(steps=[{"role": "user", "content": content}], reward=Reward(outcome=1.0))
+    trajectory.task_id = task_id
+    return trajectory
+
+
+class Summarizer:
+    def __init__(self, blocked=False):
+        self.batches = []
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+
+    def __call__(self, payloads):
+        self.release.wait(timeout=10)
+        self.batches.append(payloads)
+        return {}, 0.01
+
+
+def test_trajectories_are_coalesced_per_task_across_steps():
+    summarizer = Summarizer()
+    pipeline = SummaryPipeline(summarizer, batch_size=4, max_lag_steps=2, num_workers=1)
+    pipeline.submit([make_trajectory("a"), make_trajectory("a"), make_trajectory("b")], step=1)
+    pipeline.submit([make_trajectory("a"), make_trajectory("a")], step=2)
+    assert pipeline.flush(timeout=10)
+    sizes = sorted(len(batch) for batch in summarizer.batches)
+    assert sizes == [1, 4]  # a's four trajectories from two steps in one call, b flushed alone
+    assert summarizer.batches[0][0] == {"messages": [{"role": "user", "content": "hello"}], "score": 1.0}
+
+    metrics = pipeline.metrics()
+    assert metrics["exp_manager/summary_queue_depth"] == 0
+    assert metrics["exp_manager/summary_memory_mb"] == 0
+    assert metrics["exp_manager/summary_batches"] == 2
+    pipeline.close()
+
+
+def test_partial_batches_are_sent_once_they_lag():
+    summarizer = Summarizer()
+    pipeline = SummaryPipeline(summarizer, batch_size=4, max_lag_steps=2, num_workers=1)
+    pipeline.submit([make_trajectory("a")], step=1)
+    pipeline.submit([make_trajectory("b")], step=2)
+    assert pipeline.metrics()["exp_manager/summary_lag_steps"] == 1
+    pipeline.submit([], step=3)  # "a" has now waited two steps, "b" only one
+    for _ in range(100):
+        if summarizer.batches:
+            break
+        threading.Event().wait(0.01)
+    assert [len(batch) for batch in summarizer.batches] == [1]
+    assert pipeline.metrics()["exp_manager/summary_queue_depth"] == 1
+    pipeline.close()
+
+
+def test_full_pipeline_sheds_load_without_blocking():
+    summarizer = Summarizer(blocked=True)
+    pipeline = SummaryPipeline(summarizer, batch_size=1, max_pending=5, num_workers=1)
+    accepted = pipeline.submit([make_trajectory(str(i), content="x" * 1000) for i in range(8)], step=1)
+    assert accepted == 5
+    metrics = pipeline.metrics()
+    assert metrics["exp_manager/summary_dropped"] == 3
+    assert metrics["exp_manager/summary_queue_depth"] == 5
+    assert metrics["exp_manager/summary_memory_mb"] * 2**20 == 5000
+
+    summarizer.release.set()
+    assert pipeline.flush(timeout=10)
+    assert len(summarizer.batches) == 5
+    pipeline.close()
+
+
+def test_close_gives_up_on_a_stuck_summarizer():
+    summarizer = Summarizer(blocked=True)
+    pipeline = SummaryPipeline(summarizer, batch_size=1, num_workers=1)
+    pipeline.submit([make_trajectory("a")], step=1)
+    assert not pipeline.close(timeout=0.1)
+    summarizer.release.set()
+    assert pipeline.close(timeout=10)
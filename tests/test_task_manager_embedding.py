@@ -481,6 +481,42 @@ class TestConfiguration:
             print("✅ 检测到 OpenAI API Key")
 
 
+class TestEmbeddingCache:
+    """EmbeddingCache 与批量接口测试（不调用真实API）"""
+
+    @pytest.fixture
+    def temp_db_path(self):
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @pytest.fixture
+    def fake_embedding_calls(self):
+        """用确定性的假向量替换远程 embedding 请求，并记录每次请求的文本"""
+        calls = []
+
+        def fake_get_multiple_embeddings(self, texts, **kwargs):
+            calls.append(list(texts))
+            return [[1.0 if i == sum(map(ord, t)) % 16 else 0.0 for i in range(16)] for t in texts]
+
+        with patch.object(OpenAIEmbeddingClient, "get_multiple_embeddings", fake_get_multiple_embeddings):
+            yield calls
+
+    def test_state_recorder_embeds_each_key_once(self, temp_db_path, fake_embedding_calls, monkeypatch):
+        monkeypatch.setenv("DASHSCOPE_API_KEY", "fake-key")
+        recorder = StateRecorder(similarity_threshold=0.99, chroma_db_path=temp_db_path,
+                                 collection_name="test_cache_states")
+        trajectory = MockTrajectory([{"role": "user", "content": "打开购物车"}])
+
+        recorder.add_states([(trajectory, "click cart", "cart opened"), (trajectory, "click cart", "cart opened again")])
+        assert recorder.get_state(trajectory) == [("click cart", "cart opened"), ("click cart", "cart opened again")]
+        assert recorder.query_states([trajectory, MockTrajectory([{"role": "user", "content": "x"}])])[1] == []
+
+        sent = [text for call in fake_embedding_calls for text in call]
+        assert sent.count(pack_trajectory(trajectory)) == 1
+        assert recorder.get_metrics()["embedding_cache/hits"] == 2.0
+
+
 if __name__ == "__main__":
     print("🧪 EmbeddingClient 真实API测试用例")
     print("=" * 50)
@@ -0,0 +1,137 @@
+import random
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("tensordict")
+pytest.importorskip("verl")
+
+from tensordict import TensorDict
+
+from agentevolver.module.exp_manager.het_core_algos import het_compute_token_on_off_policy_loss
+from agentevolver.module.exp_manager.token_packing import first_fit_decreasing, pack_micro_batches, split_bins
+
+
+def make_mini_batch(batch_size=16, prompt_length=12, response_length=40, seed=0):
+    rng = random.Random(seed)
+    total = prompt_length + response_length
+    attention_mask = torch.zeros(batch_size, total, dtype=torch.long)
+    for i in range(batch_size):
+        p = rng.randint(2, prompt_length)
+        r = rng.randint(1, response_length - 8)  # leave some columns unused by every sample
+        attention_mask[i, prompt_length - p:prompt_length + r] = 1
+    loss_mask = attention_mask.clone()
+    loss_mask[:, :prompt_length] = 0
+    exp_mask = (torch.rand(batch_size, total) > 0.5).long() * loss_mask
+    return TensorDict({
+        "input_ids": torch.randint(1, 1000, (batch_size, total)) * attention_mask,
+        "attention_mask": attention_mask,
+        "position_ids": torch.clamp(torch.cumsum(attention_mask, dim=-1) - 1, min=0),
+        "loss_mask": loss_mask,
+        "exp_mask": exp_mask,
+        "responses": torch.randint(1, 1000, (batch_size, response_length)),
+        "old_log_probs": -torch.rand(batch_size, response_length),
+        "advantages": torch.randn(batch_size, response_length),
+        "step_ids": torch.randint(-1, 5, (batch_size, response_length)),
+        "group_ids": torch.arange(batch_size) // 4,
+    }, batch_size=batch_size)
+
+
+def het_loss(mb, log_prob_fn):
+    response_length = mb["responses"].size(1)
+    return het_compute_token_on_off_policy_loss(
+        old_log_prob=mb["old_log_probs"], log_prob=log_prob_fn(mb), advantages=mb["advantages"],
+        response_mask=mb["loss_mask"][:, -response_length:], exp_mask=mb["exp_mask"][:, -response_length:],
+        cliprange=0.2, off_cliprange_high=0.6,
+    )
+
+
+def test_first_fit_decreasing_respects_budget():
+    lengths = [5, 9, 3, 12, 7, 1, 30]
+    bins = first_fit_decreasing(lengths, budget=12)
+    assert sorted(i for b in bins for i in b) == list(range(len(lengths)))
+    for b in bins:
+        assert sum(lengths[i] for i in b) <= 12 or len(b) == 1
+
+
+def test_packed_micro_batches_keep_samples_and_losses():
+    mini_batch = make_mini_batch()
+    response_length = mini_batch["responses"].size(1)
+    micro_batches, metrics = pack_micro_batches(mini_batch, max_token_len=120, response_length=response_length, micro_batch_size=2)
+    assert metrics["actor/padding_ratio_after"] < metrics["actor/padding_ratio_before"]
+    assert sum(len(mb) for mb in micro_batches) == len(mini_batch)
+
+    # a log-prob function that only depends on the token and its position, like the model would
+    def log_prob_fn(mb):
+        return -(mb["responses"].float() % 7) / 10 - 0.01
+
+    for mb in micro_batches:
+        assert mb["attention_mask"].sum(dim=-1).sum() <= 120 or len(mb) == 1
+        # find the source rows through their (random, hence unique) responses
+        rows = [int(torch.nonzero((mini_batch["responses"][:, :r.size(0)] == r).all(-1))[0]) for r in mb["responses"]]
+        source = mini_batch[torch.tensor(rows)]
+        width = mb["responses"].size(1)
+        # response-aligned tensors keep their columns, step/group annotations travel with their samples
+        for key in ("old_log_probs", "advantages", "step_ids"):
+            assert torch.equal(mb[key], source[key][:, :width])
+        assert torch.equal(mb["group_ids"], source["group_ids"])
+        assert torch.equal(mb["exp_mask"][:, -width:], source["exp_mask"][:, -response_length:][:, :width])
+        # only padding is dropped
+        assert mb["attention_mask"].sum() == source["attention_mask"].sum()
+
+        expected = het_loss(source, log_prob_fn)
+        actual = het_loss(mb, log_prob_fn)
+        torch.testing.assert_close(actual["pg_loss"], expected["pg_loss"])
+        torch.testing.assert_close(actual["on_pg_loss"], expected["on_pg_loss"])
+        torch.testing.assert_close(actual["off_pg_loss"], expected["off_pg_loss"])
+
+
+def test_step_ids_wider_than_the_responses_are_trimmed_with_them():
+    mini_batch = make_mini_batch()
+    response_length = mini_batch["responses"].size(1)
+    # padded to a configured max response length beyond the batch's response width
+    mini_batch["step_ids"] = torch.cat([mini_batch["step_ids"], torch.full((len(mini_batch), 24), -1)], dim=1)
+    micro_batches, _ = pack_micro_batches(mini_batch, max_token_len=120, response_length=response_length, micro_batch_size=2)
+    for mb in micro_batches:
+        assert mb["step_ids"].size(1) == mb["responses"].size(1) < response_length
+
+
+def test_split_bins_reaches_the_requested_count():
+    lengths = [30, 2, 9, 9, 4, 1, 7, 12]
+    bins = first_fit_decreasing(lengths, budget=40)
+    for num_bins in range(len(bins), len(lengths) + 1):
+        split = split_bins(bins, lengths, num_bins)
+        assert len(split) == num_bins
+        assert sorted(i for b in split for i in b) == list(range(len(lengths)))
+        assert all(b == sorted(b) and b for b in split)
+    with pytest.raises(AssertionError):
+        split_bins(bins, lengths, len(lengths) + 1)
+
+
+def _pack_on_rank(rank, world_size, init_file, counts):
+    import torch.distributed as dist
+
+    dist.init_process_group("gloo", init_method=f"file://{init_file}", rank=rank, world_size=world_size)
+    try:
+        # rank 0 gets short samples that fit into few micro-batches, rank 1 long ones
+        mini_batch = make_mini_batch(seed=rank, response_length=40 + 60 * rank, prompt_length=12)
+        response_length = mini_batch["responses"].size(1)
+        micro_batches, metrics = pack_micro_batches(mini_batch, max_token_len=120, response_length=response_length, micro_batch_size=2)
+        alone, _ = pack_micro_batches(mini_batch, max_token_len=120, response_length=response_length, micro_batch_size=2,
+                                      same_micro_num_in_dp=False)
+        assert sum(len(mb) for mb in micro_batches) == len(mini_batch)
+        counts[rank] = (len(micro_batches), len(alone), metrics["actor/num_micro_batches"])
+    finally:
+        dist.destroy_process_group()
+
+
+def test_data_parallel_ranks_agree_on_the_micro_batch_count(tmp_path):
+    import torch.multiprocessing as mp
+
+    world_size = 2
+    counts = mp.get_context("spawn").Manager().dict()
+    mp.spawn(_pack_on_rank, args=(world_size, str(tmp_path / "dist_init"), counts), nprocs=world_size)
+    packed = [counts[rank][0] for rank in range(world_size)]
+    alone = [counts[rank][1] for rank in range(world_size)]
+    assert len(set(alone)) > 1  # the ranks would have disagreed on their own
+    assert packed == [max(alone)] * world_size